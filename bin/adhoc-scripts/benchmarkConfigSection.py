@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark of the ConfigSection parameter type checks.
+
+It times the construction of ConfigSection trees, framework job reports and
+workloads with the type checks done on every parameter (default) and with
+them deferred to a single validate_ call (lazy checks).
+
+Usage: python benchmarkConfigSection.py [--repeat N] [--files N] [--tasks N]
+"""
+from __future__ import print_function, division
+
+import timeit
+from argparse import ArgumentParser
+
+from WMCore.Configuration import ConfigSection
+from WMCore.DataStructs.Run import Run
+from WMCore.FwkJobReport.Report import Report
+from WMCore.WMSpec.WMWorkload import newWorkload
+
+
+def buildSections(lazy, nSections):
+    """
+    Build a two level ConfigSection tree with simple and complex parameters
+    """
+    config = ConfigSection("config")
+    config.lazyChecks_(lazy)
+    for i in range(nSections):
+        section = config.section_("section%s" % i)
+        section.name = "section%s" % i
+        section.number = i
+        section.ratio = i / 3.0
+        section.values = list(range(50))
+        section.mapping = {"a": [1, 2, 3], "b": {"c": "d"}}
+    config.validate_()
+    return config
+
+
+def buildReport(lazy, nFiles):
+    """
+    Build a report with nFiles output files, each with 10 runs of 100 lumis
+    """
+    report = Report()
+    report.data.lazyChecks_(lazy)
+    report.addStep("cmsRun1")
+    for i in range(nFiles):
+        aFile = {"lfn": "/store/data/file%s.root" % i, "pfn": "file%s.root" % i,
+                 "events": 1000, "size": 1024 * 1024, "merged": False,
+                 "checksums": {"adler32": "01234567", "cksum": "123456789"},
+                 "locations": set(["T1_US_FNAL_Disk"]),
+                 "runs": [Run(run, *range(1, 101)) for run in range(10)]}
+        report.addOutputFile("outputRECO", aFile)
+    report.data.validate_()
+    return report
+
+
+def buildWorkload(lazy, nTasks):
+    """
+    Build a workload with nTasks processing tasks, each with a merge task
+    """
+    workload = newWorkload("BenchmarkWorkload")
+    workload.data.lazyChecks_(lazy)
+    for i in range(nTasks):
+        task = workload.newTask("Task%s" % i)
+        task.setTaskType("Processing")
+        task.addInputDataset(name="/Primary/Processed%s/RAW" % i, primary="Primary",
+                             processed="Processed%s" % i, tier="RAW")
+        task.setSiteWhitelist(["T1_US_FNAL", "T2_CH_CERN"])
+        cmsRun = task.makeStep("cmsRun1")
+        cmsRun.setStepType("CMSSW")
+        mergeTask = task.addTask("Merge%s" % i)
+        mergeTask.setTaskType("Merge")
+        mergeTask.makeStep("cmsRun1")
+    return workload
+
+
+def main():
+    parser = ArgumentParser(description="ConfigSection type checks micro-benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timed runs")
+    parser.add_argument("--sections", type=int, default=2000, help="Sections in the ConfigSection tree")
+    parser.add_argument("--files", type=int, default=200, help="Output files in the report")
+    parser.add_argument("--tasks", type=int, default=100, help="Top level tasks in the workload")
+    args = parser.parse_args()
+
+    benchmarks = [("ConfigSection tree", buildSections, args.sections),
+                  ("Report", buildReport, args.files),
+                  ("WMWorkload", buildWorkload, args.tasks)]
+    for label, func, size in benchmarks:
+        times = {}
+        for lazy in (False, True):
+            times[lazy] = min(timeit.repeat(lambda: func(lazy, size), number=1, repeat=args.repeat))
+        print("%-20s eager checks: %.4fs  lazy checks: %.4fs  speed-up: %.2fx" %
+              (label, times[False], times[True], times[False] / times[True]))
+
+
+if __name__ == '__main__':
+    main()
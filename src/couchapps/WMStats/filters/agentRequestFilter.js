@@ -0,0 +1,4 @@
+function(doc, req) {
+  // agent_request documents plus deletions (which no longer carry the type)
+  return doc._deleted || doc.type == "agent_request";
+}
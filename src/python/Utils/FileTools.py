@@ -12,6 +12,10 @@ import subprocess
 import time
 import zlib
 
+# supported tarball compression modes: tarfile write mode and tarball extension
+TAR_COMPRESSION = {"bz2": ("w:bz2", ".tar.bz2"),
+                   "gz": ("w:gz", ".tar.gz"),
+                   "none": ("w", ".tar")}
 
 def calculateChecksums(filename):
     """
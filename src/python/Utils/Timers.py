@@ -6,7 +6,37 @@ Utilities related to timing and performance testing
 from __future__ import print_function, division, absolute_import
 
 from builtins import object
+import cProfile
+import json
+import logging
+import os
 import time
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+
+
+def _cpuTime():
+    """
+    CPU time of the calling thread when the platform provides it,
+    of the whole process otherwise
+    """
+    if hasattr(time, "thread_time"):
+        return time.thread_time()
+    return sum(os.times()[:2])
+
+
+def percentile(values, pct):
+    """
+    _percentile_
+
+    Nearest-rank percentile (0 to 100) of a sequence of values,
+    None for an empty sequence.
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    rank = int(round(pct / 100.0 * (len(values) - 1)))
+    return values[rank]
 
 
 def timeFunction(func):
@@ -52,3 +82,122 @@ class CodeTimer(object):
         runtime = end - self.start
         msg = '{label} took {time} seconds to complete'
         print(msg.format(label=self.label, time=runtime))
+
+
+class CycleProfiler(object):
+    """
+    Instrumentation of the cycles of a polling worker.
+
+    Use like
+
+    profiler = CycleProfiler("MyPoller", profileEvery=100, profileDir="/tmp")
+    with profiler.cycle():
+        with profiler.phase("loadJobs"):
+            load_jobs()
+        with profiler.phase("submit"):
+            submit()
+
+    Keeps the wall clock and CPU time of the last `window` cycles and of the
+    named phases opened in them, to report rolling percentiles. With
+    profileEvery, one cycle out of profileEvery is run under cProfile and
+    its stats are dumped to <profileDir>/<name>.prof (overwritten each time).
+    """
+
+    def __init__(self, name, window=100, profileEvery=0, profileDir=None):
+        self.name = name
+        self.window = window
+        self.profileEvery = profileEvery
+        self.profileDir = profileDir
+        self.cycles = 0
+        self.wallTimes = deque(maxlen=window)
+        self.cpuTimes = deque(maxlen=window)
+        self.phaseTimes = OrderedDict()
+        self._cyclePhases = None
+
+    def _addPhaseTime(self, phaseName, timeSpent):
+        """
+        Record the time spent in a phase
+        """
+        self.phaseTimes.setdefault(phaseName, deque(maxlen=self.window)).append(timeSpent)
+
+    @contextmanager
+    def cycle(self):
+        """
+        Context manager measuring one cycle
+        """
+        self.cycles += 1
+        profiler = None
+        if self.profileEvery and self.profileDir and self.cycles % self.profileEvery == 0:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        self._cyclePhases = OrderedDict()
+        startWall = time.time()
+        startCpu = _cpuTime()
+        try:
+            yield self
+        finally:
+            self.wallTimes.append(time.time() - startWall)
+            self.cpuTimes.append(_cpuTime() - startCpu)
+            # phases opened several times in a cycle count as one
+            for phaseName, timeSpent in self._cyclePhases.items():
+                self._addPhaseTime(phaseName, timeSpent)
+            self._cyclePhases = None
+            if profiler is not None:
+                profiler.disable()
+                self.dumpProfile(profiler)
+
+    @contextmanager
+    def phase(self, phaseName):
+        """
+        Context manager measuring a named phase of the current cycle
+        """
+        startWall = time.time()
+        try:
+            yield self
+        finally:
+            timeSpent = time.time() - startWall
+            if self._cyclePhases is None:
+                self._addPhaseTime(phaseName, timeSpent)
+            else:
+                self._cyclePhases[phaseName] = self._cyclePhases.get(phaseName, 0) + timeSpent
+
+    def dumpProfile(self, profiler):
+        """
+        Dump the cProfile stats of a cycle to the profile directory
+        """
+        profileFile = os.path.join(self.profileDir, "%s.prof" % self.name)
+        try:
+            profiler.dump_stats(profileFile)
+            logging.info("Profile of the cycle %d of %s dumped to %s", self.cycles, self.name, profileFile)
+        except Exception as ex:
+            logging.warning("Failed to dump the profile of %s to %s: %s", self.name, profileFile, str(ex))
+
+    def percentiles(self, pcts=(50, 90, 99)):
+        """
+        Rolling percentiles, in seconds, of the cycle wall clock time
+        ("wall"), cycle CPU time ("cpu") and of each phase ("phase.<name>")
+        """
+        series = OrderedDict([("wall", self.wallTimes), ("cpu", self.cpuTimes)])
+        for phaseName, times in self.phaseTimes.items():
+            series["phase.%s" % phaseName] = times
+        result = OrderedDict()
+        for key, times in series.items():
+            if times:
+                result[key] = OrderedDict(("p%s" % pct, round(percentile(times, pct), 3)) for pct in pcts)
+        return result
+
+    def summary(self, maxLength=1000):
+        """
+        Compact json summary of the percentiles and number of cycles. If it
+        is longer than maxLength characters, the phases with the shortest
+        median time are left out until it fits.
+        """
+        stats = OrderedDict([("cycles", self.cycles)])
+        stats.update(self.percentiles())
+        phases = sorted((key for key in stats if key.startswith("phase.")),
+                        key=lambda key: stats[key]["p50"], reverse=True)
+        summary = json.dumps(stats, separators=(",", ":"))
+        while len(summary) > maxLength and phases:
+            del stats[phases.pop()]
+            summary = json.dumps(stats, separators=(",", ":"))
+        return summary
@@ -5,6 +5,7 @@ Perform general agent monitoring, like:
  3. Couchdb replication status (and status of its database)
  4. Disk usage status
 """
+import json
 import time
 import logging
 import threading
@@ -514,6 +515,11 @@ class AgentStatusPoller(BaseWorkerThread):
             healthDoc['worker_poll'] = worker['poll_interval']
             healthDoc['worker_last_hb'] = worker['last_updated']
             healthDoc['worker_cycle_time'] = worker['cycle_time']
+            # rolling percentiles of the cycle and phase timings
+            try:
+                healthDoc['worker_cycle_stats'] = json.loads(worker.get('cycle_stats') or "{}")
+            except ValueError:
+                healthDoc['worker_cycle_stats'] = {}
             healthDocs.append(healthDoc)
 
         return healthDocs
@@ -180,6 +180,8 @@ class WMAgentDBData(object):
         self.jobTypeCountByStatus = wmbsDAOFactory(classname="Monitoring.JobTypeCountByState")
         self.componentStatusAction = wmAgentDAOFactory(classname="GetAllHeartbeatInfo")
         self.listWorkers = wmAgentDAOFactory(classname="MonitorWorkers")
+        # older agent schemas have no wm_workers.cycle_stats column
+        self.cycleStats = wmAgentDAOFactory(classname="ExistCycleStats").execute()
 
     def getAgentMonitoring(self):
         """
@@ -212,7 +214,7 @@ class WMAgentDBData(object):
         status and a short error message, if any.
         """
 
-        results = self.componentStatusAction.execute()
+        results = self.componentStatusAction.execute(cycleStats=self.cycleStats)
         currentTime = time.time()
         agentInfo = {}
         agentInfo['status'] = 'ok'
@@ -262,7 +264,7 @@ class WMAgentDBData(object):
                 agentInfo['down_components'].append(component)
                 agentInfo['down_component_detail'].append(component)
 
-        agentInfo['workers'] = self.listWorkers.execute()
+        agentInfo['workers'] = self.listWorkers.execute(cycleStats=self.cycleStats)
         return agentInfo
 
     def getBatchJobInfo(self):
@@ -22,6 +22,7 @@ We can introduce some delay in polling, if have to.
 
 import logging
 import threading
+from multiprocessing import Pool
 
 # harness class that encapsulates the basic component logic.
 from WMCore.Agent.Harness import Harness
@@ -53,4 +54,11 @@ class ErrorHandler(Harness):
         myThread = threading.currentThread()
         pollInterval = self.config.ErrorHandler.pollInterval
         logging.info("Setting poll interval to %s seconds" % pollInterval)
-        myThread.workerThreadManager.addWorker(ErrorHandlerPoller(self.config), pollInterval)
+        # fork the processes reading the FWJRs before the worker threads are started,
+        # so that they don't inherit locks held by other threads
+        readFWJRPool = None
+        readFWJRProcesses = getattr(self.config.ErrorHandler, 'readFWJRProcesses', 4)
+        if readFWJRProcesses > 1:
+            readFWJRPool = Pool(readFWJRProcesses)
+        myThread.workerThreadManager.addWorker(ErrorHandlerPoller(self.config, readFWJRPool=readFWJRPool),
+                                               pollInterval)
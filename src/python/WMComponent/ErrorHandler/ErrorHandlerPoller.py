@@ -20,6 +20,9 @@ it should be exhausted immediately.  It defaults to 24 hours.
 config.ErrorHandler.passExitCodes:  This should be a list of exitCodes that you want to cause the job to move
 immediately to the 'created' state, skipping cooloff.  It defaults to [].
 
+config.ErrorHandler.readFWJRProcesses:  Number of worker processes used to unpickle the FWJRs of a batch
+of failed jobs, only their error summary is sent back.  It defaults to 4.
+
 Note that exitCodesNoRetry has precedence over passExitCodes.
 """
 from future import standard_library
@@ -34,7 +37,7 @@ from Utils.IteratorTools import grouper
 from WMCore.ACDC.DataCollectionService import DataCollectionService
 from WMCore.DAOFactory import DAOFactory
 from WMCore.Database.CouchUtils import CouchConnectionError
-from WMCore.FwkJobReport.Report import Report
+from WMCore.FwkJobReport.Report import getErrorSummaries
 from WMCore.JobStateMachine.ChangeState import ChangeState
 from WMCore.WMBS.Job import Job
 from WMCore.WMException import WMException
@@ -55,7 +58,7 @@ class ErrorHandlerPoller(BaseWorkerThread):
     Polls for Error Conditions, handles them
     """
 
-    def __init__(self, config):
+    def __init__(self, config, readFWJRPool=None):
         """
         Initialise class members
         """
@@ -80,10 +83,14 @@ class ErrorHandlerPoller(BaseWorkerThread):
         self.maxFailTime = getattr(self.config.ErrorHandler, 'maxFailTime', 32 * 3600)
         self.readFWJR = getattr(self.config.ErrorHandler, 'readFWJR', False)
         self.passCodes = getattr(self.config.ErrorHandler, 'passExitCodes', [])
+        # the ErrorHandler component creates the pool before starting its threads,
+        # FWJRs are read in the poller thread without it
+        self.readFWJRPool = readFWJRPool
 
         self.getJobs = self.daoFactory(classname="Jobs.GetAllJobs")
         self.idLoad = self.daoFactory(classname="Jobs.LoadFromIDWithType")
         self.loadAction = self.daoFactory(classname="Jobs.LoadForErrorHandler")
+        self.maskAction = self.daoFactory(classname="Masks.Load")
 
         self.dataCollection = DataCollectionService(url=config.ACDC.couchurl,
                                                     database=config.ACDC.database)
@@ -128,6 +135,9 @@ class ErrorHandlerPoller(BaseWorkerThread):
         """
         logging.debug("terminating. doing one more pass before we die")
         self.algorithm(params)
+        if self.readFWJRPool is not None:
+            self.readFWJRPool.close()
+            self.readFWJRPool.join()
 
     def exhaustJobs(self, jobList):
         """
@@ -208,8 +218,10 @@ class ErrorHandlerPoller(BaseWorkerThread):
         logging.info("Starting to build ACDC with %i jobs", len(idList))
         logging.info("This operation will take some time...")
         loadList = self.loadJobsFromListFull(idList)
+        # load the masks of all the jobs at once
+        jobMasks = self.maskAction.execute(jobid=[job['id'] for job in loadList])
         for job in loadList:
-            job.getMask()
+            job['mask'].loadFromEntries(jobMasks.get(job['id'], []))
         self.dataCollection.failedJobs(loadList)
         return
 
@@ -220,71 +232,72 @@ class ErrorHandlerPoller(BaseWorkerThread):
         Check the FWJRs of the failed jobs
         and determine those that can be retried
         and which must be retried without going through cooloff.
+        The FWJRs of the whole batch are read in parallel and only
+        their error summary is kept.
         Returns a triplet with cooloff, passed and exhausted jobs.
         """
         cooloffJobs = []
         passJobs = []
         exhaustJobs = []
 
+        reportPaths = set(job['fwjr_path'] for job in jobList if job['fwjr_path'] is not None)
+        reportPaths = [reportPath for reportPath in reportPaths if os.path.isfile(reportPath)]
+        with self.phaseTimer("readFWJR"):
+            summaries = getErrorSummaries(reportPaths, self.readFWJRPool)
+
         for job in jobList:
-            report = Report()
             reportPath = job['fwjr_path']
             if reportPath is None:
                 logging.error("No FWJR in job %i, ErrorHandler can't process it.\n Passing it to cooloff.", job['id'])
                 cooloffJobs.append(job)
                 continue
-            if not os.path.isfile(reportPath):
+            if reportPath not in summaries:
                 logging.error(
                     "Failed to find FWJR for job %i in location %s.\n Passing it to cooloff.", job['id'], reportPath)
                 cooloffJobs.append(job)
                 continue
-            try:
-                report.load(reportPath)
-                # First let's check the time conditions
-                times = report.getFirstStartLastStop()
-                startTime = None
-                stopTime = None
-                if times is not None:
-                    startTime = times['startTime']
-                    stopTime = times['stopTime']
-
-                # correct the location if the original location is different from recorded in wmbs
-                # WARNING: we are not updating job location in wmbs only updating in couchdb by doing this.
-                # If location in wmbs needs to be updated, it should happen in JobAccountant.
-                locationFromFWJR = report.getSiteName()
-                if locationFromFWJR:
-                    job["location"] = locationFromFWJR
-                    job["site_cms_name"] = locationFromFWJR
-
-                if startTime is None or stopTime is None:
-                    # We have no information to make a decision, keep going.
-                    logging.debug("No start, stop times for steps for job %i", job['id'])
-                elif stopTime - startTime > self.maxFailTime:
-                    msg = "Job %i exhausted after running on node for %i seconds" % (job['id'], stopTime - startTime)
-                    logging.debug(msg)
-                    exhaustJobs.append(job)
-                    continue
-
-                if len([x for x in report.getExitCodes() if x in self.exitCodesNoRetry]):
-                    msg = "Job %i exhausted due to a bad exit code (%s)" % (job['id'], str(report.getExitCodes()))
-                    logging.debug(msg)
-                    exhaustJobs.append(job)
-                    continue
-
-                if len([x for x in report.getExitCodes() if x in self.passCodes]):
-                    msg = "Job %i restarted immediately due to an exit code (%s)" % (job['id'],
-                                                                                     str(report.getExitCodes()))
-                    logging.debug(msg)
-                    passJobs.append(job)
-                    continue
-
-                cooloffJobs.append(job)
-
-            except Exception as ex:
-                logging.warning("Exception while trying to check jobs for failures!")
-                logging.warning(str(ex))
+            summary = summaries[reportPath]
+            if summary is None:
+                logging.warning("Exception while trying to check job %i for failures!", job['id'])
                 logging.warning("Ignoring and sending job to cooloff")
                 cooloffJobs.append(job)
+                continue
+
+            # First let's check the time conditions
+            startTime = summary['startTime']
+            stopTime = summary['stopTime']
+
+            # correct the location if the original location is different from recorded in wmbs
+            # WARNING: we are not updating job location in wmbs only updating in couchdb by doing this.
+            # If location in wmbs needs to be updated, it should happen in JobAccountant.
+            locationFromFWJR = summary['siteName']
+            if locationFromFWJR:
+                job["location"] = locationFromFWJR
+                job["site_cms_name"] = locationFromFWJR
+
+            if startTime is None or stopTime is None:
+                # We have no information to make a decision, keep going.
+                logging.debug("No start, stop times for steps for job %i", job['id'])
+            elif stopTime - startTime > self.maxFailTime:
+                msg = "Job %i exhausted after running on node for %i seconds" % (job['id'], stopTime - startTime)
+                logging.debug(msg)
+                exhaustJobs.append(job)
+                continue
+
+            exitCodes = summary['exitCodes']
+            if len([x for x in exitCodes if x in self.exitCodesNoRetry]):
+                msg = "Job %i exhausted due to a bad exit code (%s)" % (job['id'], str(exitCodes))
+                logging.debug(msg)
+                exhaustJobs.append(job)
+                continue
+
+            if len([x for x in exitCodes if x in self.passCodes]):
+                msg = "Job %i restarted immediately due to an exit code (%s)" % (job['id'], str(exitCodes))
+                logging.debug(msg)
+                passJobs.append(job)
+                continue
+
+            cooloffJobs.append(job)
 
         return cooloffJobs, passJobs, exhaustJobs
 
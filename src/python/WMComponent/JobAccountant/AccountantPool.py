@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+"""
+_AccountantPool_
+
+Run the AccountantWorker in a pool of processes. Completed jobs are
+partitioned by request, so jobs of the same request (whose tasks share
+output filesets and parentage) are always accounted by the same process,
+each process using its own database connection and transactions.
+
+The FWJRs are loaded and processed concurrently, but the database writes of
+the processes are serialised by a lock: different requests can still share
+DBSBuffer rows (parent files, datasets, locations) and concurrent inserts
+of them would conflict.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from multiprocessing import Lock, Pool
+
+from Utils.IteratorTools import grouper
+from WMComponent.JobAccountant.AccountantWorker import AccountantWorker
+from WMCore.Database.CouchUtils import CouchConnectionError
+from WMCore.Database.DBFactory import DBFactory
+from WMCore.Database.Transaction import Transaction
+from WMCore.WMException import WMException
+
+# AccountantWorker instance of the pool process
+_accountantWorker = None
+
+
+class AccountantPoolException(WMException):
+    """
+    _AccountantPoolException_
+
+    Raised when some of the accountant processes failed
+    """
+
+
+def partitionJobs(jobs, nPartitions):
+    """
+    _partitionJobs_
+
+    Split the jobs in at most nPartitions lists, keeping all the jobs of a
+    request (the workflow name shared by all its tasks) in the same
+    partition. Requests are assigned from the largest to the least loaded
+    partition to balance the number of jobs.
+    """
+    jobsByWorkflow = {}
+    for job in jobs:
+        jobsByWorkflow.setdefault(job.get("workflow"), []).append(job)
+
+    partitions = [[] for _ in range(max(1, nPartitions))]
+    for workflowJobs in sorted(jobsByWorkflow.values(), key=len, reverse=True):
+        min(partitions, key=len).extend(workflowJobs)
+    return [partition for partition in partitions if partition]
+
+
+def initAccountantProcess(config, writeLock):
+    """
+    _initAccountantProcess_
+
+    Initializer of the pool processes: create a new database connection
+    and the AccountantWorker used by this process. DBFactory caches its
+    engines per process, so the connections of the parent are not reused.
+    writeLock is shared by all the processes to serialise their writes.
+    """
+    global _accountantWorker
+    myThread = threading.currentThread()
+
+    options = {}
+    if getattr(config.CoreDatabase, "socket", None):
+        options['unix_socket'] = config.CoreDatabase.socket
+    myThread.logger = logging.getLogger()
+    connectDialect = config.CoreDatabase.connectUrl.split(":", 1)[0]
+    myThread.dialect = "Oracle" if connectDialect.lower() == "oracle" else "MySQL"
+    myThread.dbFactory = DBFactory(myThread.logger, config.CoreDatabase.connectUrl, options)
+    myThread.dbi = myThread.dbFactory.connect()
+    myThread.transaction = Transaction(myThread.dbi)
+    myThread.transaction.commit()
+
+    _accountantWorker = AccountantWorker(config=config, writeLock=writeLock)
+    return
+
+
+def accountJobs(jobs, workSize):
+    """
+    _accountJobs_
+
+    Account a partition of jobs in slices of workSize jobs, each slice in
+    its own transaction. Returns a report with the process id, the number
+    of jobs accounted, the time spent and the error message if any.
+    """
+    myThread = threading.currentThread()
+    report = {'pid': os.getpid(), 'jobs': 0, 'failed': 0, 'time': 0.0,
+              'workflows': len(set(job.get("workflow") for job in jobs)), 'error': None}
+    startTime = time.time()
+    try:
+        for jobsSlice in grouper(jobs, workSize):
+            results = _accountantWorker(jobsSlice)
+            report['jobs'] += len(results)
+            report['failed'] += len([x for x in results if not x['jobSuccess']])
+    except Exception as ex:
+        if getattr(myThread, 'transaction', None) is not None:
+            myThread.transaction.rollback()
+        report['error'] = "%s\n%s" % (str(ex), "".join(traceback.format_tb(sys.exc_info()[2])))
+        report['couchError'] = isinstance(ex, CouchConnectionError)
+    report['time'] = time.time() - startTime
+    return report
+
+
+class AccountantPool(object):
+    """
+    _AccountantPool_
+
+    Distribute the completed jobs to a pool of accountant processes.
+    The processes are forked when the pool is created, so it must be created
+    before the component starts its threads.
+    """
+
+    def __init__(self, config, nProcesses, workSize):
+        self.nProcesses = nProcesses
+        self.workSize = workSize
+        self.pool = Pool(processes=nProcesses, initializer=initAccountantProcess,
+                         initargs=(config, Lock()))
+
+    def __call__(self, jobs):
+        """
+        _call_
+
+        Account the jobs, blocking until all the processes are done.
+        Returns the list of per process reports.
+        """
+        partitions = partitionJobs(jobs, self.nProcesses)
+        asyncResults = [self.pool.apply_async(accountJobs, (partition, self.workSize))
+                        for partition in partitions]
+        reports = [asyncResult.get() for asyncResult in asyncResults]
+
+        errors = []
+        for report in reports:
+            rate = report['jobs'] / report['time'] if report['time'] else 0.0
+            logging.info("Accountant process %s: %d jobs (%d failed) from %d workflows in %.1f secs, %.1f jobs/s",
+                         report['pid'], report['jobs'], report['failed'], report['workflows'],
+                         report['time'], rate)
+            if report['error'] and report['couchError']:
+                logging.error("Caught CouchConnectionError exception in process %s. "
+                              "Waiting until the next polling cycle.\n%s", report['pid'], report['error'])
+            elif report['error']:
+                errors.append("Process %s: %s" % (report['pid'], report['error']))
+        if errors:
+            raise AccountantPoolException("\n".join(errors))
+        return reports
+
+    def close(self):
+        """
+        _close_
+
+        Shut down the accountant processes
+        """
+        self.pool.close()
+        self.pool.join()
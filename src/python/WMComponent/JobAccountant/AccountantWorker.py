@@ -25,7 +25,7 @@ from WMCore.FwkJobReport.Report import Report
 from WMCore.JobStateMachine.ChangeState import ChangeState
 from WMCore.Lexicon import sanitizeURL
 from WMCore.Services.WMStats.WMStatsWriter import WMStatsWriter
-from WMCore.WMBS.File import File
+from WMCore.WMBS.File import File, ParentageCache, getAncestorsInBulk
 from WMCore.WMBS.Job import Job
 from WMCore.WMConnectionBase import WMConnectionBase
 from WMCore.WMException import WMException
@@ -45,11 +45,12 @@ class AccountantWorker(WMConnectionBase):
     Run through ProcessPool
     """
 
-    def __init__(self, config):
+    def __init__(self, config, writeLock=None):
         """
         __init__
 
-        Create all DAO objects that are used by this class.
+        Create all DAO objects that are used by this class. writeLock, if
+        given, is held while the results are written to the database.
         """
         WMConnectionBase.__init__(self, "WMCore.WMBS")
         myThread = threading.currentThread()
@@ -61,7 +62,9 @@ class AccountantWorker(WMConnectionBase):
         self.bulkAddToFilesetAction = self.daofactory(classname="Fileset.BulkAddByLFN")
         self.bulkParentageAction = self.daofactory(classname="Files.AddBulkParentage")
         self.getJobTypeAction = self.daofactory(classname="Jobs.GetType")
-        self.getParentInfoAction = self.daofactory(classname="Files.GetParentAndGrandParentInfo")
+        self.getOutputIDAction = self.daofactory(classname="Jobs.LoadOutputID")
+        self.getMasksAction = self.daofactory(classname="Masks.Load")
+        self.getIDsByLFNAction = self.daofactory(classname="Files.GetIDsByLFN")
         self.setParentageByJob = self.daofactory(classname="Files.SetParentageByJob")
         self.setParentageByMergeJob = self.daofactory(classname="Files.SetParentageByMergeJob")
         self.setFileRunLumi = self.daofactory(classname="Files.AddRunLumi")
@@ -89,6 +92,7 @@ class AccountantWorker(WMConnectionBase):
         self.dbsLFNHeritage = self.dbsDaoFactory(classname="DBSBufferFiles.BulkHeritageParent")
 
         self.stateChanger = ChangeState(config)
+        self.writeLock = writeLock
 
         # Decide whether or not to attach jobReport to returned value
         self.returnJobReport = getattr(config.JobAccountant, 'returnReportFromWorker', False)
@@ -121,6 +125,8 @@ class AccountantWorker(WMConnectionBase):
         self.parentageBinds = []
         self.parentageBindsForMerge = []
         self.jobsWithSkippedFiles = {}
+        # job id -> output map, job type, job object and output fileset, loaded in bulk
+        self.jobInfoCache = {}
         self.count = 0
         self.datasetAlgoID = collections.deque(maxlen=1000)
         self.datasetAlgoPaths = collections.deque(maxlen=1000)
@@ -146,6 +152,7 @@ class AccountantWorker(WMConnectionBase):
         self.parentageBinds = []
         self.parentageBindsForMerge = []
         self.jobsWithSkippedFiles = {}
+        self.jobInfoCache = {}
         gc.collect()
         return
 
@@ -222,6 +229,8 @@ class AccountantWorker(WMConnectionBase):
         returnList = []
         self.reset()
 
+        self.prefetchJobInfo([job["id"] for job in parameters])
+
         for job in parameters:
             logging.info("Handling %s", job["fwjr_path"])
 
@@ -240,6 +249,21 @@ class AccountantWorker(WMConnectionBase):
 
             self.count += 1
 
+        if self.writeLock is None:
+            self.writeResults()
+        else:
+            with self.writeLock:
+                self.writeResults()
+
+        return returnList
+
+    def writeResults(self):
+        """
+        _writeResults_
+
+        Write the results of the handled jobs to WMBS and DBSBuffer in
+        one transaction.
+        """
         existingTransaction = self.beginTransaction()
 
         # Now things done at the end of the job
@@ -299,8 +323,49 @@ class AccountantWorker(WMConnectionBase):
             self.handleSkippedFiles()
 
         self.commitTransaction(existingTransaction)
+        return
 
-        return returnList
+    def prefetchJobInfo(self, jobIDs):
+        """
+        _prefetchJobInfo_
+
+        Load the output map, job type, job information, job mask and output
+        fileset of a batch of jobs with one bulk query each, instead of
+        several queries per job in handleJob.
+        """
+        jobIDs = [jobID for jobID in set(jobIDs) if jobID not in self.jobInfoCache]
+        if not jobIDs:
+            return
+
+        outputMaps = self.getOutputMapAction.execute(jobID=jobIDs,
+                                                     conn=self.getDBConn(),
+                                                     transaction=self.existingTransaction())
+        jobTypes = self.getJobTypeAction.execute(jobID=jobIDs,
+                                                 conn=self.getDBConn(),
+                                                 transaction=self.existingTransaction())
+        jobTypes = dict((x['id'], x['type']) for x in jobTypes)
+        outputIDs = self.getOutputIDAction.execute(jobID=jobIDs,
+                                                   conn=self.getDBConn(),
+                                                   transaction=self.existingTransaction())
+        jobMasks = self.getMasksAction.execute(jobIDs,
+                                               conn=self.getDBConn(),
+                                               transaction=self.existingTransaction())
+        jobsInfo = self.getJobInfoByID.execute([{'jobid': x} for x in jobIDs],
+                                               conn=self.getDBConn(),
+                                               transaction=self.existingTransaction())
+        if isinstance(jobsInfo, dict):
+            jobsInfo = [jobsInfo]
+
+        for jobInfo in jobsInfo:
+            jobID = jobInfo['id']
+            wmbsJob = Job(id=jobID)
+            wmbsJob.update(jobInfo)
+            wmbsJob['mask'].loadFromEntries(jobMasks.get(jobID, []))
+            self.jobInfoCache[jobID] = {'outputMap': outputMaps.get(jobID, {}),
+                                        'jobType': jobTypes.get(jobID),
+                                        'job': wmbsJob,
+                                        'outputID': outputIDs.get(jobID)}
+        return
 
     def outputFilesetsForJob(self, outputMap, merged, moduleLabel, datatier):
         """
@@ -373,35 +438,40 @@ class AccountantWorker(WMConnectionBase):
         _findDBSParents_
 
         Find the parent of the file in DBS
-        This is meant to be called recursively
-        """
-        parentsInfo = self.getParentInfoAction.execute([lfn],
-                                                       conn=self.getDBConn(),
-                                                       transaction=self.existingTransaction())
-        newParents = set()
-        for parentInfo in parentsInfo:
-            # This will catch straight to merge files that do not have redneck
-            # parents.  We will mark the straight to merge file from the job
-            # as a child of the merged parent.
-            if int(parentInfo["merged"]) == 1:
-                newParents.add(parentInfo["lfn"])
-
-            elif parentInfo['gpmerged'] is None:
-                continue
+        """
+        return self.findBulkDBSParents([lfn])[lfn]
 
-            # Handle the files that result from merge jobs that aren't redneck
-            # children.  We have to setup parentage and then check on whether or
-            # not this file has any redneck children and update their parentage
-            # information.
-            elif int(parentInfo["gpmerged"]) == 1:
-                newParents.add(parentInfo["gplfn"])
+    def findBulkDBSParents(self, lfns):
+        """
+        _findBulkDBSParents_
 
-            # If that didn't work, we've reached the great-grandparents
-            # And we have to work via recursion
-            else:
-                parentSet = self.findDBSParents(lfn=parentInfo['gplfn'])
-                for parent in parentSet:
-                    newParents.add(parent)
+        Find the DBS parents of a list of files, returns a dictionary of
+        lfn to set of parent lfns. The DBS parent of a file is its closest
+        merged ancestor, the ancestry is walked up one generation at a time
+        for all the files together.
+        """
+        newParents = dict((lfn, set()) for lfn in lfns)
+        fileIDs = self.getIDsByLFNAction.execute(lfns, conn=self.getDBConn(),
+                                                 transaction=self.existingTransaction())
+        cache = ParentageCache()
+        # id of the ancestor to look up -> files it is an ancestor of
+        toResolve = dict((fileIDs[lfn], set([lfn])) for lfn in lfns if lfn in fileIDs)
+        while toResolve:
+            parents = getAncestorsInBulk(list(toResolve), level=1, type="file", cache=cache,
+                                         conn=self.getDBConn(),
+                                         transaction=self.existingTransaction())
+            nextToResolve = {}
+            for fileID, children in toResolve.items():
+                for parent in parents[fileID]:
+                    # The first merged ancestor is the DBS parent (for straight to merge
+                    # files it's the parent, for the output of merge jobs the grand parent),
+                    # otherwise look at the next generation
+                    if parent["merged"]:
+                        for child in children:
+                            newParents[child].add(parent["lfn"])
+                    else:
+                        nextToResolve.setdefault(parent["id"], set()).update(children)
+            toResolve = nextToResolve
 
         return newParents
 
@@ -443,13 +513,11 @@ class AccountantWorker(WMConnectionBase):
         """
         jobSuccess = fwkJobReport.taskSuccessful()
 
-        outputMap = self.getOutputMapAction.execute(jobID=jobID,
-                                                    conn=self.getDBConn(),
-                                                    transaction=self.existingTransaction())
-
-        jobType = self.getJobTypeAction.execute(jobID=jobID,
-                                                conn=self.getDBConn(),
-                                                transaction=self.existingTransaction())
+        # the job information is normally prefetched for the whole batch
+        self.prefetchJobInfo([jobID])
+        jobInfo = self.jobInfoCache[jobID]
+        outputMap = jobInfo['outputMap']
+        jobType = jobInfo['jobType']
 
         if jobSuccess:
             fileList = fwkJobReport.getAllFiles()
@@ -533,10 +601,8 @@ class AccountantWorker(WMConnectionBase):
         # now handle the job (unless the special LogCollect check failed)
         if not skipLogCollect:
 
-            wmbsJob = Job(id=jobID)
-            wmbsJob.load()
-            outputID = wmbsJob.loadOutputID()
-            wmbsJob.getMask()
+            wmbsJob = jobInfo['job']
+            outputID = jobInfo['outputID']
 
             wmbsJob["fwjr"] = fwkJobReport
 
@@ -899,9 +965,9 @@ class AccountantWorker(WMConnectionBase):
         """
         outputLFNs = [f['lfn'] for f in self.mergedOutputFiles]
         bindList = []
+        dbsParents = self.findBulkDBSParents(outputLFNs)
         for lfn in outputLFNs:
-            newParents = self.findDBSParents(lfn=lfn)
-            for parentLFN in newParents:
+            for parentLFN in dbsParents[lfn]:
                 bindList.append({'child': lfn, 'parent': parentLFN})
 
         # Now all the parents should exist
@@ -12,6 +12,7 @@ WMBS for complete jobs.
 import threading
 
 from WMCore.Agent.Harness import Harness
+from WMComponent.JobAccountant.AccountantPool import AccountantPool
 from WMComponent.JobAccountant.JobAccountantPoller import JobAccountantPoller
 
 class JobAccountant(Harness):
@@ -22,4 +23,12 @@ class JobAccountant(Harness):
     def preInitialization(self):
         pollInterval = self.config.JobAccountant.pollInterval
         myThread = threading.currentThread()
-        myThread.workerThreadManager.addWorker(JobAccountantPoller(self.config), pollInterval)
+        # fork the accountant processes before the worker threads are started,
+        # so that they don't inherit locks held by other threads
+        accountantPool = None
+        accountantProcesses = getattr(self.config.JobAccountant, 'accountantProcesses', 0)
+        if accountantProcesses > 0:
+            accountantPool = AccountantPool(self.config, accountantProcesses,
+                                            getattr(self.config.JobAccountant, 'accountantWorkSize', 100))
+        myThread.workerThreadManager.addWorker(JobAccountantPoller(self.config, accountantPool=accountantPool),
+                                               pollInterval)
@@ -13,6 +13,7 @@ from Utils.Timers import timeFunction
 from WMCore.WorkerThreads.BaseWorkerThread import BaseWorkerThread
 from WMCore.Database.CouchUtils import CouchConnectionError
 from WMCore.DAOFactory import DAOFactory
+from WMComponent.JobAccountant.AccountantPool import AccountantPool, AccountantPoolException
 from WMComponent.JobAccountant.AccountantWorker import AccountantWorker
 from WMCore.WMException import WMException
 
@@ -28,10 +29,14 @@ class JobAccountantPollerException(WMException):
 
 
 class JobAccountantPoller(BaseWorkerThread):
-    def __init__(self, config):
+    def __init__(self, config, accountantPool=None):
         BaseWorkerThread.__init__(self)
         self.config = config
         self.accountantWorkSize = getattr(self.config.JobAccountant, 'accountantWorkSize', 100)
+        # number of accountant processes, jobs are accounted in the poller thread if 0
+        self.accountantProcesses = getattr(self.config.JobAccountant, 'accountantProcesses', 0)
+        # the JobAccountant component creates the pool before starting its threads
+        self.accountantPool = accountantPool
 
         return
 
@@ -42,7 +47,12 @@ class JobAccountantPoller(BaseWorkerThread):
         Instantiate the requisite number of accountant workers and create a
         processpool with them.  Also instantiate all the DAOs that we will use.
         """
-        self.accountantWorker = AccountantWorker(config=self.config)
+        if self.accountantProcesses > 0:
+            if self.accountantPool is None:
+                self.accountantPool = AccountantPool(self.config, self.accountantProcesses,
+                                                     self.accountantWorkSize)
+        else:
+            self.accountantWorker = AccountantWorker(config=self.config)
 
         myThread = threading.currentThread()
         daoFactory = DAOFactory(package="WMCore.WMBS", logger=myThread.logger,
@@ -65,6 +75,16 @@ class JobAccountantPoller(BaseWorkerThread):
             logging.debug("No work to do; exiting")
             return
 
+        if self.accountantPool is not None:
+            try:
+                self.accountantPool(completeJobs)
+            except AccountantPoolException as ex:
+                msg = "Hit exception in JobAccountantPoller accountant processes.\n"
+                msg += str(ex)
+                logging.error(msg)
+                raise JobAccountantPollerException(msg)
+            return
+
         for jobsSlice in grouper(completeJobs, self.accountantWorkSize):
             try:
                 self.accountantWorker(jobsSlice)
@@ -90,3 +110,13 @@ class JobAccountantPoller(BaseWorkerThread):
                 raise JobAccountantPollerException(msg)
 
         return
+
+    def terminate(self, params):
+        """
+        _terminate_
+
+        Shut down the accountant processes, if any
+        """
+        if self.accountantPool is not None:
+            self.accountantPool.close()
+        BaseWorkerThread.terminate(self, params)
@@ -12,6 +12,7 @@ from __future__ import print_function
 
 import logging
 import threading
+from multiprocessing import Pool
 
 from WMCore.Agent.Harness import Harness
 
@@ -49,6 +50,13 @@ class JobArchiver(Harness):
 
         pollInterval = self.config.JobArchiver.pollInterval
         logging.info("Setting poll interval to %s seconds" % pollInterval)
-        myThread.workerThreadManager.addWorker(JobArchiverPoller(self.config), pollInterval)
+        # fork the processes writing the tarballs before the worker threads are
+        # started, so that they don't inherit locks held by other threads
+        archivePool = None
+        archiveProcesses = getattr(self.config.JobArchiver, "archiveProcesses", 4)
+        if archiveProcesses > 1:
+            archivePool = Pool(archiveProcesses)
+        myThread.workerThreadManager.addWorker(JobArchiverPoller(self.config, archivePool=archivePool),
+                                               pollInterval)
 
         return
@@ -1,14 +1,32 @@
 #!/usr/bin/env python
 """
 The actual jobArchiver algorithm
+
+The cache directories of the finished jobs are archived per JobCluster: all
+the jobs of a cycle belonging to the same workflow and JobCluster_N go in a
+single tarball, each job under Job_<id>/, next to a JSON index of the tarball
+members per job id. Tarballs are written by a pool of worker processes, forked
+by the JobArchiver component before it starts its threads, and the cache
+directories removed by a pool of threads once archived.
+
+Optional configuration:
+config.JobArchiver.compression: bz2 (default), gz (much faster) or none
+config.JobArchiver.compressLevel: compression level, tarfile default if not set
+config.JobArchiver.archiveProcesses: processes writing the tarballs, default 4
+config.JobArchiver.removeThreads: threads removing the cache dirs, default 4
 """
+import json
 import logging
 import os
 import os.path
 import shutil
 import tarfile
 import threading
+import time
+from functools import partial
+from multiprocessing.pool import ThreadPool
 
+from Utils.FileTools import TAR_COMPRESSION
 from Utils.IteratorTools import grouper
 from Utils.Timers import timeFunction
 from WMCore.DAOFactory import DAOFactory
@@ -30,17 +48,59 @@ class JobArchiverPollerException(WMException):
     """
 
 
+def archiveJobCluster(clusterArchive):
+    """
+    _archiveJobCluster_
+
+    Write the cache directories of a group of jobs into a single tarball,
+    with a JSON index of the members of each job. Runs in the worker pool,
+    it returns the tarball path, the ids of the archived jobs and an error
+    message (None on success).
+    """
+    tarPath, indexPath, mode, compressLevel, jobCaches = clusterArchive
+    index = {}
+    try:
+        cacheLists = [(jobId, cacheDir, sorted(os.listdir(cacheDir))) for jobId, cacheDir in jobCaches]
+        if any(cacheList for _, _, cacheList in cacheLists):
+            kwargs = {}
+            if compressLevel is not None and mode != "w":
+                kwargs['compresslevel'] = compressLevel
+            with tarfile.open(name=tarPath, mode=mode, **kwargs) as tarball:
+                for jobId, cacheDir, cacheList in cacheLists:
+                    index[jobId] = []
+                    for fileName in cacheList:
+                        fullFile = os.path.join(cacheDir, fileName)
+                        arcName = 'Job_%i/%s' % (jobId, fileName)
+                        try:
+                            tarball.add(name=fullFile, arcname=arcName)
+                            index[jobId].append(arcName)
+                        except IOError:
+                            logging.error('Cannot read %s, skipping', fullFile)
+            with open(indexPath, 'w') as indexFile:
+                json.dump(index, indexFile, sort_keys=True)
+    except Exception as ex:
+        msg = "Exception while opening and adding to a tarfile\n"
+        msg += "Tarfile: %s\n" % tarPath
+        msg += str(ex)
+        return tarPath, [], msg
+
+    return tarPath, [jobId for jobId, _ in jobCaches], None
+
+
 class JobArchiverPoller(BaseWorkerThread):
     """
     Polls for Error Conditions, handles them
     """
 
-    def __init__(self, config):
+    def __init__(self, config, archivePool=None):
         """
         Initialise class members
         """
         BaseWorkerThread.__init__(self)
         self.config = config
+        # the JobArchiver component creates the pool before starting its threads,
+        # tarballs are written in the poller thread without it
+        self.archivePool = archivePool
         self.changeState = ChangeState(self.config)
 
         myThread = threading.currentThread()
@@ -54,6 +114,13 @@ class JobArchiverPoller(BaseWorkerThread):
                                              "numberOfJobsToCluster", 1000)
         self.numberOfJobsToArchive = getattr(self.config.JobArchiver,
                                              "numberOfJobsToArchive", 10000)
+        self.removeThreads = getattr(self.config.JobArchiver, "removeThreads", 4)
+        self.compression = getattr(self.config.JobArchiver, "compression", "bz2")
+        self.compressLevel = getattr(self.config.JobArchiver, "compressLevel", None)
+        if self.compression not in TAR_COMPRESSION:
+            msg = "Unknown archive compression %s, supported modes are: %s" % (self.compression,
+                                                                               list(TAR_COMPRESSION))
+            raise JobArchiverPollerException(msg)
 
         try:
             self.logDir = getattr(config.JobArchiver, 'logDir',
@@ -93,6 +160,9 @@ class JobArchiverPoller(BaseWorkerThread):
         """
         logging.debug("terminating. doing one more pass before we die")
         self.algorithm(params)
+        if self.archivePool is not None:
+            self.archivePool.close()
+            self.archivePool.join()
         return
 
     @timeFunction
@@ -134,8 +204,10 @@ class JobArchiverPoller(BaseWorkerThread):
         logging.info("Found %i finished jobs to archive", len(doneList))
 
         jobCounter = 0
+        startTime = time.time()
         for slicedList in grouper(doneList, 10000):
-            self.cleanWorkArea(slicedList)
+            with self.phaseTimer("archive"):
+                self.cleanWorkArea(slicedList)
 
             successList = []
             failList = []
@@ -158,6 +230,11 @@ class JobArchiverPoller(BaseWorkerThread):
             jobCounter += len(slicedList)
             logging.info("Successfully archived %d jobs out of %d.", jobCounter, len(doneList))
 
+        if jobCounter:
+            timeSpent = time.time() - startTime
+            logging.info("Archived %d jobs in %.1f secs (%.1f jobs/s)",
+                         jobCounter, timeSpent, jobCounter / max(timeSpent, 1e-6))
+
     def findFinishedJobs(self):
         """
         _findFinishedJobs_
@@ -204,83 +281,87 @@ class JobArchiverPoller(BaseWorkerThread):
         _cleanWorkArea_
 
         Upon workQueue realizing that a subscriptions is done, everything
-        regarding those jobs is cleaned up.
+        regarding those jobs is cleaned up: the job caches are archived in
+        one tarball per JobCluster and removed once archived.
         """
+        clusterArchives = self.makeClusterArchives(doneList)
+        if not clusterArchives:
+            return
 
-        for job in doneList:
-            # print "About to clean cache for job %i" % (job['id'])
-            self.cleanJobCache(job)
+        cacheDirs = {}
+        for clusterArchive in clusterArchives:
+            cacheDirs.update(clusterArchive[-1])
+
+        removePool = ThreadPool(self.removeThreads)
+        removeCacheDir = partial(shutil.rmtree, ignore_errors=True)
+        errors = []
+        try:
+            if self.archivePool is not None and len(clusterArchives) > 1:
+                results = self.archivePool.imap_unordered(archiveJobCluster, clusterArchives)
+            else:
+                results = (archiveJobCluster(clusterArchive) for clusterArchive in clusterArchives)
+            for tarPath, jobIds, error in results:
+                if error:
+                    logging.error(error)
+                    errors.append(error)
+                    continue
+                logging.debug("Archived %d jobs in %s", len(jobIds), tarPath)
+                # remove the archived caches while the next tarballs are written
+                removePool.map_async(removeCacheDir, [cacheDirs[jobId] for jobId in jobIds])
+        finally:
+            removePool.close()
+            removePool.join()
+
+        if errors:
+            raise JobArchiverPollerException("\n".join(errors))
 
         return
 
-    def cleanJobCache(self, job):
+    def makeClusterArchives(self, doneList):
         """
-        _cleanJobCache_
+        _makeClusterArchives_
 
-        Clears out any files still sticking around in the jobCache,
-        tars up the contents and sends them off
+        Group the jobs by workflow and JobCluster, set up the output log
+        directories and return the archiving tasks of the worker pool.
         """
-
-        cacheDir = job['cache_dir']
-
-        if not cacheDir or not os.path.isdir(cacheDir):
-            msg = "Could not find jobCacheDir %s" % (cacheDir)
-            logging.error(msg)
-            return
-
-        cacheDirList = os.listdir(cacheDir)
-
-        if cacheDirList == []:
-            os.rmdir(cacheDir)
-            return
-
-        # Now we need to set up a final destination
-        try:
+        clusters = {}
+        for job in doneList:
+            cacheDir = job['cache_dir']
+            if not cacheDir or not os.path.isdir(cacheDir):
+                msg = "Could not find jobCacheDir %s" % (cacheDir)
+                logging.error(msg)
+                continue
             # Label all directories by workflow
             # Workflow better have a first character
             workflow = job['workflow']
-            firstCharacter = workflow[0]
-            jobFolder = 'JobCluster_%i' \
-                        % (int(job['id'] / self.numberOfJobsToCluster))
-            logDir = os.path.join(self.logDir, firstCharacter,
-                                  workflow, jobFolder)
-            if not os.path.exists(logDir):
-                os.makedirs(logDir)
-        except Exception as ex:
-            msg = "Exception while trying to make output logDir\n"
-            msg += str("logDir: %s\n" % (logDir))
-            msg += str(ex)
-            logging.error(msg)
-            raise JobArchiverPollerException(msg)
-
-        # Otherwise we have something in there
-        try:
-            tarName = 'Job_%i.tar.bz2' % (job['id'])
-            with tarfile.open(name=os.path.join(logDir, tarName), mode='w:bz2') as tarball:
-                for fileName in cacheDirList:
-                    fullFile = os.path.join(cacheDir, fileName)
-                    try:
-                        tarball.add(name=fullFile, arcname='Job_%i/%s' % (job['id'], fileName))
-                    except IOError:
-                        logging.error('Cannot read %s, skipping', fullFile)
-        except Exception as ex:
-            msg = "Exception while opening and adding to a tarfile\n"
-            msg += "Tarfile: %s\n" % os.path.join(logDir, tarName)
-            msg += str(ex)
-            logging.error(msg)
-            logging.debug("cacheDirList: %s", cacheDirList)
-            raise JobArchiverPollerException(msg)
-
-        try:
-            shutil.rmtree('%s' % (cacheDir), ignore_errors=True)
-        except Exception as ex:
-            msg = "Error while removing the old cache dir.\n"
-            msg += "CacheDir: %s\n" % cacheDir
-            msg += str(ex)
-            logging.error(msg)
-            raise JobArchiverPollerException(msg)
+            jobFolder = 'JobCluster_%i' % (int(job['id'] / self.numberOfJobsToCluster))
+            logDir = os.path.join(self.logDir, workflow[0], workflow, jobFolder)
+            clusters.setdefault(logDir, {})[job['id']] = cacheDir
 
-        return
+        mode, extension = TAR_COMPRESSION[self.compression]
+        clusterArchives = []
+        for logDir, jobCaches in clusters.items():
+            try:
+                if not os.path.exists(logDir):
+                    os.makedirs(logDir)
+            except Exception as ex:
+                msg = "Exception while trying to make output logDir\n"
+                msg += str("logDir: %s\n" % (logDir))
+                msg += str(ex)
+                logging.error(msg)
+                raise JobArchiverPollerException(msg)
+
+            # archives of the same cluster from different cycles differ by job range
+            baseName = os.path.join(logDir, 'Jobs_%i-%i' % (min(jobCaches), max(jobCaches)))
+            archiveName = baseName
+            counter = 0
+            while os.path.exists(archiveName + extension) or os.path.exists(archiveName + '.json'):
+                counter += 1
+                archiveName = '%s.%i' % (baseName, counter)
+            clusterArchives.append((archiveName + extension, archiveName + '.json',
+                                    mode, self.compressLevel, sorted(jobCaches.items())))
+
+        return clusterArchives
 
     def markInjected(self):
         """
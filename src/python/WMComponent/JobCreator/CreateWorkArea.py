@@ -89,7 +89,7 @@ def getMasterName(startDir, wmWorkload=None, workflow=None):
         raise CreateWorkAreaException(msg)
     else:
         wmWorkload = WMWorkloadHelper(WMWorkload("workload"))
-        wmWorkload.load(workflow.spec)
+        wmWorkload.load(workflow.spec, lazy=True, useCache=True)
 
         workload = wmWorkload.name()
 
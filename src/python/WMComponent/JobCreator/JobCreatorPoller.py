@@ -44,7 +44,7 @@ def retrieveWMSpec(workflow=None, wmWorkloadURL=None):
         return None
 
     wmWorkload = WMWorkloadHelper(WMWorkload("workload"))
-    wmWorkload.load(wmWorkloadURL)
+    wmWorkload.load(wmWorkloadURL, lazy=True, useCache=True)
 
     return wmWorkload
 
@@ -85,6 +85,8 @@ class JobSubmitterPoller(BaseWorkerThread):
         self.skipRefreshCount = int(getattr(self.config.JobSubmitter, 'skipRefreshCount', 20))
         self.packageSize = getattr(self.config.JobSubmitter, 'packageSize', 500)
         self.collSize = getattr(self.config.JobSubmitter, 'collectionSize', self.packageSize * 1000)
+        # number of jobs kept in memory before being appended to their package on disk
+        self.packageFlushSize = min(getattr(self.config.JobSubmitter, 'packageFlushSize', 100), self.packageSize)
         self.maxTaskPriority = getattr(self.config.BossAir, 'maxTaskPriority', 1e7)
         self.condorFraction = 0.75  # update during every algorithm cycle
         self.condorOverflowFraction = 0.2
@@ -181,7 +183,8 @@ class JobSubmitterPoller(BaseWorkerThread):
         _addJobsToPackage_
 
         Add a job to a job package and then return the batch ID for the job.
-        Packages are only written out to disk when they contain 100 jobs.  The
+        Jobs are appended to the package on disk every packageFlushSize jobs,
+        and the package is closed once it contains packageSize jobs.  The
         flushJobsPackages() method must be called after all jobs have been added
         to the cache and before they are actually submitted to make sure all the
         job packages have been written to disk.
@@ -197,41 +200,59 @@ class JobSubmitterPoller(BaseWorkerThread):
                                          'PackageCollection_%i' % collectionIndex,
                                          'batch_%s' % batchid)
 
+            # Leftover of a previous submission attempt, jobs are appended to it
+            stalePackage = os.path.join(collectionDir, "JobPackage.pkl")
+            if os.path.exists(stalePackage):
+                os.remove(stalePackage)
+
             # Now create the package object
             self.jobsToPackage[loadedJob["workflow"]] = {"batchid": batchid,
                                                          'id': loadedJob['id'],
+                                                         'numJobs': 0,
                                                          "package": JobPackage(directory=collectionDir)}
 
-        jobPackage = self.jobsToPackage[loadedJob["workflow"]]["package"]
+        packageInfo = self.jobsToPackage[loadedJob["workflow"]]
+        jobPackage = packageInfo["package"]
         jobPackage[loadedJob["id"]] = loadedJob.getDataStructsJob()
+        packageInfo['numJobs'] += 1
         batchDir = jobPackage['directory']
 
-        if len(jobPackage.keys()) == self.packageSize:
-            if not os.path.exists(batchDir):
-                os.makedirs(batchDir)
-
-            batchPath = os.path.join(batchDir, "JobPackage.pkl")
-            jobPackage.save(batchPath)
+        if packageInfo['numJobs'] == self.packageSize:
+            self.appendJobPackage(jobPackage)
             del self.jobsToPackage[loadedJob["workflow"]]
+        elif len(jobPackage) - 1 >= self.packageFlushSize:
+            self.appendJobPackage(jobPackage)
 
         return batchDir
 
+    @staticmethod
+    def appendJobPackage(jobPackage):
+        """
+        _appendJobPackage_
+
+        Append the jobs of an in memory package to its file on disk
+        and remove them from memory.
+        """
+        batchDir = jobPackage['directory']
+        if not os.path.exists(batchDir):
+            os.makedirs(batchDir)
+
+        batchPath = os.path.join(batchDir, "JobPackage.pkl")
+        jobPackage.append(batchPath)
+        for jobIndex in list(jobPackage):
+            if jobIndex != 'directory':
+                del jobPackage[jobIndex]
+        return
+
     def flushJobPackages(self):
         """
         _flushJobPackages_
 
         Write any jobs packages to disk that haven't been written out already.
         """
-        workflowNames = self.jobsToPackage.keys()
+        workflowNames = list(self.jobsToPackage)
         for workflowName in workflowNames:
-            jobPackage = self.jobsToPackage[workflowName]["package"]
-            batchDir = jobPackage['directory']
-
-            if not os.path.exists(batchDir):
-                os.makedirs(batchDir)
-
-            batchPath = os.path.join(batchDir, "JobPackage.pkl")
-            jobPackage.save(batchPath)
+            self.appendJobPackage(self.jobsToPackage[workflowName]["package"])
             del self.jobsToPackage[workflowName]
 
         return
@@ -2,11 +2,8 @@
 """
 _PauseAlgo_
 """
-import os.path
 import logging
 from WMComponent.RetryManager.PlugIns.RetryAlgoBase import RetryAlgoBase
-from WMCore.JobStateMachine.ChangeState import ChangeState
-from WMCore.FwkJobReport.Report import Report
 
 
 class PauseAlgo(RetryAlgoBase):
@@ -16,9 +13,11 @@ class PauseAlgo(RetryAlgoBase):
         This implements the Paused job algorithm, explanation of the concept in #3114
     """
 
-    def __init__(self, config):
-        RetryAlgoBase.__init__(self, config)
-        self.changer = ChangeState(config)
+    def needsReport(self, job, cooloffType):
+        """
+        The FWJR is only read for failed jobs when error codes are configured
+        """
+        return cooloffType == 'job' and self.hasAlgoParam(job['jobType'], 'retryErrorCodes')
 
     def isReady(self, job, cooloffType):
         """
@@ -38,19 +37,12 @@ class PauseAlgo(RetryAlgoBase):
         if job['state'] == 'jobcooloff':
             exitCodes = self.getAlgoParam(job['jobType'], 'retryErrorCodes', {})
             if exitCodes:
-                report = Report()
-                reportPath = os.path.join(job['cache_dir'], "Report.%i.pkl" % job['retry_count'])
-                try:
-                    report.load(reportPath)
-                    jobExitCode = report.getExitCode()
-                    # If the jobExitCode is configured, set the respective pauseCount for the job.
-                    if jobExitCode in exitCodes:
-                        retryByTimeOut = True
-                        pauseCount = exitCodes[jobExitCode]
-                except IOError as ex:
-                    msg = "Error loading report %s\n" % (reportPath)
-                    msg += str(ex)
-                    logging.warning(msg)
+                summary = self.getReportSummary(job)
+                if summary is None:
+                    logging.warning("Error loading the report of job %i, retry %i", job['id'], job['retry_count'])
+                # If the jobExitCode is configured, set the respective pauseCount for the job.
+                elif summary['exitCode'] in exitCodes:
+                    pauseCount = exitCodes[summary['exitCode']]
 
         # Here introduces the SquaredAlgo logic :
         baseTimeoutDict = self.getAlgoParam(job['jobType'])
@@ -65,10 +57,10 @@ class PauseAlgo(RetryAlgoBase):
         if retryByTimeOut:
             # If reached the pauseCount, we want the job to pause instead of retrying
             if pauseCount == 0:
-                self.changer.propagate(job, pauseMap[job['state']], job['state'], updatesummary=True)
+                self.queueTransition(job, pauseMap[job['state']])
                 return False
             elif job['retry_count'] > 0 and not job['retry_count'] % pauseCount:
-                self.changer.propagate(job, pauseMap[job['state']], job['state'], updatesummary=True)
+                self.queueTransition(job, pauseMap[job['state']])
                 return False
             else:
                 return True
@@ -6,10 +6,8 @@ _LinearAlgo_
 
 Straight lines to the end
 """
-import os.path
 import logging
 
-from WMCore.FwkJobReport.Report                     import Report
 from WMComponent.RetryManager.PlugIns.RetryAlgoBase import RetryAlgoBase
 
 class ProcessingAlgo(RetryAlgoBase):
@@ -46,6 +44,12 @@ class ProcessingAlgo(RetryAlgoBase):
 
         return
 
+    def needsReport(self, job, cooloffType):
+        """
+        The FWJR is read for all the failed jobs
+        """
+        return cooloffType == 'job'
+
     def isReady(self, job, cooloffType):
         """
         Actual function that does the work
@@ -57,11 +61,8 @@ class ProcessingAlgo(RetryAlgoBase):
             return True
 
         # Run this to get the errors in the actual job
-        try:
-            report     = Report()
-            reportPath = os.path.join(job['cache_dir'], "Report.%i.pkl" % job['retry_count'])
-            report.load(reportPath)
-        except:
+        summary = self.getReportSummary(job)
+        if summary is None:
             # If we're here, then the FWJR doesn't exist.
             # Give up, run it again
             return True
@@ -70,9 +71,8 @@ class ProcessingAlgo(RetryAlgoBase):
         oneMore = False
 
         # Find startTime, stopTime
-        times = report.getFirstStartLastStop()
-        startTime = times['startTime']
-        stopTime  = times['stopTime']
+        startTime = summary['startTime']
+        stopTime  = summary['stopTime']
 
         if startTime == None or stopTime == None:
             # Well, then we have a problem.
@@ -85,7 +85,7 @@ class ProcessingAlgo(RetryAlgoBase):
             logging.error("Job only allowed to run one more time due to ProcessingAlgo.maxRunTime")
             oneMore = True
 
-        if report.getExitCode() in self.exitCodes:
+        if summary['exitCode'] in self.exitCodes:
             logging.error("Job only allowed to run one more time due to ProcessingAlgo.exitCodes")
             oneMore = True
 
@@ -10,6 +10,9 @@ This is the base class for Retry Algos
 import time
 import datetime
 import logging
+import os.path
+
+from WMCore.FwkJobReport.Report import getErrorSummary
 
 class RetryAlgoBase(object):
     """
@@ -20,6 +23,7 @@ class RetryAlgoBase(object):
     def __init__(self, config):
         object.__init__(self)
         self.config = config
+        self.pendingTransitions = {}
 
     def setup(self, config):
         """
@@ -36,6 +40,59 @@ class RetryAlgoBase(object):
 
         pass
 
+    def needsReport(self, job, cooloffType):
+        """
+        _needsReport_
+
+        Whether isReady reads the FWJR of the job, the RetryManager then
+        loads the error summaries of those jobs in bulk beforehand.
+        """
+        return False
+
+    def getReportSummary(self, job):
+        """
+        _getReportSummary_
+
+        Error summary (see Report.getErrorSummary) of the FWJR of the last
+        job retry, as prefetched by the RetryManager or loaded here.
+        None if the report can't be read.
+        """
+        if 'fwjr_summary' in job:
+            return job['fwjr_summary']
+        reportPath = os.path.join(job['cache_dir'], "Report.%i.pkl" % job['retry_count'])
+        return getErrorSummary(reportPath)
+
+    def queueTransition(self, job, newState):
+        """
+        _queueTransition_
+
+        Queue a state transition decided by the algorithm, the RetryManager
+        applies them in bulk once all the jobs were checked.
+        """
+        self.pendingTransitions.setdefault((newState, job['state']), []).append(job)
+
+    def popTransitions(self):
+        """
+        _popTransitions_
+
+        Return and clear the queued transitions, as a dictionary of
+        (new state, old state) to the list of jobs.
+        """
+        transitions = self.pendingTransitions
+        self.pendingTransitions = {}
+        return transitions
+
+    def hasAlgoParam(self, jobType, param):
+        """
+        _hasAlgoParam_
+
+        Check whether a parameter is configured for the current algorithm
+        and given job type (or the default job type)
+        """
+        pluginArgs = getattr(self.config.RetryManager, self.__class__.__name__, None)
+        algoParams = getattr(pluginArgs, jobType, None) or getattr(pluginArgs, 'default', None)
+        return bool(getattr(algoParams, param, None))
+
     def convertdatetime(self, t):
         return int(time.mktime(t.timetuple()))
 
@@ -11,6 +11,7 @@ attempts to put them in their non-cooloff state again.
 
 import logging
 import threading
+from multiprocessing import Pool
 
 from WMCore.Agent.Harness import Harness
 from WMComponent.RetryManager.RetryManagerPoller import RetryManagerPoller
@@ -38,4 +39,11 @@ class RetryManager(Harness):
         myThread = threading.currentThread()
         pollInterval = self.config.RetryManager.pollInterval
         logging.info("Setting poll interval to %s seconds", pollInterval)
-        myThread.workerThreadManager.addWorker(RetryManagerPoller(self.config), pollInterval)
+        # fork the processes reading the FWJRs before the worker threads are started,
+        # so that they don't inherit locks held by other threads
+        readFWJRPool = None
+        readFWJRProcesses = getattr(self.config.RetryManager, 'readFWJRProcesses', 4)
+        if readFWJRProcesses > 1:
+            readFWJRPool = Pool(readFWJRProcesses)
+        myThread.workerThreadManager.addWorker(RetryManagerPoller(self.config, readFWJRPool=readFWJRPool),
+                                               pollInterval)
@@ -44,6 +44,10 @@ config.RetryManager.section_('SquaredAlgo')
 config.RetryManager.SquaredAlgo.section_('default')
 config.RetryManager.SquaredAlgo.default.coolOffTime = {'submit' : 50, 'create' : 50, 'job' : 20}
 
+config.RetryManager.maxProcessSize is the maximum number of jobs loaded and checked at once,
+it defaults to 250. config.RetryManager.readFWJRProcesses is the number of worker processes
+reading the FWJRs of the failed jobs for the plugins that need them, it defaults to 4.
+
 Note: It is possible to not specify any configuration at all and the
 component won't crash but it won't do anything at all. All
 jobs that get in cooloff would stay there forever.
@@ -52,11 +56,14 @@ Any parameter can be skipped and the component will use internal defaults.
 
 import datetime
 import logging
+import os.path
 import threading
 import time
 import traceback
+from Utils.IteratorTools import grouper
 from Utils.Timers import timeFunction
 from WMCore.DAOFactory import DAOFactory
+from WMCore.FwkJobReport.Report import getErrorSummaries
 from WMCore.JobStateMachine.ChangeState import ChangeState
 from WMCore.JobStateMachine.Transitions import Transitions
 from WMCore.WMBS.Job import Job
@@ -98,7 +105,7 @@ class RetryManagerPoller(BaseWorkerThread):
     based on the requirements in the selected plugin
     """
 
-    def __init__(self, config):
+    def __init__(self, config, readFWJRPool=None):
         """
         Initialise class members
         """
@@ -117,6 +124,10 @@ class RetryManagerPoller(BaseWorkerThread):
 
         self.changeState = ChangeState(self.config)
         self.getJobs = self.daoFactory(classname="Jobs.GetAllJobs")
+        self.maxProcessSize = getattr(self.config.RetryManager, 'maxProcessSize', 250)
+        # the RetryManager component creates the pool before starting its threads,
+        # FWJRs are read in the poller thread without it
+        self.readFWJRPool = readFWJRPool
 
 
         # get needed plugins
@@ -145,6 +156,9 @@ class RetryManagerPoller(BaseWorkerThread):
         """
         logging.debug("Terminating. doing one more pass before we die")
         self.algorithm(params)
+        if self.readFWJRPool is not None:
+            self.readFWJRPool.close()
+            self.readFWJRPool.join()
 
     @timeFunction
     def algorithm(self, parameters=None):
@@ -193,17 +207,27 @@ class RetryManagerPoller(BaseWorkerThread):
             msg = 'Unknown job type %s' % cooloffType
             logging.error(msg)
             return
-        propList = []
 
         newJobState = transitions[oldstate][0]
 
-        jobList = self.loadJobsFromList(idList=jobs)
-
-        # Now we should have the jobs
-        propList = self.selectRetryAlgo(jobList, cooloffType)
-
-        if len(propList) > 0:
-            self.changeState.propagate(propList, newJobState, oldstate)
+        for jobSlice in grouper(jobs, self.maxProcessSize):
+            with self.phaseTimer("loadJobs"):
+                jobList = self.loadJobsFromList(idList=jobSlice)
+            with self.phaseTimer("readFWJR"):
+                self.loadReportSummaries(jobList, cooloffType)
+
+            # Now we should have the jobs
+            propList = self.selectRetryAlgo(jobList, cooloffType)
+            for job in jobList:
+                job.pop('fwjr_summary', None)
+
+            with self.phaseTimer("propagate"):
+                if len(propList) > 0:
+                    self.changeState.propagate(propList, newJobState, oldstate)
+                # transitions queued by the plugins, e.g. jobs to pause
+                for plugin in self.plugins.values():
+                    for (newState, oldState), pluginJobs in plugin.popTransitions().items():
+                        self.changeState.propagate(pluginJobs, newState, oldState, updatesummary=True)
 
         return
 
@@ -242,6 +266,40 @@ class RetryManagerPoller(BaseWorkerThread):
 
         return listOfJobs
 
+    def getPlugin(self, job):
+        """
+        _getPlugin_
+
+        Return the retry algorithm configured for the job type
+        """
+        if job['jobType'] in self.typePluginsAssoc:
+            pluginName = self.typePluginsAssoc[job['jobType']]
+        else:
+            pluginName = self.typePluginsAssoc['default']
+        return self.plugins[pluginName]
+
+    def loadReportSummaries(self, jobList, cooloffType):
+        """
+        _loadReportSummaries_
+
+        Read in parallel the FWJRs of the jobs whose retry algorithm needs
+        them and attach their error summary to the jobs
+        """
+        reportPaths = {}
+        for job in jobList:
+            if self.getPlugin(job).needsReport(job, cooloffType):
+                reportPath = os.path.join(job['cache_dir'], "Report.%i.pkl" % job['retry_count'])
+                reportPaths[job['id']] = reportPath
+
+        if not reportPaths:
+            return
+
+        summaries = getErrorSummaries(reportPaths.values(), self.readFWJRPool)
+        for job in jobList:
+            if job['id'] in reportPaths:
+                job['fwjr_summary'] = summaries[reportPaths[job['id']]]
+        return
+
     def selectRetryAlgo(self, jobList, cooloffType):
         """
         _selectRetryAlgo_
@@ -255,11 +313,7 @@ class RetryManagerPoller(BaseWorkerThread):
 
         for job in jobList:
             try:
-                if job['jobType'] in self.typePluginsAssoc:
-                    pluginName = self.typePluginsAssoc[job['jobType']]
-                else:
-                    pluginName = self.typePluginsAssoc['default']
-                plugin = self.plugins[pluginName]
+                plugin = self.getPlugin(job)
 
                 if plugin.isReady(job=job, cooloffType=cooloffType):
                     result.append(job)
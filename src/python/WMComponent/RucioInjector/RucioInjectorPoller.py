@@ -14,6 +14,7 @@ import json
 import logging
 import threading
 import time
+from multiprocessing.pool import ThreadPool
 
 from Utils.MemoryCache import MemoryCache
 from Utils.Timers import timeFunction
@@ -43,6 +44,29 @@ def filterDataByTier(rawData, allowedTiers):
     return rawData
 
 
+def groupBlocksInBatches(filesByBlock, filesPerBatch):
+    """
+    Split the blocks in batches with about filesPerBatch files, blocks are
+    never split between batches.
+    :param filesByBlock: dictionary of block name to its list of files
+    :param filesPerBatch: integer with the number of files per batch
+    :return: a list of dictionaries with the same format as the input
+    """
+    batches = []
+    batch = {}
+    batchSize = 0
+    for block in sorted(filesByBlock):
+        if batch and batchSize + len(filesByBlock[block]) > filesPerBatch:
+            batches.append(batch)
+            batch = {}
+            batchSize = 0
+        batch[block] = filesByBlock[block]
+        batchSize += len(filesByBlock[block])
+    if batch:
+        batches.append(batch)
+    return batches
+
+
 class RucioInjectorException(WMException):
     """
     _RucioInjectorException_
@@ -61,6 +85,8 @@ class RucioInjectorPoller(BaseWorkerThread):
       * create a rucio container (or reuse a pre-existent one)
       * create a CMS block (or reuse a pre-existent one), block gets automatically attached
       * create file/replicas, which get automatically attached to its block as well
+        (blocks and replicas are inserted with bulk calls, for batches of blocks
+        grouped by RSE which are processed concurrently)
       * now create a CMS block rule to protect this data
       * if the block has been inserted into DBS, close the block in Rucio
 
@@ -94,10 +120,16 @@ class RucioInjectorPoller(BaseWorkerThread):
 
         self.scope = getattr(config.RucioInjector, "scope", "cms")
         self.rucioAcct = config.RucioInjector.rucioAccount
-        self.rucio = Rucio(acct=self.rucioAcct,
-                           hostUrl=config.RucioInjector.rucioUrl,
-                           authUrl=config.RucioInjector.rucioAuthUrl,
-                           configDict={'logger': self.logger})
+        self.rucioArgs = dict(acct=self.rucioAcct,
+                              hostUrl=config.RucioInjector.rucioUrl,
+                              authUrl=config.RucioInjector.rucioAuthUrl)
+        self.rucio = Rucio(configDict={'logger': self.logger}, **self.rucioArgs)
+
+        # blocks and replicas are inserted by a pool of threads, with one Rucio client each
+        self.rseThreads = getattr(config.RucioInjector, "rseThreads", 4)
+        self.filesPerBatch = getattr(config.RucioInjector, "filesPerBatch", 1000)
+        self.threadPool = None
+        self.threadData = threading.local()
 
         # metadata dictionary information to be added to block/container rules
         # cannot be a python dictionary, but a JSON string instead
@@ -139,6 +171,18 @@ class RucioInjectorPoller(BaseWorkerThread):
         self.setStatus = daofactory(classname="DBSBufferFiles.SetPhEDExStatus")
         self.setBlockClosed = daofactory(classname="SetBlockClosed")
 
+    def terminate(self, parameters):
+        """
+        _terminate_
+
+        Stop the threads inserting the blocks and replicas, if any
+        """
+        if self.threadPool is not None:
+            self.threadPool.close()
+            self.threadPool.join()
+            self.threadPool = None
+        BaseWorkerThread.terminate(self, parameters)
+
     @timeFunction
     def algorithm(self, parameters):
         """
@@ -171,16 +215,13 @@ class RucioInjectorPoller(BaseWorkerThread):
             else:
                 self.containersCache.addItemToCache(containersAdded)
 
-            # create blocks. Only update the cache once a rule gets created...
-            blocksAdded = self.insertBlocks(uninjectedFiles)
+            # create blocks and file replicas. Only update the cache once a rule gets created...
+            blocksAdded = self.insertBlocksAndReplicas(uninjectedFiles)
             if self.blocksCache.isCacheExpired():
                 self.blocksCache.setCache(blocksAdded)
             else:
                 self.blocksCache.addItemToCache(blocksAdded)
 
-            # create file replicas
-            self.insertReplicas(uninjectedFiles)
-
             # now close blocks already uploaded to DBS
             self.closeBlocks()
 
@@ -203,42 +244,101 @@ class RucioInjectorPoller(BaseWorkerThread):
         :return: set of containers successfully inserted into Rucio
         """
         logging.info("Preparing to insert containers into Rucio...")
-        newContainers = set()
+        containers = set()
         for location in uninjectedData:
-            for container in uninjectedData[location]:
-                # same container can be at multiple locations
-                if container not in self.containersCache and container not in newContainers:
-                    if self.rucio.createContainer(container, meta=self.metaDIDProject):
-                        logging.info("Container %s inserted into Rucio", container)
-                        newContainers.add(container)
-                    else:
-                        logging.error("Failed to create container: %s", container)
-        logging.info("Successfully inserted %d containers into Rucio", newContainers)
+            # same container can be at multiple locations
+            containers.update(container for container in uninjectedData[location]
+                              if container not in self.containersCache)
+
+        newContainers = self.rucio.createContainers(containers, meta=self.metaDIDProject)
+        for container in newContainers:
+            logging.info("Container %s inserted into Rucio", container)
+        for container in containers - newContainers:
+            logging.error("Failed to create container: %s", container)
+        logging.info("Successfully inserted %d containers into Rucio", len(newContainers))
         return newContainers
 
-    def insertBlocks(self, uninjectedData):
+    def insertBlocksAndReplicas(self, uninjectedData):
         """
         This method will insert blocks into Rucio and attach them to their correspondent
-        containers, when attaching this block, we also need to provide the RSE that it
-        will be available.
+        containers, then insert the file replicas and attach them to their blocks.
+        Blocks are grouped by RSE in batches of about filesPerBatch files, each batch
+        is inserted with bulk calls and the batches are processed concurrently. Files
+        get their database state switched to injected as soon as their batch succeeds.
         :param uninjectedData: same data as it's returned from the uninjectedFiles
-        :return: a dictionary of successfully inserted blocks and their correspondent location
+        :return: set of blocks successfully inserted into Rucio
         """
-        logging.info("Preparing to insert blocks into Rucio...")
-        newBlocks = set()
+        logging.info("Preparing to insert blocks and replicas into Rucio...")
+        batches = []
         for location in uninjectedData:
             rseName = "%s_Test" % location if self.testRSEs else location
+            filesByBlock = {}
             for container in uninjectedData[location]:
                 for block in uninjectedData[location][container]:
-                    if block not in self.blocksCache:
-                        if self.rucio.createBlock(block, rse=rseName, meta=self.metaDIDProject):
-                            logging.info("Block %s inserted into Rucio", block)
-                            newBlocks.add(block)
-                        else:
-                            logging.error("Failed to create block: %s", block)
-        logging.info("Successfully inserted %d blocks into Rucio", newBlocks)
+                    filesByBlock[block] = []
+                    for fileInfo in uninjectedData[location][container][block]['files']:
+                        filesByBlock[block].append(dict(name=fileInfo['lfn'], scope=self.scope,
+                                                        bytes=fileInfo['size'], state="A",
+                                                        adler32=fileInfo['checksum']['adler32']))
+            for batch in groupBlocksInBatches(filesByBlock, self.filesPerBatch):
+                newBlocks = [block for block in batch if block not in self.blocksCache]
+                batches.append((rseName, batch, newBlocks))
+
+        if len(batches) > 1 and self.rseThreads > 1:
+            if self.threadPool is None:
+                self.threadPool = ThreadPool(self.rseThreads)
+            results = self.threadPool.imap_unordered(self._insertBatch, batches)
+        else:
+            results = (self._insertBatch(batch) for batch in batches)
+
+        newBlocks = set()
+        for rseName, blocksAdded, lfnsByBlock in results:
+            newBlocks.update(blocksAdded)
+            listLfns = [lfn for lfns in lfnsByBlock.values() for lfn in lfns]
+            logging.info("Successfully inserted %d blocks and %d files at %s",
+                         len(blocksAdded), len(listLfns), rseName)
+            self._updateLFNState(listLfns)
+
+        logging.info("Successfully inserted %d blocks into Rucio", len(newBlocks))
         return newBlocks
 
+    def _getRucio(self):
+        """
+        Return the Rucio object of the current thread
+        """
+        rucio = getattr(self.threadData, 'rucio', None)
+        if rucio is None:
+            rucio = self.threadData.rucio = Rucio(configDict={'logger': self.logger}, **self.rucioArgs)
+        return rucio
+
+    def _insertBatch(self, rseBatch):
+        """
+        Insert a batch of blocks and their replicas at a RSE into Rucio.
+        Runs in the thread pool, so it doesn't touch the database.
+        :param rseBatch: tuple with the RSE name, a dictionary of block name to its
+            list of files and the list of blocks to be created
+        :return: a tuple with the RSE name, the set of blocks created and a dictionary
+            of block name to the list of LFNs injected
+        """
+        rseName, filesByBlock, newBlocks = rseBatch
+        rucio = self._getRucio()
+
+        blocksAdded = rucio.createBlocks(newBlocks, rse=rseName, meta=self.metaDIDProject)
+        for block in blocksAdded:
+            logging.debug("Block %s inserted into Rucio", block)
+        failedBlocks = set(newBlocks) - blocksAdded
+        for block in failedBlocks:
+            logging.error("Failed to create block: %s", block)
+
+        readyBlocks = dict((block, blockFiles) for block, blockFiles in filesByBlock.items()
+                           if block not in failedBlocks)
+        injectedBlocks = rucio.createReplicasInBlocks(rseName, readyBlocks)
+        lfnsByBlock = {}
+        for block in injectedBlocks:
+            lfnsByBlock[block] = [item['name'] for item in readyBlocks[block]]
+            logging.debug("Successfully inserted %d files on block %s", len(lfnsByBlock[block]), block)
+        return rseName, blocksAdded, lfnsByBlock
+
     # TODO: this will likely go away once the phedex to rucio migration is over
     def _isBlockTierAllowed(self, blockName):
         """
@@ -285,34 +385,6 @@ class RucioInjectorPoller(BaseWorkerThread):
                 logging.error("Failed to create rule for block: %s at %s", item['blockname'], rseName)
         return
 
-    def insertReplicas(self, uninjectedData):
-        """
-        Inserts replicas into Rucio and attach them to its specific block.
-        If the insertion succeeds, also switch their database state to injected.
-
-        :param uninjectedData: dictionary with blocks as key, and RSEs as value
-        """
-        # FIXME: I think we need a different data struct from the database
-        # this method is very expensive O(n^4)
-        logging.info("Preparing to insert replicas into Rucio...")
-
-        for location in uninjectedData.keys():
-            rseName = "%s_Test" % location if self.testRSEs else location
-            for container in uninjectedData[location]:
-                for block in uninjectedData[location][container]:
-                    injectData = []
-                    listLfns = []
-                    for fileInfo in uninjectedData[location][container][block]['files']:
-                        listLfns.append(fileInfo['lfn'])
-                        injectData.append(dict(name=fileInfo['lfn'], scope=self.scope,
-                                               bytes=fileInfo['size'], state="A",
-                                               adler32=fileInfo['checksum']['adler32']))
-
-                    if self.rucio.createReplicas(rse=rseName, files=injectData, block=block):
-                        logging.info("Successfully inserted %d files on block %s", len(listLfns), block)
-                        self._updateLFNState(listLfns)
-        return
-
     def _updateLFNState(self, listLfns, recovery=False):
         """
         Given a list of LFNs, update their state in dbsbuffer table.
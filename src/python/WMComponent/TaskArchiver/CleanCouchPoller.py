@@ -14,9 +14,13 @@ import threading
 import time
 import urllib.request
 from contextlib import closing
+
+from future.utils import viewitems
+
 from Utils.Timers import timeFunction
 from WMComponent.JobCreator.CreateWorkArea import getMasterName
 from WMComponent.JobCreator.JobCreatorPoller import retrieveWMSpec
+from WMComponent.TaskArchiver.CouchCleanup import CouchCleanup
 from WMComponent.TaskArchiver.DataCache import DataCache
 from WMCore.Algorithms import MathAlgos
 from WMCore.DAOFactory import DAOFactory
@@ -77,6 +81,14 @@ class CleanCouchPoller(BaseWorkerThread):
         self.maxProcessSize = getattr(self.config.TaskArchiver, 'maxProcessSize', 250)
         self.timeout = getattr(self.config.TaskArchiver, "timeOut", None)
         self.nOffenders = getattr(self.config.TaskArchiver, 'nOffenders', 3)
+        # number of keys sent in a single multi-key view query
+        self.viewKeysBatchSize = getattr(self.config.TaskArchiver, 'viewKeysBatchSize', 1000)
+        # couch cleanup: docs deleted per _bulk_docs request, number of workflows
+        # cleaned up concurrently and whether to _purge docs instead of deleting them
+        # (opt-in, every purged batch forces a rebuild of the couch view indexes)
+        self.cleanCouchBatchSize = getattr(self.config.TaskArchiver, 'cleanCouchBatchSize', 5000)
+        self.cleanCouchThreads = getattr(self.config.TaskArchiver, 'cleanCouchThreads', 4)
+        self.cleanCouchUsePurge = getattr(self.config.TaskArchiver, 'cleanCouchUsePurge', False)
 
         # Set up optional histograms
         self.histogramKeys = getattr(self.config.TaskArchiver, "histogramKeys", [])
@@ -134,6 +146,12 @@ class CleanCouchPoller(BaseWorkerThread):
         statSummaryDBName = self.config.JobStateMachine.summaryStatsDBName
         self.statsumdatabase = self.jobCouchdb.connectDatabase(statSummaryDBName)
 
+        self.couchCleanup = CouchCleanup(jobDBurl, jobDBName, statSummaryDBName,
+                                         self.config.TaskArchiver.localWMStatsURL,
+                                         batchSize=self.cleanCouchBatchSize,
+                                         nThreads=self.cleanCouchThreads,
+                                         usePurge=self.cleanCouchUsePurge)
+
         logging.debug("Using url %s/%s for job", jobDBurl, jobDBName)
         logging.debug("Writing to  %s/%s for workloadSummary", sanitizeURL(workDBurl)['url'], workDBName)
 
@@ -185,11 +203,10 @@ class CleanCouchPoller(BaseWorkerThread):
             logging.exception(msg)
 
     def archiveWorkflows(self, workflows, archiveState):
+        workflows = [workflowName for workflowName in workflows if self.isUploadedToWMArchive(workflowName)]
         updated = 0
-        for workflowName in workflows:
-            if not self.isUploadedToWMArchive(workflowName):
-                continue
-            if self.cleanAllLocalCouchDB(workflowName):
+        for workflowName, report in viewitems(self.couchCleanup.cleanWorkflows(workflows)):
+            if CouchCleanup.isSuccessful(report):
                 if not self.useReqMgrForCompletionCheck:
                     #  only update tier0 case, for Prodcuction/Processing reqmgr will update status
                     self.centralRequestDBWriter.updateRequestStatus(workflowName, archiveState)
@@ -260,80 +277,15 @@ class CleanCouchPoller(BaseWorkerThread):
         to clear up some space.
 
         Load the document IDs and revisions out of couch by workflowName,
-        then order a delete on them.
+        then order a delete on them (in batches of cleanCouchBatchSize docs).
         """
-        options = {"startkey": [workflowName], "endkey": [workflowName, {}], "reduce": False}
-
-        if db == "JobDump":
-            couchDB = self.jobsdatabase
-            view = "jobsByWorkflowName"
-        elif db == "FWJRDump":
-            couchDB = self.fwjrdatabase
-            view = "fwjrsByWorkflowName"
-        elif db == "SummaryStats":
-            couchDB = self.statsumdatabase
-            view = None
-        elif db == "WMStatsAgent":
-            couchDB = self.wmstatsCouchDB.getDBInstance()
-            view = "allWorkflows"
-            options = {"key": workflowName, "reduce": False}
-
-        if view is None:
-            try:
-                committed = couchDB.delete_doc(workflowName)
-            except CouchNotFoundError as ex:
-                return {'status': 'warning', 'message': "%s: %s" % (workflowName, str(ex))}
-        else:
-            try:
-                jobs = couchDB.loadView(db, view, options=options)['rows']
-            except Exception as ex:
-                errorMsg = "Error on loading jobs for %s" % workflowName
-                logging.warning("%s/n%s", str(ex), errorMsg)
-                return {'status': 'error', 'message': errorMsg}
-
-            for j in jobs:
-                doc = {}
-                doc["_id"] = j['value']['id']
-                doc["_rev"] = j['value']['rev']
-                couchDB.queueDelete(doc)
-            committed = couchDB.commit()
-
-        if committed:
-            # create the error report
-            errorReport = {}
-            deleted = 0
-            status = "ok"
-            for data in committed:
-                if 'error' in data:
-                    errorReport.setdefault(data['error'], 0)
-                    errorReport[data['error']] += 1
-                    status = "error"
-                else:
-                    deleted += 1
-            return {'status': status, 'delete': deleted, 'message': errorReport}
-        else:
-            return {'status': 'warning', 'message': "no %s exist" % workflowName}
+        return self.couchCleanup.deleteWorkflow(workflowName, db)
 
     def cleanAllLocalCouchDB(self, workflowName):
         logging.info("Deleting %s from JobCouch", workflowName)
-
-        jobReport = self.deleteWorkflowFromJobCouch(workflowName, "JobDump")
-        logging.debug("%s docs deleted from JobDump", jobReport)
-
-        fwjrReport = self.deleteWorkflowFromJobCouch(workflowName, "FWJRDump")
-        logging.debug("%s docs deleted from FWJRDump", fwjrReport)
-
-        summaryReport = self.deleteWorkflowFromJobCouch(workflowName, "SummaryStats")
-        logging.debug("%s docs deleted from SummaryStats", summaryReport)
-
-        wmstatsReport = self.deleteWorkflowFromJobCouch(workflowName, "WMStatsAgent")
-        logging.debug("%s docs deleted from wmagent_summary", wmstatsReport)
-
-        # if one of the procedure fails return False
-        if jobReport["status"] == "error" or fwjrReport["status"] == "error" or wmstatsReport["status"] == "error":
-            return False
-        # other wise return True.
-        return True
+        _, report = self.couchCleanup.cleanWorkflow(workflowName)
+        logging.debug("%s docs deleted from local couch", report)
+        return CouchCleanup.isSuccessful(report)
 
     def isUploadedToWMArchive(self, workflowName):
 
@@ -361,10 +313,9 @@ class CleanCouchPoller(BaseWorkerThread):
 
             workflowDict = self.centralRequestDBReader.getStatusAndTypeByRequest(requestNames)
 
-            for request, value in workflowDict.items():
-                if value[0].endswith("-archived"):
-                    self.cleanAllLocalCouchDB(request)
-                    numDeletedRequests += 1
+            archived = [request for request, value in viewitems(workflowDict) if value[0].endswith("-archived")]
+            self.couchCleanup.cleanWorkflows(archived)
+            numDeletedRequests = len(archived)
 
         except Exception as ex:
             errorMsg = "Error on loading workflow list from wmagent_summary db"
@@ -557,7 +508,9 @@ class CleanCouchPoller(BaseWorkerThread):
             # Catch couch errors
             logging.error("Could not load the output task mapping list due to an error")
             logging.error("Error: %s", str(ex))
-        perf = self.handleCouchPerformance(workflowName=workflowName)
+        # retries with errors of each failed job, used to query the errors of a whole chunk of jobs at once
+        jobRetries = self.getFailedJobRetries(workflowName)
+        perf = self.handleCouchPerformance(workflowName=workflowName, failedJobs=list(jobRetries))
         workflowData['performance'] = {}
         for key in perf:
             workflowData['performance'][key] = {}
@@ -613,12 +566,13 @@ class CleanCouchPoller(BaseWorkerThread):
             loadJobs = self.daoFactory(classname="Jobs.LoadForTaskArchiver")
             jobList = loadJobs.execute(chunkList)
             logging.info("Processing %d jobs,", len(jobList))
+            errorKeys = [[job['id'], retry] for job in jobList for retry in jobRetries.get(job['id'], [])]
+            jobErrors = {}
+            for row in self.loadViewByKeys(self.fwjrdatabase, "FWJRDump", "errorsByJobID", errorKeys):
+                jobErrors.setdefault(row['key'][0], []).append(row)
             for job in jobList:
                 lastRegisteredRetry = None
-                errorCouch = self.fwjrdatabase.loadView("FWJRDump", "errorsByJobID",
-                                                        options={"startkey": [job['id'], 0],
-                                                                 "endkey": [job['id'], {}],
-                                                                 "stale": "update_after"})['rows']
+                errorCouch = jobErrors.get(job['id'], [])
 
                 # Get the input files
                 inputLFNs = [x['lfn'] for x in job['input_files']]
@@ -753,7 +707,21 @@ class CleanCouchPoller(BaseWorkerThread):
             logging.error("Error: %s", str(ex))
             return {}
 
-    def handleCouchPerformance(self, workflowName):
+    def loadViewByKeys(self, couchDB, design, view, keys, options=None):
+        """
+        _loadViewByKeys_
+
+        Query a view for a list of keys with multi-key POST requests of at
+        most viewKeysBatchSize keys, returns the rows in the order of the keys.
+        """
+        options = options or {"stale": "update_after"}
+        rows = []
+        for i in range(0, len(keys), self.viewKeysBatchSize):
+            rows.extend(couchDB.loadView(design, view, options=options,
+                                         keys=keys[i:i + self.viewKeysBatchSize])['rows'])
+        return rows
+
+    def handleCouchPerformance(self, workflowName, failedJobs=None):
         """
         _handleCouchPerformance_
 
@@ -764,10 +732,14 @@ class CleanCouchPoller(BaseWorkerThread):
                                                    "endkey": [workflowName],
                                                    "stale": "update_after"})['rows']
 
-        failedJobs = self.getFailedJobs(workflowName)
+        if failedJobs is None:
+            failedJobs = self.getFailedJobs(workflowName)
+        failedJobs = set(failedJobs)
 
         taskList = {}
         finalTask = {}
+        # (key, final step/key dictionary, offenders) to fill in once all the offenders logs are known
+        worstOffenders = []
 
         for row in perf:
             taskName = row['value']['taskName']
@@ -830,33 +802,6 @@ class CleanCouchPoller(BaseWorkerThread):
                     # i.e., those with the highest values
                     offenders = MathAlgos.getLargestValues(dictList=masterList, key=key,
                                                            n=self.nOffenders)
-                    for x in offenders:
-                        try:
-                            logArchive = self.fwjrdatabase.loadView("FWJRDump", "logArchivesByJobID",
-                                                                    options={"startkey": [x['jobID']],
-                                                                             "endkey": [x['jobID'],
-                                                                                        x['retry_count']],
-                                                                             "stale": "update_after"})
-                            logArchive = logArchive['rows'][0]['value']['lfn']
-                            logCollectID = self.jobsdatabase.loadView("JobDump", "jobsByInputLFN",
-                                                                      options={"startkey": [workflowName, logArchive],
-                                                                               "endkey": [workflowName, logArchive],
-                                                                               "stale": "update_after"})
-                            logCollectID = logCollectID['rows'][0]['value']
-                            logCollect = self.fwjrdatabase.loadView("FWJRDump", "outputByJobID",
-                                                                    options={"startkey": logCollectID,
-                                                                             "endkey": logCollectID,
-                                                                             "stale": "update_after"})
-                            logCollect = logCollect['rows'][0]['value']['lfn']
-                            x['logArchive'] = logArchive.split('/')[-1]
-                            x['logCollect'] = logCollect
-                        except IndexError as ex:
-                            logging.debug("Unable to find final logArchive tarball for %i", x['jobID'])
-                            logging.debug(str(ex))
-                        except KeyError as ex:
-                            logging.debug("Unable to find final logArchive tarball for %i", x['jobID'])
-                            logging.debug(str(ex))
-
                     if key in self.histogramKeys:
                         # Usual histogram that was always done
                         histogram = MathAlgos.createHistogram(numList=output[key],
@@ -876,27 +821,79 @@ class CleanCouchPoller(BaseWorkerThread):
                         final[stepName][key]['average'] = average
                         final[stepName][key]['stdDev'] = stdDev
 
-                    final[stepName][key]['worstOffenders'] = [{'jobID': x['jobID'], 'value': x.get(key, 0.0),
-                                                               'log': x.get('logArchive', None),
-                                                               'logCollect': x.get('logCollect', None)} for x in
-                                                              offenders]
+                    worstOffenders.append((key, final[stepName][key], offenders))
 
             finalTask[taskName] = final
+
+        self.addOffendersLogs(workflowName, [x for _, _, offenders in worstOffenders for x in offenders])
+        for key, finalKey, offenders in worstOffenders:
+            finalKey['worstOffenders'] = [{'jobID': x['jobID'], 'value': x.get(key, 0.0),
+                                           'log': x.get('logArchive', None),
+                                           'logCollect': x.get('logCollect', None)} for x in offenders]
         return finalTask
 
-    def getFailedJobs(self, workflowName):
+    def addOffendersLogs(self, workflowName, offenders):
+        """
+        _addOffendersLogs_
+
+        Find the logArchive tarball of the worst offender jobs and the
+        logCollect tarball it ended up in, with one multi-key view query
+        per view for all the offenders.
+        """
+        # first retry of the job which produced a logArchive, up to the offender retry
+        archiveKeys = []
+        for x in offenders:
+            retryCount = x.get('retry_count') or 0
+            archiveKeys.extend([x['jobID'], retry] for retry in range(retryCount + 1))
+        logArchives = {}
+        for row in self.loadViewByKeys(self.fwjrdatabase, "FWJRDump", "logArchivesByJobID",
+                                       [list(k) for k in set(tuple(k) for k in archiveKeys)]):
+            jobID, retry = row['key']
+            if jobID not in logArchives or retry < logArchives[jobID][0]:
+                logArchives[jobID] = (retry, row['value']['lfn'])
+
+        logCollectIDs = {}
+        lfnKeys = [[workflowName, lfn] for _, lfn in logArchives.values()]
+        for row in self.loadViewByKeys(self.jobsdatabase, "JobDump", "jobsByInputLFN", lfnKeys):
+            logCollectIDs.setdefault(row['key'][1], row['value'])
+
+        logCollects = {}
+        for row in self.loadViewByKeys(self.fwjrdatabase, "FWJRDump", "outputByJobID",
+                                       list(set(logCollectIDs.values()))):
+            logCollects.setdefault(row['key'], row['value']['lfn'])
+
+        for x in offenders:
+            logArchive = logArchives.get(x['jobID'], (None, None))[1]
+            logCollect = logCollects.get(logCollectIDs.get(logArchive))
+            if logArchive is None or logCollect is None:
+                logging.debug("Unable to find final logArchive tarball for %i", x['jobID'])
+                continue
+            x['logArchive'] = logArchive.split('/')[-1]
+            x['logCollect'] = logCollect
+
+    def getFailedJobRetries(self, workflowName):
+        """
+        _getFailedJobRetries_
+
+        Returns a dictionary of the failed job ids to the sorted list of
+        retries which reported an error.
+        """
         # We want ALL the jobs, and I'm sorry, CouchDB doesn't support wildcards, above-than-absurd values will do:
         errorView = self.fwjrdatabase.loadView("FWJRDump", "errorsByWorkflowName",
                                                options={"startkey": [workflowName, 0, 0],
                                                         "endkey": [workflowName, 999999999, 999999],
                                                         "stale": "update_after"})['rows']
-        failedJobs = []
+        jobRetries = {}
         for row in errorView:
-            jobId = row['value']['jobid']
-            if jobId not in failedJobs:
-                failedJobs.append(jobId)
+            retries = jobRetries.setdefault(row['value']['jobid'], [])
+            if row['value']['retry'] not in retries:
+                retries.append(row['value']['retry'])
+        for retries in jobRetries.values():
+            retries.sort()
+        return jobRetries
 
-        return failedJobs
+    def getFailedJobs(self, workflowName):
+        return sorted(self.getFailedJobRetries(workflowName))
 
     def publishRecoPerfToDashBoard(self, workload):
 
@@ -0,0 +1,202 @@
+"""
+_CouchCleanup_
+
+Bulk deletion of the workflow documents stored in the agent couch databases
+(JobDump, FWJRDump, SummaryStats and the local WMStats), used by the
+CleanCouchPoller once a workflow is archived.
+
+Documents are looked up through the workflow views in pages of batchSize
+rows and every page is deleted with a single _bulk_docs request.
+Several workflows are cleaned at the same time from a pool of threads, each
+thread using its own couch connections since the couch client isn't
+thread safe.
+
+Purging the documents instead of deleting them is opt-in (usePurge): every
+_purge request changes the purge sequence of the database, which makes
+CouchDB rebuild the view indexes from scratch the next time they are read.
+With pages of batchSize documents a large workflow triggers many rebuilds,
+which are much more expensive than keeping the deleted document stubs.
+"""
+
+import logging
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+
+from WMCore.Database.CMSCouch import CouchServer, CouchNotFoundError
+from WMCore.Lexicon import splitCouchServiceURL
+
+# database label -> (design document, view name, view options builder)
+CLEANUP_VIEWS = {"JobDump": ("JobDump", "jobsByWorkflowName",
+                             lambda wf: {"startkey": [wf], "endkey": [wf, {}], "reduce": False}),
+                 "FWJRDump": ("FWJRDump", "fwjrsByWorkflowName",
+                              lambda wf: {"startkey": [wf], "endkey": [wf, {}], "reduce": False}),
+                 "WMStatsAgent": ("WMStatsAgent", "allWorkflows",
+                                  lambda wf: {"key": wf, "reduce": False})}
+
+CLEANUP_DATABASES = ["JobDump", "FWJRDump", "SummaryStats", "WMStatsAgent"]
+
+# databases whose cleanup must succeed for the workflow to be archived
+REQUIRED_CLEANUP_DATABASES = ["JobDump", "FWJRDump", "WMStatsAgent"]
+
+
+class CouchCleanup(object):
+    """
+    Deletes all the local couch documents of a list of workflows
+    """
+
+    def __init__(self, jobCouchURL, jobDBName, summaryStatsDBName, wmstatsURL,
+                 batchSize=5000, nThreads=4, usePurge=False, logger=None):
+        """
+        jobCouchURL is the couch server of the JobDump, FWJRDump and
+        SummaryStats databases, wmstatsURL the full url of the local WMStats
+        database. usePurge (off by default) makes the documents to be purged
+        instead of deleted: it frees more space, but purged documents aren't
+        replicated so it must only be used for databases without replication,
+        and every purged page forces a rebuild of the database view indexes.
+        """
+        self.logger = logger or logging.getLogger()
+        self.batchSize = batchSize
+        self.nThreads = max(1, nThreads)
+        self.usePurge = usePurge
+        if self.usePurge:
+            self.logger.warning("Couch documents will be purged in batches of %d, "
+                                "every batch forces a rebuild of the view indexes", self.batchSize)
+        wmstatsCouchURL, wmstatsDBName = splitCouchServiceURL(wmstatsURL)
+        self.dbLocations = {"JobDump": (jobCouchURL, "%s/jobs" % jobDBName),
+                            "FWJRDump": (jobCouchURL, "%s/fwjrs" % jobDBName),
+                            "SummaryStats": (jobCouchURL, summaryStatsDBName),
+                            "WMStatsAgent": (wmstatsCouchURL, wmstatsDBName)}
+        self._local = threading.local()
+
+    def _getDatabase(self, db):
+        """
+        Return the couch Database object of the calling thread for the given label
+        """
+        if not hasattr(self._local, "databases"):
+            self._local.databases = {}
+        if db not in self._local.databases:
+            couchURL, dbName = self.dbLocations[db]
+            # queue one more document than a page so commit is never triggered by queue()
+            self._local.databases[db] = CouchServer(couchURL).connectDatabase(dbName, create=False,
+                                                                              size=self.batchSize + 1)
+        return self._local.databases[db]
+
+    def _deleteBatch(self, couchDB, rows):
+        """
+        Delete the documents from a page of view rows, returns the number of
+        documents deleted and a dictionary with the errors count.
+        """
+        errorReport = {}
+        if self.usePurge:
+            docs = {}
+            for row in rows:
+                docs.setdefault(row['value']['id'], []).append(row['value']['rev'])
+            result = couchDB.purge(docs)
+            return len(result.get('purged', {})), errorReport
+
+        for row in rows:
+            couchDB.queueDelete({"_id": row['value']['id'], "_rev": row['value']['rev']})
+        deleted = 0
+        for data in couchDB.commit() or []:
+            if 'error' in data:
+                errorReport.setdefault(data['error'], 0)
+                errorReport[data['error']] += 1
+            else:
+                deleted += 1
+        return deleted, errorReport
+
+    def deleteWorkflow(self, workflowName, db):
+        """
+        _deleteWorkflow_
+
+        Delete the documents of a workflow from one of the databases, returns
+        a report dictionary with status, number of docs deleted and message.
+        """
+        couchDB = self._getDatabase(db)
+        if db not in CLEANUP_VIEWS:
+            try:
+                committed = couchDB.delete_doc(workflowName)
+            except CouchNotFoundError as ex:
+                return {'status': 'warning', 'message': "%s: %s" % (workflowName, str(ex))}
+            if 'error' in committed:
+                return {'status': 'error', 'delete': 0, 'message': {committed['error']: 1}}
+            return {'status': 'ok', 'delete': 1, 'message': {}}
+
+        design, view, optionsFunc = CLEANUP_VIEWS[db]
+        options = optionsFunc(workflowName)
+        options["limit"] = self.batchSize
+        deleted = 0
+        errorReport = {}
+        while True:
+            # deleted documents are gone from the view, so always read the first page
+            try:
+                rows = couchDB.loadView(design, view, options=options)['rows']
+            except Exception as ex:
+                errorMsg = "Error on loading documents of %s from %s" % (workflowName, db)
+                self.logger.warning("%s\n%s", str(ex), errorMsg)
+                return {'status': 'error', 'delete': deleted, 'message': errorMsg}
+            if not rows:
+                break
+            nDeleted, errors = self._deleteBatch(couchDB, rows)
+            deleted += nDeleted
+            for error, count in errors.items():
+                errorReport[error] = errorReport.get(error, 0) + count
+            if errors or len(rows) < self.batchSize:
+                # documents failing to be deleted would be read over and over
+                break
+
+        if errorReport:
+            return {'status': 'error', 'delete': deleted, 'message': errorReport}
+        if not deleted:
+            return {'status': 'warning', 'message': "no %s exist" % workflowName}
+        return {'status': 'ok', 'delete': deleted, 'message': errorReport}
+
+    def cleanWorkflow(self, workflowName):
+        """
+        _cleanWorkflow_
+
+        Delete the workflow from all the local databases, returns a
+        tuple with the workflow name and a report per database.
+        """
+        report = {}
+        for db in CLEANUP_DATABASES:
+            try:
+                report[db] = self.deleteWorkflow(workflowName, db)
+            except Exception as ex:
+                self.logger.exception("Failed to delete %s from %s", workflowName, db)
+                report[db] = {'status': 'error', 'message': str(ex)}
+        return workflowName, report
+
+    def cleanWorkflows(self, workflowNames):
+        """
+        _cleanWorkflows_
+
+        Delete several workflows at the same time from the thread pool,
+        logging a progress report as each workflow is done.
+        Returns a dictionary of workflow name to per database reports.
+        """
+        results = {}
+        if not workflowNames:
+            return results
+        startTime = time.time()
+        pool = ThreadPool(min(self.nThreads, len(workflowNames)))
+        try:
+            for workflowName, report in pool.imap_unordered(self.cleanWorkflow, workflowNames):
+                results[workflowName] = report
+                deleted = sum(dbReport.get('delete', 0) for dbReport in report.values())
+                self.logger.info("Deleted %d couch docs for %s (%d/%d workflows done in %.1f secs): %s",
+                                 deleted, workflowName, len(results), len(workflowNames),
+                                 time.time() - startTime, report)
+        finally:
+            pool.close()
+            pool.join()
+        return results
+
+    @staticmethod
+    def isSuccessful(report):
+        """
+        Whether the cleanup reported by cleanWorkflow succeeded. Errors
+        deleting the SummaryStats document don't fail the cleanup.
+        """
+        return all(report[db]["status"] != "error" for db in REQUIRED_CLEANUP_DATABASES if db in report)
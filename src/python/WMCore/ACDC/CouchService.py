@@ -54,9 +54,8 @@ class CouchService(object):
         in expirationDays (in days).
         """
         cutoutPoint = time() - (expirationDays * 3600 * 24)
-        result = self.couchdb.loadView("ACDC", "byTimestamp", {"endkey": cutoutPoint})
         count = 0
-        for entry in result["rows"]:
+        for entry in self.couchdb.iterView("ACDC", "byTimestamp", {"endkey": cutoutPoint}):
             self.couchdb.queueDelete(entry["value"])
             count += 1
         self.couchdb.commit()
@@ -49,6 +49,7 @@ class CreateAgentBase(DBCreator):
                cycle_time    FLOAT DEFAULT 0 NOT NULL,
                outcome       VARCHAR(1000),
                error_message VARCHAR(1000),
+               cycle_stats   VARCHAR(1000),
                UNIQUE (name))"""
 
         self.constraints["FK_wm_component_worker"] = \
@@ -0,0 +1,23 @@
+"""
+_ExistCycleStats_
+
+MySQL implementation of ExistCycleStats
+
+Check whether the wm_workers table has the cycle_stats column, which is
+missing in the schema of agents deployed before it was added.
+"""
+
+__all__ = []
+
+from WMCore.Database.DBFormatter import DBFormatter
+
+
+class ExistCycleStats(DBFormatter):
+    sql = """SELECT COUNT(*) FROM information_schema.columns
+               WHERE table_schema = DATABASE() AND table_name = 'wm_workers'
+               AND column_name = 'cycle_stats'"""
+
+    def execute(self, conn=None, transaction=False):
+        result = self.dbi.processData(self.sql, conn=conn,
+                                      transaction=transaction)
+        return self.format(result)[0][0] > 0
@@ -15,13 +15,19 @@ class GetAllHeartbeatInfo(DBFormatter):
     sql = """SELECT comp.name as name, comp.pid, worker.name as worker_name,
                  worker.state, worker.last_updated, comp.update_threshold,
                  worker.poll_interval, worker.cycle_time, worker.outcome,
-                 worker.last_error, worker.error_message
+                 worker.last_error, worker.error_message,
+                 %s
              FROM wm_workers worker
              INNER JOIN wm_components comp ON comp.id = worker.component_id
              """
 
-    def execute(self, conn = None, transaction = False):
+    def execute(self, cycleStats=True, conn = None, transaction = False):
+        """
+        Set cycleStats to False if the wm_workers table has no cycle_stats
+        column, it's then returned as None.
+        """
+        sql = self.sql % ("worker.cycle_stats" if cycleStats else "NULL AS cycle_stats")
 
-        result = self.dbi.processData(self.sql, conn = conn,
+        result = self.dbi.processData(sql, conn = conn,
                              transaction = transaction)
         return self.formatDict(result)
@@ -14,16 +14,22 @@ class GetHeartbeatInfo(DBFormatter):
     sql = """SELECT comp.name as name, comp.pid, worker.name as worker_name,
                     worker.state, worker.last_updated, comp.update_threshold,
                     worker.poll_interval, worker.cycle_time, worker.outcome,
-                    worker.last_error, worker.error_message
+                    worker.last_error, worker.error_message,
+                    %s
              FROM wm_workers worker
              INNER JOIN wm_components comp ON comp.id = worker.component_id
              WHERE comp.name = :component_name
              ORDER BY worker.last_updated ASC
              """
 
-    def execute(self, compName, conn=None, transaction=False):
+    def execute(self, compName, cycleStats=True, conn=None, transaction=False):
+        """
+        Set cycleStats to False if the wm_workers table has no cycle_stats
+        column, it's then returned as None.
+        """
         bind = {"component_name": compName}
+        sql = self.sql % ("worker.cycle_stats" if cycleStats else "NULL AS cycle_stats")
 
-        result = self.dbi.processData(self.sql, bind, conn=conn,
+        result = self.dbi.processData(sql, bind, conn=conn,
                                       transaction=transaction)
         return self.formatDict(result)
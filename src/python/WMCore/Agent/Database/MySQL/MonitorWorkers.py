@@ -9,9 +9,14 @@ from WMCore.Database.DBFormatter import DBFormatter
 
 
 class MonitorWorkers(DBFormatter):
-    sql = """SELECT name, last_updated, state, poll_interval, cycle_time
+    sql = """SELECT name, last_updated, state, poll_interval, cycle_time, %s
                FROM wm_workers ORDER BY name"""
 
-    def execute(self, conn=None, transaction=False):
-        result = self.dbi.processData(self.sql, conn=conn, transaction=transaction)
+    def execute(self, cycleStats=True, conn=None, transaction=False):
+        """
+        Set cycleStats to False if the wm_workers table has no cycle_stats
+        column, it's then returned as None.
+        """
+        sql = self.sql % ("cycle_stats" if cycleStats else "NULL AS cycle_stats")
+        result = self.dbi.processData(sql, conn=conn, transaction=transaction)
         return self.formatDict(result)
@@ -18,7 +18,7 @@ class UpdateWorker(DBFormatter):
     sqlpart3 = """ WHERE name = :worker_name"""
 
     def execute(self, workerName, state=None, timeSpent=None,
-                results=None, conn=None, transaction=False):
+                results=None, cycleStats=None, conn=None, transaction=False):
 
         binds = {"worker_name": workerName,
                  "last_updated": int(time.time())}
@@ -32,6 +32,9 @@ class UpdateWorker(DBFormatter):
             sqlpart2 += ", cycle_time = :cycle_time"
             binds["outcome"] = results
             sqlpart2 += ", outcome = :outcome"
+        if cycleStats is not None:
+            binds["cycle_stats"] = cycleStats
+            sqlpart2 += ", cycle_stats = :cycle_stats"
 
         sql = self.sqlpart1 + sqlpart2 + self.sqlpart3
 
@@ -0,0 +1,15 @@
+"""
+_ExistCycleStats_
+
+Oracle implementation of ExistCycleStats
+"""
+
+__all__ = []
+
+from WMCore.Agent.Database.MySQL.ExistCycleStats import ExistCycleStats \
+     as ExistCycleStatsMySQL
+
+
+class ExistCycleStats(ExistCycleStatsMySQL):
+    sql = """SELECT COUNT(*) FROM user_tab_columns
+               WHERE table_name = 'WM_WORKERS' AND column_name = 'CYCLE_STATS'"""
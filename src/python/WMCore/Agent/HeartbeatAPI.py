@@ -42,6 +42,20 @@ class HeartbeatAPI(WMConnectionBase):
         self.updateErrorWorker = self.daofactory(classname="UpdateWorkerError")
         self.getHeartbeat = self.daofactory(classname="GetHeartbeatInfo")
         self.getAllHeartbeat = self.daofactory(classname="GetAllHeartbeatInfo")
+        self.existCycleStats = self.daofactory(classname="ExistCycleStats")
+        self.cycleStatsColumn = None
+
+    def hasCycleStats(self):
+        """
+        Check, once, whether wm_workers has the cycle_stats column. Agents
+        deployed before it was added keep working without cycle stats.
+        """
+        if self.cycleStatsColumn is None:
+            self.cycleStatsColumn = self.existCycleStats.execute(conn=self.getDBConn(),
+                                                                 transaction=self.existingTransaction())
+            if not self.cycleStatsColumn:
+                self.logger.warning("wm_workers has no cycle_stats column, cycle stats aren't recorded")
+        return self.cycleStatsColumn
 
     def registerComponent(self):
         """
@@ -80,13 +94,15 @@ class HeartbeatAPI(WMConnectionBase):
             self.logger.warning("Heartbeat update failed! Wait for the next time...:\n%s", str(ex))
 
     @db_exception_handler
-    def updateWorkerCycle(self, workerName, timeSpent, results):
+    def updateWorkerCycle(self, workerName, timeSpent, results, cycleStats=None):
         """
         Update a worker's heartbeat as well as the time spent on that
-        cycle and any results returned.
+        cycle, any results returned and the cycle statistics (json).
         """
+        if not self.hasCycleStats():
+            cycleStats = None
         self.updateWorker.execute(workerName, "Running", timeSpent, results,
-                                  conn=self.getDBConn(),
+                                  cycleStats=cycleStats, conn=self.getDBConn(),
                                   transaction=self.existingTransaction())
 
     @db_exception_handler
@@ -98,14 +114,16 @@ class HeartbeatAPI(WMConnectionBase):
 
     def getHeartbeatInfo(self):
 
-        results = self.getHeartbeat.execute(self.componentName, conn=self.getDBConn(),
+        results = self.getHeartbeat.execute(self.componentName, cycleStats=self.hasCycleStats(),
+                                            conn=self.getDBConn(),
                                             transaction=self.existingTransaction())
 
         return results
 
     def getAllHeartbeatInfo(self):
 
-        results = self.getAllHeartbeat.execute(conn=self.getDBConn(),
+        results = self.getAllHeartbeat.execute(cycleStats=self.hasCycleStats(),
+                                               conn=self.getDBConn(),
                                                transaction=self.existingTransaction())
 
         return results
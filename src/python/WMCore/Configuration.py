@@ -42,6 +42,12 @@ _SupportedTypes = []
 _SupportedTypes.extend(_SimpleTypes)
 _SupportedTypes.extend(_ComplexTypes)
 
+# precomputed for the type checks done on every setting
+_SimpleTypesTuple = tuple(_SimpleTypes)
+_ComplexTypesTuple = tuple(_ComplexTypes)
+# exact types which don't need to go through _complexTypeCheck
+_SimpleTypesFastPath = frozenset([bool, float, str, long, type(None), int])
+
 
 def formatAsString(value):
     """
@@ -93,6 +99,9 @@ class ConfigSection(object):
         # should be a primitive or complex type that can be "jsonized"
         # By default it is false, but ConfigurationEx instances set it to True
         self._internal_skipChecks = False
+        # The flag lazyChecks defers the checks of each parameter added to validate_,
+        # it's inherited by the sections created with section_
+        self._internal_lazyChecks = False
 
     def __eq__(self, other):
         if isinstance(other, type(self)):
@@ -107,9 +116,9 @@ class ConfigSection(object):
 
     def _complexTypeCheck(self, name, value):
 
-        if isinstance(value, tuple(_SimpleTypes)):
+        if isinstance(value, _SimpleTypesTuple):
             return
-        elif isinstance(value, tuple(_ComplexTypes)):
+        elif isinstance(value, _ComplexTypesTuple):
             vallist = value
             if isinstance(value, dict):
                 vallist = value.values()
@@ -141,8 +150,10 @@ class ConfigSection(object):
             value = str(value)
 
         # for backward compatibility use getattr and sure to work if the
-        # _internal_skipChecks flag is not set
-        if not getattr(self, '_internal_skipChecks', False):
+        # _internal_skipChecks/_internal_lazyChecks flags are not set
+        if type(value) not in _SimpleTypesFastPath and \
+                not getattr(self, '_internal_skipChecks', False) and \
+                not getattr(self, '_internal_lazyChecks', False):
             self._complexTypeCheck(name, value)
 
         object.__setattr__(self, name, value)
@@ -200,9 +211,39 @@ class ConfigSection(object):
         if sectionName in self.__dict__:
             return self.__dict__[sectionName]
         newSection = ConfigSection(sectionName)
+        newSection._internal_lazyChecks = getattr(self, '_internal_lazyChecks', False)
         self.__setattr__(sectionName, newSection)
         return object.__getattribute__(self, sectionName)
 
+    def lazyChecks_(self, lazyChecks=True):
+        """
+        _lazyChecks_
+
+        Defer the type checks of the parameters added to this section, and
+        to the sections created from it with section_, to validate_.
+        Meant for large structures built programmatically, which should be
+        validated once when they're serialised.
+        """
+        self._internal_lazyChecks = lazyChecks
+        return
+
+    def validate_(self):
+        """
+        _validate_
+
+        Run the type checks on all the parameters of this section and its
+        children sections, raises RuntimeError on the first one that is
+        not supported.
+        """
+        skipChecks = getattr(self, '_internal_skipChecks', False)
+        for attr in self._internal_settings:
+            value = getattr(self, attr)
+            if attr in self._internal_children:
+                value.validate_()
+            elif not skipChecks:
+                self._complexTypeCheck(attr, value)
+        return
+
     def pythonise_(self, **options):
         """
         convert self into list of python format strings
@@ -3,8 +3,21 @@
 _JobPackage_
 
 Data structure for storing and retreiving multiple job objects.
+
+Packages are written to disk in an indexed format: every job is pickled
+separately and an index with the offset of each job is written at the end
+of the file, followed by a fixed size trailer pointing to the index:
+
+    MAGIC | job | job | ... | index | trailer (index offset, MAGIC)
+
+which allows appending jobs to an existing package without rewriting it
+and loading a single job without deserialising the whole package.
+Packages written as a single pickle by older versions are still readable.
 """
 
+import os
+import struct
+
 try:
     import cPickle as pickle
 except ImportError:
@@ -12,6 +25,9 @@ except ImportError:
 
 from WMCore.DataStructs.WMObject import WMObject
 
+PACKAGE_MAGIC = b"WMJOBPKG"
+PACKAGE_TRAILER = struct.Struct(">Q8s")
+
 
 class JobPackage(WMObject, dict):
     """
@@ -30,24 +46,132 @@ class JobPackage(WMObject, dict):
         dict.__init__(self)
         self.setdefault('directory', directory)
 
+    @staticmethod
+    def _readIndex(fileHandle):
+        """
+        _readIndex_
+
+        Read the job index of an indexed package, return None if the
+        file is an old style pickled package.
+        """
+        fileHandle.seek(0)
+        if fileHandle.read(len(PACKAGE_MAGIC)) != PACKAGE_MAGIC:
+            return None
+        fileHandle.seek(-PACKAGE_TRAILER.size, os.SEEK_END)
+        indexOffset, magic = PACKAGE_TRAILER.unpack(fileHandle.read(PACKAGE_TRAILER.size))
+        if magic != PACKAGE_MAGIC:
+            raise IOError("JobPackage %s is truncated or corrupted" % fileHandle.name)
+        fileHandle.seek(indexOffset)
+        index = pickle.load(fileHandle)
+        index['offset'] = indexOffset
+        return index
+
+    def _writeJobs(self, fileHandle, index, jobs):
+        """
+        _writeJobs_
+
+        Write the jobs at the current position of the file and
+        then the index and trailer, return the index offset.
+        """
+        for jobIndex, job in jobs.items():
+            if jobIndex == 'directory':
+                continue
+            data = pickle.dumps(job, -1)
+            index['jobs'][jobIndex] = (fileHandle.tell(), len(data))
+            fileHandle.write(data)
+
+        indexOffset = fileHandle.tell()
+        pickle.dump({'directory': index['directory'], 'jobs': index['jobs']}, fileHandle, -1)
+        fileHandle.write(PACKAGE_TRAILER.pack(indexOffset, PACKAGE_MAGIC))
+        fileHandle.truncate()
+        return indexOffset
+
     def save(self, fileName):
         """
         _save_
 
-        Pickle this object and save it to disk.
+        Save this object to disk in the indexed format.
+        """
+        with open(fileName, 'wb') as fileHandle:
+            fileHandle.write(PACKAGE_MAGIC)
+            index = {'directory': self.get('directory'), 'jobs': {}}
+            self._writeJobs(fileHandle, index, self)
+        return
+
+    def append(self, fileName, jobs=None):
+        """
+        _append_
+
+        Append jobs (a dict of job index to job, this object content by
+        default) to the package saved in fileName, creating it if needed.
+        Jobs already in the file are not rewritten.
         """
-        with open(fileName, 'w') as fileHandle:
-            pickle.dump(self, fileHandle, -1)
+        jobs = self if jobs is None else jobs
+        if not os.path.exists(fileName):
+            package = JobPackage(directory=self.get('directory'))
+            package.update(jobs)
+            package.save(fileName)
+            return
+
+        with open(fileName, 'r+b') as fileHandle:
+            index = self._readIndex(fileHandle)
+            if index is None:
+                # old style package, convert it to the indexed format
+                fileHandle.seek(0)
+                package = pickle.load(fileHandle)
+                fileHandle.seek(0)
+                fileHandle.write(PACKAGE_MAGIC)
+                index = {'directory': package.get('directory'), 'jobs': {}}
+                index['offset'] = self._writeJobs(fileHandle, index, package)
+            # overwrite the old index and trailer
+            fileHandle.seek(index['offset'])
+            self._writeJobs(fileHandle, index, jobs)
         return
 
-    def load(self, fileName):
+    def load(self, fileName, jobIndexes=None):
         """
         _load_
 
-        Load a pickled JobPackage object.
+        Load a JobPackage from disk. If jobIndexes is provided only these
+        jobs are kept (indexes not found in the package are ignored). Old
+        style pickled packages still have to be deserialised as a whole.
         """
         self.clear()
-        with open(fileName, 'r') as fileHandle:
-            loadedJobPackage = pickle.load(fileHandle)
-        self.update(loadedJobPackage)
+        with open(fileName, 'rb') as fileHandle:
+            index = self._readIndex(fileHandle)
+            if index is None:
+                fileHandle.seek(0)
+                loadedJobPackage = pickle.load(fileHandle)
+                if jobIndexes is None:
+                    self.update(loadedJobPackage)
+                else:
+                    self['directory'] = loadedJobPackage.get('directory')
+                    for jobIndex in jobIndexes:
+                        if jobIndex in loadedJobPackage:
+                            self[jobIndex] = loadedJobPackage[jobIndex]
+                return
+
+            self['directory'] = index['directory']
+            if jobIndexes is None:
+                jobIndexes = index['jobs']
+            for jobIndex in jobIndexes:
+                if jobIndex not in index['jobs']:
+                    continue
+                offset, length = index['jobs'][jobIndex]
+                fileHandle.seek(offset)
+                self[jobIndex] = pickle.loads(fileHandle.read(length))
         return
+
+    @staticmethod
+    def listJobIndexes(fileName):
+        """
+        _listJobIndexes_
+
+        Return the list of job indexes stored in a package file.
+        """
+        with open(fileName, 'rb') as fileHandle:
+            index = JobPackage._readIndex(fileHandle)
+            if index is None:
+                fileHandle.seek(0)
+                return [key for key in pickle.load(fileHandle) if key != 'directory']
+            return list(index['jobs'])
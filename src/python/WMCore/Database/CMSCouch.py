@@ -471,14 +471,18 @@ class Database(CouchDBRequests):
                 time.sleep(blocking_poll)
         return response
 
-    def changes(self, since=-1):
+    def changes(self, since=-1, limit=None):
         """
         Get the changes since sequence number. Store the last sequence value to
         self.last_seq. If the since is negative use self.last_seq.
+        If limit is given at most limit rows are returned.
         """
         if since < 0:
             since = self.last_seq
-        data = self.get('/%s/_changes/?since=%s' % (self.name, since))
+        if limit:
+            data = self.get('/%s/_changes/?limit=%s&since=%s' % (self.name, limit, since))
+        else:
+            data = self.get('/%s/_changes/?since=%s' % (self.name, since))
         self.last_seq = data['last_seq']
         return data
 
@@ -550,6 +554,50 @@ class Database(CouchDBRequests):
         else:
             return retval
 
+    def _iterRows(self, loadPage, options, keys, pageSize):
+        """
+        Yield the rows returned by loadPage(options, keys) page by page. The
+        keys are queried pageSize at a time, otherwise the rows are paged with
+        startkey/startkey_docid, starting each page at the extra row fetched
+        with the previous one. The limit and skip options apply to all rows.
+        """
+        options = dict(options or {})
+        if keys:
+            for keysSlice in grouper(keys, pageSize):
+                for row in loadPage(options, keysSlice)['rows']:
+                    yield row
+            return
+
+        if "key" in options:
+            options["startkey"] = options["endkey"] = options.pop("key")
+        remaining = options.pop("limit", None)
+        while remaining is None or remaining > 0:
+            pageLimit = pageSize if remaining is None else min(pageSize, remaining)
+            options["limit"] = pageLimit + 1
+            rows = loadPage(options, None)['rows']
+            for row in rows[:pageLimit]:
+                yield row
+            if len(rows) <= pageLimit:
+                return
+            if remaining is not None:
+                remaining -= pageLimit
+            # reduced views have no document id, but their keys are unique
+            options.pop("skip", None)
+            options["startkey"] = rows[pageLimit]["key"]
+            if "id" in rows[pageLimit]:
+                options["startkey_docid"] = rows[pageLimit]["id"]
+
+    def iterView(self, design, view, options=None, keys=None, pageSize=1000):
+        """
+        Same as loadView, but yield the view rows, querying at most pageSize
+        rows or keys at a time, so that large views are never held in memory
+        at once. Use it as a drop-in replacement of loadView(...)['rows'].
+        """
+        def loadPage(pageOptions, pageKeys):
+            return self.loadView(design, view, pageOptions, pageKeys)
+
+        return self._iterRows(loadPage, options, keys, pageSize)
+
     def loadList(self, design, list, view, options=None, keys=None):
         """
         Load data from a list function. This returns data that hasn't been
@@ -616,6 +664,13 @@ class Database(CouchDBRequests):
         else:
             return self.get('/%s/_all_docs' % self.name, encodedOptions)
 
+    def iterAllDocs(self, options=None, keys=None, pageSize=1000):
+        """
+        Same as allDocs, but yield the rows, querying at most pageSize rows or
+        keys at a time. Use it as a drop-in replacement of allDocs(...)['rows'].
+        """
+        return self._iterRows(self.allDocs, options, keys, pageSize)
+
     def info(self):
         """
         Return information about the databaes (size, number of documents etc).
@@ -1,4 +1,5 @@
 
+import os
 import threading
 
 from sqlalchemy import create_engine
@@ -79,7 +80,9 @@ class DBFactory(object):
             self.dia = None
 
         else:
-            self.engine = self._engineMap.setdefault(self.dburl,
+            # engines are cached per process: a forked process must not use (nor
+            # close) the pooled connections inherited from its parent
+            self.engine = self._engineMap.setdefault((os.getpid(), self.dburl),
                                                      create_engine(self.dburl,
                                                                    connect_args=options,
                                                                    **self._defaultEngineParams)
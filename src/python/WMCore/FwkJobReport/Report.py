@@ -1427,6 +1427,21 @@ class Report(object):
 
         return
 
+    def setStepPSS(self, stepName, minimum, maximum, average):
+        """
+        _setStepPSS_
+
+        Set the Performance PSS information
+        """
+
+        reportStep = self.retrieveStep(stepName)
+        reportStep.performance.section_('PSSMemory')
+        reportStep.performance.PSSMemory.min = minimum
+        reportStep.performance.PSSMemory.max = maximum
+        reportStep.performance.PSSMemory.average = average
+
+        return
+
     def setStepPMEM(self, stepName, minimum, maximum, average):
         """
         _setStepPMEM_
@@ -1591,3 +1606,43 @@ class Report(object):
         Return the log URL
         """
         return getattr(self.data, 'logURL', '')
+
+
+def getErrorSummary(reportPath):
+    """
+    _getErrorSummary_
+
+    Load a pickled FWJR and only return what's needed to classify the job
+    failure: first start and last stop times, site name and exit codes.
+    Returns None if the report can't be loaded or read.
+    """
+    report = Report()
+    try:
+        report.load(reportPath)
+        times = report.getFirstStartLastStop() or {}
+        return {"startTime": times.get("startTime"),
+                "stopTime": times.get("stopTime"),
+                "siteName": report.getSiteName(),
+                "exitCodes": report.getExitCodes(),
+                "exitCode": report.getExitCode()}
+    except Exception as ex:
+        logging.warning("Failed to read the errors of the FWJR %s: %s", reportPath, str(ex))
+        return None
+
+
+def getErrorSummaries(reportPaths, pool=None):
+    """
+    _getErrorSummaries_
+
+    Error summaries (see getErrorSummary) of a list of pickled FWJRs,
+    returns a dictionary of report path to summary. With a multiprocessing
+    pool, reports are unpickled in its worker processes and only the
+    summaries are sent back. Components must create the pool before they
+    start their threads, and reuse it.
+    """
+    reportPaths = list(set(reportPaths))
+    if pool is not None and len(reportPaths) > 1:
+        summaries = pool.map(getErrorSummary, reportPaths)
+    else:
+        summaries = [getErrorSummary(reportPath) for reportPath in reportPaths]
+    return dict(zip(reportPaths, summaries))
@@ -236,6 +236,15 @@ class JobFactory(WMObject):
             logging.debug("About to load files by proxy")
             fileset = self.loadFiles(size=self.limit)
             logging.debug("Loaded %i files", len(fileset))
+        elif hasattr(self.subscription, "availableFilesByLocation"):
+            logging.debug("About to stream files by location from DAO")
+            fileDict = self.subscription.availableFilesByLocation(limit=self.limit, doingJobSplitting=True)
+            if not self.trustSitelists:
+                for fileInfo in fileDict.get(frozenset(), []):
+                    logging.error("File %s has no locations!", fileInfo['lfn'])
+            elif fileDict:
+                fileDict = {frozenset(['AAA']): [f for files in fileDict.values() for f in files]}
+            return fileDict
         else:
             logging.debug("About to load files by DAO")
             fileset = self.subscription.availableFiles(limit=self.limit, doingJobSplitting=True)
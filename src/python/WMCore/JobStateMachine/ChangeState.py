@@ -62,7 +62,7 @@ def discardConflictingDocument(couchDbInstance, data, result):
 
 def getDataFromSpecFile(specFile):
     workload = WMWorkloadHelper()
-    workload.load(specFile)
+    workload.load(specFile, lazy=True, useCache=True)
     campaign = workload.getCampaign()
     result = {"Campaign": campaign}
     for task in workload.taskIterator():
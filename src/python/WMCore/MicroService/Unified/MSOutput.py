@@ -9,13 +9,14 @@ the Output data placement in WMCore MicroServices.
 from __future__ import division, print_function
 
 # system modules
-from pymongo import IndexModel, ReturnDocument, errors
+from pymongo import IndexModel, UpdateOne
 from pymongo.command_cursor import CommandCursor
 from pprint import pformat
 from copy import deepcopy
 from time import time
 from socket import gethostname
 from threading import current_thread
+from uuid import uuid4
 from retry import retry
 
 # WMCore modules
@@ -100,6 +101,11 @@ class MSOutput(MSCore):
         self.msConfig.setdefault("mongoDBUrl", 'mongodb://localhost')
         self.msConfig.setdefault("mongoDBPort", 8230)
         self.msConfig.setdefault("streamerBufferFile", None)
+        # number of documents uploaded or claimed per MongoDB bulk call
+        self.msConfig.setdefault("mongoDBBulkSize", 500)
+        # after how long a document claimed by a consumer can be claimed again,
+        # the consumer renews the lease of its documents while it processes them
+        self.msConfig.setdefault("leaseTime", 3 * self.msConfig["interval"])
         self.uConfig = {}
         self.emailAlert = EmailAlert(self.msConfig)
 
@@ -108,7 +114,10 @@ class MSOutput(MSCore):
         self.campaigns = {}
         self.psn2pnnMap = {}
 
-        msOutIndex = IndexModel('RequestName', unique=True)
+        msOutIndexes = (IndexModel('RequestName', unique=True),
+                        # for the consumer queries and the claimed documents
+                        IndexModel([('isTaken', 1), ('transferStatus', 1), ('lastUpdate', 1)]),
+                        IndexModel('isTakenBy'))
         msOutDBConfig = {
             'database': 'msOutDB',
             'server': self.msConfig['mongoDBUrl'],
@@ -116,8 +125,8 @@ class MSOutput(MSCore):
             'logger': self.logger,
             'create': True,
             'collections': [
-                ('msOutRelValColl', msOutIndex),
-                ('msOutNonRelValColl', msOutIndex)]}
+                ('msOutRelValColl',) + msOutIndexes,
+                ('msOutNonRelValColl',) + msOutIndexes]}
 
         self.msOutDB = MongoDB(**msOutDBConfig).msOutDB
         self.msOutRelValColl = self.msOutDB['msOutRelValColl']
@@ -554,55 +563,36 @@ class MSOutput(MSCore):
         #    Done: To build it through a pipe
         #    Done: To write back the updated document to MonogoDB
         msPipelineRelVal = Pipeline(name="MSOutputConsumer PipelineRelVal",
-                                    funcLine=[Functor(self.docReadfromMongo,
-                                                      self.msOutRelValColl,
-                                                      setTaken=False),
-                                              Functor(self.makeSubscriptions),
+                                    funcLine=[Functor(self.makeSubscriptions),
                                               Functor(self.docKeyUpdate,
                                                       isTaken=False,
                                                       isTakenBy=None,
                                                       lastUpdate=int(time())),
-                                              Functor(self.docUploader,
-                                                      self.msOutRelValColl,
-                                                      update=True,
-                                                      keys=['isTaken',
-                                                            'lastUpdate',
-                                                            'transferStatus',
-                                                            'transferIDs']),
-                                              Functor(self.docDump, pipeLine='PipelineRelVal'),
-                                              Functor(self.docCleaner)])
+                                              Functor(self.docDump, pipeLine='PipelineRelVal')])
         msPipelineNonRelVal = Pipeline(name="MSOutputConsumer PipelineNonRelVal",
-                                       funcLine=[Functor(self.docReadfromMongo,
-                                                         self.msOutNonRelValColl,
-                                                         setTaken=False),
-                                                 Functor(self.makeSubscriptions),
+                                       funcLine=[Functor(self.makeSubscriptions),
                                                  Functor(self.docKeyUpdate,
                                                          isTaken=False,
                                                          isTakenBy=None,
                                                          lastUpdate=int(time())),
-                                                 Functor(self.docUploader,
-                                                         self.msOutNonRelValColl,
-                                                         update=True,
-                                                         keys=['isTaken',
-                                                               'lastUpdate',
-                                                               'transferStatus',
-                                                               'transferIDs']),
-                                                 Functor(self.docDump, pipeLine='PipelineNonRelVal'),
-                                                 Functor(self.docCleaner)])
+                                                 Functor(self.docDump, pipeLine='PipelineNonRelVal')])
+        updateKeys = ['isTaken', 'isTakenBy', 'lastUpdate', 'transferStatus', 'transferIDs']
 
         # NOTE:
         #    If we actually have any exception that has reached to the top level
         #    exception handlers (eg. here - outside the pipeLine), this means
         #    some function from within the pipeLine has not caught it and the msOutDoc
         #    has left the pipe and died before the relevant document in MongoDB
-        #    has been released (its flag 'isTaken' to be set back to False)
+        #    has been released (its flag 'isTaken' to be set back to False).
+        #    It will be claimed again once its lease expires.
         wfCounters = {}
-        for pipeLine in [msPipelineRelVal, msPipelineNonRelVal]:
+        for pipeLine, dbColl in [(msPipelineRelVal, self.msOutRelValColl),
+                                 (msPipelineNonRelVal, self.msOutNonRelValColl)]:
             pipeLineName = pipeLine.getPipelineName()
             wfCounters[pipeLineName] = 0
             while wfCounters[pipeLineName] < self.msConfig['limitRequestsPerCycle']:
                 # take only workflows:
-                # - which are not already taken or
+                # - which are not already taken, or whose lease has expired and
                 # - a transfer subscription have never been done for them and
                 # - avoid retrying workflows in the same cycle
                 # NOTE:
@@ -614,43 +604,98 @@ class MSOutput(MSCore):
                 #    unsuccessful transfers
                 currTime = int(time())
                 treshTime = currTime - self.msConfig['interval']
+                leaseTresh = currTime - self.msConfig['leaseTime']
                 mQueryDict = {
                     '$and': [
-                        {'isTaken': False},
                         {'$or': [
                             {'transferStatus': None},
                             {'transferStatus': 'incomplete'}]},
                         {'$or': [
-                            {'lastUpdate': None},
-                            {'lastUpdate': {'$lt': treshTime}}]}]}
-
-                # FIXME:
-                #    To redefine those exceptions as MSoutputExceptions and
-                #    start using those here so we do not mix with general errors
+                            {'$and': [
+                                {'isTaken': False},
+                                {'$or': [
+                                    {'lastUpdate': None},
+                                    {'lastUpdate': {'$lt': treshTime}}]}]},
+                            {'$and': [
+                                {'isTaken': True},
+                                {'lastUpdate': {'$lt': leaseTresh}}]}]}]}
+
+                limit = min(self.msConfig['mongoDBBulkSize'],
+                            self.msConfig['limitRequestsPerCycle'] - wfCounters[pipeLineName])
                 try:
-                    pipeLine.run(mQueryDict)
-                except KeyError as ex:
-                    msg = "%s Possibly malformed record in MongoDB. Err: %s. " % (pipeLineName, str(ex))
-                    msg += "Continue to the next document."
-                    self.logger.exception(msg)
-                    continue
-                except TypeError as ex:
-                    msg = "%s Possibly malformed record in MongoDB. Err: %s. " % (pipeLineName, str(ex))
-                    msg += "Continue to the next document."
-                    self.logger.exception(msg)
-                    continue
-                except EmptyResultError as ex:
+                    msOutDocs = self.docClaimFromMongo(mQueryDict, dbColl, limit)
+                except EmptyResultError:
                     msg = "%s All relevant records in MongoDB exhausted. " % pipeLineName
                     msg += "We are done for the current cycle."
                     self.logger.info(msg)
                     break
                 except Exception as ex:
-                    msg = "%s General Error from pipeline. Err: %s. " % (pipeLineName, str(ex))
+                    msg = "%s General Error claiming documents. Err: %s. " % (pipeLineName, str(ex))
+                    msg += "Giving up Now."
+                    self.logger.error(msg)
+                    self.logger.exception(ex)
+                    break
+
+                if not msOutDocs:
+                    # only malformed documents were claimed
+                    continue
+
+                # FIXME:
+                #    To redefine those exceptions as MSoutputExceptions and
+                #    start using those here so we do not mix with general errors
+                leaseToken = msOutDocs[0]['isTakenBy']
+                leaseTime = int(time())
+                processedDocs = []
+                releasedDocs = []
+                failed = False
+                for msOutDoc in msOutDocs:
+                    if failed:
+                        releasedDocs.append(msOutDoc)
+                        continue
+                    # renew the lease well before it expires, so that the documents
+                    # of this batch are not claimed by another consumer meanwhile
+                    if int(time()) - leaseTime > self.msConfig['leaseTime'] // 3:
+                        try:
+                            leaseTime = self.docRenewLease(leaseToken, dbColl)
+                        except Exception as ex:
+                            msg = "%s General Error renewing the lease. Err: %s. " % (pipeLineName, str(ex))
+                            msg += "Giving up Now."
+                            self.logger.error(msg)
+                            self.logger.exception(ex)
+                            releasedDocs.append(msOutDoc)
+                            failed = True
+                            continue
+                    try:
+                        processedDocs.append(pipeLine.run(msOutDoc))
+                    except (KeyError, TypeError) as ex:
+                        msg = "%s Possibly malformed record in MongoDB. Err: %s. " % (pipeLineName, str(ex))
+                        msg += "Continue to the next document."
+                        self.logger.exception(msg)
+                        releasedDocs.append(msOutDoc)
+                    except Exception as ex:
+                        msg = "%s General Error from pipeline. Err: %s. " % (pipeLineName, str(ex))
+                        msg += "Giving up Now."
+                        self.logger.error(msg)
+                        self.logger.exception(ex)
+                        releasedDocs.append(msOutDoc)
+                        failed = True
+                    wfCounters[pipeLineName] += 1
+
+                try:
+                    self.docBulkUploader(processedDocs, dbColl, update=True, keys=updateKeys,
+                                         leaseToken=leaseToken)
+                    self.docBulkUploader(releasedDocs, dbColl, update=True, keys=['isTaken', 'isTakenBy'],
+                                         leaseToken=leaseToken, release=True)
+                except Exception as ex:
+                    msg = "%s General Error uploading documents. Err: %s. " % (pipeLineName, str(ex))
                     msg += "Giving up Now."
                     self.logger.error(msg)
                     self.logger.exception(ex)
+                    failed = True
+                for msOutDoc in msOutDocs:
+                    self.docCleaner(msOutDoc)
+                if failed:
                     break
-                wfCounters[pipeLineName] += 1
 
         wfCounterTotal = sum(wfCounters.values())
         return wfCounterTotal
@@ -679,22 +724,21 @@ class MSOutput(MSCore):
         # NOTE:
         #    To discuss the collection names
         # NOTE:
-        #    Here we should never use docUploader with `update=True`, because
+        #    Here we should never use docBulkUploader with `update=True`, because
         #    this will erase the latest state of already existing and fully or
         #    partially processed documents by the Consumer pipeline
         self.logger.info("Running the msOutputProducer ...")
+        #    The documents are uploaded in bulk, every 'mongoDBBulkSize' documents
         msPipelineRelVal = Pipeline(name="MSOutputProducer PipelineRelVal",
                                     funcLine=[Functor(self.docTransformer),
                                               Functor(self.docKeyUpdate, isRelVal=True),
-                                              Functor(self.docInfoUpdate, pipeLine='PipelineRelVal'),
-                                              Functor(self.docUploader, self.msOutRelValColl),
-                                              Functor(self.docCleaner)])
+                                              Functor(self.docInfoUpdate, pipeLine='PipelineRelVal')])
         msPipelineNonRelVal = Pipeline(name="MSOutputProducer PipelineNonRelVal",
                                        funcLine=[Functor(self.docTransformer),
                                                  Functor(self.docKeyUpdate, isRelVal=False),
-                                                 Functor(self.docInfoUpdate, pipeLine='PipelineNonRelVal'),
-                                                 Functor(self.docUploader, self.msOutNonRelValColl),
-                                                 Functor(self.docCleaner)])
+                                                 Functor(self.docInfoUpdate, pipeLine='PipelineNonRelVal')])
+        uploadBuffers = {msPipelineRelVal.getPipelineName(): (self.msOutRelValColl, []),
+                         msPipelineNonRelVal.getPipelineName(): (self.msOutNonRelValColl, [])}
         # TODO:
         #    To generate the object from within the Function scope see above.
         counter = 0
@@ -703,12 +747,16 @@ class MSOutput(MSCore):
             try:
                 if request.get('SubRequestType') == 'RelVal':
                     pipeLine = msPipelineRelVal
-                    pipeLineName = pipeLine.getPipelineName()
-                    pipeLine.run(request)
                 else:
                     pipeLine = msPipelineNonRelVal
-                    pipeLineName = pipeLine.getPipelineName()
-                    pipeLine.run(request)
+                pipeLineName = pipeLine.getPipelineName()
+                dbColl, msOutDocs = uploadBuffers[pipeLineName]
+                msOutDocs.append(pipeLine.run(request))
+                if len(msOutDocs) >= self.msConfig['mongoDBBulkSize']:
+                    self.docBulkUploader(msOutDocs, dbColl)
+                    for msOutDoc in msOutDocs:
+                        self.docCleaner(msOutDoc)
+                    del msOutDocs[:]
             except KeyError as ex:
                 msg = "%s Possibly broken read from Reqmgr2 API or other Err: %s. " % (pipeLineName, str(ex))
                 msg += "Continue to the next document."
@@ -725,6 +773,16 @@ class MSOutput(MSCore):
                 self.logger.error(msg)
                 self.logger.exception(ex)
                 break
+
+        for pipeLineName, (dbColl, msOutDocs) in uploadBuffers.items():
+            try:
+                self.docBulkUploader(msOutDocs, dbColl)
+            except Exception as ex:
+                msg = "%s General Error uploading documents. Err: %s. " % (pipeLineName, str(ex))
+                self.logger.error(msg)
+                self.logger.exception(ex)
+            for msOutDoc in msOutDocs:
+                self.docCleaner(msOutDoc)
         return counter
 
     def docTransformer(self, doc):
@@ -876,93 +934,91 @@ class MSOutput(MSCore):
                                   str(ex))
         return msOutDoc
 
-    def docUploader(self, msOutDoc, dbColl, update=False, keys=None, stride=None):
+    def docBulkUploader(self, msOutDocs, dbColl, update=False, keys=None, leaseToken=None, release=False):
         """
-        A function to upload documents to MongoDB. The session object to the  relevant
-        database and Collection must be passed as arguments
-        :msOutDocs: A list of documents of type MSOutputTemplate
-        :dbColl: an object containing an active connection to a MongoDB Collection
-        :stride: the max number of documents we are about to upload at once
-        :update: A flag to trigger document update in MongoDB in case of duplicates
-        :keys:   A list of keys to update. If missing the whole document will be updated
+        A function to upload documents to MongoDB in bulk, with one bulk_write
+        call per 'mongoDBBulkSize' documents
+        :msOutDocs:  A list of documents of type MSOutputTemplate
+        :dbColl:     an object containing an active connection to a MongoDB Collection
+        :update:     A flag to trigger document update in MongoDB in case of duplicates,
+                     otherwise already existing documents are left untouched
+        :keys:       A list of keys to update. If missing the whole document will be updated
+        :leaseToken: Only update the documents still claimed with this token (the value
+                     of 'isTakenBy' when claimed), the documents are not inserted then
+        :release:    Release the claimed documents: set 'isTaken' to False and
+                     'isTakenBy' to None and ignore the document values
+        :return:     The pymongo BulkWriteResult of the last bulk call, None if no documents
         """
-        # DONE: to determine the collection to which the document belongs based
-        #       on 'isRelval' key or some other criteria
-        # NOTE: We must return the document(s) at the end so that it can be explicitly
-        #       deleted outside the pipeline
-
-        # Skipping documents avoiding index unique property (documents having the
-        # same value for the indexed key as an already uploaded document)
-        try:
-            dbColl.insert_one(msOutDoc)
-        except errors.DuplicateKeyError:
-            # DONE:
-            #    Here we may wish to double check and make document update, so
-            #    that a change of the Request on ReqMgr may be reflected here too
-            # NOTE:
-            #    If we use the 'update' option with a fresh document created from
-            #    Reqmgr and we overwrite an already existing document in MongoDB
-            #    which have been already worked on - we will loose the information
-            #    that have been stored in the MonggDB - so always use 'update'
-            #    with the proper set of keys to be updated
-            if not keys:
-                keys = []
-
-            # update only the requested keys:
-            if update and keys:
-                updateDict = {}
-                for key in keys:
-                    updateDict[key] = msOutDoc[key]
-                msOutDoc = dbColl.find_one_and_update(
-                    {'_id': msOutDoc['_id']},
-                    {'$set': updateDict},
-                    return_document=ReturnDocument.AFTER)
-            if update and not keys:
-                msOutDoc = dbColl.find_one_and_update(
-                    {'_id': msOutDoc['_id']},
-                    {'$set': msOutDoc},
-                    return_document=ReturnDocument.AFTER)
-        return msOutDoc
-
-    def docReadfromMongo(self, mQueryDict, dbColl, setTaken=False):
+        # NOTE:
+        #    Never use 'update' without 'keys' for documents created from
+        #    Reqmgr, this will overwrite the state kept in MongoDB
+        result = None
+        for i in range(0, len(msOutDocs), self.msConfig['mongoDBBulkSize']):
+            requests = []
+            for msOutDoc in msOutDocs[i:i + self.msConfig['mongoDBBulkSize']]:
+                mQueryDict = {'_id': msOutDoc['_id']}
+                if leaseToken:
+                    mQueryDict['isTakenBy'] = leaseToken
+                if release:
+                    updateDict = {'$set': {'isTaken': False, 'isTakenBy': None}}
+                elif update:
+                    docKeys = keys or [key for key in msOutDoc if key != '_id']
+                    updateDict = {'$set': dict((key, msOutDoc[key]) for key in docKeys)}
+                    if not leaseToken:
+                        insertDict = dict((key, value) for key, value in msOutDoc.items()
+                                          if key != '_id' and key not in docKeys)
+                        if insertDict:
+                            updateDict['$setOnInsert'] = insertDict
+                else:
+                    updateDict = {'$setOnInsert': dict((key, value) for key, value in msOutDoc.items()
+                                                       if key != '_id')}
+                requests.append(UpdateOne(mQueryDict, updateDict, upsert=not leaseToken))
+            result = dbColl.bulk_write(requests, ordered=False)
+            self.logger.debug("%s: Bulk upload of %d documents: %d inserted, %d modified",
+                              self.currThreadIdent, len(requests), result.upserted_count, result.modified_count)
+        return result
+
+    def docClaimFromMongo(self, mQueryDict, dbColl, limit):
         """
-        Reads a single Document from MongoDB and if setTaken flag is on then
-        Sets the relevant flags (isTaken, isTakenBy) in the document at MongoDB
+        Claims up to 'limit' documents matching mQueryDict in MongoDB: they are
+        set as taken ('isTaken': True, 'lastUpdate': now) with a lease token
+        unique to this claim in 'isTakenBy'. A document is only claimed by one
+        consumer, until its lease expires.
+        :return: the list of claimed documents, of type MSOutputTemplate.
+                 Raises EmptyResultError if no document is left to be claimed
         """
-        # NOTE:
-        #    In case the current query returns an empty document from MongoDB
-        #    (eg. all workflows have been processed) the MSOutputTemplate
-        #    will throw an error. We should catch this one here and interrupt
-        #    the pipeLine traversal, otherwise an error either here or in one of the
-        #    following stages will most probably occur and the whole run will be broken.
-        if setTaken:
-            lastUpdate = int(time())
-            retrString = self.currThreadIdent
-            mongoDoc = dbColl.find_one_and_update(mQueryDict,
-                                                  {'$set': {'isTaken': True,
-                                                            'isTakenBy': retrString,
-                                                            'lastUpdate': lastUpdate}},
-                                                  return_document=ReturnDocument.AFTER)
-        else:
-            mongoDoc = dbColl.find_one(mQueryDict)
-        if mongoDoc:
+        docIds = [mongoDoc['_id'] for mongoDoc in dbColl.find(mQueryDict, {'_id': 1}).limit(limit)]
+        if not docIds:
+            raise EmptyResultError
+        leaseToken = "%s:%s" % (self.currThreadIdent, uuid4().hex)
+        # the query is repeated, so documents claimed meanwhile by another consumer are skipped
+        dbColl.update_many({'$and': [{'_id': {'$in': docIds}}, mQueryDict]},
+                           {'$set': {'isTaken': True,
+                                     'isTakenBy': leaseToken,
+                                     'lastUpdate': int(time())}})
+        msOutDocs = []
+        for mongoDoc in dbColl.find({'isTakenBy': leaseToken}):
             try:
-                msOutDoc = MSOutputTemplate(mongoDoc)
+                msOutDocs.append(MSOutputTemplate(mongoDoc))
             except Exception as ex:
-                msg = "Unable to create msOutDoc from %s." % mongoDoc
-                self.logger.warning(msg)
-                raise ex
                 # NOTE:
-                #    Here if we do not update the isTaken flag in MongoDB back
-                #    to False, the document will not be released in MongoDb and
-                #    will stay locked. If we are ending up here it means for some
-                #    reason we have a malformed document in MongoDB. We should make
-                #    a design choice - should we release the document or should
-                #    we leave it locked for further investigations or maybe
-                #    mark it with another flag eg. 'isMalformed': True
-        else:
-            raise EmptyResultError
-        return msOutDoc
+                #    The malformed document stays claimed until its lease expires
+                msg = "Unable to create msOutDoc from %s. Error: %s" % (mongoDoc, str(ex))
+                self.logger.warning(msg)
+        return msOutDocs
+
+    def docRenewLease(self, leaseToken, dbColl):
+        """
+        Renews the lease of the documents claimed with 'leaseToken' by
+        docClaimFromMongo, so they are not claimed by another consumer
+        :return: the time the lease was renewed at
+        """
+        lastUpdate = int(time())
+        result = dbColl.update_many({'isTakenBy': leaseToken},
+                                    {'$set': {'lastUpdate': lastUpdate}})
+        self.logger.debug("%s: Renewed the lease of %d documents",
+                          self.currThreadIdent, result.modified_count)
+        return lastUpdate
 
     def docCleaner(self, doc):
         """
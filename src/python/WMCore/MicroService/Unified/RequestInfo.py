@@ -10,7 +10,6 @@ from __future__ import division, print_function
 # system modules
 import datetime
 import json
-import pickle
 import time
 # WMCore modules
 from pprint import pformat
@@ -29,6 +28,7 @@ from WMCore.MicroService.Unified.MSCore import MSCore
 from WMCore.MicroService.Unified.SiteInfo import SiteInfo
 from WMCore.Services.pycurl_manager import getdata \
     as multi_getdata, RequestHandler
+from WMCore.WMSpec.Persistency import decodeSpec
 
 
 class RequestInfo(MSCore):
@@ -605,7 +605,7 @@ class RequestInfo(MSCore):
         rdict = {}
         for row in data:
             req = row['url'].split('/')[-2]
-            rdict[req] = pickle.loads(row['data'])
+            rdict[req] = decodeSpec(row['data'])
         return rdict
 
     def _getSiteWhiteList(self, uConfig, request, siteInfo, reqSpecs=None, pickone=False):
@@ -753,7 +753,7 @@ class RequestInfo(MSCore):
         url = str('%s/%s/spec' % (self.msConfig['reqmgrCacheUrl'], request['RequestName']))
         mgr = RequestHandler()
         data = mgr.getdata(url, params={}, cert=cert(), ckey=ckey())
-        return pickle.loads(data)
+        return decodeSpec(data)
 
     def taskDescending(self, node, select=None):
         "Helper function to walk through task nodes in descending order"
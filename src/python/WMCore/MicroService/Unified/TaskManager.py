@@ -13,7 +13,8 @@ import time
 import json
 import hashlib
 import threading
-from queue import Queue
+from collections import deque
+from queue import Queue, Full
 
 # WMCore modules
 from WMCore.MicroService.Unified.Common import getMSLogger
@@ -105,6 +106,168 @@ class UidSet(object):
         "Get value for given uid"
         return self.set.get(uid, 0)
 
+class TaskTimeoutError(Exception):
+    """Exception raised by TaskFuture when a task did not complete within its timeout"""
+    pass
+
+
+class TaskFuture(object):
+    """
+    Result holder of a task executed by the TaskManager. It gives access to
+    the task result (or exception) once it's done and to its latency, i.e.
+    the time spent in the queue and the time spent running.
+    For backward compatibility it can also be used as the (event, pid)
+    pair which used to be returned by TaskManager.spawn.
+
+    The task timeout is not enforced by a timer: it is only checked when
+    the task is picked up by a worker and when someone waits on the future
+    (wait, exception, result or TaskManager.joinall). A task which hangs
+    while running is marked as timed out for its waiters, but it keeps
+    occupying its worker thread until the function returns.
+    """
+    def __init__(self, pid, func, args, kwargs, timeout=None, callback=None):
+        self.pid = pid
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.evt = threading.Event()
+        self.submitTime = time.time()
+        self.startTime = None
+        self.endTime = None
+        self.deadline = self.submitTime + timeout if timeout else None
+        self._callback = callback
+        self._lock = threading.Lock()
+        self._state = 'pending'  # pending, running, done, failed, timeout, cancelled
+        self._result = None
+        self._exception = None
+
+    def __getitem__(self, idx):
+        "Support the (evt, pid) tuple interface"
+        return (self.evt, self.pid)[idx]
+
+    def __iter__(self):
+        return iter((self.evt, self.pid))
+
+    def _finish(self, state, result=None, exception=None):
+        "Set final state of the future, return False if it was already finished"
+        with self._lock:
+            if self.evt.is_set():
+                return False
+            self._state = state
+            self._result = result
+            self._exception = exception
+            self.endTime = time.time()
+        if self._callback:
+            self._callback(self)
+        self.evt.set()
+        return True
+
+    def run(self):
+        "Execute the task, it is called by the worker thread"
+        with self._lock:
+            if self._state != 'pending':
+                return
+            self._state = 'running'
+            self.startTime = time.time()
+        if self.deadline and self.startTime > self.deadline:
+            msg = "task %s timed out after %s seconds in the queue" % (self.pid, self.startTime - self.submitTime)
+            self._finish('timeout', exception=TaskTimeoutError(msg))
+            return
+        try:
+            result = self.func(*self.args, **self.kwargs)
+        except Exception as exc:
+            self._finish('failed', exception=exc)
+            raise
+        self._finish('done', result=result)
+
+    def cancel(self):
+        "Cancel the task if it did not start yet, return True on success"
+        with self._lock:
+            if self._state != 'pending':
+                return False
+            self._state = 'cancelling'
+        return self._finish('cancelled', exception=TaskTimeoutError("task %s cancelled" % self.pid))
+
+    def state(self):
+        "Return the state of the task"
+        return self._state
+
+    def done(self):
+        "Return True if the task is finished (successfully or not)"
+        return self.evt.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Wait for the task to finish, at most timeout seconds and no longer
+        than the task deadline. A task which passes its deadline while still
+        running is marked as timed out (the thread running it can't be
+        interrupted, its result is discarded). Return True if the task is done.
+        """
+        if self.deadline:
+            remaining = max(0, self.deadline - time.time())
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        if not self.evt.wait(timeout) and self.deadline and time.time() >= self.deadline:
+            msg = "task %s did not complete within %s seconds" % (self.pid, self.deadline - self.submitTime)
+            self._finish('timeout', exception=TaskTimeoutError(msg))
+        return self.evt.is_set()
+
+    def exception(self, timeout=None):
+        "Return the exception raised by the task, None if it succeeded"
+        if not self.wait(timeout):
+            raise TaskTimeoutError("task %s is not done" % self.pid)
+        return self._exception
+
+    def result(self, timeout=None):
+        "Return the task result, re-raising its exception if it failed"
+        exc = self.exception(timeout)
+        if exc is not None:
+            raise exc
+        return self._result
+
+    def latency(self):
+        "Return the time the task spent in the queue and running"
+        if self.startTime is None:
+            return {'wait': None, 'run': None}
+        return {'wait': self.startTime - self.submitTime,
+                'run': self.endTime - self.startTime if self.endTime else None}
+
+
+class TaskStats(object):
+    """Keep track of the number of tasks and latency of the TaskManager tasks"""
+    def __init__(self, nlatencies=1000):
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.waitTimes = deque(maxlen=nlatencies)
+        self.runTimes = deque(maxlen=nlatencies)
+
+    def add(self, future):
+        "Account for a finished task"
+        latency = future.latency()
+        with self.lock:
+            self.counts[future.state()] = self.counts.get(future.state(), 0) + 1
+            if latency['wait'] is not None:
+                self.waitTimes.append(latency['wait'])
+            if latency['run'] is not None:
+                self.runTimes.append(latency['run'])
+
+    @staticmethod
+    def summary(values):
+        "Return average, max and percentiles of a list of values"
+        if not values:
+            return {}
+        values = sorted(values)
+        pct = lambda frac: values[min(len(values) - 1, int(frac * len(values)))]
+        return {'avg': sum(values) / len(values), 'max': values[-1],
+                'p50': pct(0.5), 'p95': pct(0.95)}
+
+    def info(self):
+        "Return task counts and latency summary of the last tasks"
+        with self.lock:
+            return {'tasks': dict(self.counts),
+                    'wait': self.summary(self.waitTimes),
+                    'run': self.summary(self.runTimes)}
+
+
 class Worker(threading.Thread):
     """Thread executing worker from a given tasks queue"""
     def __init__(self, name, taskq, pidq, uidq, logger=None):
@@ -131,15 +294,11 @@ class Worker(threading.Thread):
                 return
             if self.exit:
                 return
-            evt, pid, func, args, kwargs = task
             try:
-                func(*args, **kwargs)
-                self.pids.discard(pid)
+                task.run()
             except Exception as exc:
-                self.pids.discard(pid)
-                msg = "func=%s args=%s kwargs=%s" % (func, args, kwargs)
+                msg = "func=%s args=%s kwargs=%s" % (task.func, task.args, task.kwargs)
                 self.logger.error('error %s, call %s', str(exc), msg)
-            evt.set()
 
 class TaskManager(object):
     """
@@ -156,13 +315,22 @@ class TaskManager(object):
         jobs.append(mgr.spawn(func, args))
         mgr.joinall(jobs)
 
+        Or collecting the results:
+        futures = [mgr.submit(func, (arg,), timeout=60) for arg in args]
+        results = [future.result() for future in futures]
+
+    The queue size can be bounded with qsize, in which case
+    submitting a task blocks until the queue has space for it.
     """
-    def __init__(self, nworkers=10, name='TaskManager', logger=None):
+    def __init__(self, nworkers=10, name='TaskManager', logger=None, qsize=0):
         self.logger = getMSLogger(verbose=True, logger=logger)
         self.name = name
         self.pids = set()
         self.uids = UidSet()
-        self.tasks = Queue()
+        self.tasks = Queue(maxsize=qsize)
+        self.futures = {}
+        self.stats = TaskStats()
+        self.lock = threading.Lock()
         self.workers = [Worker(name, self.tasks, self.pids, self.uids, logger) \
                         for _ in range(0, nworkers)]
 
@@ -170,29 +338,60 @@ class TaskManager(object):
         "Return status of task manager queue"
         info = {'qsize':self.tasks.qsize(), 'full':self.tasks.full(),
                 'unfinished':self.tasks.unfinished_tasks,
-                'nworkers':len(self.workers)}
+                'nworkers':len(self.workers), 'latency': self.stats.info()}
         return {self.name: info}
 
     def nworkers(self):
         """Return number of workers associated with this manager"""
         return len(self.workers)
 
-    def spawn(self, func, *args, **kwargs):
-        """Spawn new process for given function"""
-        pid = kwargs.get('pid', genkey(str(args) + str(kwargs)))
-        evt = threading.Event()
-        if  not pid in self.pids:
+    def _taskDone(self, future):
+        "Callback of finished tasks"
+        with self.lock:
+            self.pids.discard(future.pid)
+            if self.futures.get(future.pid) is future:
+                del self.futures[future.pid]
+        self.stats.add(future)
+
+    def submit(self, func, args=(), kwargs=None, pid=None, timeout=None, block=True):
+        """
+        Submit a new task for given function and return its TaskFuture.
+        Tasks with the same pid as a pending one are not run twice, the
+        future of the pending task is returned instead. Optional timeout
+        (in seconds, starting at submission) is the time after which the
+        task is considered failed: it is only checked when the task starts
+        and when waiting on its future, a running task is never interrupted
+        and keeps its worker thread busy until it returns, so tasks which
+        may hang must use their own (e.g. network) timeouts as well.
+        If block is False and the queue is full the queue.Full exception
+        is raised.
+        """
+        kwargs = kwargs or {}
+        pid = pid or genkey(str(args) + str(kwargs))
+        with self.lock:
+            if pid in self.futures:
+                return self.futures[pid]
+            future = TaskFuture(pid, func, args, kwargs, timeout=timeout, callback=self._taskDone)
             self.pids.add(pid)
-            task = (evt, pid, func, args, kwargs)
-            self.tasks.put(task)
-        else:
-            # the event was not added to task list, invoke set()
-            # to pass it in wait() call, see joinall
-            evt.set()
-        return evt, pid
+            self.futures[pid] = future
+        try:
+            self.tasks.put(future, block=block)
+        except Full:
+            with self.lock:
+                self.pids.discard(pid)
+                del self.futures[pid]
+            raise
+        return future
+
+    def spawn(self, func, *args, **kwargs):
+        """Spawn new process for given function, return its TaskFuture"""
+        return self.submit(func, args, kwargs, pid=kwargs.get('pid'))
 
     def remove(self, pid):
         """Remove pid and associative process from the queue"""
+        future = self.futures.get(pid)
+        if future is not None:
+            future.cancel()
         self.pids.discard(pid)
 
     def is_alive(self, pid):
@@ -206,9 +405,20 @@ class TaskManager(object):
         """
         _ = [t[0].clear() for t in tasks] # each task is return from spawn, i.e. a pair (evt, pid)
 
-    def joinall(self, tasks):
-        """Join all tasks in a queue and quit"""
-        _ = [t[0].wait() for t in tasks] # each task is return from spawn, i.e. a pair (evt, pid)
+    def joinall(self, tasks, timeout=None):
+        """
+        Join all tasks in a queue, waiting at most timeout seconds in total.
+        Return True if all tasks are done. Timed out tasks are not stopped,
+        their worker threads remain busy until they return.
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        for task in tasks:
+            remaining = max(0, deadline - time.time()) if deadline is not None else None
+            if isinstance(task, TaskFuture):
+                task.wait(remaining)
+            else:
+                task[0].wait(remaining)
+        return all(task[0].is_set() for task in tasks)
 
     def quit(self):
         """Put None task to all workers and let them quit"""
@@ -2,9 +2,12 @@ from __future__ import print_function
 
 import hashlib
 import json
+import time
 import types
 import xml.sax.saxutils
 import zlib
+from collections import OrderedDict
+from threading import Lock
 from traceback import format_exc
 
 import cherrypy
@@ -16,6 +19,40 @@ try:
 except ImportError:
     from cherrypy.lib import http as httputil
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+    # older ujson versions round floats to 9 significant digits
+    if int(ujson.__version__.split(".")[0]) < 2:
+        ujson = None
+except ImportError:
+    ujson = None
+
+def _orjson_dumps(obj):
+    """Encode `obj` to JSON with orjson."""
+    return orjson.dumps(obj).decode("utf-8")
+
+def _ujson_dumps(obj):
+    """Encode `obj` to JSON with ujson."""
+    return ujson.dumps(obj, escape_forward_slashes=False)
+
+#: JSON encoders by name, the fastest available ones first.
+JSON_ENCODERS = OrderedDict((name, func) for name, func, module in
+                            [("orjson", _orjson_dumps, orjson),
+                             ("ujson", _ujson_dumps, ujson),
+                             ("json", json.dumps, json)] if module)
+
+def json_encoder(name=None):
+    """Return the JSON encoder function called `name`, by default the
+    fastest one available. The standard library "json" is always there."""
+    if name is None:
+        return next(iter(JSON_ENCODERS.values()))
+    return JSON_ENCODERS[name]
+
 def vary_by(header):
     """Add 'Vary' header for `header`."""
     varies = cherrypy.response.headers.get('Vary', '')
@@ -223,11 +260,32 @@ class JSONFormat(RESTFormat):
     final trailer line consisting of "``]}``". Each line is generated as a
     HTTP transfer chunk. This format is fixed so readers can be constructed
     to read and parse the stream incrementally one line at a time,
-    facilitating maximum throughput processing of the response."""
+    facilitating maximum throughput processing of the response. The lines
+    of the objects are grouped into HTTP transfer chunks of about
+    `chunk_size` bytes.
+
+    The objects are encoded with the `encoder` JSON encoder, by default the
+    fastest one available (see `json_encoder()`). Objects it cannot encode
+    are encoded with the standard library ``json.dumps()``."""
+
+    def __init__(self, encoder=None, chunk_size=64 * 1024):
+        self.dumps = json_encoder(encoder)
+        self.chunk_size = chunk_size
+
+    def encode(self, obj):
+        """Encode `obj` to JSON."""
+        try:
+            return self.dumps(obj)
+        except (TypeError, ValueError, OverflowError):
+            if self.dumps is json.dumps:
+                raise
+            return json.dumps(obj)
 
     def stream_chunked(self, stream, etag, preamble, trailer):
         """Generator for actually producing the output."""
         comma = " "
+        lines = []
+        size = 0
 
         try:
             if preamble:
@@ -236,10 +294,16 @@ class JSONFormat(RESTFormat):
 
             try:
                 for obj in stream:
-                    chunk = comma + json.dumps(obj) + "\n"
-                    etag.update(chunk)
-                    yield chunk
+                    line = comma + self.encode(obj) + "\n"
+                    lines.append(line)
+                    size += len(line)
                     comma = ","
+                    if size >= self.chunk_size:
+                        chunk = "".join(lines)
+                        lines = []
+                        size = 0
+                        etag.update(chunk)
+                        yield chunk
             except GeneratorExit:
                 etag.invalidate()
                 trailer = None
@@ -250,8 +314,9 @@ class JSONFormat(RESTFormat):
                 raise
             finally:
                 if trailer:
-                    etag.update(trailer)
-                    yield trailer
+                    chunk = "".join(lines) + trailer
+                    etag.update(chunk)
+                    yield chunk
 
             cherrypy.response.headers["X-REST-Status"] = 100
         except RESTError as e:
@@ -411,6 +476,56 @@ class RawFormat(RESTFormat):
             etag.invalidate()
             raise
 
+class ResponseCache(object):
+    """In-memory cache of fully buffered responses and the headers needed to
+    replay them. Entries expire after the time given to `put()`, the least
+    recently used ones are evicted to keep the cache under `max_size` bytes."""
+
+    #: Response headers saved with the cached responses.
+    headers = ('Content-Type', 'Content-Encoding', 'Content-Length', 'Vary',
+               'Cache-Control', 'Pragma', 'Expires', 'ETag', 'X-REST-Status')
+
+    def __init__(self, max_size=128 * 1024 * 1024):
+        self.max_size = max_size
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        """Return the (body, headers) cached for `key`, None if missing or expired."""
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                return None
+            expires, body, headers = entry
+            if expires < time.time():
+                self.size -= len(body)
+                return None
+            self.entries[key] = entry
+            return body, headers
+
+    def put(self, key, body, headers, ttl):
+        """Cache `body` with the `headers` to replay from the response headers,
+        for `ttl` seconds."""
+        if len(body) > self.max_size:
+            return
+        headers = dict((h, headers[h]) for h in self.headers if h in headers)
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[1])
+            self.entries[key] = (time.time() + ttl, body, headers)
+            self.size += len(body)
+            while self.size > self.max_size:
+                _, old = self.entries.popitem(last=False)
+                self.size -= len(old[1])
+
+    def clear(self):
+        """Drop all the cached responses."""
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
 class DigestETag:
     """Compute hash digest over contents for ETag header."""
     algorithm = None
@@ -602,3 +717,14 @@ def stream_maybe_etag(size_limit, etag, reply):
     result = "".join(result)
     assert len(result) == size
     return result
+
+def replay_cached(body, headers):
+    """Respond with a `body` and its `headers` saved by `ResponseCache`,
+    matching the ETag against If-Match / If-None-Match request headers."""
+    req = cherrypy.request
+    res = cherrypy.response
+    res.headers.update(headers)
+    match = [str(x) for x in (req.headers.elements('If-Match') or [])]
+    nomatch = [str(x) for x in (req.headers.elements('If-None-Match') or [])]
+    _etag_match(res.status or 200, headers['ETag'], match, nomatch)
+    return body
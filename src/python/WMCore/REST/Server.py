@@ -617,6 +617,16 @@ class MiniRESTApi:
        The API can override this value with ``compression_chunk`` keyword
        argument to :func:`restcall`.
 
+    .. attribute:: response_cache
+
+       The :class:`~.ResponseCache` of the GET / HEAD responses of the API
+       methods registered with a ``cache`` keyword argument to :func:`restcall`,
+       the number of seconds a response stays in the cache. Responses are
+       cached by request path and validated arguments, and only if they were
+       fully buffered with an ETag (see ``etag_limit``). A cached response is
+       replayed verbatim without calling the API method, so only use it for
+       read-only methods which reply the same to all the users.
+
     .. attribute:: default_expires
 
        Number, default expire time for GET / HEAD responses in seconds. The
@@ -650,6 +660,7 @@ class MiniRESTApi:
         self.methods = {}
         self.default_expires = 3600
         self.default_expires_opts = []
+        self.response_cache = ResponseCache()
 
     def _addAPI(self, method, api, callable, args, validation, **kwargs):
         """Add an API method.
@@ -800,6 +811,17 @@ class MiniRESTApi:
             v(apiobj, request.method, api, param, safe)
         validate_no_more_input(param)
 
+        # Reply from the cache if the method allows it and the same request,
+        # up to the order of arguments, was answered recently.
+        cache_key = None
+        if apiobj.get('cache') and request.method in ('GET', 'HEAD'):
+            cache_key = (request.path_info, format, repr(safe.args),
+                         repr(sorted(safe.kwargs.items())),
+                         request.headers.get('Accept-Encoding', ''))
+            cached = self.response_cache.get(cache_key)
+            if cached:
+                return replay_cached(*cached)
+
         # Invoke the method.
         obj = apiobj['call'](*safe.args, **safe.kwargs)
 
@@ -836,7 +858,10 @@ class MiniRESTApi:
                                 apiobj.get('compression', self.compression),
                                 apiobj.get('compression_level', self.compression_level),
                                 apiobj.get('compression_chunk', self.compression_chunk))
-        return stream_maybe_etag(apiobj.get('etag_limit', self.etag_limit), etagger, reply)
+        result = stream_maybe_etag(apiobj.get('etag_limit', self.etag_limit), etagger, reply)
+        if cache_key and isinstance(result, str) and response.headers.get('ETag'):
+            self.response_cache.put(cache_key, result, response.headers, apiobj['cache'])
+        return result
 
     def _precall(self, param):
         """Point for derived classes to hook into prior to peeking at URL.
@@ -2356,6 +2381,7 @@ def restcall(func=None, args=None, generate="result", **kwargs):
     compression         "Accept-Encoding" methods, empty disables compression.
     compression_level   ZLIB compression level for output (0 .. 9).
     compression_chunk   Approximate amount of output to compress at once.
+    cache               Seconds to cache the responses of a read-only method.
     =================== ======================================================
 
     :returns: The original function suitably enriched with attributes if
@@ -0,0 +1,293 @@
+"""
+In-memory cache of the request documents of the ReqMgr2 database.
+
+It holds the documents of the requests which are not archived, is kept
+current with the database changes feed and keeps the field projections
+(masks) asked by the clients, so most GET /request queries are answered
+without reading any document from CouchDB.
+"""
+from __future__ import division, print_function
+
+import logging
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from WMCore.ReqMgr.DataStructs.RequestStatus import REQUEST_STATE_LIST
+
+#: Request status which are kept in the cache
+CACHED_STATUS = set(status for status in REQUEST_STATE_LIST if not status.endswith("-archived"))
+
+
+def maskChain(maskedDict, reqDict, chainName, maskKey):
+    """
+    Replace the `maskKey` value of `maskedDict` by the list of its values in
+    the Task/Step dictionaries of the `reqDict` TaskChain/StepChain request,
+    if any of them defines it.
+    """
+    numLoop = reqDict["%sChain" % chainName]
+    chainKeys = ["%s%s" % (chainName, i + 1) for i in range(numLoop)]
+    if not any(maskKey in reqDict[chainKey] for chainKey in chainKeys):
+        return
+
+    defaultValue = maskedDict[maskKey]
+    values = []
+    for chainKey in chainKeys:
+        chain = reqDict[chainKey]
+        if maskKey in chain:
+            values.append(chain[maskKey])
+        else:
+            if isinstance(defaultValue, dict):
+                value = defaultValue.get(chainKey, None)
+            else:
+                value = defaultValue
+            if value is not None:
+                values.append(value)
+    maskedDict[maskKey] = list(set(values))
+
+
+def maskRequest(reqDict, mask, chainKeys=None):
+    """
+    Return a dictionary with the `mask` keys of the `reqDict` request. The
+    values defined by Task/Step of a TaskChain/StepChain are listed, see
+    `maskChain`. `chainKeys` is the set of keys defined in any Task/Step,
+    if known beforehand.
+    """
+    chainName = None
+    if "TaskChain" in reqDict:
+        chainName = "Task"
+    elif "StepChain" in reqDict:
+        chainName = "Step"
+
+    maskedDict = {}
+    for maskKey in mask:
+        maskedDict[maskKey] = reqDict.get(maskKey, None)
+        if chainName and (chainKeys is None or maskKey in chainKeys):
+            maskChain(maskedDict, reqDict, chainName, maskKey)
+    return maskedDict
+
+
+def getChainKeys(reqDict):
+    """
+    Return the set of keys defined in the Task/Step dictionaries of a
+    TaskChain/StepChain request
+    """
+    chainKeys = set()
+    for chainName in ("Task", "Step"):
+        if "%sChain" % chainName in reqDict:
+            for i in range(reqDict["%sChain" % chainName]):
+                chainKeys.update(reqDict.get("%s%s" % (chainName, i + 1), {}))
+            break
+    return chainKeys
+
+
+def getPrepIDs(reqDict):
+    """
+    Return the set of PrepIDs of a request, the same the byprepid view emits
+    """
+    prepIDs = set()
+    if reqDict.get("PrepID") and reqDict["PrepID"] != "None":
+        prepIDs.add(reqDict["PrepID"])
+    for chainName in ("Task", "Step"):
+        for i in range(reqDict.get("%sChain" % chainName) or 0):
+            chainPrepID = reqDict.get("%s%s" % (chainName, i + 1), {}).get("PrepID")
+            if chainPrepID and reqDict.get("PrepID") != "None":
+                prepIDs.add(chainPrepID)
+    return prepIDs
+
+
+class RequestCache(object):
+    """
+    Cache of the request documents which are not archived, kept current with
+    the changes feed of the database. The changes are pulled at most every
+    `refreshInterval` seconds, when the cache is queried.
+
+    Query results are served from the cache only if it can answer them
+    exactly: the query must select requests by status, none of them
+    archived, or by names which are all in the cache. Otherwise the methods
+    return None and the caller has to query the database. If the database
+    can't be read, the cache is not used and no new attempt is made before
+    `retryInterval` seconds.
+
+    The full documents are kept, since the requests are returned unmasked
+    unless the client asks for a mask, so the memory used is about the size
+    of the non archived requests in the database (a few kB per request,
+    plus the Task/Step dictionaries of the chained requests), and the masked
+    copies of the `maxMasks` most recent masks on top of it. Every server
+    process holds its own copy.
+    """
+
+    def __init__(self, couchdb, refreshInterval=30, retryInterval=300, changesLimit=1000,
+                 maxMasks=32, logger=None):
+        self.couchdb = couchdb
+        self.refreshInterval = refreshInterval
+        self.retryInterval = retryInterval
+        self.changesLimit = changesLimit
+        self.maxMasks = maxMasks
+        self.logger = logger or logging.getLogger()
+        self.lastSeq = None
+        self.lastRefresh = 0
+        self.lastFailure = 0
+        # request name -> document, set of Task/Step keys, set of PrepIDs
+        self.docs = {}
+        self.chainKeys = {}
+        self.prepIDs = {}
+        # mask tuple -> {request name: projected document}
+        self.projections = OrderedDict()
+        self.docLock = Lock()
+        self.refreshLock = Lock()
+
+    def expire(self):
+        """
+        Make the next query pull the database changes first
+        """
+        self.lastRefresh = 0
+
+    def _setDoc(self, doc):
+        """
+        Add, update or remove (if archived) a request document.
+        Must be called with docLock held.
+        """
+        name = doc["_id"]
+        for projection in self.projections.values():
+            projection.pop(name, None)
+        if doc.get("_deleted") or doc.get("RequestStatus") not in CACHED_STATUS:
+            self.docs.pop(name, None)
+            self.chainKeys.pop(name, None)
+            self.prepIDs.pop(name, None)
+            return
+        for key in ('_rev', '_attachments'):
+            doc.pop(key, None)
+        self.docs[name] = doc
+        self.chainKeys[name] = getChainKeys(doc)
+        self.prepIDs[name] = getPrepIDs(doc)
+
+    def _load(self):
+        """
+        Load all the requests not archived, return the update sequence they
+        are current with
+        """
+        lastSeq = self.couchdb.info()["update_seq"]
+        data = self.couchdb.loadView("ReqMgr", "bystatus", {"include_docs": True},
+                                     keys=list(CACHED_STATUS))
+        with self.docLock:
+            self.docs.clear()
+            self.chainKeys.clear()
+            self.prepIDs.clear()
+            self.projections.clear()
+            for row in data["rows"]:
+                if row.get("doc"):
+                    self._setDoc(row["doc"])
+        self.logger.info("Loaded %d requests in the request cache", len(self.docs))
+        return lastSeq
+
+    def _pullChanges(self, since):
+        """
+        Apply the database changes after the `since` update sequence,
+        return the last update sequence applied
+        """
+        while True:
+            data = self.couchdb.get('/%s/_changes?since=%s&limit=%s&include_docs=true' %
+                                    (self.couchdb.name, since, self.changesLimit))
+            with self.docLock:
+                for change in data["results"]:
+                    if change["id"].startswith("_design/"):
+                        continue
+                    doc = change.get("doc") or {"_id": change["id"], "_deleted": True}
+                    if change.get("deleted"):
+                        doc["_deleted"] = True
+                    self._setDoc(doc)
+            since = data["last_seq"]
+            if len(data["results"]) < self.changesLimit:
+                return since
+
+    def refresh(self):
+        """
+        Load the cache or pull the database changes if they were not pulled
+        in the last refreshInterval seconds. Return False if the cache is
+        not usable: the update failed now or in the last retryInterval seconds.
+        """
+        if time.time() - self.lastRefresh < self.refreshInterval:
+            return True
+        if time.time() - self.lastFailure < self.retryInterval:
+            return False
+        with self.refreshLock:
+            if time.time() - self.lastRefresh < self.refreshInterval:
+                return True
+            if time.time() - self.lastFailure < self.retryInterval:
+                return False
+            startTime = time.time()
+            try:
+                if self.lastSeq is None:
+                    self.lastSeq = self._load()
+                self.lastSeq = self._pullChanges(self.lastSeq)
+            except Exception as ex:
+                self.logger.error("Failed to update the request cache, next attempt in %d seconds: %s",
+                                  self.retryInterval, str(ex))
+                self.lastFailure = time.time()
+                return False
+            self.lastRefresh = startTime
+        return True
+
+    def query(self, filters):
+        """
+        Return the names of the requests matching all the `filters`, a dict of
+        request field -> list of allowed values, with RequestName and PrepID
+        matching the request name and any of its PrepIDs. Return None if the
+        cache cannot answer the query.
+        """
+        status = filters.get("RequestStatus")
+        names = filters.get("RequestName")
+        if status and not CACHED_STATUS.issuperset(status):
+            return None
+        if not status and not names:
+            return None
+        if not self.refresh():
+            return None
+
+        filters = dict(filters)
+        prepIDs = filters.pop("PrepID", None)
+        prepIDs = set(prepIDs) if prepIDs is not None else None
+        names = filters.pop("RequestName", None)
+        names = set(names) if names is not None else None
+        with self.docLock:
+            if names is None:
+                candidates = list(self.docs)
+            elif names.issubset(self.docs):
+                candidates = names
+            else:
+                return None
+            result = []
+            for name in candidates:
+                doc = self.docs[name]
+                if prepIDs is not None and not prepIDs & self.prepIDs[name]:
+                    continue
+                if all(doc.get(key) in values for key, values in filters.items()):
+                    result.append(name)
+        return result
+
+    def getRequests(self, names, mask=None):
+        """
+        Return a dict of request name -> document for the `names` requests
+        returned by `query`. If `mask` is given the documents are projected on
+        the mask fields, see `maskRequest`.
+        """
+        with self.docLock:
+            if not mask:
+                return dict((name, self.docs[name]) for name in names if name in self.docs)
+            mask = tuple(mask)
+            projection = self.projections.pop(mask, None)
+            if projection is None:
+                projection = {}
+                if len(self.projections) >= self.maxMasks:
+                    self.projections.popitem(last=False)
+            self.projections[mask] = projection
+
+            result = {}
+            for name in names:
+                if name not in self.docs:
+                    continue
+                if name not in projection:
+                    projection[name] = maskRequest(self.docs[name], mask, self.chainKeys[name])
+                result[name] = projection[name]
+        return result
@@ -17,6 +17,7 @@ from WMCore.REST.Validation import validate_str
 from WMCore.REST.Auth import get_user_info
 
 from WMCore.ReqMgr.DataStructs.ReqMgrConfigDataCache import ReqMgrConfigDataCache
+from WMCore.ReqMgr.DataStructs.RequestCache import RequestCache, maskRequest
 from WMCore.ReqMgr.DataStructs.RequestError import InvalidSpecParameterValue
 from WMCore.ReqMgr.DataStructs.RequestStatus import (REQUEST_STATE_LIST,
                                                      REQUEST_STATE_TRANSITION, ACTIVE_STATUS)
@@ -35,6 +36,12 @@ class Request(RESTEntity):
         self.reqmgr_db_service = RequestDBWriter(self.reqmgr_db, couchapp="ReqMgr")
         # this need for the post validtiaon
         self.gq_service = WorkQueue(config.couch_host, config.couch_workqueue_db)
+        # in-memory cache of the requests not archived, fed by the changes feed.
+        # request_cache_refresh is the max age in seconds of its data, 0 disables it
+        self.request_cache = None
+        cache_refresh = getattr(config, "request_cache_refresh", 30)
+        if cache_refresh:
+            self.request_cache = RequestCache(self.reqmgr_db, refreshInterval=cache_refresh)
 
     def _validateGET(self, param, safe):
         # TODO: need proper validation but for now pass everything
@@ -206,56 +213,67 @@ class Request(RESTEntity):
                 msg = str(ex)
             raise InvalidSpecParameterValue(msg)
 
-    def _maskTaskStepChain(self, masked_dict, req_dict, chain_name, mask_key):
-
-        mask_exist = False
-        num_loop = req_dict["%sChain" % chain_name]
-        for i in range(num_loop):
-            if mask_key in req_dict["%s%s" % (chain_name, i + 1)]:
-                mask_exist = True
-                break
-        if mask_exist:
-            defaultValue = masked_dict[mask_key]
-            masked_dict[mask_key] = []
-            # assume mask_key is list if the condition doesn't meet.
-
-            for i in range(num_loop):
-                chain_key = "%s%s" % (chain_name, i + 1)
-                chain = req_dict[chain_key]
-                if mask_key in chain:
-                    masked_dict[mask_key].append(chain[mask_key])
-                else:
-                    if isinstance(defaultValue, dict):
-                        value = defaultValue.get(chain_key, None)
-                    else:
-                        value = defaultValue
-
-                    if value is not None:
-                        masked_dict[mask_key].append(value)
-
-            masked_dict[mask_key] = list(set(masked_dict[mask_key]))
-        return
-
-    def _mask_result(self, mask, result):
-
+    def _resolve_mask(self, mask):
         if len(mask) == 1 and mask[0] == "DAS":
             mask = ReqMgrConfigDataCache.getConfig("DAS_RESULT_FILTER")["filter_list"]
+        return mask
+
+    def _mask_result(self, mask, result):
 
         if len(mask) > 0:
             masked_result = {}
             for req_name, req_info in result.items():
-                masked_result.setdefault(req_name, {})
-                for mask_key in mask:
-                    masked_result[req_name].update({mask_key: req_info.get(mask_key, None)})
-                    if "TaskChain" in req_info:
-                        self._maskTaskStepChain(masked_result[req_name], req_info, "Task", mask_key)
-                    elif "StepChain" in req_info:
-                        self._maskTaskStepChain(masked_result[req_name], req_info, "Step", mask_key)
-
+                masked_result[req_name] = maskRequest(req_info, mask)
             return masked_result
         else:
             return result
 
+    def _cache_filters(self, kwargs, status):
+        """
+        Return the request cache filters equivalent to the couch views the
+        query is answered with, None if some of them can't be evaluated
+        from the cache.
+        """
+        request_type = kwargs.get("request_type", [])
+        if len(kwargs) == 2 and status and kwargs.get("team"):
+            return {"RequestStatus": status, "Team": kwargs["team"]}
+        elif len(kwargs) == 2 and status and request_type:
+            return {"RequestStatus": status, "RequestType": request_type}
+        elif len(kwargs) == 2 and status and kwargs.get("requestor"):
+            return {"RequestStatus": status, "Requestor": kwargs["requestor"]}
+        elif len(kwargs) == 3 and status and request_type and kwargs.get("requestor"):
+            return {"RequestStatus": status, "RequestType": request_type,
+                    "Requestor": kwargs["requestor"]}
+
+        for key in ["inputdataset", "outputdataset", "date_range", "mc_pileup", "data_pileup"]:
+            if kwargs.get(key):
+                return None
+        filters = {}
+        for key, field in [("status", "RequestStatus"), ("name", "RequestName"),
+                           ("request_type", "RequestType"), ("prep_id", "PrepID"),
+                           ("campaign", "Campaign")]:
+            value = status if key == "status" else kwargs.get(key)
+            if value:
+                filters[field] = [value] if isinstance(value, basestring) else value
+        return filters
+
+    def _get_from_cache(self, kwargs, status, mask):
+        """
+        Return the requests matching the query from the request cache, masked,
+        or None if the cache can't answer the query.
+        """
+        filters = self._cache_filters(kwargs, status)
+        if not filters:
+            return None
+        names = self.request_cache.query(filters)
+        if names is None:
+            return None
+        return self.request_cache.getRequests(names, mask)
+
+    def _expire_cache(self):
+        if self.request_cache:
+            self.request_cache.expire()
+
     @restcall(formats=[('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())])
     def get(self, **kwargs):
         """
@@ -272,7 +290,7 @@ class Request(RESTEntity):
 
         """
         ### pop arguments unrelated to the user query
-        mask = kwargs.pop("mask", [])
+        mask = self._resolve_mask(kwargs.pop("mask", []))
         detail = kwargs.pop("detail", True)
         common_dict = int(kwargs.pop("common_dict", 0))  # modifies the response format
         nostale = kwargs.pop("_nostale", False)
@@ -302,6 +320,12 @@ class Request(RESTEntity):
         if nostale:
             self.reqmgr_db_service._setNoStale()
 
+        # serve the query from memory if the request cache can answer it
+        if self.request_cache and not nostale:
+            result = self._get_from_cache(kwargs, status, mask)
+            if result is not None:
+                return self._format_result(result, option, common_dict)
+
         request_info = []
         queryMatched = False  # flag to avoid calling the same view twice
         if len(kwargs) == 2:
@@ -361,12 +385,13 @@ class Request(RESTEntity):
 
         # get the intersection of the request data
         result = self._intersection_of_request_info(request_info)
+        result = self._mask_result(mask, result)
+        return self._format_result(result, option, common_dict)
 
+    def _format_result(self, result, option, common_dict):
         if not result:
             return []
 
-        result = self._mask_result(mask, result)
-
         if not option["include_docs"]:
             return result.keys()
 
@@ -515,6 +540,7 @@ class Request(RESTEntity):
         for workload, request_args in workload_pair_list:
             result = self._updateRequest(workload, request_args)
             report.append(result)
+        self._expire_cache()
         return report
 
     @restcall(formats=[('application/json', JSONFormat())])
@@ -527,6 +553,7 @@ class Request(RESTEntity):
             cherrypy.log(msg + " Reason: %s" % ex)
             raise cherrypy.HTTPError(404, msg)
             # TODO
+        self._expire_cache()
         # delete should also happen on WMStats
         cherrypy.log("INFO: Delete '%s' done." % request_name)
 
@@ -589,6 +616,7 @@ class Request(RESTEntity):
                 cherrypy.log("Error saving request spec to couch: %s " % str(ex))
                 self.delete(request_args['RequestName'])
 
+        self._expire_cache()
         return out
 
 
@@ -36,7 +36,7 @@ class WMStatsInfo(RESTEntity):
         return
 
 
-    @restcall(formats = [('application/json', JSONFormat())])
+    @restcall(formats = [('application/json', JSONFormat())], cache=60)
     @tools.expires(secs=-1)
     def get(self, request_name):
         result = self.wmstats.getRequestSummaryWithJobInfo(request_name)
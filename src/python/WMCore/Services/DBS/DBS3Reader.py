@@ -8,7 +8,12 @@ Readonly DBS Interface
 from __future__ import print_function, division
 
 import logging
-from collections import defaultdict
+import os
+import threading
+import time
+from collections import defaultdict, OrderedDict
+from copy import deepcopy
+from multiprocessing.pool import ThreadPool
 
 from RestClient.ErrorHandling.RestClientExceptions import HTTPError
 from dbs.apis.dbsClient import DbsApi
@@ -23,6 +28,13 @@ from WMCore.Services.PhEDEx.PhEDEx import PhEDEx
 ### Needed for the pycurl comment, leave it out for now
 # from WMCore.Services.pycurl_manager import getdata as multi_getdata
 
+# maximum number of DBS calls issued at once by a DBS3Reader
+DBS_PARALLEL_CALLS = 8
+# lifetime in seconds of the per block results cached in the process
+DBS_BLOCK_CACHE_EXPIRATION = 120
+# maximum number of per block results cached in the process
+DBS_BLOCK_CACHE_SIZE = 500
+
 
 def remapDBS3Keys(data, stringify=False, **others):
     """Fields have been renamed between DBS2 and 3, take fields from DBS3
@@ -45,6 +57,115 @@ def remapDBS3Keys(data, stringify=False, **others):
     return data
 
 
+class DBSBlockCache(object):
+    """
+    _DBSBlockCache_
+
+    Short-lived cache of the DBS results per block, shared by the readers of
+    the process. Concurrent requests for the same key are de-duplicated: only
+    one thread calls DBS, the others wait for its result.
+
+    Results hold whole file and lumi lists, so the cache keeps at most
+    maxSize of them, evicting the least recently used ones, and drops
+    expired results as soon as they're looked up.
+    """
+
+    def __init__(self, expiration=DBS_BLOCK_CACHE_EXPIRATION, maxSize=DBS_BLOCK_CACHE_SIZE):
+        self.expiration = expiration
+        self.maxSize = maxSize
+        self._lock = threading.Lock()
+        self._results = OrderedDict()
+        self._inFlight = {}
+
+    def _lookup(self, key):
+        """
+        Return the cached (time, result) entry for key, None if it's missing
+        or expired. Must be called holding the lock.
+        """
+        entry = self._results.pop(key, None)
+        if entry is None or time.time() - entry[0] >= self.expiration:
+            return None
+        # most recently used go last
+        self._results[key] = entry
+        return entry
+
+    def get(self, key, func, *args, **kwargs):
+        """
+        Return a copy of the cached result for key, calling func(*args)
+        to get it if it's missing or expired. With wait=False, the result
+        is fetched again instead of waiting for a running call.
+        """
+        wait = kwargs.get('wait', True)
+        while True:
+            with self._lock:
+                entry = self._lookup(key)
+                if entry is not None:
+                    return deepcopy(entry[1])
+                event = self._inFlight.get(key)
+                owner = event is None
+                if owner:
+                    event = self._inFlight[key] = threading.Event()
+            if owner:
+                break
+            if not wait:
+                return func(*args)
+            # retry once the running call is over, it might have failed
+            event.wait()
+
+        try:
+            result = func(*args)
+            with self._lock:
+                now = time.time()
+                for oldKey in [k for k, v in self._results.items() if now - v[0] >= self.expiration]:
+                    del self._results[oldKey]
+                self._results[key] = (now, result)
+                while len(self._results) > self.maxSize:
+                    self._results.popitem(last=False)
+            return deepcopy(result)
+        finally:
+            with self._lock:
+                self._inFlight.pop(key).set()
+
+    def clear(self):
+        """
+        Drop all the cached results
+        """
+        with self._lock:
+            self._results.clear()
+
+
+blockCache = DBSBlockCache()
+
+# thread pools running the parallel DBS calls, shared by the readers of the
+# process and keyed by (pid, size): a forked child can't use the parent pools,
+# their threads don't exist in the child
+_threadPools = {}
+_threadPoolsLock = threading.Lock()
+_poolThread = threading.local()
+
+
+def _getThreadPool(size):
+    """
+    Return the thread pool with size threads of the current process
+    """
+    pid = os.getpid()
+    with _threadPoolsLock:
+        if (pid, size) not in _threadPools:
+            for key in [key for key in _threadPools if key[0] != pid]:
+                del _threadPools[key]
+            _threadPools[(pid, size)] = ThreadPool(size)
+        return _threadPools[(pid, size)]
+
+
+def _runCall(call):
+    """
+    Execute a (function, arguments) call in a thread of the pool
+    """
+    _poolThread.active = True
+    func, args = call
+    return func(*args)
+
+
 @retry(tries=3, delay=1)
 def getDataTiers(dbsUrl):
     """
@@ -66,13 +187,20 @@ class DBS3Reader(object):
     _DBSReader_
 
     General API for reading data from DBS
+
+    The block, file, lumi and parent calls are issued in parallel by a pool
+    of parallelCalls threads, each thread with its own DbsApi connection,
+    and the block results are cached for a short time in the process.
     """
 
-    def __init__(self, url, logger=None, **contact):
+    def __init__(self, url, logger=None, parallelCalls=DBS_PARALLEL_CALLS, **contact):
 
         # instantiate dbs api object
         try:
             self.dbsURL = url
+            self.contact = contact
+            self.parallelCalls = parallelCalls
+            self._local = threading.local()
             self.dbs = DbsApi(url, **contact)
             self.logger = logger or logging.getLogger(self.__class__.__name__)
         except dbsClientException as ex:
@@ -83,6 +211,43 @@ class DBS3Reader(object):
         # connection to PhEDEx (Use default endpoint url)
         self.phedex = PhEDEx(responseType="json", dbsUrl=self.dbsURL)
 
+    @property
+    def dbs(self):
+        """
+        DbsApi object of the current thread, DbsApi connections can't be
+        shared between threads.
+        """
+        dbsApi = getattr(self._local, 'dbs', None)
+        if dbsApi is None:
+            dbsApi = self._local.dbs = DbsApi(self.dbsURL, **self.contact)
+        return dbsApi
+
+    @dbs.setter
+    def dbs(self, dbsApi):
+        self._local.dbs = dbsApi
+
+    def _parallelCalls(self, calls):
+        """
+        _parallelCalls_
+
+        Execute a list of (function, arguments) calls in parallel and return
+        their results in the same order. Calls made from within the pool
+        threads are executed serially, which bounds the concurrency.
+        """
+        if len(calls) < 2 or self.parallelCalls < 2 or getattr(_poolThread, 'active', False):
+            return [func(*args) for func, args in calls]
+
+        return _getThreadPool(self.parallelCalls).map(_runCall, calls, chunksize=1)
+
+    def _blockCached(self, method, blockName, *args):
+        """
+        Return the result of a block method from the process cache
+        """
+        key = (self.dbsURL, method.__name__, blockName) + args
+        # pool threads never wait for other calls, they can't block the pool
+        return blockCache.get(key, method, blockName, *args,
+                              wait=not getattr(_poolThread, 'active', False))
+
     def _getLumiList(self, blockName=None, lfns=None, validFileOnly=1):
         """
         currently only take one lfn but dbs api need be updated
@@ -92,8 +257,9 @@ class DBS3Reader(object):
                 lumiLists = self.dbs.listFileLumis(block_name=blockName, validFileOnly=validFileOnly)
             elif lfns:
                 lumiLists = []
-                for slfn in grouper(lfns, 50):
-                    lumiLists.extend(self.dbs.listFileLumiArray(logical_file_name=slfn))
+                calls = [(self._listFileLumiArray, (slfn,)) for slfn in grouper(set(lfns), 50)]
+                for lumis in self._parallelCalls(calls):
+                    lumiLists.extend(lumis)
             else:
                 # shouldn't call this with both blockName and lfns empty
                 # but still returns empty dict for that case
@@ -104,6 +270,25 @@ class DBS3Reader(object):
             msg += "%s\n" % formatEx3(ex)
             raise DBSReaderError(msg)
 
+        return self._makeLumiDict(lumiLists)
+
+    def _listFileLumiArray(self, lfns):
+        """
+        Lumis of a list of files
+        """
+        return self.dbs.listFileLumiArray(logical_file_name=lfns)
+
+    def _listFileArray(self, lfns):
+        """
+        Details of a list of files
+        """
+        return self.dbs.listFileArray(logical_file_name=lfns, detail=True)
+
+    @staticmethod
+    def _makeLumiDict(lumiLists):
+        """
+        Map each file to its run and lumi information
+        """
         lumiDict = {}
         for lumisItem in lumiLists:
             lumiDict.setdefault(lumisItem['logical_file_name'], [])
@@ -470,8 +655,15 @@ class DBS3Reader(object):
 
         """
         self.checkBlockName(fileBlockName)
-        try:
+        return self._blockCached(self._blockExists, fileBlockName)
 
+    def _blockExists(self, fileBlockName):
+        """
+        _blockExists_
+
+        Check the block in DBS
+        """
+        try:
             blocks = self.dbs.listBlocks(block_name=fileBlockName)
         except Exception as ex:
             msg = "Error in "
@@ -498,16 +690,28 @@ class DBS3Reader(object):
             msg = "DBSReader.listFilesInBlock(%s): No matching data"
             raise DBSReaderError(msg % fileBlockName)
 
+        return self._blockCached(self._listFilesInBlock, fileBlockName, lumis, validFileOnly)
+
+    def _listFilesInBlock(self, fileBlockName, lumis, validFileOnly):
+        """
+        _listFilesInBlock_
+
+        Fetch the files and the lumis of the block in parallel
+        """
+        calls = [(self._listBlockFileArray, (fileBlockName, validFileOnly))]
+        if lumis:
+            calls.append((self._getLumiList, (fileBlockName, None, validFileOnly)))
         try:
-            files = self.dbs.listFileArray(block_name=fileBlockName, validFileOnly=validFileOnly, detail=True)
+            results = self._parallelCalls(calls)
         except dbsClientException as ex:
             msg = "Error in "
             msg += "DBSReader.listFilesInBlock(%s)\n" % fileBlockName
             msg += "%s\n" % formatEx3(ex)
             raise DBSReaderError(msg)
 
+        files = results[0]
         if lumis:
-            lumiDict = self._getLumiList(blockName=fileBlockName, validFileOnly=validFileOnly)
+            lumiDict = results[1]
 
         result = []
         for fileInfo in files:
@@ -516,6 +720,18 @@ class DBS3Reader(object):
             result.append(remapDBS3Keys(fileInfo, stringify=True))
         return result
 
+    def _listBlockFileArray(self, fileBlockName, validFileOnly):
+        """
+        Details of the files in a block
+        """
+        return self.dbs.listFileArray(block_name=fileBlockName, validFileOnly=validFileOnly, detail=True)
+
+    def _listBlockFileParents(self, fileBlockName):
+        """
+        Parents of the files in a block
+        """
+        return self.dbs.listFileParents(block_name=fileBlockName)
+
     def listFilesInBlockWithParents(self, fileBlockName, lumis=True, validFileOnly=1):
         """
         _listFilesInBlockWithParents_
@@ -531,10 +747,19 @@ class DBS3Reader(object):
             msg = "DBSReader.listFilesInBlockWithParents(%s): No matching data"
             raise DBSReaderError(msg % fileBlockName)
 
+        return self._blockCached(self._listFilesInBlockWithParents, fileBlockName, lumis, validFileOnly)
+
+    def _listFilesInBlockWithParents(self, fileBlockName, lumis, validFileOnly):
+        """
+        _listFilesInBlockWithParents_
+
+        Fetch the files of the block, their parents and the details and
+        lumis of the parent files in parallel
+        """
         try:
             # TODO: shoud we get only valid block for this?
-            files = self.dbs.listFileParents(block_name=fileBlockName)
-            fileDetails = self.listFilesInBlock(fileBlockName, lumis, validFileOnly)
+            files, fileDetails = self._parallelCalls([(self._listBlockFileParents, (fileBlockName,)),
+                                                      (self.listFilesInBlock, (fileBlockName, lumis, validFileOnly))])
 
         except dbsClientException as ex:
             msg = "Error in "
@@ -549,7 +774,7 @@ class DBS3Reader(object):
             for fp in f['parent_logical_file_name']:
                 childByParents[fp].append(f['logical_file_name'])
 
-        parentsLFNs = childByParents.keys()
+        parentsLFNs = list(childByParents)
 
         if len(parentsLFNs) == 0:
             msg = "Error in "
@@ -558,13 +783,21 @@ class DBS3Reader(object):
             raise DBSReaderError(msg)
 
         parentFilesDetail = []
+        parentLumis = []
         # TODO: slicing parentLFNs util DBS api is handling that.
         # Remove slicing if DBS api handles
-        for pLFNs in grouper(parentsLFNs, 50):
-            parentFilesDetail.extend(self.dbs.listFileArray(logical_file_name=pLFNs, detail=True))
+        calls = [(self._listFileArray, (pLFNs,)) for pLFNs in grouper(parentsLFNs, 50)]
+        nDetailCalls = len(calls)
+        if lumis:
+            calls.extend([(self._listFileLumiArray, (pLFNs,)) for pLFNs in grouper(parentsLFNs, 50)])
+        for i, result in enumerate(self._parallelCalls(calls)):
+            if i < nDetailCalls:
+                parentFilesDetail.extend(result)
+            else:
+                parentLumis.extend(result)
 
         if lumis:
-            parentLumis = self._getLumiList(lfns=parentsLFNs)
+            parentLumis = self._makeLumiDict(parentLumis)
 
         parentsByLFN = defaultdict(list)
 
@@ -624,11 +857,11 @@ class DBS3Reader(object):
         if dbsOnly:
             blocksInfo = {}
             try:
-                for block in fileBlockNames:
-                    blocksInfo.setdefault(block, [])
+                uniqueBlocks = list(set(fileBlockNames))
+                calls = [(self._blockCached, (self._listBlockOrigin, block)) for block in uniqueBlocks]
+                for block, origins in zip(uniqueBlocks, self._parallelCalls(calls)):
                     # there should be only one element with a single origin site string ...
-                    for blockInfo in self.dbs.listBlockOrigin(block_name=block):
-                        blocksInfo[block].append(blockInfo['origin_site_name'])
+                    blocksInfo[block] = [blockInfo['origin_site_name'] for blockInfo in origins]
             except dbsClientException as ex:
                 msg = "Error in DBS3Reader: self.dbs.listBlockOrigin(block_name=%s)\n" % fileBlockNames
                 msg += "%s\n" % formatEx3(ex)
@@ -651,6 +884,12 @@ class DBS3Reader(object):
 
         return locations
 
+    def _listBlockOrigin(self, fileBlockName):
+        """
+        Origin site of a block
+        """
+        return self.dbs.listBlockOrigin(block_name=fileBlockName)
+
     def getFileBlock(self, fileBlockName, dbsOnly=False):
         """
         _getFileBlock_
@@ -711,6 +950,42 @@ class DBS3Reader(object):
         }
         return result
 
+    def getFileBlocks(self, fileBlockNames, dbsOnly=False, withParents=False):
+        """
+        _getFileBlocks_
+
+        Same as getFileBlock (or getFileBlockWithParents) for a list of
+        blocks, the files of the different blocks are fetched in parallel.
+
+        return a dictionary:
+        { blockName: {
+             "PhEDExNodeNames" : [<pnn list>],
+             "Files" : dictionaries representing each file
+             "IsOpen" : True or False
+             },
+          ...
+        }
+        """
+        fileBlockNames = list(set(unicode(block) for block in fileBlockNames))
+        if not fileBlockNames:
+            return {}
+
+        listFiles = self.listFilesInBlockWithParents if withParents else self.listFilesInBlock
+        calls = []
+        for block in fileBlockNames:
+            calls.append((listFiles, (block,)))
+            calls.append((self.blockIsOpen, (block,)))
+        results = self._parallelCalls(calls)
+        # PhEDEx service objects are not thread safe, all the blocks at once
+        locations = self.listFileBlockLocation(fileBlockNames, dbsOnly)
+
+        result = {}
+        for i, block in enumerate(fileBlockNames):
+            result[block] = {"PhEDExNodeNames": locations[block],
+                             "Files": results[2 * i],
+                             "IsOpen": results[2 * i + 1]}
+        return result
+
     def getFiles(self, dataset, onlyClosedBlocks=False):
         """
         _getFiles_
@@ -720,13 +995,9 @@ class DBS3Reader(object):
         for that block and the files in that block by LFN mapped to NEvents
 
         """
-        result = {}
         blocks = self.listFileBlocks(dataset, onlyClosedBlocks)
 
-        for x in blocks:
-            result.update(self.getFileBlock(x))
-
-        return result
+        return self.getFileBlocks(blocks)
 
     def listBlockParents(self, blockName):
         """Get parent blocks for block"""
@@ -748,6 +1019,14 @@ class DBS3Reader(object):
 
         """
         self.checkBlockName(blockName)
+        return self._blockCached(self._blockIsOpen, blockName)
+
+    def _blockIsOpen(self, blockName):
+        """
+        _blockIsOpen_
+
+        Check the block status in DBS
+        """
         blockInstance = self.dbs.listBlocks(block_name=blockName, detail=True)
         if len(blockInstance) == 0:
             return False
@@ -11,6 +11,7 @@ standard_library.install_aliases()
 import logging
 import re
 import threading
+import time
 from collections import defaultdict
 from http.client import HTTPException
 
@@ -35,6 +36,11 @@ class LogDB(object):
     _LogDB_
 
     LogDB object - interface to LogDB functionality.
+
+    If a flush_interval (in seconds) is given, the posted messages are
+    buffered in memory and written by a background thread with a single
+    bulk call every flush_interval seconds, or as soon as max_buffer
+    messages are buffered.
     """
 
     def __init__(self, url, identifier, logger=None, **kwds):
@@ -47,12 +53,21 @@ class LogDB(object):
             self.thread_name = kwds.pop('thread_name')
         except KeyError:
             self.thread_name = threading.currentThread().getName()
+        self.flush_interval = kwds.pop('flush_interval', 0)
+        self.last_flush_error = 0
 
         self.user_pat = re.compile(r'^/[a-zA-Z][a-zA-Z0-9/\=\s()\']*\=[a-zA-Z0-9/\=\.\-_/#:\s\']*$')
         self.agent = 0 if self.user_pat.match(self.identifier) else 1
         couch_url, db_name = splitCouchServiceURL(self.url)
         self.backend = LogDBBackend(couch_url, db_name, identifier,
                                     self.thread_name, agent=self.agent, **kwds)
+        self.flusher = None
+        if self.flush_interval:
+            self.stop_flusher = threading.Event()
+            self.flusher = threading.Thread(target=self._flush_loop,
+                                            name="LogDBFlusher-%s" % self.thread_name)
+            self.flusher.daemon = True
+            self.flusher.start()
         self.logger.info(self)
 
     def __repr__(self):
@@ -66,7 +81,13 @@ class LogDB(object):
         try:
             if request is None:
                 request = self.default_user
-            if self.user_pat.match(self.identifier):
+            if self.flusher:
+                full = self.backend.buffer_update(request, msg, mtype)
+                res = 'post-buffered'
+                # do not retry a failed flush before the next interval
+                if full and time.time() - self.last_flush_error > self.flush_interval:
+                    res = self.flush()
+            elif self.user_pat.match(self.identifier):
                 res = self.backend.user_update(request, msg, mtype)
             else:
                 res = self.backend.agent_update(request, msg, mtype)
@@ -78,9 +99,40 @@ class LogDB(object):
         self.logger.debug("LogDB post request, res=%s", res)
         return res
 
+    def flush(self):
+        """Write the buffered messages into LogDB"""
+        res = 'flush-error'
+        try:
+            res = self.backend.flush()
+        except HTTPException as ex:
+            msg = "Failed to flush docs to LogDB. Reason: %s, status: %s" % (ex.reason, ex.status)
+            self.logger.error(msg)
+        except Exception as exc:
+            self.logger.error("LogDBBackend flush API failed, error=%s", str(exc))
+        if res == 'flush-error':
+            self.last_flush_error = time.time()
+        self.logger.debug("LogDB flush request, res=%s", res)
+        return res
+
+    def _flush_loop(self):
+        """Flush the buffered messages every flush_interval seconds"""
+        while not self.stop_flusher.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """Stop the background flushes and write the buffered messages"""
+        if self.flusher:
+            self.stop_flusher.set()
+            self.flusher.join()
+            self.flusher = None
+            self.flush()
+
     def get(self, request=None, mtype=None):
         """Retrieve all entries from LogDB for given request"""
         res = []
+        if self.flusher:
+            # read our own buffered messages too
+            self.flush()
         try:
             if request is None:
                 request = self.default_user
@@ -126,6 +178,9 @@ class LogDB(object):
         mtype != None - only delete specified mtype
         """
         res = 'delete-error'
+        if self.flusher:
+            # do not write buffered messages after their deletion
+            self.flush()
         try:
             if request is None:
                 request = self.default_user
@@ -153,6 +208,8 @@ class LogDB(object):
             self.logger.error("User %s: doesn't allow this function", self.identifier)
             return report
 
+        if self.flusher:
+            self.flush()
         for row in self.backend.get(self.default_user, None, agent=True).get('rows', []):
             identifier = row['doc']['identifier']
             # wmstats thread can run in multiple boxed.
@@ -8,7 +8,9 @@ Interface to LogDB persistent storage
 # syste modules
 import datetime
 import hashlib
+import threading
 import time
+from collections import OrderedDict
 
 # WMCore modules
 from WMCore.Database.CMSCouch import CouchServer, CouchNotFoundError
@@ -16,6 +18,10 @@ from WMCore.Services.LogDB.LogDBExceptions import LogDBError
 
 # define full list of supported LogDB types
 LOGDB_MSG_TYPES = ['info', 'error', 'warning', 'comment']
+# maximum number of messages kept in the buffer of a buffered LogDB
+LOGDB_MAX_BUFFER = 1000
+# maximum number of document revisions remembered by a buffered LogDB
+LOGDB_MAX_REVISIONS = 10000
 
 def gen_hash(key):
     "Generate hash for given key"
@@ -56,6 +62,13 @@ class LogDBBackend(object):
         self.tsview = 'tstamp' # name of tsview to look-up requests
         self.threadview = 'logByRequestAndThread'
         self.requestview = 'logByRequest'
+        # buffered updates, see buffer_update and flush
+        self.max_buffer = kwds.get('max_buffer', LOGDB_MAX_BUFFER)
+        self.buffer = OrderedDict()
+        self.buffered_msgs = 0
+        self.revisions = {}
+        self.buffer_lock = threading.Lock()
+        self.flush_lock = threading.Lock()
 
     def deleteDatabase(self):
         """Delete back-end database"""
@@ -117,6 +130,133 @@ class LogDBBackend(object):
             res = self.db.commitOne(doc)
         return res
 
+    def buffer_update(self, request, msg='', mtype="info"):
+        """
+        Buffer an agent (or user) update for given request, to be written
+        by the next flush call. Agent documents only keep the last message,
+        user documents keep all of them, the newest first.
+        Return True if the buffer is full and should be flushed.
+        """
+        if self.agent:
+            self.check(request, mtype)
+            mtype = self.prefix(mtype)
+        rec = {"ts": tstamp(), "msg": msg}
+        doc_id = self.docid(request, mtype)
+        with self.buffer_lock:
+            doc = self.buffer.get(doc_id)
+            if doc is None:
+                self.buffer[doc_id] = {"_id": doc_id, "messages": [rec],
+                                       "request": request, "identifier": self.dbid,
+                                       "thr": self.thread_name, "type": mtype}
+                self.buffered_msgs += 1
+            elif self.agent:
+                doc["messages"] = [rec]
+            else:
+                doc["messages"].insert(0, rec)
+                self.buffered_msgs += 1
+            self._trim()
+            return self.buffered_msgs >= self.max_buffer
+
+    def flush(self):
+        """
+        Write all the buffered updates with a single _bulk_docs call, using
+        the document revisions known from previous flushes. Documents which
+        revision is not known are looked up with a single _all_docs call.
+        Return the _bulk_docs results.
+        """
+        with self.flush_lock:
+            with self.buffer_lock:
+                docs = list(self.buffer.values())
+                self.buffer = OrderedDict()
+                self.buffered_msgs = 0
+            if not docs:
+                return []
+            try:
+                return self._bulk_commit(docs)
+            except Exception:
+                self._requeue(docs)
+                raise
+
+    def _bulk_commit(self, docs, retry=True):
+        """
+        Commit the buffered docs, merging the existing messages of user
+        documents. Conflicting documents are retried once with their
+        current revision.
+        """
+        if self.agent:
+            lookup = [doc["_id"] for doc in docs if doc["_id"] not in self.revisions]
+        else:
+            lookup = [doc["_id"] for doc in docs]
+        existing = {}
+        if lookup:
+            options = {} if self.agent else {'include_docs': True}
+            for row in self.db.allDocs(options, keys=lookup).get('rows', []):
+                value = row.get('value') or {}
+                if 'rev' in value and not value.get('deleted'):
+                    self.revisions[row['key']] = value['rev']
+                    if row.get('doc'):
+                        existing[row['key']] = row['doc'].get('messages', [])
+                else:
+                    self.revisions.pop(row['key'], None)
+
+        commit_docs = []
+        for doc in docs:
+            commit_doc = dict(doc)
+            if doc["_id"] in self.revisions:
+                commit_doc["_rev"] = self.revisions[doc["_id"]]
+            if not self.agent:
+                commit_doc["messages"] = doc["messages"] + existing.get(doc["_id"], [])
+            commit_docs.append(commit_doc)
+
+        if len(self.revisions) > LOGDB_MAX_REVISIONS:
+            self.revisions.clear()
+        results = self.db.post('/%s/_bulk_docs/' % self.db.name, {'docs': commit_docs})
+        conflicts = set()
+        for row in results:
+            if 'rev' in row:
+                self.revisions[row['id']] = row['rev']
+            else:
+                self.revisions.pop(row['id'], None)
+                if row.get('error') == 'conflict':
+                    conflicts.add(row['id'])
+        if conflicts and retry:
+            retried = self._bulk_commit([doc for doc in docs if doc["_id"] in conflicts], retry=False)
+            retried = dict((row['id'], row) for row in retried)
+            results = [retried.get(row['id'], row) for row in results]
+        return results
+
+    def _requeue(self, docs):
+        """
+        Put back in the buffer the docs of a failed flush, ahead of the
+        updates buffered meanwhile
+        """
+        with self.buffer_lock:
+            buffered = self.buffer
+            self.buffer = OrderedDict()
+            for doc in docs:
+                newer = buffered.pop(doc["_id"], None)
+                if newer is not None:
+                    if self.agent:
+                        doc = newer
+                    else:
+                        doc["messages"] = newer["messages"] + doc["messages"]
+                self.buffer[doc["_id"]] = doc
+            self.buffer.update(buffered)
+            self.buffered_msgs = sum(len(doc["messages"]) for doc in self.buffer.values())
+            self._trim()
+
+    def _trim(self):
+        """
+        Drop the oldest buffered messages above the buffer size,
+        must be called holding the buffer lock
+        """
+        while self.buffered_msgs > self.max_buffer:
+            doc_id, doc = next(iter(self.buffer.items()))
+            doc["messages"].pop()
+            if not doc["messages"]:
+                del self.buffer[doc_id]
+            self.buffered_msgs -= 1
+
     def get(self, request, mtype=None, detail=True, agent=True):
         """Retrieve all entries from LogDB for given request"""
         self.check(request, mtype)
@@ -168,6 +308,8 @@ class LogDBBackend(object):
             docs = self.get(request, mtype=mtype, detail=False, agent=agent)
         ids = [r['id'] for r in docs.get('rows', [])]
         res = self.db.bulkDeleteByIDs(ids)
+        for doc_id in ids:
+            self.revisions.pop(doc_id, None)
         return res
 
     def cleanup(self, thr):
@@ -182,4 +324,6 @@ class LogDBBackend(object):
         docs = self.db.loadView(self.design, self.tsview, spec)
         ids = [d['id'] for d in docs.get('rows', [])]
         self.db.bulkDeleteByIDs(ids)
+        for doc_id in ids:
+            self.revisions.pop(doc_id, None)
         return ids
@@ -428,6 +428,123 @@ class Rucio(object):
 
         return response
 
+    def createContainers(self, names, scope='cms', **kwargs):
+        """
+        _createContainers_
+
+        Create - in bulk - a list of CMS datasets (Rucio containers) in a given scope.
+        If the bulk call fails, e.g. because one of the containers already exists,
+        the containers are created one by one.
+        :param names: list of container names
+        :param scope: optional string with the scope name
+        :param kwargs: same keyword arguments as createContainer (only meta is used in bulk)
+        :return: a set with the containers that exist in Rucio
+        """
+        names = [name for name in set(names) if validateMetaData(name, kwargs.get("meta", {}), logger=self.logger)]
+        if not names:
+            return set()
+        dids = [dict(scope=scope, name=name, type="CONTAINER", meta=kwargs.get("meta", {})) for name in names]
+        try:
+            # add_dids(dids)
+            self.cli.add_dids(dids)
+            return set(names)
+        except Exception as ex:
+            self.logger.debug("Bulk container creation failed, creating them one by one. Error: %s", str(ex))
+        return set(name for name in names if self.createContainer(name, scope, **kwargs))
+
+    def createBlocks(self, names, rse, scope='cms', attach=True, **kwargs):
+        """
+        _createBlocks_
+
+        Create - in bulk - a list of CMS blocks (Rucio datasets) at a RSE and
+        attach them to their containers. If the bulk call fails, e.g. because
+        one of the blocks already exists, the blocks are created one by one.
+        :param names: list of block names
+        :param rse: string with the RSE name
+        :param scope: optional string with the scope name
+        :param attach: boolean whether to attach the blocks to their containers or not
+        :param kwargs: same keyword arguments as createBlock (only meta is used in bulk)
+        :return: a set with the blocks that exist (and are attached) in Rucio
+        """
+        names = [name for name in set(names) if validateMetaData(name, kwargs.get("meta", {}), logger=self.logger)]
+        if not names:
+            return set()
+        dids = [dict(scope=scope, name=name, type="DATASET", rse=rse, meta=kwargs.get("meta", {}))
+                for name in names]
+        try:
+            self.cli.add_dids(dids)
+        except Exception as ex:
+            self.logger.debug("Bulk block creation failed, creating them one by one. Error: %s", str(ex))
+            return set(name for name in names if self.createBlock(name, scope, attach, rse=rse, **kwargs))
+
+        if not attach:
+            return set(names)
+        blocksByContainer = {}
+        for name in names:
+            blocksByContainer.setdefault(name.split('#')[0], []).append(name)
+        attached = self.attachDIDsToDIDs(rse, blocksByContainer, scope)
+        return set(name for name in names if name.split('#')[0] in attached)
+
+    def attachDIDsToDIDs(self, rse, didsBySuperDID, scope='cms'):
+        """
+        _attachDIDsToDIDs_
+
+        Attach - in bulk - lists of data identifiers to several upper level DIDs.
+        If the bulk call fails, each list is attached on its own.
+        :param rse: string with the RSE name
+        :param didsBySuperDID: dictionary of upper level DID (container or block name)
+            to the list of DIDs (block or file names) to attach to it
+        :param scope: string with the scope name
+        :return: a set with the upper level DIDs that got all their DIDs attached
+        """
+        attachments = []
+        for superDID, dids in didsBySuperDID.items():
+            attachments.append({'scope': scope, 'name': superDID, 'rse': rse,
+                                'dids': [{'scope': scope, 'name': did} for did in dids]})
+        if not attachments:
+            return set()
+        try:
+            # attach_dids_to_dids(attachments, ignore_duplicate=True), DIDs already attached aren't an error
+            self.cli.attach_dids_to_dids(attachments, ignore_duplicate=True)
+            return set(didsBySuperDID)
+        except Exception as ex:
+            self.logger.debug("Bulk DID attachment failed, attaching them one by one. Error: %s", str(ex))
+        return set(superDID for superDID, dids in didsBySuperDID.items()
+                   if self.attachDIDs(rse, superDID, list(dids), scope))
+
+    def createReplicasInBlocks(self, rse, filesByBlock, scope='cms', ignoreAvailability=True):
+        """
+        _createReplicasInBlocks_
+
+        Create - in bulk - the files of several blocks at a RSE, then attach them to
+        their blocks. If the bulk call fails, the replicas are created block by block.
+        :param rse: string with the RSE name
+        :param filesByBlock: dictionary of block name to the list of file dictionaries
+            (see createReplicas)
+        :param scope: string with the scope name
+        :param ignoreAvailability: boolean to ignore the RSE blacklisting
+        :return: a set with the blocks that got all their replicas created and attached
+        """
+        files = []
+        for blockFiles in filesByBlock.values():
+            for item in blockFiles:
+                item['scope'] = scope
+                files.append(item)
+        if not files:
+            return set()
+        try:
+            # add_replicas(rse, files, ignore_availability=True)
+            self.cli.add_replicas(rse, files, ignoreAvailability)
+        except Exception as ex:
+            self.logger.debug("Bulk replica creation at %s failed, creating them block by block. Error: %s",
+                              rse, str(ex))
+            return set(block for block, blockFiles in filesByBlock.items()
+                       if self.createReplicas(rse, blockFiles, block, scope, ignoreAvailability))
+
+        lfnsByBlock = dict((block, [item['name'] for item in blockFiles])
+                           for block, blockFiles in filesByBlock.items())
+        return self.attachDIDsToDIDs(rse, lfnsByBlock, scope)
+
     def closeBlockContainer(self, name, scope='cms'):
         """
         _closeBlockContainer_
@@ -1,6 +1,12 @@
 from __future__ import division, print_function
 
 import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing.pool import ThreadPool
+
 from Utils.IteratorTools import nestedDictUpdate, grouper
 from WMCore.Database.CMSCouch import CouchServer
 from WMCore.Lexicon import splitCouchServiceURL, sanitizeURL
@@ -8,6 +14,29 @@ from WMCore.Services.RequestDB.RequestDBReader import RequestDBReader
 from WMCore.Services.WMStats.DataStruct.RequestInfoCollection import RequestInfo
 from WMCore.ReqMgr.DataStructs.RequestStatus import T0_ACTIVE_STATUS, WMSTATS_JOB_INFO, WMSTATS_NO_JOB_INFO
 
+# number of keys per latestRequest view query
+LATEST_JOB_INFO_SLICE = 5000
+# number of latestRequest view queries running concurrently
+LATEST_JOB_INFO_THREADS = 4
+
+# thread pools querying the latestRequest view slices, shared by the readers
+# of the process and keyed by (pid, size), a forked child can't use them
+_jobInfoPools = {}
+_jobInfoPoolsLock = threading.Lock()
+
+
+def _getJobInfoPool(size):
+    """
+    Return the thread pool with size threads of the current process
+    """
+    pid = os.getpid()
+    with _jobInfoPoolsLock:
+        if (pid, size) not in _jobInfoPools:
+            for key in [key for key in _jobInfoPools if key[0] != pid]:
+                del _jobInfoPools[key]
+            _jobInfoPools[(pid, size)] = ThreadPool(size)
+        return _jobInfoPools[(pid, size)]
+
 REQUEST_PROPERTY_MAP = {
     "_id": "_id",
     "InputDataset": "inputdataset",
@@ -58,7 +87,7 @@ def convertToLegacyFormat(requestDoc):
 class WMStatsReader(object):
 
     def __init__(self, couchURL, appName="WMStats", reqdbURL=None,
-                 reqdbCouchApp="ReqMgr", logger=None):
+                 reqdbCouchApp="ReqMgr", logger=None, jobInfoThreads=LATEST_JOB_INFO_THREADS):
         self._sanitizeURL(couchURL)
         # set the connection for local couchDB call
         self._commonInit(couchURL, appName)
@@ -67,6 +96,7 @@ class WMStatsReader(object):
         else:
             self.reqDB = None
         self.logger = logger if logger else logging.getLogger()
+        self.jobInfoThreads = jobInfoThreads
 
     def _sanitizeURL(self, couchURL):
         return sanitizeURL(couchURL)['url']
@@ -90,6 +120,17 @@ class WMStatsReader(object):
             options.update(self.defaultStale)
         return options
 
+    @contextmanager
+    def _stageTimer(self, stageTimes, stage):
+        """
+        Add to the stageTimes dictionary of the caller the time spent in a stage
+        """
+        tStart = time.time()
+        try:
+            yield
+        finally:
+            stageTimes[stage] = stageTimes.get(stage, 0) + time.time() - tStart
+
     def getLatestJobInfoByRequests(self, requestNames):
         jobInfoByRequestAndAgent = {}
 
@@ -98,10 +139,18 @@ class WMStatsReader(object):
             jobInfoByRequestAndAgent = self._getLatestJobInfo(requestAndAgentKey)
         return jobInfoByRequestAndAgent
 
-    def _updateRequestInfoWithJobInfo(self, requestInfo):
+    def updateRequestInfoWithJobInfo(self, requestInfo, stageTimes=None):
+        """
+        adds the latest agent job information to requestInfo ({requestName: requestDoc}) in place.
+        The agent documents are merged as the view slices arrive, without keeping them all in memory.
+        The time spent in each stage is added to the stageTimes dictionary, if given.
+        """
+        stageTimes = {} if stageTimes is None else stageTimes
         if requestInfo:
-            jobInfoByRequestAndAgent = self.getLatestJobInfoByRequests(requestInfo.keys())
-            self._combineRequestAndJobData(requestInfo, jobInfoByRequestAndAgent)
+            with self._stageTimer(stageTimes, "requestAgent"):
+                requestAndAgentKey = self._getRequestAndAgent(requestInfo.keys())
+            with self._stageTimer(stageTimes, "jobInfo"):
+                self._mergeJobInfoRows(requestInfo, self._iterLatestJobInfo(requestAndAgentKey))
 
     def _getCouchView(self, view, options, keys=None):
         keys = keys or []
@@ -170,13 +219,19 @@ class WMStatsReader(object):
            "type":"agent_request"}}
         """
         if jobData:
-            for row in jobData["rows"]:
-                # condition checks if documents are deleted between calls.
-                # just ignore in that case
-                if row["doc"]:
-                    jobInfo = requestData[row["doc"]["workflow"]]
-                    jobInfo.setdefault("AgentJobInfo", {})
-                    jobInfo["AgentJobInfo"][row["doc"]["agent_url"]] = row["doc"]
+            self._mergeJobInfoRows(requestData, jobData["rows"])
+
+    def _mergeJobInfoRows(self, requestData, rows):
+        """
+        update the request data with the agent documents of the latestRequest view rows
+        """
+        for row in rows:
+            # condition checks if documents are deleted between calls.
+            # just ignore in that case
+            if row["doc"]:
+                jobInfo = requestData[row["doc"]["workflow"]]
+                jobInfo.setdefault("AgentJobInfo", {})
+                jobInfo["AgentJobInfo"][row["doc"]["agent_url"]] = row["doc"]
 
     def _getRequestAndAgent(self, filterRequest=None):
         """
@@ -190,6 +245,7 @@ class WMStatsReader(object):
         if filterRequest is None:
             keys = [row['key'] for row in result["rows"]]
         else:
+            filterRequest = set(filterRequest)
             keys = [row['key'] for row in result["rows"] if row['key'][0] in filterRequest]
         return keys
 
@@ -209,19 +265,35 @@ class WMStatsReader(object):
         """
         if not keys:
             return []
-        options = {}
-        options["include_docs"] = True
-        options["reduce"] = False
-        finalResults = {}
+        return {'rows': list(self._iterLatestJobInfo(keys))}
+
+    def _getLatestJobInfoSlice(self, keys):
+        """
+        Query the latestRequest view for a slice of keys, with its own
+        database connection so that slices can be queried concurrently
+        """
+        options = self.setDefaultStaleOptions({"include_docs": True, "reduce": False})
+        self.logger.info("Querying latestRequest with %d keys", len(keys))
+        couchDB = self.couchServer.connectDatabase(self.dbName, False)
+        return couchDB.loadView(self.couchapp, "latestRequest", options, keys)
+
+    def _iterLatestJobInfo(self, keys):
+        """
+        Same as _getLatestJobInfo, but yields the view rows as the slices
+        of keys, queried concurrently, are answered
+        """
         # magic number: 5000 keys (need to check which number is optimal)
-        for sliceKeys in grouper(keys, 5000):
-            self.logger.info("Querying latestRequest with %d keys", len(sliceKeys))
-            result = self._getCouchView("latestRequest", options, sliceKeys)
-            if not finalResults and result:
-                finalResults = result
-            elif result.get('rows'):
-                finalResults['rows'].extend(result['rows'])
-        return finalResults
+        slices = list(grouper(keys, LATEST_JOB_INFO_SLICE))
+        if len(slices) <= 1 or self.jobInfoThreads <= 1:
+            for sliceKeys in slices:
+                for row in self._getLatestJobInfoSlice(sliceKeys).get('rows', []):
+                    yield row
+            return
+
+        pool = _getJobInfoPool(self.jobInfoThreads)
+        for result in pool.imap_unordered(self._getLatestJobInfoSlice, slices):
+            for row in result.get('rows', []):
+                yield row
 
     def _getAllDocsByIDs(self, ids, include_docs=True):
         """
@@ -291,9 +363,79 @@ class WMStatsReader(object):
 
         if jobInfoFlag:
             # get request and agent info
-            self._updateRequestInfoWithJobInfo(requestInfo)
+            self.updateRequestInfoWithJobInfo(requestInfo)
         return requestInfo
 
+    def getUpdateSequences(self):
+        """
+        returns the current update sequence of the request and wmstats databases,
+        in the format used by the DataCache incremental updates
+        """
+        return {"reqmgr": self.reqDB.couchDB.info()["update_seq"],
+                "wmstats": self.couchDB.info()["update_seq"]}
+
+    def _getChangedIDs(self, couchDB, since, filterName=None, limit=1000):
+        """
+        pages through the changes feed of couchDB starting at the since sequence.
+        returns a tuple of (changed doc ids, deleted doc ids, last sequence)
+        """
+        changed = set()
+        deleted = set()
+        while True:
+            if filterName:
+                data = couchDB.changesWithFilter(filterName, limit, since)
+            else:
+                data = couchDB.changes(since, limit)
+            for row in data.get("results", []):
+                if row["id"].startswith("_design/"):
+                    continue
+                if row.get("deleted"):
+                    deleted.add(row["id"])
+                    changed.discard(row["id"])
+                else:
+                    changed.add(row["id"])
+                    deleted.discard(row["id"])
+            since = data["last_seq"]
+            if len(data.get("results", [])) < limit:
+                break
+        return changed, deleted, since
+
+    def getRequestChanges(self, since, statusList):
+        """
+        gets the request documents changed in ReqMgr since the given update sequence.
+        returns a tuple of ({requestName: doc} for the requests in statusList,
+        set of request names which left statusList or were deleted, last sequence)
+        """
+        changed, removed, lastSeq = self._getChangedIDs(self.reqDB.couchDB, since)
+        requestInfo = {}
+        if changed:
+            docs = self.reqDB.getRequestByNames(list(changed), True)
+            for requestName, doc in docs.items():
+                if doc and doc.get("RequestStatus") in statusList:
+                    requestInfo[requestName] = doc
+                else:
+                    removed.add(requestName)
+        self.logger.info("ReqMgr changes since %s: %d active requests updated, %d removed",
+                         since, len(requestInfo), len(removed))
+        return requestInfo, removed, lastSeq
+
+    def getAgentRequestChanges(self, since):
+        """
+        gets the agent_request documents changed in WMStats since the given update sequence.
+        returns a tuple of (list of agent_request docs, set of deleted doc ids, last sequence)
+        """
+        changed, deleted, lastSeq = self._getChangedIDs(self.couchDB, since,
+                                                        filterName="%s/agentRequestFilter" % self.couchapp)
+        docs = []
+        if changed:
+            for row in self._getAllDocsByIDs(list(changed))["rows"]:
+                doc = row.get("doc")
+                if doc and doc.get("type") == "agent_request":
+                    docs.append(doc)
+        self.logger.info("WMStats changes since %s: %d agent_request docs updated, %d deleted",
+                         since, len(docs), len(deleted))
+        return docs, deleted, lastSeq
+
     def getActiveData(self, listStatuses, jobInfoFlag=False):
         return self.getRequestByStatus(listStatuses, jobInfoFlag)
 
@@ -310,10 +452,12 @@ class WMStatsReader(object):
         If legacyFormat is True convert data to old wmstats format from current reqmgr format.
         Shouldn't be set to True unless existing code breaks
         """
+        stageTimes = {}
         results = dict()
         for status in statusList:
             self.logger.info("Fetching workflows by status from ReqMgr2, status: %s", status)
-            requestInfo = self.reqDB.getRequestByStatus(status, True, limit, skip)
+            with self._stageTimer(stageTimes, "requests"):
+                requestInfo = self.reqDB.getRequestByStatus(status, True, limit, skip)
             self.logger.info("Found %d workflows in status: %s", len(requestInfo), status)
 
             if legacyFormat:
@@ -325,8 +469,10 @@ class WMStatsReader(object):
         # now update these requests with agent information too
         if results and jobInfoFlag:
             self.logger.info("Now updating these requests with job info...")
-            self._updateRequestInfoWithJobInfo(results)
+            self.updateRequestInfoWithJobInfo(results, stageTimes)
 
+        self.logger.info("Time spent fetching %d requests by stage: %s", len(results),
+                         ", ".join("%s %.3f secs" % (stage, secs) for stage, secs in sorted(stageTimes.items())))
         return results
 
     def getRequestSummaryWithJobInfo(self, requestName):
@@ -334,7 +480,7 @@ class WMStatsReader(object):
         get request info with job status
         """
         requestInfo = self.reqDB.getRequestByNames(requestName)
-        self._updateRequestInfoWithJobInfo(requestInfo)
+        self.updateRequestInfoWithJobInfo(requestInfo)
         return requestInfo
 
     def getArchivedRequests(self):
@@ -8,6 +8,7 @@ A simple object representing a file in WMBS.
 import logging
 import threading
 
+from WMCore.DAOFactory import DAOFactory
 from WMCore.DataStructs.File import File as WMFile
 from WMCore.DataStructs.Run import Run
 from WMCore.WMBS.WMBSBase import WMBSBase
@@ -94,85 +95,45 @@ class File(WMBSBase, WMFile):
         result.sort()  # ensure SecondaryInputFiles are in order
         return [x['lfn'] for x in result]
 
-    def getAncestors(self, level=2, type="id"):
+    def getAncestors(self, level=2, type="id", cache=None):
         """
         Get ancestorLFNs. it will access directly DAO.
         level indicates the level of ancestors. default value is 2
         (grand parents). level should be bigger than >= 1
+        An optional ParentageCache can be given to reuse the parentage
+        already loaded in the current transaction.
         """
         existingTransaction = self.beginTransaction()
 
-        def _getAncestorIDs(ids, level):
-            action = self.daofactory(classname="Files.GetParentIDsByID")
-            parentIDs = sorted(action.execute(ids, conn=self.getDBConn(), transaction=self.existingTransaction()))
-
-            if level == 1 or len(parentIDs) == 0:
-                return parentIDs
-            else:
-                return _getAncestorIDs(parentIDs, level - 1)
-
         if self["id"] < 0:
             self.load()
 
-        idList = _getAncestorIDs(self["id"], level)
-
-        if type == "id":
-            results = idList
-        elif type == "lfn":
-            results = []
-            for fileID in idList:
-                anceFile = File(id=fileID)
-                anceFile.load()
-                results.append(anceFile["lfn"])
-        elif type == "file":
-            results = []
-            for fileID in idList:
-                anceFile = File(id=fileID)
-                anceFile.load()
-                results.append(anceFile)
+        results = getAncestorsInBulk([self["id"]], level=level, type=type, cache=cache,
+                                     conn=self.getDBConn(),
+                                     transaction=self.existingTransaction())
 
         self.commitTransaction(existingTransaction)
-        return results
+        return results[self["id"]]
 
-    def getDescendants(self, level=2, type="id"):
+    def getDescendants(self, level=2, type="id", cache=None):
         """
         Get descendants. it will access directly DAO.
         level indicates the level of ancestors. default value is 2
         (grand parents). level should be bigger than >= 1
+        An optional ParentageCache can be given to reuse the parentage
+        already loaded in the current transaction.
         """
         existingTransaction = self.beginTransaction()
 
-        def _getDescendantIDs(ids, level):
-            action = self.daofactory(classname="Files.GetChildIDsByID")
-            childIDs = sorted(action.execute(ids, conn=self.getDBConn(), transaction=self.existingTransaction()))
-
-            if level == 1 or len(childIDs) == 0:
-                return childIDs
-            else:
-                return _getDescendantIDs(childIDs, level - 1)
-
         if self["id"] < 0:
             self.load()
 
-        idList = _getDescendantIDs(self["id"], level)
-
-        if type == "id":
-            results = idList
-        elif type == "lfn":
-            results = []
-            for fileID in idList:
-                descFile = File(id=fileID)
-                descFile.load()
-                results.append(descFile['lfn'])
-        elif type == "file":
-            results = []
-            for fileID in idList:
-                descFile = File(id=fileID)
-                descFile.load()
-                results.append(descFile)
+        results = getDescendantsInBulk([self["id"]], level=level, type=type, cache=cache,
+                                       conn=self.getDBConn(),
+                                       transaction=self.existingTransaction())
 
         self.commitTransaction(existingTransaction)
-        return results
+        return results[self["id"]]
 
     def load(self):
         """
@@ -620,3 +581,117 @@ def addFilesToWMBSInBulk(filesetId, workflowName, files, isDBS=True,
                              transaction=transaction)
 
     return len(lfnsToCreate)
+
+
+class ParentageCache(object):
+    """
+    _ParentageCache_
+
+    In memory cache of the file parentage and file meta data loaded by
+    getAncestorsInBulk and getDescendantsInBulk. It is meant to live for
+    the duration of a transaction, as it is never invalidated when the
+    parentage changes in the database.
+    """
+
+    def __init__(self):
+        self.parents = {}
+        self.children = {}
+        self.files = {}
+
+    def clear(self):
+        """
+        _clear_
+
+        Drop everything cached so far
+        """
+        self.parents.clear()
+        self.children.clear()
+        self.files.clear()
+
+
+def _getRelativesInBulk(fileIDs, level, type, relatives, cache, conn, transaction):
+    """
+    _getRelativesInBulk_
+
+    Walk the parentage level by level for all the files at the same time,
+    with one query per level for the file ids not cached yet. relatives is
+    either "parents" or "children". Returns a dictionary of file id to the
+    sorted list of relatives found at the given level.
+    """
+    cache = cache if cache is not None else ParentageCache()
+    relativeMap = getattr(cache, relatives)
+    daoName = "Files.GetParentMapByID" if relatives == "parents" else "Files.GetChildMapByID"
+
+    myThread = threading.currentThread()
+    daofactory = DAOFactory(package="WMCore.WMBS", logger=myThread.logger,
+                            dbinterface=myThread.dbi)
+    relativesAction = daofactory(classname=daoName)
+
+    # set of files reached at the current level for each of the requested files
+    current = dict((fileID, set([fileID])) for fileID in fileIDs)
+    for _ in range(level):
+        levelIDs = set().union(*current.values())
+        if not levelIDs:
+            break
+        missingIDs = [fileID for fileID in levelIDs if fileID not in relativeMap]
+        if missingIDs:
+            relativeMap.update(relativesAction.execute(missingIDs, conn=conn,
+                                                       transaction=transaction))
+        for fileID in current:
+            current[fileID] = set().union(*[relativeMap[x] for x in current[fileID]])
+
+    results = dict((fileID, sorted(ids)) for fileID, ids in current.items())
+    if type == "id":
+        return results
+
+    missingIDs = set().union(*current.values()) - set(cache.files)
+    if missingIDs:
+        loadAction = daofactory(classname="Files.GetByID")
+        checksumAction = daofactory(classname="Files.GetChecksumsByID")
+        fileInfo = loadAction.execute(list(missingIDs), conn=conn, transaction=transaction)
+        checksums = checksumAction.execute(list(missingIDs), conn=conn, transaction=transaction)
+        for fileID in fileInfo:
+            fileInfo[fileID]["checksums"] = checksums.get(fileID, {})
+        cache.files.update(fileInfo)
+
+    for fileID, ids in results.items():
+        if type == "lfn":
+            results[fileID] = [cache.files[x]["lfn"] for x in ids]
+        else:
+            results[fileID] = [_fileFromInfo(cache.files[x]) for x in ids]
+    return results
+
+
+def _fileFromInfo(fileInfo):
+    """
+    _fileFromInfo_
+
+    Build a File object out of the meta data loaded by Files.GetByID
+    """
+    wmbsFile = File(id=fileInfo["id"])
+    wmbsFile.update(fileInfo)
+    wmbsFile["checksums"] = dict(fileInfo["checksums"])
+    return wmbsFile
+
+
+def getAncestorsInBulk(fileIDs, level=2, type="id", cache=None, conn=None, transaction=False):
+    """
+    _getAncestorsInBulk_
+
+    Get the ancestors at the given level (2 being the grand parents) of
+    many files at once. Returns a dictionary of file id to the list of
+    ancestor ids, lfns or File objects depending on type, sorted by id.
+    An optional ParentageCache avoids reloading the parentage and file
+    meta data already loaded in the same transaction.
+    """
+    return _getRelativesInBulk(fileIDs, level, type, "parents", cache, conn, transaction)
+
+
+def getDescendantsInBulk(fileIDs, level=2, type="id", cache=None, conn=None, transaction=False):
+    """
+    _getDescendantsInBulk_
+
+    Get the descendants at the given level (2 being the grand children)
+    of many files at once, see getAncestorsInBulk.
+    """
+    return _getRelativesInBulk(fileIDs, level, type, "children", cache, conn, transaction)
@@ -130,6 +130,16 @@ class Mask(WMBSBase, WMMask):
 
         self.commitTransaction(existingTransaction)
 
+        self.loadFromEntries(jobMask)
+        return
+
+    def loadFromEntries(self, jobMask):
+        """
+        _loadFromEntries_
+
+        Fill the mask with the entries loaded from the database by the
+        Masks.Load DAO (allows to load the masks of several jobs at once).
+        """
         # Now we get a bit weird.
         # We assemble things into a list
         # NOTE: Right now this will totally break down if you have multiple mask entries
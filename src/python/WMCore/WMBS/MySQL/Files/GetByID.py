@@ -47,6 +47,7 @@ class GetByID(DBFormatter):
             tmpDict["lfn"]         = entry["lfn"]
             tmpDict["events"]      = int(entry["events"])
             tmpDict["first_event"] = int(entry["first_event"])
+            tmpDict["merged"]      = bool(int(entry["merged"]))
             if "size" in entry.keys():
                 tmpDict["size"]    = int(entry["size"])
             else:
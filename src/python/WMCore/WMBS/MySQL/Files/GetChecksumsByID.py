@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+"""
+_GetChecksumsByID_
+
+MySQL implementation of Files.GetChecksumsByID
+
+Load the checksums of a list of files with a single query. Returns a
+dictionary of file id to a dictionary of checksum type to checksum,
+files without checksums are not part of the result.
+"""
+
+from WMCore.Database.DBFormatter import DBFormatter
+
+
+class GetChecksumsByID(DBFormatter):
+    sql = """SELECT fcs.fileid AS fileid, cst.type AS cktype, fcs.cksum AS cksum
+               FROM wmbs_file_checksums fcs
+               INNER JOIN wmbs_checksum_type cst ON fcs.typeid = cst.id
+               WHERE fcs.fileid = :fileid"""
+
+    def execute(self, files=None, conn=None, transaction=False):
+        files = self.dbi.makelist(files)
+        if not files:
+            return {}
+
+        binds = [{'fileid': fileID} for fileID in set(files)]
+        result = self.dbi.processData(self.sql, binds,
+                                      conn=conn, transaction=transaction)
+        checksums = {}
+        for entry in self.formatDict(result):
+            checksums.setdefault(int(entry["fileid"]), {})[entry["cktype"]] = entry["cksum"]
+        return checksums
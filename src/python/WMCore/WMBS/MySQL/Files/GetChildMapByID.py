@@ -0,0 +1,29 @@
+#!/usr/bin/env python
+"""
+_GetChildMapByID_
+
+MySQL implementation of Files.GetChildMapByID
+
+Return the ids of the children of a list of files, as a dictionary of
+file id to the set of children ids. Files without children are mapped to
+an empty set.
+"""
+
+from WMCore.Database.DBFormatter import DBFormatter
+
+
+class GetChildMapByID(DBFormatter):
+    sql = """SELECT parent, child FROM wmbs_file_parent WHERE parent = :parent"""
+
+    def execute(self, ids=None, conn=None, transaction=False):
+        ids = self.dbi.makelist(ids)
+        results = dict((int(fileID), set()) for fileID in ids)
+        if not ids:
+            return results
+
+        binds = [{'parent': fileID} for fileID in results]
+        result = self.dbi.processData(self.sql, binds,
+                                      conn=conn, transaction=transaction)
+        for fileID, childID in self.format(result):
+            results[int(fileID)].add(int(childID))
+        return results
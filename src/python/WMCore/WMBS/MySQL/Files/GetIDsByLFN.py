@@ -0,0 +1,25 @@
+#!/usr/bin/env python
+"""
+_GetIDsByLFN_
+
+MySQL implementation of Files.GetIDsByLFN
+
+Return the ids of a list of files as a dictionary of lfn to file id.
+Files not in WMBS are not part of the result.
+"""
+
+from WMCore.Database.DBFormatter import DBFormatter
+
+
+class GetIDsByLFN(DBFormatter):
+    sql = """SELECT lfn, id FROM wmbs_file_details WHERE lfn = :lfn"""
+
+    def execute(self, lfns=None, conn=None, transaction=False):
+        lfns = self.dbi.makelist(lfns)
+        if not lfns:
+            return {}
+
+        binds = [{'lfn': lfn} for lfn in set(lfns)]
+        result = self.dbi.processData(self.sql, binds,
+                                      conn=conn, transaction=transaction)
+        return dict((lfn, int(fileID)) for lfn, fileID in self.format(result))
@@ -13,7 +13,7 @@ from WMCore.Database.DBFormatter import DBFormatter
 
 
 class GetParentAndGrandParentInfo(DBFormatter):
-    sql = """SELECT wfp.id, wfp.lfn, wfp.merged,
+    sql = """SELECT wfd.lfn AS child_lfn, wfp.id, wfp.lfn, wfp.merged,
                     wfgp.lfn AS gplfn, wfgp.merged AS gpmerged
              FROM wmbs_file_details wfp
              INNER JOIN wmbs_file_parent wfpa ON wfpa.parent = wfp.id
@@ -0,0 +1,29 @@
+#!/usr/bin/env python
+"""
+_GetParentMapByID_
+
+MySQL implementation of Files.GetParentMapByID
+
+Return the ids of the parents of a list of files, as a dictionary of
+file id to the set of parents ids. Files without parents are mapped to
+an empty set.
+"""
+
+from WMCore.Database.DBFormatter import DBFormatter
+
+
+class GetParentMapByID(DBFormatter):
+    sql = """SELECT child, parent FROM wmbs_file_parent WHERE child = :child"""
+
+    def execute(self, ids=None, conn=None, transaction=False):
+        ids = self.dbi.makelist(ids)
+        results = dict((int(fileID), set()) for fileID in ids)
+        if not ids:
+            return results
+
+        binds = [{'child': fileID} for fileID in results]
+        result = self.dbi.processData(self.sql, binds,
+                                      conn=conn, transaction=transaction)
+        for fileID, parentID in self.format(result):
+            results[int(fileID)].add(int(parentID))
+        return results
@@ -14,10 +14,18 @@ class GetFWJRByState(DBFormatter):
     """
     _GetFWJRByState_
 
-    Retrieve the ID and framework job report path of all jobs in a particular
-    state.
+    Retrieve the ID, framework job report path and workflow (request) name
+    of all jobs in a particular state.
     """
-    sql = """SELECT id, fwjr_path FROM wmbs_job WHERE state =
+    sql = """SELECT wmbs_job.id, wmbs_job.fwjr_path, wmbs_workflow.name
+             FROM wmbs_job
+               INNER JOIN wmbs_jobgroup ON
+                 wmbs_jobgroup.id = wmbs_job.jobgroup
+               INNER JOIN wmbs_subscription ON
+                 wmbs_subscription.id = wmbs_jobgroup.subscription
+               INNER JOIN wmbs_workflow ON
+                 wmbs_workflow.id = wmbs_subscription.workflow
+             WHERE wmbs_job.state =
                (SELECT id FROM wmbs_job_state WHERE name = :state)"""
 
     def format(self, results):
@@ -29,7 +37,7 @@ class GetFWJRByState(DBFormatter):
 
         jobs = []
         for result in results:
-            jobs.append({"id": result[0], "fwjr_path": result[1]})
+            jobs.append({"id": result[0], "fwjr_path": result[1], "workflow": result[2]})
 
         return jobs
 
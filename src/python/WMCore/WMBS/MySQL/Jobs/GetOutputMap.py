@@ -8,7 +8,8 @@ MySQL implementation of Jobs.GetOutputMap
 from WMCore.Database.DBFormatter import DBFormatter
 
 class GetOutputMap(DBFormatter):
-    sql = """SELECT wmbs_workflow_output.output_identifier AS wf_output_id,
+    sql = """SELECT wmbs_job.id AS jobid,
+                    wmbs_workflow_output.output_identifier AS wf_output_id,
                     wmbs_workflow_output.output_fileset AS wf_output_fset,
                     wmbs_workflow_output.merged_output_fileset AS wf_output_mfset
                     FROM wmbs_workflow_output
@@ -21,14 +22,28 @@ class GetOutputMap(DBFormatter):
              WHERE wmbs_job.id = :jobid"""
 
     def execute(self, jobID, conn = None, transaction = False):
-        results = self.dbi.processData(self.sql, {"jobid": jobID}, conn = conn,
+        """
+        Return the output map of a job, or a dictionary of job id to
+        output map if a list of job ids is given.
+        """
+        isList = isinstance(jobID, list)
+        if isList:
+            if not jobID:
+                return {}
+            binds = [{"jobid": job} for job in jobID]
+        else:
+            binds = {"jobid": jobID}
+        results = self.dbi.processData(self.sql, binds, conn = conn,
                                        transaction = transaction)
 
-        outputMap = {}
+        outputMaps = dict((job, {}) for job in jobID) if isList else {}
         for result in self.formatDict(results):
+            outputMap = outputMaps.setdefault(result["jobid"], {})
             if result["wf_output_id"] not in outputMap:
                 outputMap[result["wf_output_id"]] = []
 
             outputMap[result["wf_output_id"]].append({"output_fileset": result["wf_output_fset"],
                                                       "merged_output_fileset": result["wf_output_mfset"]})
-        return outputMap
+        if isList:
+            return outputMaps
+        return outputMaps.get(jobID, {})
@@ -18,7 +18,7 @@ class LoadOutputID(DBFormatter):
     """
 
 
-    sql = """SELECT wfs.id AS id FROM wmbs_fileset wfs
+    sql = """SELECT wj.id AS jobid, wfs.id AS id FROM wmbs_fileset wfs
                 INNER JOIN wmbs_jobgroup wjg ON wjg.output = wfs.id
                 INNER JOIN wmbs_job wj ON wj.jobgroup = wjg.id
                 WHERE wj.id = :jobid"""
@@ -26,9 +26,16 @@ class LoadOutputID(DBFormatter):
 
     def execute(self, jobID, conn = None, transaction = False):
         """
-        Given a jobID, find the fileset
+        Given a jobID, find the fileset. If a list of job ids is given
+        return a dictionary of job id to output fileset id.
 
         """
+        if isinstance(jobID, list):
+            if not jobID:
+                return {}
+            result = self.dbi.processData(self.sql, [{"jobid": job} for job in jobID],
+                                          conn = conn, transaction = transaction)
+            return dict((entry['jobid'], entry['id']) for entry in self.formatDict(result))
 
         result = self.dbi.processData(self.sql, {"jobid": jobID}, conn = conn,
                                       transaction = transaction)
@@ -12,7 +12,7 @@ __all__ = []
 from WMCore.Database.DBFormatter import DBFormatter
 
 class Load(DBFormatter):
-    sql = """SELECT DISTINCT FirstEvent, LastEvent, FirstLumi, LastLumi, FirstRun,
+    sql = """SELECT DISTINCT job, FirstEvent, LastEvent, FirstLumi, LastLumi, FirstRun,
              LastRun FROM wmbs_job_mask WHERE job = :jobid"""
 
     def format(self, results):
@@ -28,13 +28,27 @@ class Load(DBFormatter):
             tmpDict['LastLumi']   = entry['lastlumi']
             tmpDict['FirstRun']   = entry['firstrun']
             tmpDict['LastRun']    = entry['lastrun']
+            tmpDict['jobid']      = entry['job']
 
             out.append(tmpDict)
 
         return out
 
     def execute(self, jobid, conn = None, transaction = False):
+        """
+        Return the list of mask entries of a job, or a dictionary of
+        job id to mask entries if a list of job ids is given.
+        """
+        if isinstance(jobid, list) and not jobid:
+            return {}
         binds = self.getBinds(jobid = jobid)
         result = self.dbi.processData(self.sql, binds, conn = conn,
                                       transaction = transaction)
-        return self.format(result)
+        masks = self.format(result)
+        if not isinstance(jobid, list):
+            return masks
+
+        jobMasks = dict((job, []) for job in jobid)
+        for mask in masks:
+            jobMasks.setdefault(mask['jobid'], []).append(mask)
+        return jobMasks
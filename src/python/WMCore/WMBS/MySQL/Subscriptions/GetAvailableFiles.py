@@ -17,37 +17,46 @@ class GetAvailableFiles(DBFormatter):
                INNER JOIN wmbs_pnns wpnn ON wpnn.id = wfl.pnn
              WHERE wsfa.subscription = :subscription"""
 
-    def formatDict(self, results):
+    @staticmethod
+    def _locationIndex(keys):
         """
-        _formatDict_
+        _locationIndex_
 
-        Cast the file column to an integer as the DBFormatter's formatDict()
-        method turns everything into strings.  Also, fixup the results of the
-        Oracle query by renaming 'fileid' to file.
+        Return the column index of the pnn in the result, None if the
+        query doesn't return it.
         """
-        formattedResults = DBFormatter.formatDict(self, results)
+        keys = [str(key).lower() for key in keys]
+        return keys.index("pnn") if "pnn" in keys else None
 
-        for formattedResult in formattedResults:
-            if "file" in formattedResult.keys():
-                formattedResult["file"] = int(formattedResult["file"])
-            else:
-                formattedResult["file"] = int(formattedResult["fileid"])
+    def groupLocations(self, results):
+        """
+        _groupLocations_
 
-        # Now the tricky part
-        tempResults = {}
-        for formattedResult in formattedResults:
-            fileID = formattedResult['file']
-            if fileID not in tempResults.keys():
-                tempResults[fileID] = []
-            if "pnn" in formattedResult.keys():
-                if not formattedResult['pnn'] in tempResults[fileID]:
-                    tempResults[fileID].append(formattedResult["pnn"])
+        Group the (fileid, pnn) rows in a dictionary of file id to the
+        set of locations of the file.
+        """
+        fileLocations = {}
+        for result in results:
+            pnnIndex = self._locationIndex(result.keys)
+            for row in result.fetchall():
+                locations = fileLocations.setdefault(int(row[0]), set())
+                if pnnIndex is not None:
+                    locations.add(str(row[pnnIndex]))
+            result.close()
+        return fileLocations
 
+    def formatDict(self, results):
+        """
+        _formatDict_
+
+        Return a list of dictionaries with the file id under 'file' and the
+        list of locations under 'locations' (only if the file has any).
+        """
         finalResults = []
-        for key in tempResults.keys():
-            tmpDict = {"file": key}
-            if not tempResults[key] == []:
-                tmpDict['locations'] = tempResults[key]
+        for fileID, locations in self.groupLocations(results).items():
+            tmpDict = {"file": fileID}
+            if locations:
+                tmpDict['locations'] = sorted(locations)
             finalResults.append(tmpDict)
 
         return finalResults
@@ -61,3 +70,48 @@ class GetAvailableFiles(DBFormatter):
         results = self.dbi.processData(self.sql, {"subscription": subscription},
                                        conn=conn, transaction=transaction)
         return self.formatDict(results)
+
+    def executeStream(self, subscription, size=10000):
+        """
+        _executeStream_
+
+        Generator of (file id, frozenset of locations) tuples for all the
+        available files, reading the rows from the database size rows at a
+        time instead of loading them all in memory. The query runs on its
+        own connection with a server side cursor (stream_results), so the
+        caller can keep using its connection while the generator is
+        consumed. Only committed data is seen by the stream: it must not be
+        used inside an open transaction which added or changed available
+        files, use execute on the transaction connection instead.
+        """
+        connection = self.dbi.connection().execution_options(stream_results=True)
+        try:
+            # rows of the same file must be consecutive to be streamed
+            cursors = self.dbi.processData(self.sql + " ORDER BY 1", {"subscription": subscription},
+                                           conn=connection, transaction=True,
+                                           returnCursor=True)
+            for cursor in cursors:
+                try:
+                    keys = cursor.keys if isinstance(cursor.keys, list) else list(cursor.keys())
+                    pnnIndex = self._locationIndex(keys)
+                    currentID = None
+                    locations = set()
+                    while True:
+                        rows = cursor.fetchmany(size)
+                        if not rows:
+                            break
+                        for row in rows:
+                            fileID = int(row[0])
+                            if fileID != currentID:
+                                if currentID is not None:
+                                    yield currentID, frozenset(locations)
+                                currentID = fileID
+                                locations = set()
+                            if pnnIndex is not None:
+                                locations.add(str(row[pnnIndex]))
+                    if currentID is not None:
+                        yield currentID, frozenset(locations)
+                finally:
+                    cursor.close()
+        finally:
+            connection.close()
@@ -0,0 +1,12 @@
+#!/usr/bin/env python
+"""
+_GetChecksumsByID_
+
+Oracle implementation of Files.GetChecksumsByID
+"""
+
+from WMCore.WMBS.MySQL.Files.GetChecksumsByID import GetChecksumsByID as MySQLGetChecksumsByID
+
+
+class GetChecksumsByID(MySQLGetChecksumsByID):
+    pass
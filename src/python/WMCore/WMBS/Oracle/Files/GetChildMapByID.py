@@ -0,0 +1,12 @@
+#!/usr/bin/env python
+"""
+_GetChildMapByID_
+
+Oracle implementation of Files.GetChildMapByID
+"""
+
+from WMCore.WMBS.MySQL.Files.GetChildMapByID import GetChildMapByID as MySQLGetChildMapByID
+
+
+class GetChildMapByID(MySQLGetChildMapByID):
+    pass
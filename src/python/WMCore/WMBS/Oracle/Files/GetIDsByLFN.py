@@ -0,0 +1,12 @@
+#!/usr/bin/env python
+"""
+_GetIDsByLFN_
+
+Oracle implementation of Files.GetIDsByLFN
+"""
+
+from WMCore.WMBS.MySQL.Files.GetIDsByLFN import GetIDsByLFN as MySQLGetIDsByLFN
+
+
+class GetIDsByLFN(MySQLGetIDsByLFN):
+    pass
@@ -0,0 +1,12 @@
+#!/usr/bin/env python
+"""
+_GetParentMapByID_
+
+Oracle implementation of Files.GetParentMapByID
+"""
+
+from WMCore.WMBS.MySQL.Files.GetParentMapByID import GetParentMapByID as MySQLGetParentMapByID
+
+
+class GetParentMapByID(MySQLGetParentMapByID):
+    pass
@@ -207,6 +207,66 @@ class Subscription(WMBSBase, WMSubscription):
         self.commitTransaction(existingTransaction)
         return files
 
+    def availableFilesByLocation(self, limit=None, loadChecksums=True,
+                                 doingJobSplitting=False, chunkSize=10000):
+        """
+        _availableFilesByLocation_
+
+        Return the available File objects (at most limit of them) in a
+        dictionary keyed by the frozenset of their locations. The available
+        files are streamed from the database and their details loaded in
+        bulk chunkSize files at a time. Within a transaction opened by the
+        caller they are read with a regular query on its connection, so that
+        its uncommitted rows are seen.
+        """
+        existingTransaction = self.beginTransaction()
+
+        action = self.daofactory(classname="Subscriptions.GetAvailableFiles")
+        if doingJobSplitting:
+            fileInfoAct = self.daofactory(classname="Files.GetForJobSplittingByID")
+        else:
+            fileInfoAct = self.daofactory(classname="Files.GetByID")
+        checksumAct = self.daofactory(classname="Files.GetChecksumsByID")
+
+        def _addChunk(chunk):
+            fileIDs = list(chunk)
+            fileInfoDict = fileInfoAct.execute(file=fileIDs, conn=self.getDBConn(),
+                                               transaction=self.existingTransaction())
+            checksumDict = {}
+            if loadChecksums:
+                checksumDict = checksumAct.execute(files=fileIDs, conn=self.getDBConn(),
+                                                   transaction=self.existingTransaction())
+            for fileID, locations in chunk.items():
+                fl = File(id=fileID)
+                if fileID in checksumDict:
+                    fl["checksums"] = checksumDict[fileID]
+                fl.update(fileInfoDict[fileID])
+                fl.setLocation(locations, immediateSave=False)
+                filesByLocation.setdefault(locations, []).append(fl)
+
+        filesByLocation = {}
+        chunk = {}
+        nFiles = 0
+        if existingTransaction:
+            availableFiles = ((f['file'], frozenset(f.get('locations', [])))
+                              for f in action.execute(self["id"], conn=self.getDBConn(),
+                                                      transaction=self.existingTransaction()))
+        else:
+            availableFiles = action.executeStream(self["id"], size=chunkSize)
+        for fileID, locations in availableFiles:
+            chunk[fileID] = locations
+            nFiles += 1
+            if len(chunk) >= chunkSize:
+                _addChunk(chunk)
+                chunk = {}
+            if limit and nFiles >= limit:
+                break
+        if chunk:
+            _addChunk(chunk)
+
+        self.commitTransaction(existingTransaction)
+        return filesByLocation
+
     def acquireFiles(self, files=None):
         """
         _acquireFiles_
@@ -9,7 +9,6 @@ import inspect
 import logging
 import os
 import os.path
-import pickle
 import socket
 import sys
 import threading
@@ -22,6 +21,7 @@ from WMCore.WMException import WMException
 from WMCore.WMRuntime import StepSpace
 from WMCore.WMRuntime import TaskSpace
 from WMCore.WMRuntime.Watchdog import Watchdog
+from WMCore.WMSpec.Persistency import decodeSpec
 from WMCore.WMSpec.WMWorkload import WMWorkloadHelper
 
 
@@ -126,16 +126,6 @@ def loadJobDefinition():
     it doesn't know the retry_count and will create the wrong file
     """
     sandboxLoc = locateWMSandbox()
-    package = JobPackage()
-    packageLoc = os.path.join(sandboxLoc, "JobPackage.pcl")
-    try:
-        package.load(packageLoc)
-    except Exception as ex:
-        msg = "Failed to load JobPackage:%s\n" % packageLoc
-        msg += str(ex)
-        createErrorReport(exitCode=11001, errorType="JobPackageError", errorDetails=msg)
-        raise BootstrapException(msg)
-
     try:
         import WMSandbox.JobIndex
     except ImportError as ex:
@@ -146,12 +136,28 @@ def loadJobDefinition():
 
     index = WMSandbox.JobIndex.jobIndex
 
+    package = JobPackage()
+    packageLoc = os.path.join(sandboxLoc, "JobPackage.pcl")
+    try:
+        # only deserialise the job we are going to run
+        package.load(packageLoc, jobIndexes=[index])
+    except Exception as ex:
+        msg = "Failed to load JobPackage:%s\n" % packageLoc
+        msg += str(ex)
+        createErrorReport(exitCode=11001, errorType="JobPackageError", errorDetails=msg)
+        raise BootstrapException(msg)
+
     try:
         job = package[index]
-    except Exception:
+    except Exception as ex:
         msg = "Failed to extract job index %i " % index
         msg += "from the jobPackage directory: %s\n" % package.get('directory')
-        msg += "Found a total of %d indexes in the JobPackage.\n" % len(package)
+        msg += "Error: %s\n" % str(ex)
+        logging.error(msg)
+        try:
+            msg += "Found a total of %d indexes in the JobPackage.\n" % len(JobPackage.listJobIndexes(packageLoc))
+        except Exception as listEx:
+            msg += "Failed to list the indexes in the JobPackage: %s\n" % str(listEx)
         createErrorReport(exitCode=11003, errorType="JobExtractionError", errorDetails=msg)
         raise BootstrapException(msg)
     logging.info("Job Index = %s\nJob Instance = %s\n", index, job)
@@ -168,8 +174,8 @@ def loadWorkload():
     """
     sandboxLoc = locateWMSandbox()
     workloadPcl = "%s/WMWorkload.pkl" % sandboxLoc
-    with open(workloadPcl, 'r') as handle:
-        wmWorkload = pickle.load(handle)
+    with open(workloadPcl, 'rb') as handle:
+        wmWorkload = decodeSpec(handle.read())
 
     return WMWorkloadHelper(wmWorkload)
 
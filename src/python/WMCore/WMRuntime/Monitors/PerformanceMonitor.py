@@ -6,16 +6,19 @@ __PerformanceMonitor_
 Monitor object which checks the job to ensure it is working inside
 the agreed limits of virtual memory and wallclock time, and terminate it
 if it exceeds them.
+
+The memory and CPU usage of the whole step process tree is sampled in
+process from /proc, without running any external command.
 """
 from __future__ import division
 
+import glob
 import logging
 import os
 import os.path
 import signal
 import time
 
-import WMCore.Algorithms.SubprocessAlgos as subprocessAlgos
 import WMCore.FwkJobReport.Report as Report
 from WMCore.WMException import WMException
 from WMCore.WMRuntime.Monitors.DashboardMonitor import getStepPID
@@ -34,6 +37,218 @@ def average(numbers):
     return float(sum(numbers)) / len(numbers)
 
 
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+PAGE_SIZE_KB = (os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096) // 1024
+
+
+def readProcStat(pid):
+    """
+    _readProcStat_
+
+    Read /proc/<pid>/stat and return a dictionary with the parent pid,
+    the CPU time in seconds, the virtual size and the RSS in kB.
+    Return None if the process is gone.
+    """
+    try:
+        with open('/proc/%i/stat' % pid) as fd:
+            stat = fd.read()
+    except (IOError, OSError):
+        return None
+    # the command name is in parentheses and can contain spaces
+    fields = stat[stat.rfind(')') + 2:].split()
+    return {'ppid': int(fields[1]),
+            'cpuTime': (int(fields[11]) + int(fields[12])) / CLOCK_TICKS,
+            'vsize': int(fields[20]) // 1024,
+            'rss': int(fields[21]) * PAGE_SIZE_KB}
+
+
+def readProcPSS(pid):
+    """
+    _readProcPSS_
+
+    Return the PSS of a process in kB, from /proc/<pid>/smaps_rollup or,
+    on older kernels, summing up /proc/<pid>/smaps. Return None if the
+    process is gone.
+    """
+    for smapsFile in ('/proc/%i/smaps_rollup' % pid, '/proc/%i/smaps' % pid):
+        try:
+            with open(smapsFile) as fd:
+                return sum(int(line.split()[1]) for line in fd if line.startswith('Pss:'))
+        except (IOError, OSError):
+            continue
+    return None
+
+
+def readMemTotal():
+    """
+    _readMemTotal_
+
+    Return the total memory of the node in kB, from /proc/meminfo
+    """
+    try:
+        with open('/proc/meminfo') as fd:
+            for line in fd:
+                if line.startswith('MemTotal:'):
+                    return int(line.split()[1])
+    except (IOError, OSError):
+        pass
+    return None
+
+
+def listProcessTree(pid):
+    """
+    _listProcessTree_
+
+    Return the pids of a process and all its descendants, from the
+    /proc/<pid>/task/<tid>/children files when the kernel provides them,
+    scanning the parent pid of all the processes otherwise.
+    """
+    if os.path.exists('/proc/%i/task/%i/children' % (pid, pid)):
+        pids = []
+        toVisit = [pid]
+        while toVisit:
+            current = toVisit.pop()
+            pids.append(current)
+            for childrenFile in glob.glob('/proc/%i/task/*/children' % current):
+                try:
+                    with open(childrenFile) as fd:
+                        toVisit.extend(int(child) for child in fd.read().split())
+                except (IOError, OSError):
+                    continue
+        return pids
+
+    children = {}
+    for procDir in glob.glob('/proc/[0-9]*'):
+        stat = readProcStat(int(os.path.basename(procDir)))
+        if stat is not None:
+            children.setdefault(stat['ppid'], []).append(int(os.path.basename(procDir)))
+    pids = []
+    toVisit = [pid]
+    while toVisit:
+        current = toVisit.pop()
+        pids.append(current)
+        toVisit.extend(children.get(current, []))
+    return pids
+
+
+class RunningStats(object):
+    """
+    _RunningStats_
+
+    Minimum, maximum and average of a series of values, updated incrementally
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.minimum = None
+        self.maximum = None
+
+    def update(self, value):
+        """
+        Add a value to the series
+        """
+        self.count += 1
+        self.total += value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+    @property
+    def average(self):
+        """
+        Average of the values, None if there are none
+        """
+        return self.total / self.count if self.count else None
+
+
+class ProcessTreeSampler(object):
+    """
+    _ProcessTreeSampler_
+
+    Sample the memory and CPU usage of a process and all its descendants
+    from /proc. Keeps the running statistics of the RSS, PSS and virtual
+    size (in MB), of the CPU usage since the previous sample and of the
+    physical memory usage (in percent).
+    """
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.memTotal = readMemTotal()
+        self.cpuTimes = {}
+        self.lastSample = None
+        self.stats = dict((key, RunningStats()) for key in ('rss', 'pss', 'vsize', 'pcpu', 'pmem'))
+
+    def sample(self):
+        """
+        _sample_
+
+        Take a sample of the whole process tree, update the statistics and
+        return the sample: rss, pss and vsize in kB and pcpu and pmem in
+        percent. Return None if the process is gone.
+        """
+        now = time.time()
+        sample = {'rss': 0, 'pss': 0, 'vsize': 0, 'cpuTime': 0}
+        cpuTimes = {}
+        for pid in listProcessTree(self.pid):
+            stat = readProcStat(pid)
+            pss = readProcPSS(pid)
+            if stat is None or pss is None:
+                # the process finished in the meantime
+                continue
+            sample['rss'] += stat['rss']
+            sample['vsize'] += stat['vsize']
+            sample['pss'] += pss
+            cpuTimes[pid] = stat['cpuTime']
+            sample['cpuTime'] += stat['cpuTime'] - self.cpuTimes.get(pid, 0)
+        if self.pid not in cpuTimes:
+            return None
+
+        if self.lastSample is None:
+            # first sample, CPU usage since the process started
+            elapsed = now - self._startTime(self.pid)
+        else:
+            elapsed = now - self.lastSample
+        sample['pcpu'] = 100 * sample.pop('cpuTime') / elapsed if elapsed > 0 else 0
+        sample['pmem'] = 100 * sample['rss'] / self.memTotal if self.memTotal else 0
+        self.cpuTimes = cpuTimes
+        self.lastSample = now
+
+        for key in ('rss', 'pss', 'vsize'):
+            self.stats[key].update(sample[key] / 1000)
+        for key in ('pcpu', 'pmem'):
+            self.stats[key].update(sample[key])
+        return sample
+
+    @staticmethod
+    def _startTime(pid):
+        """
+        Start time (epoch) of a process
+        """
+        with open('/proc/uptime') as fd:
+            uptime = float(fd.read().split()[0])
+        with open('/proc/%i/stat' % pid) as fd:
+            stat = fd.read()
+        startTicks = int(stat[stat.rfind(')') + 2:].split()[19])
+        return time.time() - uptime + startTicks / CLOCK_TICKS
+
+    def fillReport(self, report, stepName):
+        """
+        _fillReport_
+
+        Record the statistics in the performance section of a report step
+        """
+        if not self.stats['rss'].count:
+            return
+        setters = {'rss': report.setStepRSS, 'pss': report.setStepPSS, 'vsize': report.setStepVSize,
+                   'pcpu': report.setStepPCPU, 'pmem': report.setStepPMEM}
+        for key, setter in setters.items():
+            stats = self.stats[key]
+            setter(stepName, stats.minimum, stats.maximum, stats.average)
+        return
+
+
 class PerformanceMonitorException(WMException):
     """
     _PerformanceMonitorException_
@@ -47,7 +262,7 @@ class PerformanceMonitor(WMRuntimeMonitor):
     """
     _PerformanceMonitor_
 
-    Monitors the performance by pinging ps and
+    Monitors the performance by sampling /proc and
     recording data regarding the current step
     """
 
@@ -59,16 +274,10 @@ class PerformanceMonitor(WMRuntimeMonitor):
 
         self.pid = None
         self.uid = os.getuid()
-        self.monitorBase = "ps -p %i -o pid,ppid,rss,pcpu,pmem,cmd -ww | grep %i"
-        self.pssMemoryCommand = "awk '/^Pss/ {pss += $2} END {print pss}' /proc/%i/smaps"
-        self.monitorCommand = None
+        self.sampler = None
         self.currentStepSpace = None
         self.currentStepName = None
 
-        self.rss = []
-        self.pcpu = []
-        self.pmem = []
-
         self.maxPSS = None
         self.softTimeout = None
         self.hardTimeout = None
@@ -125,6 +334,7 @@ class PerformanceMonitor(WMRuntimeMonitor):
         self.stepHelper = WMStepHelper(step)
         self.currentStepName = getStepName(step)
         self.currentStepSpace = None
+        self.sampler = None
 
         if not self.stepHelper.stepType() in self.watchStepTypes:
             self.disableStep = True
@@ -143,12 +353,19 @@ class PerformanceMonitor(WMRuntimeMonitor):
         Package the information and send it off
         """
 
-        if not self.disableStep:
+        if self.disableStep:
             # No information to correlate
             return
 
+        if self.sampler is not None and stepReport is not None:
+            try:
+                self.sampler.fillReport(stepReport, self.currentStepName)
+            except Exception as ex:
+                logging.warning("Failed to record the performance of step %s: %s", self.currentStepName, str(ex))
+
         self.currentStepName = None
         self.currentStepSpace = None
+        self.sampler = None
 
         return
 
@@ -183,38 +400,21 @@ class PerformanceMonitor(WMRuntimeMonitor):
             # Then we have no step PID, we can do nothing
             return
 
-        # Now we run the ps monitor command and collate the data
-        # Gathers RSS, %CPU and %MEM statistics from ps
-        ps_cmd = self.monitorBase % (stepPID, stepPID)
-        stdout, _stderr, _retcode = subprocessAlgos.runCommand(ps_cmd)
-
-        ps_output = stdout.split()
-        if not len(ps_output) > 6:
-            # Then something went wrong in getting the ps data
-            msg = "Error when grabbing output from process ps\n"
-            msg += "output = %s\n" % ps_output
-            msg += "command = %s\n" % ps_cmd
-            logging.error(msg)
-            return
-
-        # run the command to gather PSS memory statistics from /proc/<pid>/smaps
-        smaps_cmd = self.pssMemoryCommand % (stepPID)
-        stdout, _stderr, _retcode = subprocessAlgos.runCommand(smaps_cmd)
-
-        smaps_output = stdout.split()
-        if not len(smaps_output) == 1:
-            # Then something went wrong in getting the smaps data
-            msg = "Error when grabbing output from smaps\n"
-            msg += "output = %s\n" % smaps_output
-            msg += "command = %s\n" % smaps_cmd
-            logging.error(msg)
+        # Sample RSS, PSS, %CPU and %MEM of the step process tree from /proc
+        if self.sampler is None or self.sampler.pid != stepPID:
+            self.sampler = ProcessTreeSampler(stepPID)
+        sample = self.sampler.sample()
+        if sample is None:
+            # Then something went wrong in getting the /proc data
+            logging.error("Error when sampling /proc for the step process %s", stepPID)
             return
 
-        # smaps also returns data in kiloBytes, let's make it megaBytes
+        # /proc also returns data in kiloBytes, let's make it megaBytes
         # I'm also confused with these megabytes and mebibytes...
-        pss = int(smaps_output[0]) // 1000
+        pss = sample['pss'] // 1000
 
-        logging.info("PSS: %s; RSS: %s; PCPU: %s; PMEM: %s", smaps_output[0], ps_output[2], ps_output[3], ps_output[4])
+        logging.info("PSS: %s; RSS: %s; PCPU: %.1f; PMEM: %.1f",
+                     sample['pss'], sample['rss'], sample['pcpu'], sample['pmem'])
 
         msg = 'Error in CMSSW step %s\n' % self.currentStepName
         msg += 'Number of Cores: %s\n' % self.numOfCores
@@ -8,22 +8,31 @@
 from future import standard_library
 standard_library.install_aliases()
 
+import hashlib
 import logging
 import os
 import shutil
+import subprocess
 import tarfile
 import tempfile
 import zipfile
 
+from distutils.spawn import find_executable
 from urllib.parse import urlsplit
 
 import PSetTweaks
 import Utils
+import WMCore
 import WMCore.WMSpec.WMStep as WMStep
 import WMCore.WMSpec.WMTask as WMTask
+from Utils.FileTools import TAR_COMPRESSION
 from WMCore.WMSpec.Steps.StepFactory import getFetcher
 
 
+# name of the WMCore zip archive in the sandbox
+WMCORE_PACKAGE = "WMCore.zip"
+
+
 def tarFilter(tarinfo):
     """
     _tarFilter_
@@ -37,8 +46,21 @@ def tarFilter(tarinfo):
 
 
 class SandboxCreator:
-    def __init__(self):
+    # key of the code packaged in the sandboxes, computed once per process
+    _codeKey = None
+
+    def __init__(self, compression="bz2", packageCacheDir=None):
+        """
+        compression is one of TAR_COMPRESSION modes. packageCacheDir is
+        where the WMCore zip archives are cached, by default a WMCorePackageCache
+        directory in the sandbox build area.
+        """
+        if compression not in TAR_COMPRESSION:
+            raise ValueError("Unknown sandbox compression %s, supported modes are: %s" %
+                             (compression, list(TAR_COMPRESSION)))
         self.packageWMCore = True
+        self.compression = compression
+        self.packageCacheDir = packageCacheDir
 
     def disableWMCorePackaging(self):
         """
@@ -65,20 +87,123 @@ class SandboxCreator:
         with open(path + "/__init__.py", 'w') as initHandle:
             initHandle.write("# dummy file for now")
 
+    @staticmethod
+    def codeKey():
+        """
+            __codeKey__
+
+            Content key of the WMCore zip archive: the WMCore version and
+            the names and contents of the python sources it contains.
+            Compiled files are left out, so compiling the code doesn't
+            change the key.
+        """
+        if SandboxCreator._codeKey is None:
+            keyHash = hashlib.sha1(WMCore.__version__.encode('utf-8'))
+            for filePath, arcname in SandboxCreator._wmcoreFiles():
+                if not filePath.endswith(".py"):
+                    continue
+                keyHash.update(arcname.encode('utf-8'))
+                with open(filePath, 'rb') as sourceFile:
+                    keyHash.update(sourceFile.read())
+            SandboxCreator._codeKey = keyHash.hexdigest()
+        return SandboxCreator._codeKey
+
+    @staticmethod
+    def _wmcoreFiles():
+        """
+            __wmcoreFiles__
+
+            Generator of (path, name in the archive) of all the files
+            packaged in the WMCore zip archive.
+        """
+        wmcorePath = os.path.realpath(os.path.join(os.path.dirname(__file__), '..'))
+        for (root, dirnames, filenames) in os.walk(wmcorePath):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if not filename.endswith(".svn") and not filename.endswith(".git"):
+                    # the name in the archive is the path relative to WMCore/
+                    filePath = os.path.join(root, filename)
+                    yield filePath, filePath[len(wmcorePath) - len('WMCore/') + 1:]
+
+    def getWMCorePackage(self, buildItHere):
+        """
+            __getWMCorePackage__
+
+            Returns the path to the WMCore zip archive for the current code,
+            which is built only once per code version and then reused by
+            all the workflow sandboxes.
+        """
+        cacheDir = self.packageCacheDir or os.path.join(buildItHere, "WMCorePackageCache")
+        zipPath = os.path.join(cacheDir, "WMCore-%s.zip" % self.codeKey())
+        if os.path.exists(zipPath):
+            return zipPath
+        if not os.path.exists(cacheDir):
+            os.makedirs(cacheDir)
+
+        (zipHandle, tmpZipPath) = tempfile.mkstemp(dir=cacheDir)
+        os.close(zipHandle)
+        zipFile = zipfile.ZipFile(tmpZipPath,
+                                  mode='w',
+                                  compression=zipfile.ZIP_DEFLATED)
+
+        for filePath, arcname in self._wmcoreFiles():
+            zipFile.write(filename=filePath, arcname=arcname)
+
+        # Add a dummy module for zipimport testing
+        zipFile.writestr('WMCore/ZipImportTestModule.py',
+                         "#!/usr/bin/env python\nprint('ZIPIMPORTTESTOK')\n")
+        zipFile.close()
+
+        # atomic, concurrent builders end up with the same archive
+        os.rename(tmpZipPath, zipPath)
+        # archives of previous code versions are not needed anymore: the
+        # sandboxes carry their own copy. Archives hard linked somewhere else
+        # are still referenced and are kept.
+        for oldZip in os.listdir(cacheDir):
+            oldZipPath = os.path.join(cacheDir, oldZip)
+            if oldZip.startswith("WMCore-") and oldZip != os.path.basename(zipPath) and \
+                    os.stat(oldZipPath).st_nlink == 1:
+                os.remove(oldZipPath)
+        logging.info("Created WMCore package %s with size %d", zipPath, os.path.getsize(zipPath))
+        return zipPath
+
+    def _writeArchive(self, archivePath, tarContent):
+        """
+            __writeArchive__
+
+            Write the sandbox archive with the configured compression.
+        """
+        mode = TAR_COMPRESSION[self.compression][0]
+        pigz = find_executable("pigz") if self.compression == "gz" else None
+        tarPath = archivePath[:-len(".gz")] if pigz else archivePath
+        if pigz:
+            mode = "w"
+
+        with tarfile.open(tarPath, mode) as tar:
+            for (name, arcname) in tarContent:
+                tar.add(name, arcname, filter=tarFilter)
+
+        if pigz:
+            # compresses in parallel, writes tarPath.gz and removes tarPath
+            subprocess.check_call([pigz, "-f", tarPath])
+        return
+
     def makeSandbox(self, buildItHere, workload):
         """
             __makeSandbox__
 
             MakeSandbox creates and archives a sandbox in buildItHere,
             returning the path to the archive and putting it in the
-            task
+            task. The WMCore package added to the sandbox is built once
+            and shared by all the workflows (see getWMCorePackage).
         """
         workloadName = workload.name()
         # Create path to sandbox
         pileupCachePath = "%s/pileupCache" % buildItHere
         path = "%s/%s/WMSandbox" % (buildItHere, workloadName)
         workloadFile = os.path.join(path, "WMWorkload.pkl")
-        archivePath = os.path.join(buildItHere, "%s/%s-Sandbox.tar.bz2" % (workloadName, workloadName))
+        archivePath = os.path.join(buildItHere, "%s/%s-Sandbox%s" % (workloadName, workloadName,
+                                                                    TAR_COMPRESSION[self.compression][1]))
         # check if already built
         if os.path.exists(archivePath) and os.path.exists(workloadFile):
             workload.setSpecUrl(workloadFile)  # point to sandbox spec
@@ -138,38 +263,11 @@ class SandboxCreator:
         # now, tar everything up and put it somewhere special
 
         tarContent = []
-        deleteFiles = []
         tarContent.append(("%s/%s/" % (buildItHere, workloadName), '/'))
 
         if self.packageWMCore:
-
-            wmcorePath = os.path.realpath(os.path.join(os.path.dirname(__file__), '..'))
-
-            (zipHandle, zipPath) = tempfile.mkstemp()
-            os.close(zipHandle)
-            zipFile = zipfile.ZipFile(zipPath,
-                                      mode='w',
-                                      compression=zipfile.ZIP_DEFLATED)
-
-            for (root, dirnames, filenames) in os.walk(wmcorePath):
-                for filename in filenames:
-                    if not filename.endswith(".svn") and not filename.endswith(".git"):
-                        zipFile.write(filename=os.path.join(root, filename),
-                                      # the name in the archive is the path relative to WMCore/
-                                      arcname=os.path.join(root, filename)[len(wmcorePath) - len('WMCore/') + 1:])
-
-            # Add a dummy module for zipimport testing
-            (handle, dummyModulePath) = tempfile.mkstemp()
-            os.write(handle, "#!/usr/bin/env python\n")
-            os.write(handle, "print('ZIPIMPORTTESTOK')\n")
-            os.close(handle)
-            zipFile.write(filename=dummyModulePath, arcname='WMCore/ZipImportTestModule.py')
-
-            # Add the wmcore zipball to the sandbox
-            zipFile.close()
-            tarContent.append((zipPath, '/WMCore.zip'))
-            deleteFiles.append(dummyModulePath)
-            deleteFiles.append(zipPath)
+            # Add the cached wmcore zipball to the sandbox
+            tarContent.append((self.getWMCorePackage(buildItHere), '/' + WMCORE_PACKAGE))
 
             psetTweaksPath = PSetTweaks.__path__[0]
             tarContent.append((psetTweaksPath, '/PSetTweaks'))
@@ -182,12 +280,7 @@ class SandboxCreator:
             if not splitResult[0]:
                 tarContent.append((sb, os.path.basename(sb)))
 
-        with tarfile.open(archivePath, 'w:bz2') as tar:
-            for (name, arcname) in tarContent:
-                tar.add(name, arcname, filter=tarFilter)
-
-        for deleteFile in deleteFiles:
-            os.unlink(deleteFile)
+        self._writeArchive(archivePath, tarContent)
 
         logging.info("Created sandbox %s with size %d",
                      os.path.basename(archivePath),
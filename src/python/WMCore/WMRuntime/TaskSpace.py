@@ -11,8 +11,8 @@ Runtime utils for a Task
 import os
 import sys
 import inspect
-import pickle
 
+from WMCore.WMSpec.Persistency import decodeSpec
 from WMCore.WMSpec.WMWorkload import WMWorkloadHelper
 
 
@@ -72,8 +72,8 @@ class TaskSpace:
         wmsandboxLoc = inspect.getsourcefile(WMSandbox)
         workloadPcl = wmsandboxLoc.replace("__init__.py","WMWorkload.pkl")
 
-        with open(workloadPcl, 'r') as handle:
-            wmWorkload = pickle.load(handle)
+        with open(workloadPcl, 'rb') as handle:
+            wmWorkload = decodeSpec(handle.read())
         self.workload = WMWorkloadHelper(wmWorkload)
         return
 
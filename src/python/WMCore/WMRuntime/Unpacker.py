@@ -23,11 +23,17 @@ from __future__ import print_function
 import getopt
 import logging
 import os
+import subprocess
 import sys
 import tarfile
 import traceback
 import zipfile
 
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
 options = {
     "sandbox=": "WMAGENT_SANDBOX",  # sandbox archive file
     "package=": "WMAGENT_PACKAGE",  # job package pickle file
@@ -62,6 +68,26 @@ def makeErrorReport(jobName, exitCode, message):
         handle.write(xml)
 
 
+def extractSandbox(sandbox, jobDir):
+    """
+    _extractSandbox_
+
+    Extract the sandbox archive with the system tar, which is much faster
+    than tarfile and decompresses (bz2/gz autodetected) in a separate process.
+    Fall back to tarfile if tar isn't available or fails.
+
+    """
+    try:
+        with open(os.devnull, 'w') as devNull:
+            retCode = subprocess.call(["tar", "-xf", sandbox, "-C", jobDir], stderr=devNull)
+    except OSError:
+        retCode = None
+    if retCode != 0:
+        logging.info("Failed to extract the sandbox with tar, using tarfile")
+        with tarfile.open(sandbox, "r") as tfile:
+            tfile.extractall(jobDir)
+
+
 def createWorkArea(sandbox):
     """
     _createWorkArea_
@@ -77,8 +103,7 @@ def createWorkArea(sandbox):
     if not os.path.exists(os.path.join(jobDir, 'StartupScript')):
         os.makedirs(os.path.join(jobDir, 'StartupScript'))
 
-    with tarfile.open(sandbox, "r") as tfile:
-        tfile.extractall(jobDir)
+    extractSandbox(sandbox, jobDir)
 
     # need to pull out the startup file from the zipball
     with zipfile.ZipFile(os.path.join(jobDir, 'WMCore.zip'), 'r') as zfile:
@@ -92,6 +117,42 @@ def createWorkArea(sandbox):
     return jobDir
 
 
+def extractPackageJob(jobPackage, jobIndex, pkgTarget):
+    """
+    _extractPackageJob_
+
+    Copy only the serialised job jobIndex of an indexed job package
+    (see WMCore.DataStructs.JobPackage) into a single job package.
+    The job itself is copied as raw bytes, without being deserialised.
+    Returns False if jobPackage is an old style pickled package or
+    doesn't contain the job.
+
+    """
+    from WMCore.DataStructs.JobPackage import PACKAGE_MAGIC, PACKAGE_TRAILER
+
+    with open(jobPackage, 'rb') as handle:
+        if handle.read(len(PACKAGE_MAGIC)) != PACKAGE_MAGIC:
+            return False
+        handle.seek(-PACKAGE_TRAILER.size, os.SEEK_END)
+        indexOffset, magic = PACKAGE_TRAILER.unpack(handle.read(PACKAGE_TRAILER.size))
+        if magic != PACKAGE_MAGIC:
+            raise IOError("JobPackage %s is truncated or corrupted" % jobPackage)
+        handle.seek(indexOffset)
+        index = pickle.load(handle)
+        if jobIndex not in index['jobs']:
+            return False
+        offset, length = index['jobs'][jobIndex]
+        with open(pkgTarget, 'wb') as target:
+            target.write(PACKAGE_MAGIC)
+            handle.seek(offset)
+            jobs = {jobIndex: (target.tell(), length)}
+            target.write(handle.read(length))
+            indexOffset = target.tell()
+            pickle.dump({'directory': index['directory'], 'jobs': jobs}, target, -1)
+            target.write(PACKAGE_TRAILER.pack(indexOffset, PACKAGE_MAGIC))
+    return True
+
+
 def installPackage(jobArea, jobPackage, jobIndex):
     """
     _installPackage_
@@ -101,9 +162,13 @@ def installPackage(jobArea, jobPackage, jobIndex):
 
     """
     target = "%s/WMSandbox" % jobArea
+    wmcoreZip = os.path.join(jobArea, 'WMCore.zip')
+    if os.path.exists(wmcoreZip) and wmcoreZip not in sys.path:
+        sys.path.insert(0, wmcoreZip)
     pkgTarget = "%s/JobPackage.pcl" % target
-    # shutil.copy(jobPackage, pkgTarget)
-    os.system("/bin/cp %s %s" % (jobPackage, pkgTarget))
+    if not extractPackageJob(jobPackage, int(jobIndex), pkgTarget):
+        # shutil.copy(jobPackage, pkgTarget)
+        os.system("/bin/cp %s %s" % (jobPackage, pkgTarget))
 
     indexPy = "%s/JobIndex.py" % target
     with open(indexPy, 'w') as handle:
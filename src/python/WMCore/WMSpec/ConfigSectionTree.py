@@ -11,6 +11,7 @@ of ConfigSections
 
 
 import types
+from collections import OrderedDict
 
 from WMCore.Configuration import ConfigSection
 
@@ -33,6 +34,19 @@ def nodeParent(node):
     """
     return node._internal_parent_ref
 
+def _walkNodes(topNode):
+    """
+    _walkNodes_
+
+    Walk the tree under topNode, returns the list of (name, node)
+    in execution order
+
+    """
+    result = [(nodeName(topNode), topNode)]
+    for child in topNode.tree.childNames:
+        result.extend(_walkNodes(getattr(topNode.tree.children, child)))
+    return result
+
 def listNodes(topNode):
     """
     _listNodes_
@@ -41,11 +55,9 @@ def listNodes(topNode):
     returns them in execution order
 
     """
-    result = []
-    result.append(nodeName(topNode))
-    for child in topNode.tree.childNames:
-        result.extend(listNodes(getattr(topNode.tree.children, child)))
-    return result
+    if findTopNode(topNode) is topNode:
+        return list(_nodeIndex(topNode))
+    return [name for name, _ in _walkNodes(topNode)]
 
 def listChildNodes(topNode):
     """
@@ -131,6 +143,8 @@ def addNode(currentNode, newNode):
     setattr(currentNode.tree.children, newName, newNode)
     currentNode.tree.childNames.append(newName)
     newNode.tree.parent = nodeName(currentNode)
+    newNode._internal_node_index = None
+    invalidateNodeIndex(currentNode)
     return
 
 def addTopNode(currentNode, newNode):
@@ -151,6 +165,8 @@ def addTopNode(currentNode, newNode):
     setattr(currentNode.tree.children, newName, newNode)
     currentNode.tree.childNames.insert(0, newName)
     newNode.tree.parent = nodeName(currentNode)
+    newNode._internal_node_index = None
+    invalidateNodeIndex(currentNode)
     return
 
 def deleteNode(topNode, childName):
@@ -161,8 +177,53 @@ def deleteNode(topNode, childName):
     with the given name if it exists
     """
     if hasattr(topNode.tree.children, childName):
+        getattr(topNode.tree.children, childName)._internal_node_index = None
         delattr(topNode.tree.children, childName)
         topNode.tree.childNames.remove(childName)
+        invalidateNodeIndex(topNode)
+
+def invalidateNodeIndex(node):
+    """
+    _invalidateNodeIndex_
+
+    Drop the name to node index of the tree containing node, it will
+    be rebuilt by the next getNode call. Must be called whenever the
+    structure of the tree changes.
+    """
+    findTopNode(node)._internal_node_index = None
+
+def _isInTree(node, topNode):
+    """
+    _isInTree_
+
+    Check whether an indexed node is still attached to the tree, walking
+    up to topNode, to guard against nodes (or any of their ancestors)
+    removed without going through deleteNode
+    """
+    while node is not topNode:
+        # node -> parent tree.children -> parent tree -> parent node
+        parentChildren = nodeParent(node)
+        if parentChildren is None or getattr(parentChildren, nodeName(node), None) is not node:
+            return False
+        parentTree = nodeParent(parentChildren)
+        node = nodeParent(parentTree) if parentTree is not None else None
+        if node is None:
+            return False
+    return True
+
+def _nodeIndex(topNode):
+    """
+    _nodeIndex_
+
+    Return the name to node index (in execution order) of the tree,
+    cached in its top node and only rebuilt after the tree structure
+    changed.
+    """
+    index = getattr(topNode, "_internal_node_index", None)
+    if index is None:
+        index = OrderedDict(_walkNodes(topNode))
+        topNode._internal_node_index = index
+    return index
 
 def getNode(node, nodeNameToGet):
     """
@@ -172,10 +233,17 @@ def getNode(node, nodeNameToGet):
     return it.
     returns None if not found
 
+    The name to node map of the tree is cached in the top node and only
+    rebuilt after the tree structure changed, or when the name is not
+    found or the node found is not in the tree anymore.
     """
     topNode = findTopNode(node)
-    mapping = nodeMap(topNode)
-    return mapping.get(nodeNameToGet, None)
+    result = _nodeIndex(topNode).get(nodeNameToGet, None)
+    if result is not None and nodeName(result) == nodeNameToGet and _isInTree(result, topNode):
+        return result
+
+    topNode._internal_node_index = None
+    return _nodeIndex(topNode).get(nodeNameToGet, None)
 
 def findTop(node):
     """
@@ -199,8 +267,12 @@ def nodeIterator(node):
     Generator function that delivers all nodes in order
 
     """
-    for i in listNodes(node):
-        yield getNode(node, i)
+    if findTopNode(node) is node:
+        nodes = list(_nodeIndex(node).values())
+    else:
+        nodes = [child for _, child in _walkNodes(node)]
+    for child in nodes:
+        yield child
 
 def nodeChildIterator(node):
     """
@@ -343,8 +415,8 @@ class TreeHelper:
         """
         generator for processing all subnodes in execution order
         """
-        for i in listNodes(self.data):
-            yield getNode(self.data, i)
+        for node in nodeIterator(self.data):
+            yield node
 
     def nodeChildIterator(self):
         """
@@ -439,3 +511,14 @@ class ConfigSectionTree(ConfigSection):
         self.tree.section_("children")
         self.tree.childNames = []
         self.tree.parent = None
+
+    def __getstate__(self):
+        """
+        _getstate_
+
+        The name to node index is a cache rebuilt on demand,
+        don't pickle it along with the tree.
+        """
+        state = self.__dict__.copy()
+        state.pop("_internal_node_index", None)
+        return state
@@ -5,11 +5,20 @@ _PersistencyHelper_
 Util class to provide a common persistency layer for ConfigSection derived
 objects, with options to save in different formats
 
-Placeholder for ideas at present....
+Two spec formats are supported:
+ - pickle: the whole workload pickled at once (legacy format)
+ - indexed: a versioned format where the workload, without its tasks, and
+   every task node, without its child tasks, are pickled separately, so
+   that tasks are only deserialised when accessed
 
+Both formats are detected and read transparently by load.
 """
 from __future__ import print_function
 
+import hashlib
+import struct
+import threading
+from collections import OrderedDict
 from urllib2 import urlopen, Request
 
 try:
@@ -22,6 +31,364 @@ try:
 except ImportError:
     import pickle
 
+from WMCore.Configuration import ConfigSection
+from WMCore.WMSpec.ConfigSectionTree import ConfigSectionTree
+
+SPEC_MAGIC = b"WMSPEC"
+SPEC_VERSION = 2
+SPEC_HEADER = struct.Struct(">6sH")
+SPEC_FORMATS = ("indexed", "pickle")
+
+
+class LazyTaskSection(ConfigSection):
+    """
+    _LazyTaskSection_
+
+    ConfigSection holding task nodes of a workload loaded from an indexed
+    spec: the top level tasks (data.tasks) or the child tasks of a task
+    (tree.children). Tasks are kept pickled until they are first accessed,
+    and so are their own child tasks.
+    """
+
+    def __getattr__(self, name):
+        lazyTasks = self.__dict__.get("_internal_lazy_tasks")
+        if not lazyTasks or name not in lazyTasks:
+            raise AttributeError("'%s' object has no attribute '%s'" % (self.__class__.__name__, name))
+        task = _loadTaskNode(lazyTasks[name])
+        self.__setattr__(name, task)
+        return task
+
+    def __setattr__(self, name, value):
+        if not name.startswith("_internal_"):
+            self.__dict__.get("_internal_lazy_tasks", {}).pop(name, None)
+        ConfigSection.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        lazyTasks = self.__dict__.get("_internal_lazy_tasks", {})
+        if name in lazyTasks and name not in self.__dict__:
+            del lazyTasks[name]
+            self._internal_children.discard(name)
+            self._internal_settings.discard(name)
+            return
+        ConfigSection.__delattr__(self, name)
+
+    def loadedTasks(self):
+        """
+        _loadedTasks_
+
+        List of the tasks already deserialised
+        """
+        return [name for name in self._internal_children if name in self.__dict__]
+
+    def hasLazyTask(self, taskName):
+        """
+        _hasLazyTask_
+
+        Check whether a task with this name is still pickled in the
+        subtree of one of the tasks not deserialised yet.
+        """
+        return any(_partHasTask(part, taskName) for part in self.__dict__.get("_internal_lazy_tasks", {}).values())
+
+
+def _partHasTask(part, taskName):
+    """
+    _partHasTask_
+
+    Check whether a pickled task node part contains the task, looking at
+    the names of its child parts only.
+    """
+    childParts = part[1]
+    return taskName in childParts or any(_partHasTask(x, taskName) for x in childParts.values())
+
+
+def _splitSection(section):
+    """
+    _splitSection_
+
+    Split a section holding task nodes into a skeleton section without the
+    tasks and a dictionary of task name to the pickled task node parts.
+    Tasks which weren't accessed since being lazily loaded are not
+    deserialised.
+    """
+    lazyTasks = section.__dict__.get("_internal_lazy_tasks", {})
+    taskNames = set(lazyTasks) | set(name for name in section._internal_children
+                                     if isinstance(section.__dict__.get(name), ConfigSectionTree))
+
+    taskParts = {}
+    for taskName in taskNames:
+        if taskName in section.__dict__:
+            taskParts[taskName] = _splitTaskNode(section.__dict__[taskName])
+        else:
+            taskParts[taskName] = lazyTasks[taskName]
+
+    skeleton = ConfigSection(section._internal_name)
+    skeleton.__dict__.update((key, value) for key, value in section.__dict__.items()
+                             if key not in taskNames and key != "_internal_lazy_tasks")
+    skeleton._internal_children = section._internal_children - taskNames
+    skeleton._internal_settings = section._internal_settings - taskNames
+    return skeleton, taskParts
+
+
+def _splitTaskNode(node):
+    """
+    _splitTaskNode_
+
+    Pickle a task node without its child tasks, which are pickled
+    separately. Returns a (node pickle, {child name: child part}) tuple.
+    """
+    children = node.tree.children
+    skeleton, childParts = _splitSection(children)
+    parentRef = node._internal_parent_ref
+    # don't follow the reference back to the parent task or workload
+    object.__setattr__(node, "_internal_parent_ref", None)
+    object.__setattr__(node.tree, "children", skeleton)
+    try:
+        nodePickle = pickle.dumps(node, pickle.HIGHEST_PROTOCOL)
+    finally:
+        object.__setattr__(node.tree, "children", children)
+        object.__setattr__(node, "_internal_parent_ref", parentRef)
+    return nodePickle, childParts
+
+
+def _lazySection(section, taskParts):
+    """
+    _lazySection_
+
+    Make a LazyTaskSection out of a skeleton section and its task parts
+    """
+    lazySection = LazyTaskSection(section._internal_name)
+    lazySection.__dict__.update(section.__dict__)
+    for value in section.__dict__.values():
+        if isinstance(value, ConfigSection) and value._internal_parent_ref is section:
+            object.__setattr__(value, "_internal_parent_ref", lazySection)
+    lazySection._internal_children = section._internal_children | set(taskParts)
+    lazySection._internal_settings = section._internal_settings | set(taskParts)
+    object.__setattr__(lazySection, "_internal_lazy_tasks", dict(taskParts))
+    return lazySection
+
+
+def _loadTaskNode(part):
+    """
+    _loadTaskNode_
+
+    Deserialise a task node, its child tasks are left pickled
+    """
+    node = pickle.loads(part[0])
+    node.tree.children = _lazySection(node.tree.children, part[1])
+    return node
+
+
+def _loadAllTasks(section):
+    """
+    _loadAllTasks_
+
+    Deserialise all the task nodes of a section holding tasks, and turn the
+    lazy sections into plain ConfigSections.
+    """
+    if isinstance(section, LazyTaskSection):
+        for taskName in list(section.__dict__.get("_internal_lazy_tasks", {})):
+            getattr(section, taskName)
+        object.__delattr__(section, "_internal_lazy_tasks")
+        object.__setattr__(section, "__class__", ConfigSection)
+    for taskName in section._internal_children:
+        node = section.__dict__.get(taskName)
+        if isinstance(node, ConfigSectionTree):
+            _loadAllTasks(node.tree.children)
+
+
+def splitWorkload(data):
+    """
+    _splitWorkload_
+
+    Pickle separately the workload without its tasks and each of the task
+    nodes, at any depth of the task tree. Returns the workload pickle and a
+    dictionary of top level task name to task part.
+    """
+    tasks = data.tasks
+    skeleton, taskParts = _splitSection(tasks)
+    object.__setattr__(data, "tasks", skeleton)
+    try:
+        workloadPickle = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+    finally:
+        object.__setattr__(data, "tasks", tasks)
+    return workloadPickle, taskParts
+
+
+def joinWorkload(workloadPickle, taskParts, lazy=True):
+    """
+    _joinWorkload_
+
+    Rebuild the workload data from the output of splitWorkload. With lazy
+    every task is only deserialised when first accessed.
+    """
+    data = pickle.loads(workloadPickle)
+    data.tasks = _lazySection(data.tasks, taskParts)
+    if not lazy:
+        _loadAllTasks(data.tasks)
+    return data
+
+
+def findTaskNode(section, taskName):
+    """
+    _findTaskNode_
+
+    Find a task by name in the section holding tasks and in their child
+    tasks, only deserialising the lazily loaded tasks on the way to it.
+    Returns None if not found.
+    """
+    taskNames = getattr(section, "tasklist", None)
+    if taskNames is None:
+        taskNames = section._internal_parent_ref.childNames
+    for name in taskNames:
+        if name == taskName:
+            return getattr(section, name, None)
+        if name not in section.__dict__:
+            lazyTasks = section.__dict__.get("_internal_lazy_tasks", {})
+            if name not in lazyTasks or not _partHasTask(lazyTasks[name], taskName):
+                continue
+        node = getattr(section, name, None)
+        result = findTaskNode(node.tree.children, taskName) if node is not None else None
+        if result is not None:
+            return result
+    return None
+
+
+def encodeSpec(data, specFormat="pickle"):
+    """
+    _encodeSpec_
+
+    Serialise the workload data in the given format
+    """
+    if specFormat == "pickle":
+        # the legacy format must only contain plain ConfigSections
+        _loadAllTasks(data.tasks)
+        return pickle.dumps(data)
+    if specFormat != "indexed":
+        raise ValueError("Unknown spec format %s, supported formats are %s" % (specFormat, SPEC_FORMATS))
+
+    workloadPickle, taskParts = splitWorkload(data)
+    content = {"workload": workloadPickle, "tasks": taskParts}
+    return SPEC_HEADER.pack(SPEC_MAGIC, SPEC_VERSION) + pickle.dumps(content, pickle.HIGHEST_PROTOCOL)
+
+
+def decodeSpecParts(content):
+    """
+    _decodeSpecParts_
+
+    Return the workload and task pickles of an indexed spec, or None if the
+    content is a legacy pickled spec.
+    """
+    if not content.startswith(SPEC_MAGIC):
+        return None
+    magic, version = SPEC_HEADER.unpack(content[:SPEC_HEADER.size])
+    if version > SPEC_VERSION:
+        raise ValueError("Spec format version %s is not supported (max %s)" % (version, SPEC_VERSION))
+    parts = pickle.loads(content[SPEC_HEADER.size:])
+    return parts["workload"], parts["tasks"]
+
+
+def decodeSpec(content, lazy=True):
+    """
+    _decodeSpec_
+
+    Deserialise workload data saved in any of the spec formats
+    """
+    parts = decodeSpecParts(content)
+    if parts is None:
+        return pickle.loads(content)
+    return joinWorkload(parts[0], parts[1], lazy=lazy)
+
+
+class SpecCache(object):
+    """
+    _SpecCache_
+
+    In process LRU cache of spec contents keyed by their sha1 hash. The
+    cache keeps the compact pickled parts of the specs, so every load
+    returns a new workload object (the cached data is never shared between
+    callers) whose tasks are deserialised on demand.
+
+    Specs read from local files are keyed by their content too, so a spec
+    rewritten in place is never served stale.
+    """
+
+    def __init__(self, maxSize=50):
+        self.maxSize = maxSize
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key):
+        """
+        _lookup_
+
+        Return the cached parts for the content key, None if not cached.
+        Must be called holding the lock.
+        """
+        parts = self._cache.pop(key, None)
+        if parts is not None:
+            self._cache[key] = parts
+            self.hits += 1
+        return parts
+
+    def _decodeParts(self, content):
+        """
+        _decodeParts_
+
+        Return the content key and the parts of the spec content, decoding
+        and caching them if they aren't cached yet.
+        """
+        key = hashlib.sha1(content).hexdigest()
+        with self._lock:
+            parts = self._lookup(key)
+        if parts is not None:
+            return key, parts
+
+        parts = decodeSpecParts(content)
+        if parts is None:
+            # keep legacy specs split too, so that they're loaded lazily
+            parts = splitWorkload(pickle.loads(content))
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = parts
+            while len(self._cache) > self.maxSize:
+                self._cache.popitem(last=False)
+        return key, parts
+
+    def decode(self, content, lazy=True):
+        """
+        _decode_
+
+        Return the workload data for the spec content, using the cached
+        parts when the same content was already decoded.
+        """
+        parts = self._decodeParts(content)[1]
+        return joinWorkload(parts[0], parts[1], lazy=lazy)
+
+    def decodeFile(self, filename, lazy=True):
+        """
+        _decodeFile_
+
+        Return the workload data for a local spec file. The file is read
+        every time, but only decoded when its content isn't cached.
+        """
+        with open(filename, 'rb') as handle:
+            return self.decode(handle.read(), lazy=lazy)
+
+    def clear(self):
+        """
+        _clear_
+
+        Empty the cache
+        """
+        with self._lock:
+            self._cache.clear()
+
+
+# cache shared by all the workloads loaded in this process
+specCache = SpecCache()
+
 
 class PersistencyHelper:
     """
@@ -38,54 +405,67 @@ class PersistencyHelper:
 
     """
 
-    def save(self, filename):
+    def save(self, filename, specFormat="pickle"):
         """
         _save_
 
-        Save data to a file
-        Saved format is defined depending on the extension
+        Save data to a file, in the legacy pickle format by default
+        (use specFormat="indexed" for the lazily loadable format)
         """
-        with open(filename, 'w') as handle:
-            # TODO: use different encoding scheme for different extension
-            # extension = filename.split(".")[-1].lower()
-            pickle.dump(self.data, handle)
+        with open(filename, 'wb') as handle:
+            handle.write(encodeSpec(self.data, specFormat))
         return
 
-    def load(self, filename):
+    def load(self, filename, lazy=False, useCache=False):
         """
         _load_
 
-        Unpickle data from file
-
+        Load the spec from a file or url, in any of the spec formats.
+        With lazy, tasks are deserialised when accessed (legacy pickled
+        specs are only loaded lazily through the cache).
+        With useCache, the spec content is decoded through the spec cache
+        shared in this process, the workload loaded is still a private
+        copy that can be modified.
+        Both are opt-in, by default the whole spec is read and deserialised.
         """
 
         # TODO: currently support both loading from file path or url
         # if there are more things to filter may be separate the load function
 
+        if useCache and not urlparse(filename)[0]:
+            # local spec file, only read again if it changed
+            self.data = specCache.decodeFile(filename, lazy=lazy)
+            return
+
         # urllib2 needs a scheme - assume local file if none given
         if not urlparse(filename)[0]:
             filename = 'file:' + filename
             handle = urlopen(Request(filename, headers={"Accept": "*/*"}))
-            self.data = pickle.load(handle)
+            content = handle.read()
             handle.close()
         elif filename.startswith('file:'):
             handle = urlopen(Request(filename, headers={"Accept": "*/*"}))
-            self.data = pickle.load(handle)
+            content = handle.read()
             handle.close()
         else:
             # use own request class so we get authentication if needed
             from WMCore.Services.Requests import Requests
             request = Requests(filename)
             data = request.makeRequest('', incoming_headers={"Accept": "*/*"})
-            self.data = pickle.loads(data[0])
-
-        # TODO: use different encoding scheme for different extension
-        # extension = filename.split(".")[-1].lower()
+            content = data[0]
 
+        if useCache:
+            self.data = specCache.decode(content, lazy=lazy)
+        else:
+            self.data = decodeSpec(content, lazy=lazy)
         return
 
-    def saveCouch(self, couchUrl, couchDBName, metadata=None):
-        """ Save this spec in CouchDB.  Returns URL """
+    def saveCouch(self, couchUrl, couchDBName, metadata=None, specFormat="pickle"):
+        """
+        Save this spec in CouchDB.  Returns URL
+        The spec is attached in the legacy pickle format by default, as
+        it can be read by clients outside of WMCore.
+        """
         from WMCore.Database.CMSCouch import CouchServer, CouchInternalServerError
         metadata = metadata or {}
         server = CouchServer(couchUrl)
@@ -104,7 +484,7 @@ class PersistencyHelper:
             rev = doc['_rev']
 
         # specuriwrev = specuri + '?rev=%s' % rev
-        workloadString = pickle.dumps(self.data)
+        workloadString = encodeSpec(self.data, specFormat)
         # result = database.put(specuriwrev, workloadString, contentType='application/text')
         retval = database.addAttachment(name, rev, workloadString, 'spec')
         if retval.get('ok', False) is not True:
@@ -12,7 +12,7 @@ from WMCore.Configuration import ConfigSection
 from WMCore.Lexicon import sanitizeURL
 from WMCore.WMException import WMException
 from WMCore.WMSpec.ConfigSectionTree import findTop
-from WMCore.WMSpec.Persistency import PersistencyHelper
+from WMCore.WMSpec.Persistency import PersistencyHelper, LazyTaskSection, findTaskNode
 from WMCore.WMSpec.WMTask import WMTask, WMTaskHelper
 from WMCore.WMSpec.WMWorkloadTools import (validateArgumentsUpdate, loadSpecClassByType,
                                            setAssignArgumentsWithDefault)
@@ -486,12 +486,14 @@ class WMWorkloadHelper(PersistencyHelper):
 
         Retrieve a task with the given name in the whole workflow tree.
         """
+        if isinstance(self.data.tasks, LazyTaskSection):
+            # don't deserialise the tasks which don't lead to this one
+            node = findTaskNode(self.data.tasks, taskName)
+            return WMTaskHelper(node) if node is not None else None
         for t in self.taskIterator():
-            if t.name() == taskName:
-                return t
-            for x in t.taskIterator():
-                if x.name() == taskName:
-                    return x
+            node = t.getNode(taskName)
+            if node is not None:
+                return WMTaskHelper(node)
         return None
 
     def getTaskByPath(self, taskPath):
@@ -501,11 +503,6 @@ class WMWorkloadHelper(PersistencyHelper):
         Get a task instance based on the path name
 
         """
-        mapping = {}
-        for t in self.taskIterator():
-            for x in t.taskIterator():
-                mapping.__setitem__(x.getPathName, x.name())
-
         taskList = parseTaskPath(taskPath)
 
         if taskList[0] != self.name():  # should always be workload name first
@@ -524,10 +521,16 @@ class WMWorkloadHelper(PersistencyHelper):
             msg = "Task /%s/%s Not Found in Workload" % (taskList[0],
                                                          taskList[1])
             raise RuntimeError(msg)
-        for x in topTask.taskIterator():
-            if x.getPathName() == taskPath:
-                return x
-        return None
+        # walk down the path, only the tasks on it are looked at
+        node = topTask.data
+        for taskName in taskList[2:]:
+            node = getattr(node.tree.children, taskName, None)
+            if node is None:
+                return None
+        task = WMTaskHelper(node)
+        if task.getPathName() != taskPath:
+            return None
+        return task
 
     def taskIterator(self):
         """
@@ -10,6 +10,12 @@ class DataCacheUpdate(CherryPyPeriodicTask):
 
     def __init__(self, rest, config):
         self.getJobInfo = getattr(config, "getJobInfo", False)
+        # how often the cache is updated from the couch changes feeds
+        self.updateInterval = getattr(config, "dataCacheUpdateInterval", 300)
+        # how often the whole cache is reloaded from scratch, as a safety net
+        # for changes which could have been missed by the incremental updates
+        self.fullReloadInterval = getattr(config, "dataCacheFullReloadInterval", 3600)
+        DataCache.setDuration(self.fullReloadInterval)
 
         super(DataCacheUpdate, self).__init__(config)
 
@@ -17,7 +23,7 @@ class DataCacheUpdate(CherryPyPeriodicTask):
         """
         sets the list of functions which
         """
-        self.concurrentTasks = [{'func': self.gatherActiveDataStats, 'duration': 300}]
+        self.concurrentTasks = [{'func': self.gatherActiveDataStats, 'duration': self.updateInterval}]
 
     def gatherActiveDataStats(self, config):
         """
@@ -26,18 +32,54 @@ class DataCacheUpdate(CherryPyPeriodicTask):
         self.logger.info("Starting gatherActiveDataStats with jobInfo set to: %s", self.getJobInfo)
         try:
             tStart = time.time()
-            if DataCache.islatestJobDataExpired():
-                wmstatsDB = WMStatsReader(config.wmstats_url, reqdbURL=config.reqmgrdb_url,
-                                          reqdbCouchApp="ReqMgr", logger=self.logger)
-                self.logger.info("Getting active data with job info for statuses: %s", WMSTATS_JOB_INFO)
-                jobData = wmstatsDB.getActiveData(WMSTATS_JOB_INFO, jobInfoFlag=self.getJobInfo)
-                self.logger.info("Getting active data with NO job info for statuses: %s", WMSTATS_NO_JOB_INFO)
-                tempData = wmstatsDB.getActiveData(WMSTATS_NO_JOB_INFO, jobInfoFlag=False)
-                jobData.update(tempData)
-                self.logger.info("Running setlatestJobData...")
-                DataCache.setlatestJobData(jobData)
-                self.logger.info("DataCache is up-to-date with %d requests data", len(jobData))
+            wmstatsDB = WMStatsReader(config.wmstats_url, reqdbURL=config.reqmgrdb_url,
+                                      reqdbCouchApp="ReqMgr", logger=self.logger)
+            if DataCache.islatestJobDataExpired() or not DataCache.getSequences():
+                self.reloadDataCache(wmstatsDB)
+            else:
+                self.updateDataCache(wmstatsDB)
+            self.logger.info("DataCache status: %s", DataCache.getCacheStatus())
         except Exception as ex:
             self.logger.exception("Exception updating DataCache. Error: %s", str(ex))
         self.logger.info("Total time loading data from ReqMgr2 and WMStats: %s", time.time() - tStart)
         return
+
+    def reloadDataCache(self, wmstatsDB):
+        """
+        Fully reload the cache with all the active requests
+        """
+        # get the sequences before loading the data, changes happening
+        # in the meantime are picked up by the next incremental update
+        sequences = wmstatsDB.getUpdateSequences()
+        self.logger.info("Getting active data with job info for statuses: %s", WMSTATS_JOB_INFO)
+        jobData = wmstatsDB.getActiveData(WMSTATS_JOB_INFO, jobInfoFlag=self.getJobInfo)
+        self.logger.info("Getting active data with NO job info for statuses: %s", WMSTATS_NO_JOB_INFO)
+        tempData = wmstatsDB.getActiveData(WMSTATS_NO_JOB_INFO, jobInfoFlag=False)
+        jobData.update(tempData)
+        self.logger.info("Running setlatestJobData...")
+        DataCache.setlatestJobData(jobData, sequences)
+        self.logger.info("DataCache is up-to-date with %d requests data", len(jobData))
+
+    def updateDataCache(self, wmstatsDB):
+        """
+        Apply the ReqMgr and WMStats changes since the last update to the cache
+        """
+        sequences = DataCache.getSequences()
+        activeStatus = WMSTATS_JOB_INFO + WMSTATS_NO_JOB_INFO
+        requests, removed, reqSeq = wmstatsDB.getRequestChanges(sequences["reqmgr"], activeStatus)
+
+        if self.getJobInfo:
+            # requests which entered a job info status need their agent information loaded
+            cachedData = DataCache.getlatestJobData()
+            newJobInfoRequests = dict((name, doc) for name, doc in requests.items()
+                                      if doc["RequestStatus"] in WMSTATS_JOB_INFO and
+                                      "AgentJobInfo" not in cachedData.get(name, {}))
+            wmstatsDB.updateRequestInfoWithJobInfo(newJobInfoRequests)
+
+        DataCache.removeRequests(removed)
+        DataCache.updateRequests(requests, {"reqmgr": reqSeq})
+
+        if self.getJobInfo:
+            jobDocs, deletedIDs, wmstatsSeq = wmstatsDB.getAgentRequestChanges(sequences["wmstats"])
+            DataCache.updateJobInfo(jobDocs, deletedIDs, {"wmstats": wmstatsSeq})
+        self.logger.info("DataCache updated with %d requests, %d requests removed", len(requests), len(removed))
@@ -1,12 +1,71 @@
+from __future__ import division, print_function
+
+import threading
 import time
+
+from future.utils import viewitems
+from past.builtins import basestring
+
 from WMCore.ReqMgr.DataStructs.Request import RequestInfo, protectedLFNs
 
+# request properties with a secondary index (value -> set of request names).
+# Filters on these keys are resolved through the index, so only the matching
+# requests need to go through RequestInfo.andFilterCheck
+INDEXED_KEYS = ["RequestStatus", "Campaign", "RequestType", "AgentJobInfo"]
+
+
+def _normalizeFilterValue(key, value):
+    """
+    Convert a filter value the same way RequestInfo.andFilterCheck does.
+    Returns the list of values to look up in the index or None when the
+    index can't be used for this condition.
+    """
+    if isinstance(value, dict):
+        return None
+    if key == "AgentJobInfo":
+        # only the special cleaned up check is indexed
+        return ["CLEANED"] if value == "CLEANED" else None
+    if value in ["false", "False", "FALSE"]:
+        value = False
+    elif value in ["true", "True", "TRUE"]:
+        value = True
+    if not isinstance(value, list):
+        value = [value]
+    return value
+
+
+def _indexValues(key, reqInfo):
+    """
+    Returns the list of index values of a request for a given key
+    """
+    if key == "AgentJobInfo":
+        return ["CLEANED"] if reqInfo.isWorkflowCleaned() else []
+    value = reqInfo.get(key)
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        return [value]
+    return value
+
+
 class DataCache(object):
     # TODO: need to change to  store in  db instead of storing in the memory
     # When mulitple server run for load balancing it could have different result
     # from each server.
     _duration = 300  # 5 minitues
     _lastedActiveDataFromAgent = {}
+    # secondary indexes: {key: {value: set(requestName)}}
+    _index = {}
+    # requests with values which can't be indexed (unhashable): {key: set(requestName)}
+    _unindexed = {}
+    # wmstats agent_request doc id -> (requestName, agentURL)
+    _jobInfoDocs = {}
+    # couch update sequences the cache is in sync with
+    _sequences = {}
+    _lastUpdate = 0
+    # writers replace the data dict (copy on write) and readers take
+    # a snapshot of the matching requests under this lock
+    _lock = threading.RLock()
 
     @staticmethod
     def getDuration():
@@ -29,9 +88,18 @@ class DataCache(object):
         return not DataCache._lastedActiveDataFromAgent.get("data")
 
     @staticmethod
-    def setlatestJobData(jobData):
-        DataCache._lastedActiveDataFromAgent["time"] = int(time.time())
-        DataCache._lastedActiveDataFromAgent["data"] = jobData
+    def setlatestJobData(jobData, sequences=None):
+        """
+        Replace the whole cache content (full reload). sequences is the
+        dictionary of couch update sequences the data corresponds to, which
+        is used as the starting point for the incremental updates.
+        """
+        with DataCache._lock:
+            DataCache._lastedActiveDataFromAgent["time"] = int(time.time())
+            DataCache._lastedActiveDataFromAgent["data"] = jobData
+            DataCache._lastUpdate = DataCache._lastedActiveDataFromAgent["time"]
+            DataCache._sequences = dict(sequences or {})
+            DataCache._rebuildIndex()
 
     @staticmethod
     def islatestJobDataExpired():
@@ -43,10 +111,199 @@ class DataCache(object):
         return False
 
     @staticmethod
-    def filterData(filterDict, maskList):
+    def getSequences():
+        """
+        Returns the couch update sequences the cache is in sync with
+        """
+        return dict(DataCache._sequences)
+
+    @staticmethod
+    def getCacheStatus():
+        """
+        Returns the cache freshness and size information
+        """
+        now = int(time.time())
+        lastLoad = DataCache._lastedActiveDataFromAgent.get("time", 0)
+        data = DataCache.getlatestJobData()
+        return {"size": len(data) if isinstance(data, dict) else 0,
+                "last_full_load": lastLoad,
+                "last_update": DataCache._lastUpdate,
+                "age": now - DataCache._lastUpdate if DataCache._lastUpdate else None,
+                "expired": DataCache.islatestJobDataExpired(),
+                "sequences": DataCache.getSequences(),
+                "indexes": {key: len(DataCache._index.get(key, {})) for key in INDEXED_KEYS}}
+
+    @staticmethod
+    def _rebuildIndex():
+        """
+        Build the secondary indexes from scratch. Must be called with the lock held.
+        """
+        DataCache._index = dict((key, {}) for key in INDEXED_KEYS)
+        DataCache._unindexed = dict((key, set()) for key in INDEXED_KEYS)
+        DataCache._jobInfoDocs = {}
         reqData = DataCache.getlatestJobData()
+        if not isinstance(reqData, dict):
+            return
+        for reqName, reqDict in viewitems(reqData):
+            DataCache._addToIndex(reqName, reqDict)
+
+    @staticmethod
+    def _addToIndex(reqName, reqDict):
+        if not isinstance(reqDict, dict):
+            return
+        reqInfo = RequestInfo(reqDict)
+        for key in INDEXED_KEYS:
+            for value in _indexValues(key, reqInfo):
+                try:
+                    DataCache._index[key].setdefault(value, set()).add(reqName)
+                except TypeError:
+                    DataCache._unindexed[key].add(reqName)
+        for agentURL, jobInfo in viewitems(reqDict.get("AgentJobInfo") or {}):
+            if isinstance(jobInfo, dict) and "_id" in jobInfo:
+                DataCache._jobInfoDocs[jobInfo["_id"]] = (reqName, agentURL)
 
-        for _, reqInfo in reqData.iteritems():
+    @staticmethod
+    def _removeFromIndex(reqName, reqDict):
+        if not isinstance(reqDict, dict):
+            return
+        reqInfo = RequestInfo(reqDict)
+        for key in INDEXED_KEYS:
+            DataCache._unindexed[key].discard(reqName)
+            for value in _indexValues(key, reqInfo):
+                try:
+                    names = DataCache._index[key].get(value)
+                except TypeError:
+                    continue
+                if names is not None:
+                    names.discard(reqName)
+                    if not names:
+                        del DataCache._index[key][value]
+        for jobInfo in (reqDict.get("AgentJobInfo") or {}).values():
+            if isinstance(jobInfo, dict):
+                DataCache._jobInfoDocs.pop(jobInfo.get("_id"), None)
+
+    @staticmethod
+    def _replaceRequests(newDocs, removed=None):
+        """
+        Apply a set of request changes: newDocs is a {requestName: doc} dict
+        of requests to add/replace and removed an iterable of request names
+        to drop. The data dict is copied before being modified so readers
+        holding a reference to the previous one are not affected.
+        Must be called with the lock held.
+        """
+        if not DataCache._index:
+            DataCache._rebuildIndex()
+        # never loaded, make sure the next check triggers a full reload
+        DataCache._lastedActiveDataFromAgent.setdefault("time", 0)
+        DataCache._lastedActiveDataFromAgent.setdefault("data", {})
+        reqData = dict(DataCache.getlatestJobData())
+        for reqName in removed or []:
+            if reqName in reqData:
+                DataCache._removeFromIndex(reqName, reqData.pop(reqName))
+        for reqName, reqDict in viewitems(newDocs):
+            if reqName in reqData:
+                DataCache._removeFromIndex(reqName, reqData[reqName])
+            reqData[reqName] = reqDict
+            DataCache._addToIndex(reqName, reqDict)
+        DataCache._lastedActiveDataFromAgent["data"] = reqData
+        DataCache._lastUpdate = int(time.time())
+
+    @staticmethod
+    def updateRequests(requests, sequences=None):
+        """
+        Add or replace request documents in the cache, requests is a
+        {requestName: requestDoc} dictionary. The job information
+        (AgentJobInfo) already cached for a request is kept if the new
+        document doesn't provide it.
+        """
+        with DataCache._lock:
+            reqData = DataCache.getlatestJobData()
+            newDocs = {}
+            for reqName, reqDict in viewitems(requests):
+                if not reqDict:
+                    continue
+                if "AgentJobInfo" not in reqDict and "AgentJobInfo" in reqData.get(reqName, {}):
+                    reqDict = dict(reqDict)
+                    reqDict["AgentJobInfo"] = reqData[reqName]["AgentJobInfo"]
+                newDocs[reqName] = reqDict
+            DataCache._replaceRequests(newDocs)
+            DataCache._sequences.update(sequences or {})
+
+    @staticmethod
+    def removeRequests(requestNames, sequences=None):
+        """
+        Remove requests from the cache
+        """
+        with DataCache._lock:
+            DataCache._replaceRequests({}, requestNames)
+            DataCache._sequences.update(sequences or {})
+
+    @staticmethod
+    def updateJobInfo(jobInfoDocs, deletedIDs=None, sequences=None):
+        """
+        Update the AgentJobInfo of the cached requests with the given wmstats
+        agent_request documents and remove the ones which were deleted
+        (by document id). Documents for requests not in the cache are ignored.
+        """
+        with DataCache._lock:
+            reqData = DataCache.getlatestJobData()
+            newDocs = {}
+            for docID in deletedIDs or []:
+                reqName, agentURL = DataCache._jobInfoDocs.get(docID, (None, None))
+                reqDict = newDocs.get(reqName, reqData.get(reqName))
+                if reqDict and agentURL in reqDict.get("AgentJobInfo", {}):
+                    reqDict = dict(reqDict)
+                    reqDict["AgentJobInfo"] = dict(reqDict["AgentJobInfo"])
+                    del reqDict["AgentJobInfo"][agentURL]
+                    newDocs[reqName] = reqDict
+            for doc in jobInfoDocs:
+                reqName = doc.get("workflow")
+                reqDict = newDocs.get(reqName, reqData.get(reqName))
+                if not reqDict:
+                    continue
+                reqDict = dict(reqDict)
+                reqDict["AgentJobInfo"] = dict(reqDict.get("AgentJobInfo", {}))
+                reqDict["AgentJobInfo"][doc["agent_url"]] = doc
+                newDocs[reqName] = reqDict
+            if newDocs:
+                DataCache._replaceRequests(newDocs)
+            DataCache._sequences.update(sequences or {})
+
+    @staticmethod
+    def _candidateRequests(filterDict):
+        """
+        Returns the list of (requestName, requestDoc) which can match the filter,
+        using the secondary indexes to narrow down the requests to check.
+        """
+        with DataCache._lock:
+            reqData = DataCache.getlatestJobData()
+            candidates = None
+            for key, value in viewitems(filterDict):
+                if key not in DataCache._index:
+                    continue
+                values = _normalizeFilterValue(key, value)
+                if values is None:
+                    continue
+                names = set(DataCache._unindexed[key])
+                for item in values:
+                    try:
+                        names.update(DataCache._index[key].get(item, ()))
+                    except TypeError:
+                        names = None
+                        break
+                if names is None:
+                    continue
+                candidates = names if candidates is None else candidates & names
+                if not candidates:
+                    return []
+
+            if candidates is None:
+                return list(viewitems(reqData))
+            return [(reqName, reqData[reqName]) for reqName in candidates if reqName in reqData]
+
+    @staticmethod
+    def filterData(filterDict, maskList):
+        for _, reqInfo in DataCache._candidateRequests(filterDict):
             reqData = RequestInfo(reqInfo)
             if reqData.andFilterCheck(filterDict):
                 for prop in maskList:
@@ -60,15 +317,13 @@ class DataCache(object):
 
     @staticmethod
     def filterDataByRequest(filterDict, maskList=None):
-        reqData = DataCache.getlatestJobData()
-
         if maskList is not None:
             if isinstance(maskList, basestring):
                 maskList = [maskList]
             if "RequestName" not in maskList:
                 maskList.append("RequestName")
 
-        for _, reqDict in reqData.iteritems():
+        for _, reqDict in DataCache._candidateRequests(filterDict):
             reqInfo = RequestInfo(reqDict)
             if reqInfo.andFilterCheck(filterDict):
 
@@ -84,6 +339,6 @@ class DataCache(object):
     def getProtectedLFNs():
         reqData = DataCache.getlatestJobData()
 
-        for _, reqInfo in reqData.iteritems():
+        for _, reqInfo in viewitems(reqData):
             for dirPath in protectedLFNs(reqInfo):
-                yield dirPath
\ No newline at end of file
+                yield dirPath
@@ -23,7 +23,7 @@ class ActiveRequestJobInfo(RESTEntity):
     def validate(self, apiobj, method, api, param, safe):
         return
 
-    @restcall(formats=[('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())])
+    @restcall(formats=[('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())], cache=60)
     @tools.expires(secs=-1)
     def get(self):
         # This assumes DataCahe is periodically updated.
@@ -50,7 +50,7 @@ class FilteredActiveRequestJobInfo(RESTEntity):
 
         return
 
-    @restcall(formats=[('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())])
+    @restcall(formats=[('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())], cache=60)
     @tools.expires(secs=-1)
     def get(self, mask=None, **input_condition):
         # This assumes DataCahe is periodically updated.
@@ -71,7 +71,7 @@ class ProtectedLFNList(RESTEntity):
     def validate(self, apiobj, method, api, param, safe):
         return
 
-    @restcall(formats=[('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())])
+    @restcall(formats=[('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())], cache=60)
     @tools.expires(secs=-1)
     def get(self):
         # This assumes DataCahe is periodically updated.
@@ -95,7 +95,7 @@ class ProtectedLFNListOnlyFinalOutput(RESTEntity):
     def validate(self, apiobj, method, api, param, safe):
         return
 
-    @restcall(formats=[('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())])
+    @restcall(formats=[('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())], cache=60)
     @tools.expires(secs=-1)
     def get(self):
         # This assumes DataCahe is periodically updated.
@@ -111,7 +111,7 @@ class GlobalLockList(RESTEntity):
     def validate(self, apiobj, method, api, param, safe):
         return
 
-    @restcall(formats=[('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())])
+    @restcall(formats=[('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())], cache=60)
     @tools.expires(secs=-1)
     def get(self):
         # This assumes DataCahe is periodically updated.
@@ -121,3 +121,20 @@ class GlobalLockList(RESTEntity):
         else:
             return rows(DataCache.filterData(ACTIVE_STATUS_FILTER,
                                              ["InputDataset", "OutputDatasets", "MCPileup", "DataPileup"]))
+
+
+class DataCacheStatus(RESTEntity):
+    """
+    Freshness and size information about the server data cache
+    """
+
+    def __init__(self, app, api, config, mount):
+        RESTEntity.__init__(self, app, api, config, mount)
+
+    def validate(self, apiobj, method, api, param, safe):
+        return
+
+    @restcall(formats=[('text/plain', PrettyJSONFormat()), ('application/json', JSONFormat())])
+    @tools.expires(secs=-1)
+    def get(self):
+        return rows([DataCache.getCacheStatus()])
@@ -30,7 +30,7 @@ class RequestInfo(RESTEntity):
         return
 
 
-    @restcall(formats = [('application/json', JSONFormat())])
+    @restcall(formats = [('application/json', JSONFormat())], cache=60)
     @tools.expires(secs=-1)
     def get(self, request_name):
         result = self.wmstats.getRequestSummaryWithJobInfo(request_name)
@@ -95,7 +95,8 @@ class JobDetailInfo(RESTEntity):
         return
 
 
-    @restcall(formats=[('text/plain', PrettyJSONFormat()), ('text/html', PrettyJSONHTMLFormat()), ('application/json', JSONFormat())])
+    @restcall(formats=[('text/plain', PrettyJSONFormat()), ('text/html', PrettyJSONHTMLFormat()), ('application/json', JSONFormat())],
+              cache=60)
     @tools.expires(secs=-1)
     def get(self, request_name, sample_size):
 
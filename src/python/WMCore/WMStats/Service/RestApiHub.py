@@ -16,7 +16,7 @@ from WMCore.WMStats.Service.RequestInfo import (RequestInfo, FinishedStatusInfo,
                                                 TeamInfo, JobDetailInfo)
 from WMCore.WMStats.Service.ActiveRequestJobInfo import (ActiveRequestJobInfo, GlobalLockList,
                                                          ProtectedLFNList, ProtectedLFNListOnlyFinalOutput,
-                                                         FilteredActiveRequestJobInfo)
+                                                         FilteredActiveRequestJobInfo, DataCacheStatus)
 
 
 class RestApiHub(RESTApi):
@@ -47,5 +47,6 @@ class RestApiHub(RESTApi):
                    "protectedlfns": ProtectedLFNList(app, self, config, mount),
                    "protectedlfns_final": ProtectedLFNListOnlyFinalOutput(app, self, config, mount),
                    "globallocks": GlobalLockList(app, self, config, mount),
+                   "cachestatus": DataCacheStatus(app, self, config, mount),
                    "proc_status": ProcessMatrix(app, self, config, mount)
                    })
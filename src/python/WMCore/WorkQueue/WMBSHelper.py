@@ -154,7 +154,7 @@ class WMBSHelper(WMConnectionBase):
     """
 
     def __init__(self, wmSpec, taskName, blockName=None, mask=None,
-                 cachepath='.', commonLocation=None):
+                 cachepath='.', commonLocation=None, sandboxCompression="bz2"):
         """
         _init_
 
@@ -165,6 +165,7 @@ class WMBSHelper(WMConnectionBase):
         self.wmSpec = wmSpec
         self.topLevelTask = wmSpec.getTask(taskName)
         self.cachepath = cachepath
+        self.sandboxCompression = sandboxCompression
         self.isDBS = True
 
         self.topLevelFileset = None
@@ -205,7 +206,7 @@ class WMBSHelper(WMConnectionBase):
 
     def createSandbox(self):
         """Create the runtime sandbox"""
-        sandboxCreator = SandboxCreator()
+        sandboxCreator = SandboxCreator(compression=self.sandboxCompression)
         sandboxCreator.makeSandbox(self.cachepath, self.wmSpec)
 
     def createTopLevelFileset(self, topLevelFilesetName=None):
@@ -131,6 +131,8 @@ class WorkQueue(WorkQueueBase):
 
         self.params.setdefault('JobDumpConfig', None)
         self.params.setdefault('BossAirConfig', None)
+        # compression of the job sandboxes: bz2, gz or none
+        self.params.setdefault('SandboxCompression', 'bz2')
 
         self.params['QueueURL'] = self.backend.queueUrl  # url this queue is visible on
         # backend took previous QueueURL and sanitized it
@@ -374,9 +376,9 @@ class WorkQueue(WorkQueueBase):
         :param dbsUrl: string with the DBS url
         :return: an instance of DBSReader
         """
-        if dbsUrl in self.dbses:
-            return self.dbses[dbsUrl]
-        return DBSReader(dbsUrl)
+        if dbsUrl not in self.dbses:
+            self.dbses[dbsUrl] = DBSReader(dbsUrl)
+        return self.dbses[dbsUrl]
 
     def _getDBSDataset(self, match):
         """Get DBS info for this dataset"""
@@ -385,8 +387,7 @@ class WorkQueue(WorkQueueBase):
         datasetName = match['Inputs'].keys()[0]
 
         blocks = dbs.listFileBlocks(datasetName, onlyClosedBlocks=True)
-        for blockName in blocks:
-            tmpDsetDict.update(dbs.getFileBlock(blockName))
+        tmpDsetDict.update(dbs.getFileBlocks(blocks))
 
         dbsDatasetDict = {'Files': [], 'IsOpen': False, 'PhEDExNodeNames': []}
         dbsDatasetDict['Files'] = [f for block in tmpDsetDict.values() for f in block['Files']]
@@ -437,7 +438,8 @@ class WorkQueue(WorkQueueBase):
 
         mask = match['Mask']
         wmbsHelper = WMBSHelper(wmspec, match['TaskName'], blockName, mask,
-                                self.params['CacheDir'], commonLocation)
+                                self.params['CacheDir'], commonLocation,
+                                sandboxCompression=self.params['SandboxCompression'])
 
         sub, match['NumOfFilesAdded'] = wmbsHelper.createSubscriptionAndAddFiles(block=dbsBlock)
         self.logger.info("Created top level subscription %s for %s with %s files",
@@ -471,7 +473,8 @@ class WorkQueue(WorkQueueBase):
             blockName, dbsBlock = self._getDBSBlock(ele, wmspec)
             if ele['NumOfFilesAdded'] != len(dbsBlock['Files']):
                 self.logger.info("Adding new files to open block %s (%s)", blockName, ele.id)
-                wmbsHelper = WMBSHelper(wmspec, ele['TaskName'], blockName, ele['Mask'], self.params['CacheDir'])
+                wmbsHelper = WMBSHelper(wmspec, ele['TaskName'], blockName, ele['Mask'], self.params['CacheDir'],
+                                        sandboxCompression=self.params['SandboxCompression'])
                 ele['NumOfFilesAdded'] += wmbsHelper.createSubscriptionAndAddFiles(block=dbsBlock)[1]
                 self.backend.updateElements(ele.id, NumOfFilesAdded=ele['NumOfFilesAdded'])
             if dbsBlock['IsOpen'] != ele['OpenForNewData']:
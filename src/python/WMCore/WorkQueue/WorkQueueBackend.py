@@ -481,12 +481,12 @@ class WorkQueueBackend(object):
 
     def getWorkflows(self, includeInbox=False, includeSpecs=False):
         """Returns workflows known to workqueue"""
-        result = set([x['key'] for x in self.db.loadView('WorkQueue', 'elementsByWorkflow', {'group': True})['rows']])
+        result = set([x['key'] for x in self.db.iterView('WorkQueue', 'elementsByWorkflow', {'group': True})])
         if includeInbox:
             result = result | set(
-                [x['key'] for x in self.inbox.loadView('WorkQueue', 'elementsByWorkflow', {'group': True})['rows']])
+                [x['key'] for x in self.inbox.iterView('WorkQueue', 'elementsByWorkflow', {'group': True})])
         if includeSpecs:
-            result = result | set([x['key'] for x in self.db.loadView('WorkQueue', 'specsByWorkflow')['rows']])
+            result = result | set([x['key'] for x in self.db.iterView('WorkQueue', 'specsByWorkflow')])
         return list(result)
 
     def queueLength(self):
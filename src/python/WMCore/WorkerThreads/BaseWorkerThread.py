@@ -6,6 +6,14 @@ _BaseWorkerThread_
 Base class for all regular worker threads managed by WorkerThreadManager.
 Deriving classes should override algorithm, and optionally setup and terminate
 to perform thread-specific setup and clean-up operations
+
+Every cycle is instrumented (wall clock/CPU time and the named phases opened
+with phaseTimer), the rolling percentiles are published with the heartbeat.
+The following optional parameters of the component configuration section
+control it:
+  cycleStatsWindow: number of cycles the percentiles are computed on (100)
+  profileEveryNCycles: run one cycle out of N under cProfile and dump it to
+                       <componentDir>/<worker name>.prof (0, disabled)
 """
 
 import logging
@@ -14,6 +22,7 @@ import threading
 import time
 import traceback
 
+from Utils.Timers import CycleProfiler
 from WMCore.Database.DBExceptionHandler import db_exception_handler
 from WMCore.Database.Transaction import Transaction
 
@@ -50,6 +59,7 @@ class BaseWorkerThread(object):
 
         # Init the timing
         self.lastTime = time.time()
+        self.profiler = CycleProfiler(self.__class__.__name__)
 
         # Get the current DBFactory
         myThread = threading.currentThread()
@@ -101,14 +111,38 @@ class BaseWorkerThread(object):
             self.heartbeatAPI.registerWorker(self.workerName)
         return
 
+    def setUpProfiler(self, myThread):
+        """
+        Configure the cycle profiler from the component configuration
+        """
+        config = self.component.config
+        compName = getattr(getattr(config, "Agent", None), "componentName", None)
+        compSect = getattr(config, compName, None) if compName else None
+        self.profiler = CycleProfiler(myThread.getName(),
+                                      window=getattr(compSect, "cycleStatsWindow", 100),
+                                      profileEvery=getattr(compSect, "profileEveryNCycles", 0),
+                                      profileDir=getattr(compSect, "componentDir", None))
+        return
+
+    def phaseTimer(self, phaseName):
+        """
+        Context manager timing a named phase of the current cycle, use like
+
+        with self.phaseTimer("loadJobs"):
+            ...
+        """
+        return self.profiler.phase(phaseName)
+
     def setUpLogDB(self, myThread):
         # setup logDB
         if hasattr(self.component.config, "General") and \
                 hasattr(self.component.config.General, "central_logdb_url") and \
                 hasattr(self.component.config, "Agent"):
             from WMCore.Services.LogDB.LogDB import LogDB
+            flushInterval = getattr(self.component.config.General, "central_logdb_flush_interval", 30)
             myThread.logdbClient = LogDB(self.component.config.General.central_logdb_url,
-                                         self.component.config.Agent.hostName, logger=logging)
+                                         self.component.config.Agent.hostName, logger=logging,
+                                         flush_interval=flushInterval)
         else:
             myThread.logdbClient = None
         return
@@ -140,6 +174,7 @@ class BaseWorkerThread(object):
         myThread.transaction = Transaction(myThread.dbi)
 
         self.setUpHeartbeat(myThread)
+        self.setUpProfiler(myThread)
         self.setUpLogDB(myThread)
 
         # Call worker setup
@@ -179,10 +214,12 @@ class BaseWorkerThread(object):
                             if self.useHeartbeat:
                                 self.heartbeatAPI.updateWorkerHeartbeat(self.workerName, "Running")
 
-                            tSpent, results, _ = algorithmWithDBExceptionHandler(parameters)
+                            with self.profiler.cycle():
+                                tSpent, results, _ = algorithmWithDBExceptionHandler(parameters)
                             if tSpent and self.useHeartbeat:
                                 logging.info("%s took %.3f secs to execute", self.workerName, tSpent)
-                                self.heartbeatAPI.updateWorkerCycle(self.workerName, tSpent, results)
+                                self.heartbeatAPI.updateWorkerCycle(self.workerName, tSpent, results,
+                                                                    self.profiler.summary())
 
                             # Catch if someone forgets to commit/rollback
                             if myThread.transaction.transaction is not None:
@@ -227,6 +264,10 @@ class BaseWorkerThread(object):
                 except Exception as ex:
                     logging.error("Heartbeat error update failed %s", str(ex))
 
+        # Write any buffered LogDB message
+        if getattr(threading.currentThread(), "logdbClient", None):
+            threading.currentThread().logdbClient.close()
+
         # Indicate to manager that thread is done
         self.terminateCallback(threading.currentThread().name)
 
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+Unittests for the Timers module
+"""
+
+from __future__ import division, print_function
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from Utils.Timers import timeFunction, percentile, CycleProfiler
+
+
+class TimersTest(unittest.TestCase):
+    """
+    unittest for the Timers functions and classes
+    """
+
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+    def testTimeFunction(self):
+        """
+        Test the timeFunction decorator
+        """
+
+        @timeFunction
+        def func(value):
+            return value * 2
+
+        timeSpent, result, funcName = func(2)
+        self.assertTrue(timeSpent >= 0)
+        self.assertEqual(result, 4)
+        self.assertEqual(funcName, "func")
+
+    def testPercentile(self):
+        """
+        Test the percentile function
+        """
+        self.assertIsNone(percentile([], 50))
+        self.assertEqual(percentile([3, 1, 2], 50), 2)
+        self.assertEqual(percentile(range(101), 90), 90)
+        self.assertEqual(percentile(range(101), 100), 100)
+        self.assertEqual(percentile([5], 99), 5)
+
+    def testCycleProfiler(self):
+        """
+        Test the cycle and phase timings of the CycleProfiler
+        """
+        profiler = CycleProfiler("TestPoller", window=3)
+        for _ in range(5):
+            with profiler.cycle():
+                with profiler.phase("load"):
+                    time.sleep(0.01)
+                with profiler.phase("process"):
+                    pass
+                with profiler.phase("load"):
+                    time.sleep(0.01)
+
+        self.assertEqual(profiler.cycles, 5)
+        self.assertEqual(len(profiler.wallTimes), 3)
+        self.assertEqual(len(profiler.cpuTimes), 3)
+        self.assertEqual(list(profiler.phaseTimes), ["load", "process"])
+        # both load phases of a cycle count as one
+        self.assertEqual(len(profiler.phaseTimes["load"]), 3)
+        self.assertTrue(min(profiler.phaseTimes["load"]) >= 0.02)
+
+        stats = profiler.percentiles()
+        self.assertEqual(list(stats), ["wall", "cpu", "phase.load", "phase.process"])
+        self.assertEqual(list(stats["wall"]), ["p50", "p90", "p99"])
+        self.assertTrue(stats["wall"]["p50"] >= stats["phase.load"]["p50"])
+
+        summary = json.loads(profiler.summary())
+        self.assertEqual(summary["cycles"], 5)
+        self.assertItemsEqual(summary.keys(), ["cycles", "wall", "cpu", "phase.load", "phase.process"])
+        # the shortest phases are left out of a summary too long, it's still valid json
+        summary = profiler.summary(maxLength=len(profiler.summary()) - 1)
+        self.assertItemsEqual(json.loads(summary).keys(), ["cycles", "wall", "cpu", "phase.load"])
+        summary = json.loads(profiler.summary(maxLength=10))
+        self.assertItemsEqual(summary.keys(), ["cycles", "wall", "cpu"])
+
+        # phases outside a cycle are recorded on their own
+        with profiler.phase("setup"):
+            pass
+        self.assertEqual(len(profiler.phaseTimes["setup"]), 1)
+
+        # cycles raising exceptions are measured too
+        with self.assertRaises(RuntimeError):
+            with profiler.cycle():
+                raise RuntimeError("failed cycle")
+        self.assertEqual(profiler.cycles, 6)
+
+    def testCycleProfilerDump(self):
+        """
+        Test the cProfile dumps of the CycleProfiler
+        """
+        profiler = CycleProfiler("TestPoller", profileEvery=2, profileDir=self.tempDir)
+        profileFile = os.path.join(self.tempDir, "TestPoller.prof")
+        with profiler.cycle():
+            sorted(range(1000))
+        self.assertFalse(os.path.exists(profileFile))
+        with profiler.cycle():
+            sorted(range(1000))
+        self.assertTrue(os.path.exists(profileFile))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+"""
+_AccountantPool_t_
+
+Unit tests for the JobAccountant process pool helpers.
+"""
+
+import unittest
+
+from WMComponent.JobAccountant.AccountantPool import partitionJobs
+
+
+class AccountantPoolTest(unittest.TestCase):
+    """
+    Test the partitioning of the completed jobs
+    """
+
+    def testPartitionJobs(self):
+        """
+        _testPartitionJobs_
+
+        Jobs of a workflow must always end up in the same partition
+        and partitions should be balanced.
+        """
+        jobs = []
+        for workflow, nJobs in [(1, 10), (2, 6), (3, 4), (4, 3), (5, 1)]:
+            jobs.extend({"id": "%s-%s" % (workflow, i), "fwjr_path": "", "workflow": workflow}
+                        for i in range(nJobs))
+
+        partitions = partitionJobs(jobs, 3)
+        self.assertEqual(len(partitions), 3)
+        self.assertItemsEqual([len(partition) for partition in partitions], [10, 7, 7])
+        self.assertEqual(sum(len(partition) for partition in partitions), len(jobs))
+        for partition in partitions:
+            for workflow in set(job["workflow"] for job in partition):
+                self.assertEqual(len([job for job in partition if job["workflow"] == workflow]),
+                                 len([job for job in jobs if job["workflow"] == workflow]))
+
+        # more processes than workflows
+        self.assertEqual(len(partitionJobs(jobs, 10)), 5)
+        self.assertEqual(partitionJobs([], 3), [])
+        self.assertEqual(len(partitionJobs(jobs, 0)), 1)
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
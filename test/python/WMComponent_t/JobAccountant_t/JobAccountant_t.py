@@ -1312,6 +1312,37 @@ class JobAccountantTest(EmulatedUnitTestCase):
 
         return
 
+    def testAccountantPool(self):
+        """
+        _testAccountantPool_
+
+        Run the load test accounting the jobs through a pool of
+        accountant processes.
+        """
+        self.setupDBForLoadTest(maxJobs=20)
+
+        config = self.createConfig()
+        config.JobAccountant.accountantProcesses = 2
+        config.JobAccountant.accountantWorkSize = 5
+        accountant = JobAccountantPoller(config)
+        accountant.setup()
+        try:
+            accountant.algorithm()
+        finally:
+            accountant.terminate(None)
+
+        for (jobID, fwjrPath) in self.jobs:
+            jobReport = Report()
+            jobReport.unpersist(fwjrPath)
+
+            self.verifyFileMetaData(jobID, jobReport.getAllFilesFromStep("cmsRun1"))
+            self.verifyJobSuccess(jobID)
+            self.verifyDBSBufferContents("Processing",
+                                         ["/some/lfn/for/job/%s" % jobID],
+                                         jobReport.getAllFilesFromStep("cmsRun1"))
+
+        return
+
     def testDBRollback(self):
         """
         _testDBRollback_
@@ -4,15 +4,16 @@
 JobArchiver test
 """
 
+import json
 import os
-import shutil
+import tarfile
 import threading
 import unittest
-from subprocess import PIPE, Popen
 
 from nose.plugins.attrib import attr
 
-from WMComponent.JobArchiver.JobArchiverPoller import JobArchiverPoller
+from Utils.FileTools import TAR_COMPRESSION
+from WMComponent.JobArchiver.JobArchiverPoller import JobArchiverPoller, archiveJobCluster
 from WMCore.DAOFactory import DAOFactory
 from WMCore.DataStructs.Run import Run
 from WMCore.JobStateMachine.ChangeState import ChangeState
@@ -221,24 +222,63 @@ class JobArchiverTest(EmulatedUnitTestCase):
         for job in testJobGroup.jobs:
             self.assertEqual(job["name"] in dirList, False)
 
+        # all the jobs of the cluster go in a single tarball with an index
         logPath = os.path.join(config.JobArchiver.componentDir, 'logDir', 'w', 'wf001', 'JobCluster_0')
-        logList = os.listdir(logPath)
-        for job in testJobGroup.jobs:
-            self.assertEqual('Job_%i.tar.bz2' % (job['id']) in logList, True,
-                             'Could not find transferred tarball for job %i' % (job['id']))
-            pipe = Popen(['tar', '-jxvf', os.path.join(logPath, 'Job_%i.tar.bz2' % (job['id']))],
-                         stdout=PIPE, stderr=PIPE, shell=False)
-            pipe.wait()
-            # filename = '%s/%s/%s.out' %(cacheDir[1:], job['name'], job['name'])
-            filename = 'Job_%i/%s.out' % (job['id'], job['name'])
-            self.assertEqual(os.path.isfile(filename), True, 'Could not find file %s' % (filename))
-            f = open(filename, 'r')
-            fileContents = f.readlines()
-            f.close()
-            self.assertEqual(fileContents[0].find(job['name']) > -1, True)
-            shutil.rmtree('Job_%i' % (job['id']))
-            if os.path.isfile('Job_%i.tar.bz2' % (job['id'])):
-                os.remove('Job_%i.tar.bz2' % (job['id']))
+        jobIds = [job['id'] for job in testJobGroup.jobs]
+        archiveName = 'Jobs_%i-%i' % (min(jobIds), max(jobIds))
+        self.assertItemsEqual(os.listdir(logPath), [archiveName + '.tar.bz2', archiveName + '.json'])
+
+        with open(os.path.join(logPath, archiveName + '.json')) as indexFile:
+            index = json.load(indexFile)
+        self.assertItemsEqual(index.keys(), [str(jobId) for jobId in jobIds])
+
+        with tarfile.open(os.path.join(logPath, archiveName + '.tar.bz2')) as tarball:
+            for job in testJobGroup.jobs:
+                filename = 'Job_%i/%s.out' % (job['id'], job['name'])
+                self.assertEqual(index[str(job['id'])], [filename])
+                fileContents = tarball.extractfile(filename).read()
+                self.assertEqual(fileContents.find(job['name']) > -1, True)
+
+        return
+
+    def testArchiveJobCluster(self):
+        """
+        _testArchiveJobCluster_
+
+        Test the archiving of a group of job caches with the different compressions
+        """
+        cacheDir = os.path.join(self.testDir, 'cache')
+        jobCaches = []
+        for jobId in range(1, 4):
+            path = os.path.join(cacheDir, 'job%i' % jobId)
+            os.makedirs(path)
+            for fileName in ('job.out', 'job.err'):
+                with open(os.path.join(path, fileName), 'w') as f:
+                    f.write('job %i' % jobId)
+            jobCaches.append((jobId, path))
+        # empty caches are archived without members
+        os.makedirs(os.path.join(cacheDir, 'job4'))
+        jobCaches.append((4, os.path.join(cacheDir, 'job4')))
+
+        for mode, extension in TAR_COMPRESSION.values():
+            tarPath = os.path.join(self.testDir, 'Jobs_1-4' + extension)
+            indexPath = os.path.join(self.testDir, 'Jobs_1-4%s.json' % extension)
+            result = archiveJobCluster((tarPath, indexPath, mode, None, jobCaches))
+            self.assertEqual(result, (tarPath, [1, 2, 3, 4], None))
+
+            with open(indexPath) as indexFile:
+                index = json.load(indexFile)
+            self.assertEqual(index['1'], ['Job_1/job.err', 'Job_1/job.out'])
+            self.assertEqual(index['4'], [])
+            with tarfile.open(tarPath) as tarball:
+                self.assertEqual(len(tarball.getnames()), 6)
+                self.assertEqual(tarball.extractfile('Job_3/job.out').read(), 'job 3')
+
+        # failures are reported back
+        tarPath = os.path.join(self.testDir, 'missing', 'Jobs_1-4.tar')
+        tarPath, jobIds, error = archiveJobCluster((tarPath, tarPath + '.json', 'w', None, jobCaches))
+        self.assertEqual(jobIds, [])
+        self.assertTrue(error.startswith("Exception while opening and adding to a tarfile"))
 
         return
 
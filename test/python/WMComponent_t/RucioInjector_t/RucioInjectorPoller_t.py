@@ -6,7 +6,7 @@ Unit tests for the RucioInjectorPoller module
 from __future__ import division
 
 import unittest
-from WMComponent.RucioInjector.RucioInjectorPoller import filterDataByTier
+from WMComponent.RucioInjector.RucioInjectorPoller import filterDataByTier, groupBlocksInBatches
 
 
 class RucioInjectorPollerTest(unittest.TestCase):
@@ -39,6 +39,32 @@ class RucioInjectorPollerTest(unittest.TestCase):
 
         return
 
+    def testGroupBlocksInBatches(self):
+        """
+        _testGroupBlocksInBatches_
+
+        Test the `groupBlocksInBatches` function, which splits the blocks
+        in batches of about the same number of files.
+        """
+        self.assertEqual(groupBlocksInBatches({}, 10), [])
+
+        filesByBlock = {"/dset1/procStr-v1/GEN#1": ["file"] * 4,
+                        "/dset1/procStr-v1/GEN#2": ["file"] * 4,
+                        "/dset1/procStr-v1/GEN#3": ["file"] * 15,
+                        "/dset1/procStr-v1/GEN#4": ["file"] * 1}
+        batches = groupBlocksInBatches(filesByBlock, 10)
+        self.assertEqual(len(batches), 3)
+        self.assertItemsEqual(batches[0].keys(), ["/dset1/procStr-v1/GEN#1", "/dset1/procStr-v1/GEN#2"])
+        # blocks bigger than a batch are never split
+        self.assertItemsEqual(batches[1].keys(), ["/dset1/procStr-v1/GEN#3"])
+        self.assertItemsEqual(batches[2].keys(), ["/dset1/procStr-v1/GEN#4"])
+        self.assertEqual(batches[1]["/dset1/procStr-v1/GEN#3"], ["file"] * 15)
+
+        batches = groupBlocksInBatches(filesByBlock, 100)
+        self.assertEqual(batches, [filesByBlock])
+
+        return
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+"""
+_CouchCleanup_t_
+
+Unittests for the couch cleanup reports
+"""
+
+import unittest
+
+from WMComponent.TaskArchiver.CouchCleanup import CouchCleanup
+
+
+class CouchCleanupTest(unittest.TestCase):
+
+    def testIsSuccessful(self):
+        """
+        _testIsSuccessful_
+
+        Verify which cleanup errors fail a workflow cleanup.
+        """
+        report = {"JobDump": {'status': 'ok', 'delete': 10, 'message': {}},
+                  "FWJRDump": {'status': 'warning', 'message': "no workflow exist"},
+                  "SummaryStats": {'status': 'ok', 'delete': 1, 'message': {}},
+                  "WMStatsAgent": {'status': 'ok', 'delete': 1, 'message': {}}}
+        self.assertTrue(CouchCleanup.isSuccessful(report))
+
+        report["SummaryStats"] = {'status': 'error', 'delete': 0, 'message': {'conflict': 1}}
+        self.assertTrue(CouchCleanup.isSuccessful(report))
+
+        report["FWJRDump"] = {'status': 'error', 'delete': 5, 'message': {'conflict': 1}}
+        self.assertFalse(CouchCleanup.isSuccessful(report))
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
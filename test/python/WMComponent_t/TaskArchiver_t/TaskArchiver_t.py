@@ -657,6 +657,38 @@ class TaskArchiverTest(EmulatedUnitTestCase):
                 '8020'], 0)
         return
 
+    def testCleanLocalCouch(self):
+        """
+        _testCleanLocalCouch_
+
+        Test the batched deletion of the workflow docs from the local couch dbs
+        """
+        config = self.getConfig()
+        config.TaskArchiver.cleanCouchBatchSize = 3
+        workloadPath = os.path.join(self.testDir, 'specDir', 'spec.pkl')
+        workload = self.createWorkload(workloadName=workloadPath)
+        self.createTestJobGroup(config=config, name=workload.name(),
+                                specLocation=workloadPath, error=False)
+
+        couchdb = CouchServer(config.JobStateMachine.couchurl)
+        jobdb = couchdb.connectDatabase("%s/jobs" % self.databaseName)
+        fwjrdb = couchdb.connectDatabase("%s/fwjrs" % self.databaseName)
+        options = {"startkey": [workload.name()], "endkey": [workload.name(), {}], "reduce": False}
+        self.assertEqual(len(jobdb.loadView("JobDump", "jobsByWorkflowName", options=options)['rows']),
+                         self.nJobs)
+
+        cleanCouch = CleanCouchPoller(config=config)
+        cleanCouch.setup()
+        report = cleanCouch.couchCleanup.cleanWorkflows([workload.name(), "NotAWorkflow"])
+        self.assertItemsEqual(report.keys(), [workload.name(), "NotAWorkflow"])
+        self.assertEqual(report[workload.name()]["JobDump"], {'status': 'ok', 'delete': self.nJobs, 'message': {}})
+        self.assertEqual(report[workload.name()]["FWJRDump"]['status'], 'ok')
+        self.assertEqual(report["NotAWorkflow"]["JobDump"]['status'], 'warning')
+
+        self.assertEqual(jobdb.loadView("JobDump", "jobsByWorkflowName", options=options)['rows'], [])
+        self.assertEqual(fwjrdb.loadView("FWJRDump", "fwjrsByWorkflowName", options=options)['rows'], [])
+        return
+
     @attr("integration")
     def testC_Profile(self):
         """
@@ -117,6 +117,18 @@ class HeartbeatTest(unittest.TestCase):
         self.assertEqual(round(hb2[0]["cycle_time"], 1), 1234.1)
         self.assertEqual(hb2[0]["outcome"], '100')
         self.assertEqual(hb2[0]["error_message"], None)
+        self.assertEqual(hb2[0]["cycle_stats"], None)
+
+        comp2.updateWorkerCycle("testWorker21", 12.1, None, '{"cycles":2}')
+        hb2 = comp2.getHeartbeatInfo()
+        self.assertEqual(hb2[0]["cycle_stats"], '{"cycles":2}')
+        self.assertTrue(comp2.hasCycleStats())
+
+        # schemas without the cycle_stats column
+        comp2.cycleStatsColumn = False
+        comp2.updateWorkerCycle("testWorker21", 10.1, None, '{"cycles":3}')
+        self.assertEqual(comp2.getHeartbeat.execute("testComponent2", cycleStats=False)[0]["cycle_stats"], None)
+        self.assertEqual(comp2.getHeartbeatInfo()[0]["cycle_stats"], None)
 
         # time to update workers with an error
         comp1.updateWorkerError("testWorker2", "BAD JOB!!!")
@@ -323,6 +323,33 @@ class ConfigurationTest(unittest.TestCase):
             self.assertFalse(isinstance(values, ConfigSection))
         self.assertEqual(d["Task1"]["subSection"]["value3"], "MyValue3")
 
+    def testI_LazyChecks(self):
+        """
+        Type checks of a section with lazy checks are only done
+        by validate_, in the section and the sections created from it.
+
+        """
+        config = ConfigSection("config")
+        self.assertRaises(RuntimeError, setattr, config, "badValue", [set()])
+
+        config.lazyChecks_()
+        config.section_("Task1")
+        config.Task1.section_("subSection")
+        config.value1 = [1, {"a": "b"}]
+        config.Task1.subSection.value2 = ("a", 2.0)
+        config.validate_()
+
+        config.Task1.subSection.badValue = {"a": set()}
+        self.assertRaises(RuntimeError, config.validate_)
+        del config.Task1.subSection.badValue
+        config.validate_()
+
+        config.lazyChecks_(False)
+        self.assertRaises(RuntimeError, setattr, config, "badValue", [set()])
+        # sections created before still defer their checks
+        config.Task1.badValue = set()
+        self.assertRaises(RuntimeError, config.validate_)
+
 
 if __name__ == '__main__':
     unittest.main()
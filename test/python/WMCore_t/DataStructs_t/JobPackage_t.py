@@ -8,6 +8,11 @@ Unittests for JobPackage persistency mechanism
 import os
 import unittest
 
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
 from WMQuality.TestInit import TestInit
 
 from WMCore.DataStructs.JobPackage import JobPackage
@@ -144,5 +149,88 @@ class JobPackageTest(unittest.TestCase):
 
         return
 
+    def testLoadSingleJob(self):
+        """
+        _testLoadSingleJob_
+
+        Verify that a subset of the jobs can be loaded from a package.
+        """
+        package = JobPackage(directory="/some/dir")
+
+        for i in range(100):
+            newJob = Job("Job%s" % i)
+            newJob["id"] = i
+            package[i] = newJob
+
+        package.save(self.persistFile)
+
+        newPackage = JobPackage()
+        newPackage.load(self.persistFile, jobIndexes=[42, 1000])
+        self.assertItemsEqual(['directory', 42], newPackage.keys())
+        self.assertEqual("/some/dir", newPackage['directory'])
+        self.assertEqual("Job42", newPackage[42]["name"])
+
+        self.assertItemsEqual(range(100), JobPackage.listJobIndexes(self.persistFile))
+        return
+
+    def testAppend(self):
+        """
+        _testAppend_
+
+        Verify that jobs can be appended to an existing package.
+        """
+        package = JobPackage(directory="/some/dir")
+        for i in range(10):
+            newJob = Job("Job%s" % i)
+            newJob["id"] = i
+            package[i] = newJob
+        package.append(self.persistFile)
+
+        moreJobs = {}
+        for i in range(10, 20):
+            newJob = Job("Job%s" % i)
+            newJob["id"] = i
+            moreJobs[i] = newJob
+        package.append(self.persistFile, moreJobs)
+
+        newPackage = JobPackage()
+        newPackage.load(self.persistFile)
+        self.assertEqual(21, len(newPackage))
+        self.assertEqual("/some/dir", newPackage['directory'])
+        for i in range(20):
+            self.assertEqual("Job%d" % i, newPackage[i]["name"])
+        return
+
+    def testOldPackageFormat(self):
+        """
+        _testOldPackageFormat_
+
+        Verify that packages pickled as a whole can still be read and
+        appended to.
+        """
+        package = JobPackage(directory="/some/dir")
+        for i in range(10):
+            newJob = Job("Job%s" % i)
+            newJob["id"] = i
+            package[i] = newJob
+        with open(self.persistFile, 'wb') as fileHandle:
+            pickle.dump(package, fileHandle, -1)
+
+        newPackage = JobPackage()
+        newPackage.load(self.persistFile, jobIndexes=[3, 1000])
+        self.assertItemsEqual(['directory', 3], newPackage.keys())
+        self.assertEqual("/some/dir", newPackage['directory'])
+        self.assertEqual("Job3", newPackage[3]["name"])
+        self.assertItemsEqual(range(10), JobPackage.listJobIndexes(self.persistFile))
+
+        newJob = Job("Job10")
+        newJob["id"] = 10
+        package.append(self.persistFile, {10: newJob})
+        newPackage.load(self.persistFile, jobIndexes=[3, 10])
+        self.assertItemsEqual(['directory', 3, 10], newPackage.keys())
+        self.assertEqual("Job10", newPackage[10]["name"])
+        return
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -370,6 +370,44 @@ class CMSCouchTest(unittest.TestCase):
         self.assertEqual(1, len(self.db.allDocs({'limit':1}, ["1", "3"])['rows']))
         self.assertTrue('error' in self.db.allDocs(keys = ["1", "4"])['rows'][1])
 
+    def testIterViewAndAllDocs(self):
+        """
+        Test the paged iterators return the same rows as loadView and allDocs
+        """
+        ddoc = {
+            '_id': '_design/foo',
+            'language': 'javascript',
+            'views': {
+                'byparity': {
+                    'map': 'function(doc) {if (doc.num !== undefined) {emit(doc.num % 2, doc.num)}}',
+                    'reduce': '_count'
+                },
+            }
+        }
+        self.db.commit(ddoc)
+        for i in range(25):
+            self.db.queue(Document(id="doc%02d" % i, inputDict={'num': i}))
+        self.db.commit()
+
+        options = {'reduce': False}
+        self.assertEqual(list(self.db.iterView('foo', 'byparity', options, pageSize=4)),
+                         self.db.loadView('foo', 'byparity', options)['rows'])
+        options = {'reduce': False, 'key': 1, 'skip': 2, 'limit': 7}
+        self.assertEqual(list(self.db.iterView('foo', 'byparity', options, pageSize=3)),
+                         self.db.loadView('foo', 'byparity', options)['rows'])
+        options = {'reduce': False}
+        self.assertEqual(list(self.db.iterView('foo', 'byparity', options, keys=[0, 1], pageSize=1)),
+                         self.db.loadView('foo', 'byparity', options, keys=[0, 1])['rows'])
+        options = {'group': True}
+        self.assertEqual(list(self.db.iterView('foo', 'byparity', options, pageSize=1)),
+                         self.db.loadView('foo', 'byparity', options)['rows'])
+
+        self.assertEqual(list(self.db.iterAllDocs(pageSize=4)), self.db.allDocs()['rows'])
+        options = {'startkey': "doc10", 'include_docs': True}
+        self.assertEqual(list(self.db.iterAllDocs(options, pageSize=4)), self.db.allDocs(options)['rows'])
+        self.assertEqual(list(self.db.iterAllDocs(keys=["doc01", "doc30"], pageSize=1)),
+                         self.db.allDocs(keys=["doc01", "doc30"])['rows'])
+
     def testUpdateBulkDocuments(self):
         """
         Test AllDocs with options
@@ -5,13 +5,14 @@ _Report_t_
 Unit tests for the Report class.
 """
 
+import multiprocessing
 import os
 import time
 import unittest
 
 from Utils import FileTools
 from WMCore.Configuration import ConfigSection
-from WMCore.FwkJobReport.Report import Report
+from WMCore.FwkJobReport.Report import Report, getErrorSummaries
 from WMCore.WMBase import getTestBase
 from WMQuality.TestInitCouchApp import TestInitCouchApp
 
@@ -941,6 +942,20 @@ class ReportTest(unittest.TestCase):
         self.assertEqual(badReport.getExitCode(), 60450)
         return
 
+    def testTypeChecks(self):
+        """
+        _testTypeChecks_
+
+        Values of a type not supported are refused when they are set, not
+        when the report is persisted.
+        """
+        report = Report("cmsRun1")
+        stepSection = report.retrieveStep("cmsRun1")
+        self.assertRaises(RuntimeError, setattr, stepSection, "badValue", object())
+        self.assertRaises(RuntimeError, setattr, report.data, "badValue", [object()])
+        report.persist(os.path.join(self.testDir, "Report.pkl"))
+        return
+
     def testNoLocationFile(self):
         """
         _testNoLocationFile_
@@ -956,6 +971,40 @@ class ReportTest(unittest.TestCase):
         self.assertItemsEqual(fileList[1]['locations'], {"T2_CH_CSCS"})
         self.assertEqual(fileList[1]['outputModule'], "logArchive")
 
+    def testErrorSummaries(self):
+        """
+        _testErrorSummaries_
+
+        Test the error summaries of FWJRs read in worker processes.
+        """
+        report = Report("cmsRun1")
+        report.parse(os.path.join(getTestBase(), "WMCore_t/FwkJobReport_t/CMSSWFailReport.xml"))
+        report.addError("cmsRun1", 50660, "PerformanceKill", "Job exceeded memory", siteName="T1_US_FNAL")
+        badPath = os.path.join(self.testDir, "Report.0.pkl")
+        report.save(badPath)
+
+        report = Report("cmsRun1")
+        report.parse(self.xmlPath)
+        goodPath = os.path.join(self.testDir, "Report.1.pkl")
+        report.save(goodPath)
+
+        missingPath = os.path.join(self.testDir, "Report.2.pkl")
+
+        pool = multiprocessing.Pool(2)
+        for readPool in (None, pool):
+            summaries = getErrorSummaries([badPath, goodPath, missingPath, badPath], readPool)
+            self.assertItemsEqual(summaries.keys(), [badPath, goodPath, missingPath])
+            self.assertEqual(summaries[badPath]['exitCode'], 8001)
+            self.assertItemsEqual(summaries[badPath]['exitCodes'], [8001, 50660])
+            self.assertEqual(summaries[badPath]['siteName'], "T1_US_FNAL")
+            self.assertEqual(summaries[goodPath]['exitCode'], 0)
+            self.assertEqual(summaries[goodPath]['exitCodes'], set())
+            self.assertIsNone(summaries[missingPath])
+        pool.close()
+        pool.join()
+
+        return
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,197 @@
+"""
+Unit tests for Unified/MSOutput.py module
+"""
+from __future__ import division, print_function
+
+import time
+import unittest
+
+import mock
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+from WMCore.MicroService.DataStructs.MSOutputTemplate import MSOutputTemplate
+from WMCore.MicroService.Unified.MSOutput import MSOutput, EmptyResultError
+from WMQuality.Emulators.EmulatedUnitTestCase import EmulatedUnitTestCase
+
+
+@unittest.skipIf(mongomock is None, "mongomock is not available")
+class MSOutputTest(EmulatedUnitTestCase):
+    "Unit test for the MongoDB bulk operations of MSOutput"
+
+    def setUp(self):
+        "init test class"
+        super(MSOutputTest, self).setUp()
+        self.msConfig = {'verbose': False,
+                         'interval': 1 * 60,
+                         'reqmgr2Url': 'https://cmsweb-testbed.cern.ch/reqmgr2',
+                         'ddmUrl': 'https://dynamo.mit.edu',
+                         'mongoDBUrl': 'mongodb://localhost',
+                         'mongoDBPort': 8230,
+                         'mongoDBBulkSize': 3}
+        # mongomock does not implement the 'ismaster' command of the connection test
+        for mongoPatcher in (mock.patch('WMCore.Database.MongoDB.MongoClient', new=mongomock.MongoClient),
+                             mock.patch('WMCore.Database.MongoDB.MongoDB._dbTest')):
+            mongoPatcher.start()
+            self.addCleanup(mongoPatcher.stop)
+
+        self.ms = MSOutput(self.msConfig, mode='MSOutputConsumer')
+        self.ms.currThreadIdent = "MainThread:1@localhost"
+        self.dbColl = self.ms.msOutNonRelValColl
+        self.dbColl.delete_many({})
+        self.ms.msOutRelValColl.delete_many({})
+
+    def makeDocs(self, num):
+        "Create num MSOutput documents"
+        docs = []
+        for i in range(num):
+            reqName = u"TestWorkflow_%d" % i
+            docs.append(MSOutputTemplate({'_id': reqName, 'RequestName': reqName,
+                                          'Campaign': u'TestCampaign', 'isRelVal': False,
+                                          'OutputDatasets': [u'/Primary/Processed-v1/AODSIM']}))
+        return docs
+
+    def testIndexes(self):
+        """
+        Test the indexes of the MSOutput collections
+        """
+        indexes = self.dbColl.index_information()
+        indexKeys = [index['key'] for index in indexes.values()]
+        self.assertIn([('RequestName', 1)], indexKeys)
+        self.assertIn([('isTakenBy', 1)], indexKeys)
+        self.assertIn([('isTaken', 1), ('transferStatus', 1), ('lastUpdate', 1)], indexKeys)
+
+    def testDocBulkUploader(self):
+        """
+        Test the bulk upsert of documents
+        """
+        docs = self.makeDocs(5)
+        self.ms.docBulkUploader(docs, self.dbColl)
+        self.assertEqual(self.dbColl.count_documents({}), 5)
+
+        # without update, already existing documents are left untouched
+        self.dbColl.update_one({'_id': docs[0]['_id']}, {'$set': {'transferStatus': 'done'}})
+        newDocs = self.makeDocs(7)
+        result = self.ms.docBulkUploader(newDocs, self.dbColl)
+        self.assertEqual(result.upserted_count, 1)
+        self.assertEqual(self.dbColl.count_documents({}), 7)
+        self.assertEqual(self.dbColl.find_one({'_id': docs[0]['_id']})['transferStatus'], 'done')
+
+        # with update, only the given keys are updated
+        newDocs[0]['transferStatus'] = u'incomplete'
+        newDocs[0]['Campaign'] = u'OtherCampaign'
+        self.ms.docBulkUploader(newDocs[:1], self.dbColl, update=True, keys=['transferStatus'])
+        mongoDoc = self.dbColl.find_one({'_id': docs[0]['_id']})
+        self.assertEqual(mongoDoc['transferStatus'], 'incomplete')
+        self.assertEqual(mongoDoc['Campaign'], 'TestCampaign')
+
+    def testDocClaimFromMongo(self):
+        """
+        Test claiming documents in batches with a lease token
+        """
+        self.ms.docBulkUploader(self.makeDocs(5), self.dbColl)
+        mQueryDict = {'isTaken': False}
+
+        claimed = self.ms.docClaimFromMongo(mQueryDict, self.dbColl, 3)
+        self.assertEqual(len(claimed), 3)
+        leaseToken = claimed[0]['isTakenBy']
+        self.assertTrue(leaseToken.startswith(self.ms.currThreadIdent))
+        self.assertTrue(all(doc['isTaken'] and doc['isTakenBy'] == leaseToken for doc in claimed))
+
+        # other consumers can only claim the rest of the documents
+        others = self.ms.docClaimFromMongo(mQueryDict, self.dbColl, 3)
+        self.assertEqual(len(others), 2)
+        otherToken = others[0]['isTakenBy']
+        self.assertNotEqual(otherToken, leaseToken)
+        self.assertFalse(set(doc['_id'] for doc in claimed) & set(doc['_id'] for doc in others))
+        self.assertRaises(EmptyResultError, self.ms.docClaimFromMongo, mQueryDict, self.dbColl, 3)
+
+        # documents are only updated while the lease is held
+        for doc in claimed + others:
+            doc.setKey('isTaken', False)
+            doc.setKey('isTakenBy', None)
+            doc.setKey('transferStatus', u'done')
+        self.ms.docBulkUploader(claimed, self.dbColl, update=True,
+                                keys=['isTaken', 'isTakenBy', 'transferStatus'], leaseToken=leaseToken)
+        self.ms.docBulkUploader(others, self.dbColl, update=True,
+                                keys=['isTaken', 'isTakenBy', 'transferStatus'], leaseToken=leaseToken)
+        self.assertEqual(self.dbColl.count_documents({'transferStatus': 'done', 'isTaken': False}), 3)
+        self.assertEqual(self.dbColl.count_documents({'isTaken': True, 'isTakenBy': otherToken}), 2)
+
+        # released documents can be claimed again
+        self.ms.docBulkUploader(others, self.dbColl, update=True, leaseToken=otherToken, release=True)
+        mQueryDict['transferStatus'] = None
+        self.assertEqual(len(self.ms.docClaimFromMongo(mQueryDict, self.dbColl, 3)), 2)
+
+    def testDocRenewLease(self):
+        """
+        Test renewing the lease of claimed documents
+        """
+        self.ms.docBulkUploader(self.makeDocs(5), self.dbColl)
+        claimed = self.ms.docClaimFromMongo({'isTaken': False}, self.dbColl, 3)
+        leaseToken = claimed[0]['isTakenBy']
+        leaseTresh = int(time.time()) - self.ms.msConfig['leaseTime']
+        mQueryDict = {'isTaken': True, 'lastUpdate': {'$lt': leaseTresh}}
+
+        # an expired lease can be claimed by another consumer, unless renewed
+        self.dbColl.update_many({'isTakenBy': leaseToken}, {'$set': {'lastUpdate': leaseTresh - 1}})
+        self.assertEqual(self.dbColl.count_documents(mQueryDict), 3)
+        self.assertGreaterEqual(self.ms.docRenewLease(leaseToken, self.dbColl), leaseTresh)
+        self.assertEqual(self.dbColl.count_documents(mQueryDict), 0)
+        self.assertEqual(self.dbColl.count_documents({'isTakenBy': leaseToken}), 3)
+
+    def testMsOutputProducer(self):
+        """
+        Test the producer pipeline uploading documents in bulk
+        """
+        requests = []
+        for i in range(4):
+            reqName = u"TestWorkflow_%d" % i
+            requests.append((reqName, {'_id': reqName, 'RequestName': reqName, 'Campaign': u'TestCampaign',
+                                       'SubRequestType': 'RelVal' if i == 0 else 'ReDigi',
+                                       'OutputDatasets': [u'/Primary/Processed-v1/AODSIM']}))
+        self.assertEqual(self.ms.msOutputProducer(requests), 4)
+        self.assertEqual(self.ms.msOutRelValColl.count_documents({}), 1)
+        self.assertEqual(self.dbColl.count_documents({}), 3)
+        self.assertItemsEqual(self.dbColl.find_one({'_id': 'TestWorkflow_1'})['destination'], ['T1_*_Disk', 'T2_*'])
+
+    def testMsOutputConsumer(self):
+        """
+        Test the consumer pipeline over claimed batches of documents
+        """
+        self.ms.docBulkUploader(self.makeDocs(5), self.dbColl)
+        self.ms.msConfig['limitRequestsPerCycle'] = 4
+        with mock.patch.object(self.ms, 'makeSubscriptions', side_effect=lambda doc: doc):
+            self.assertEqual(self.ms.msOutputConsumer(), 4)
+            self.assertEqual(self.dbColl.count_documents({'isTaken': True}), 0)
+            self.assertEqual(self.dbColl.count_documents({'lastUpdate': {'$gt': int(time.time()) - 10}}), 4)
+            # documents are not processed twice in the same cycle
+            self.assertEqual(self.ms.msOutputConsumer(), 1)
+            self.assertEqual(self.ms.msOutputConsumer(), 0)
+
+    def testMsOutputConsumerLease(self):
+        """
+        Test the consumer renewing its lease while processing a batch
+        """
+        self.ms.docBulkUploader(self.makeDocs(3), self.dbColl)
+        self.ms.msConfig['limitRequestsPerCycle'] = 3
+        currTime = [int(time.time())]
+
+        def makeSubscriptions(doc):
+            "each document takes half the lease time to be processed"
+            currTime[0] += self.ms.msConfig['leaseTime'] // 2
+            return doc
+
+        with mock.patch('WMCore.MicroService.Unified.MSOutput.time', side_effect=lambda: currTime[0]), \
+                mock.patch.object(self.ms, 'makeSubscriptions', side_effect=makeSubscriptions), \
+                mock.patch.object(self.ms, 'docRenewLease', wraps=self.ms.docRenewLease) as renewLease:
+            self.assertEqual(self.ms.msOutputConsumer(), 3)
+            self.assertEqual(renewLease.call_count, 2)
+        self.assertEqual(self.dbColl.count_documents({'isTaken': True}), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,12 +4,15 @@ Unit tests for Unified/TaskManager.py module
 Author: Valentin Kuznetsov <vkuznet [AT] gmail [DOT] com>
 """
 from __future__ import division, print_function
+from future import standard_library
+standard_library.install_aliases()
 
 import time
 import unittest
+from queue import Full
 
 from WMCore.MicroService.Unified.TaskManager import \
-        TaskManager, genkey, UidSet
+        TaskManager, TaskTimeoutError, genkey, UidSet
 
 
 def myFunc(interval, results):
@@ -17,6 +20,13 @@ def myFunc(interval, results):
     time.sleep(interval)
     results.update({interval: 'ok_%s' % interval})
 
+def mySquare(value, interval=0):
+    "Test function returning a value"
+    time.sleep(interval)
+    if value < 0:
+        raise ValueError("negative value %s" % value)
+    return value * value
+
 class TaskManagerTest(unittest.TestCase):
     "Unit test for TaskManager module"
     def setUp(self):
@@ -75,5 +85,41 @@ class TaskManagerTest(unittest.TestCase):
         for worker in mgr.workers:
             self.assertEqual(False, worker.is_alive())
 
+    def testTaskFutures(self):
+        "Test TaskManager futures results and exceptions"
+        mgr = TaskManager(nworkers=3)
+        futures = [mgr.submit(mySquare, (value,)) for value in range(5)]
+        self.assertEqual([future.result() for future in futures], [0, 1, 4, 9, 16])
+
+        future = mgr.submit(mySquare, (-1,))
+        self.assertRaises(ValueError, future.result)
+        self.assertTrue(isinstance(future.exception(), ValueError))
+        self.assertEqual(future.state(), 'failed')
+
+        # same pid while the task is still pending returns the same future
+        future1 = mgr.submit(mySquare, (2,), {'interval': 0.5}, pid='task2')
+        future2 = mgr.submit(mySquare, (3,), pid='task2')
+        self.assertTrue(future1 is future2)
+        self.assertTrue(mgr.joinall([future1]))
+        self.assertEqual(future2.result(), 4)
+
+        stats = mgr.status()['TaskManager']['latency']
+        self.assertEqual(stats['tasks'], {'done': 6, 'failed': 1})
+        self.assertTrue(stats['run']['max'] >= 0.5)
+        mgr.quit()
+
+    def testTaskTimeout(self):
+        "Test TaskManager tasks timeout and bounded queue"
+        mgr = TaskManager(nworkers=1, qsize=1)
+        future1 = mgr.submit(mySquare, (1,), {'interval': 1}, timeout=0.2)
+        self.assertRaises(TaskTimeoutError, future1.result)
+        self.assertEqual(future1.state(), 'timeout')
+        # the worker is still busy with the first task
+        future2 = mgr.submit(mySquare, (2,))
+        self.assertRaises(Full, mgr.submit, mySquare, (3,), block=False)
+        self.assertEqual(future2.result(timeout=5), 4)
+        self.assertFalse(mgr.joinall([mgr.submit(mySquare, (4,), {'interval': 1})], timeout=0.1))
+        mgr.quit()
+
 if __name__ == '__main__':
     unittest.main()
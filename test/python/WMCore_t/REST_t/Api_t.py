@@ -16,6 +16,8 @@ from WMCore.REST.Validation import validate_num, validate_str
 from WMCore.REST.Error import InvalidObject
 from WMCore.REST.Format import RawFormat
 from WMCore.REST.Tools import tools
+from WMCore.WMStats.DataStructs.DataCache import DataCache
+from WMCore.WMStats.Service.ActiveRequestJobInfo import FilteredActiveRequestJobInfo
 
 gif_bytes = ('GIF89a\x01\x00\x01\x00\x82\x00\x01\x99"\x1e\x00\x00\x00\x00\x00'
              '\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
@@ -65,12 +67,39 @@ class Image(RESTEntity):
     def get(self):
         return gif_bytes
 
+class Cached(RESTEntity):
+    calls = 0
+
+    def validate(self, apiobj, method, api, param, safe):
+        validate_str("a", param, safe, re.compile("^[a-z]*$"), optional=True)
+        validate_str("b", param, safe, re.compile("^[a-z]*$"), optional=True)
+
+    @restcall(cache=60)
+    @tools.expires(secs=300)
+    def get(self, a, b):
+        Cached.calls += 1
+        return rows([{"a": a, "b": b, "calls": Cached.calls}])
+
+class SetDataCache(RESTEntity):
+    def validate(self, apiobj, method, api, param, safe):
+        validate_str("status", param, safe, re.compile("^[a-z-]+$"))
+
+    @restcall
+    def get(self, status):
+        DataCache.setlatestJobData({"TestWorkflow": {"RequestName": "TestWorkflow",
+                                                     "RequestStatus": status,
+                                                     "Campaign": "TestCampaign"}})
+        return rows([status])
+
 class Root(RESTApi):
     def __init__(self, app, config, mount):
         RESTApi.__init__(self, app, config, mount)
         self._add({ "simple": Simple(app, self, config, mount),
                     "image":  Image(app, self, config, mount),
-                    "multi":  Multi(app, self, config, mount) })
+                    "multi":  Multi(app, self, config, mount),
+                    "cached": Cached(app, self, config, mount),
+                    "setdatacache": SetDataCache(app, self, config, mount),
+                    "filtered_requests": FilteredActiveRequestJobInfo(app, self, config, mount) })
 
 class Tester(webtest.WebCase):
 
@@ -244,6 +273,57 @@ class Tester(webtest.WebCase):
             assert b["result"][i][0] == "row"
             assert b["result"][i][1] == i
 
+    def test_cached(self):
+        h = self.h
+        h.append(("Accept", "application/json"))
+        self.getPage("/test/cached?a=x&b=y", headers = h)
+        self.assertStatus("200 OK")
+        self.assertHeader("ETag")
+        first = json.loads(self.body)["result"][0]
+        etag = self.assertHeader("ETag")
+
+        # same query with the arguments in another order is served from cache
+        self.getPage("/test/cached?b=y&a=x", headers = h)
+        self.assertStatus("200 OK")
+        self.assertHeader("ETag", etag)
+        self.assertHeader("Cache-Control", "max-age=300")
+        self.assertEqual(json.loads(self.body)["result"][0], first)
+
+        # cached responses honour If-None-Match
+        self.getPage("/test/cached?a=x&b=y", headers = h + [("If-None-Match", etag)])
+        self.assertStatus(304)
+
+        # other queries are not
+        self.getPage("/test/cached?a=x&b=z", headers = h)
+        self.assertStatus("200 OK")
+        other = json.loads(self.body)["result"][0]
+        self.assertEqual(other["b"], "z")
+        self.assertNotEqual(other["calls"], first["calls"])
+
+    def test_cached_wmstats(self):
+        h = self.h
+        h.append(("Accept", "application/json"))
+        self.getPage("/test/setdatacache?status=running-open", headers = h)
+        self.assertStatus("200 OK")
+        self.getPage("/test/filtered_requests?RequestStatus=running-open&mask=Campaign", headers = h)
+        self.assertStatus("200 OK")
+        first = json.loads(self.body)["result"]
+        self.assertEqual(first, [{"RequestName": "TestWorkflow", "Campaign": "TestCampaign"}])
+        etag = self.assertHeader("ETag")
+
+        # the same dashboard query is served from the cache after the data changed
+        self.getPage("/test/setdatacache?status=completed", headers = h)
+        self.assertStatus("200 OK")
+        self.getPage("/test/filtered_requests?mask=Campaign&RequestStatus=running-open", headers = h)
+        self.assertStatus("200 OK")
+        self.assertHeader("ETag", etag)
+        self.assertEqual(json.loads(self.body)["result"], first)
+
+        # other queries see the new data
+        self.getPage("/test/filtered_requests?RequestStatus=running-open", headers = h)
+        self.assertStatus("200 OK")
+        self.assertEqual(json.loads(self.body)["result"], [])
+
 def setup_server():
     srcfile = __file__.split("/")[-1].split(".py")[0]
     setup_dummy_server(srcfile, "Root", authz_key_file=FAKE_FILE, port=PORT)
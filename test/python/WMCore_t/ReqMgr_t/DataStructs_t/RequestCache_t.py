@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+"""
+Unittests for the ReqMgr2 request cache
+"""
+
+from __future__ import division, print_function
+
+import unittest
+from copy import deepcopy
+
+from WMCore.ReqMgr.DataStructs.RequestCache import RequestCache, maskRequest
+
+REQUESTS = [{"_id": "req_rereco", "_rev": "1-a", "RequestStatus": "assigned", "RequestType": "ReReco",
+             "Team": "production", "Campaign": "Camp1", "PrepID": "prep1", "Memory": 2000},
+            {"_id": "req_taskchain", "_rev": "1-b", "RequestStatus": "running-open", "RequestType": "TaskChain",
+             "Team": "production", "Campaign": "Camp2", "PrepID": "prep2", "Memory": {"Task2": 3000},
+             "TaskChain": 2, "Task1": {"Memory": 1000, "PrepID": "prep3"}, "Task2": {"TaskName": "T2"},
+             "_attachments": {"spec": {"stub": True}}}]
+
+
+class FakeCouchDB(object):
+    """
+    Minimal request database answering the calls of the request cache
+    """
+    name = "reqmgr_workload_cache"
+
+    def __init__(self, docs):
+        self.docs = dict((doc["_id"], deepcopy(doc)) for doc in docs)
+        self.changes = []
+        self.views = 0
+        self.down = False
+
+    def info(self):
+        if self.down:
+            raise IOError("CouchDB is down")
+        return {"update_seq": len(self.changes)}
+
+    def loadView(self, design, view, options=None, keys=None):
+        self.views += 1
+        return {"rows": [{"id": name, "doc": deepcopy(doc)} for name, doc in self.docs.items()
+                         if doc["RequestStatus"] in keys]}
+
+    def get(self, uri):
+        if self.down:
+            raise IOError("CouchDB is down")
+        since = int(uri.split("since=")[1].split("&")[0])
+        limit = int(uri.split("limit=")[1].split("&")[0])
+        results = self.changes[since:since + limit]
+        return {"results": deepcopy(results), "last_seq": since + len(results)}
+
+    def update(self, doc, deleted=False):
+        change = {"id": doc["_id"], "doc": doc}
+        if deleted:
+            change = {"id": doc["_id"], "deleted": True}
+        self.changes.append(change)
+
+
+class RequestCacheTest(unittest.TestCase):
+    """
+    unittest for the RequestCache class
+    """
+
+    def setUp(self):
+        self.couchdb = FakeCouchDB(REQUESTS)
+        self.cache = RequestCache(self.couchdb, refreshInterval=0, changesLimit=2)
+
+    def testQuery(self):
+        """
+        Test the queries answered from the cache
+        """
+        self.assertItemsEqual(self.cache.query({"RequestStatus": ["assigned", "running-open"]}),
+                              ["req_rereco", "req_taskchain"])
+        self.assertEqual(self.cache.query({"RequestStatus": ["assigned", "running-open"],
+                                           "RequestType": ["TaskChain"]}), ["req_taskchain"])
+        self.assertEqual(self.cache.query({"RequestName": ["req_rereco"], "Campaign": ["Camp1"]}),
+                         ["req_rereco"])
+        self.assertEqual(self.cache.query({"RequestName": ["req_rereco"], "Campaign": ["Camp2"]}), [])
+        self.assertEqual(self.cache.query({"RequestStatus": ["running-open"], "PrepID": ["prep3"]}),
+                         ["req_taskchain"])
+        # queries which need the database
+        self.assertIsNone(self.cache.query({"RequestStatus": ["normal-archived"]}))
+        self.assertIsNone(self.cache.query({"RequestName": ["req_rereco", "req_unknown"]}))
+        self.assertIsNone(self.cache.query({"RequestType": ["ReReco"]}))
+        self.assertEqual(self.couchdb.views, 1)
+
+        docs = self.cache.getRequests(["req_taskchain"])
+        self.assertNotIn("_rev", docs["req_taskchain"])
+        self.assertNotIn("_attachments", docs["req_taskchain"])
+        self.assertEqual(docs["req_taskchain"]["Campaign"], "Camp2")
+
+    def testChanges(self):
+        """
+        Test the cache follows the database changes
+        """
+        self.assertEqual(len(self.cache.query({"RequestStatus": ["assigned"]})), 1)
+        newDoc = dict(REQUESTS[0], _id="req_new", RequestStatus="new")
+        self.couchdb.update(newDoc)
+        self.couchdb.update(dict(REQUESTS[0], RequestStatus="normal-archived"))
+        self.couchdb.update({"_id": "_design/ReqMgr"})
+        self.couchdb.update({"_id": "req_taskchain"}, deleted=True)
+
+        self.assertEqual(self.cache.query({"RequestStatus": ["assigned", "running-open"]}), [])
+        self.assertEqual(self.cache.query({"RequestStatus": ["new"]}), ["req_new"])
+        self.assertIsNone(self.cache.query({"RequestName": ["req_rereco"]}))
+        self.assertEqual(self.cache.lastSeq, 4)
+
+        # changes are not pulled before refreshInterval
+        self.cache.refreshInterval = 3600
+        self.couchdb.update(dict(newDoc, RequestStatus="assigned"))
+        self.assertEqual(self.cache.query({"RequestStatus": ["new"]}), ["req_new"])
+        self.cache.expire()
+        self.assertEqual(self.cache.query({"RequestStatus": ["new"]}), [])
+        self.assertEqual(self.couchdb.views, 1)
+
+    def testFailures(self):
+        """
+        Test the cache backs off when the database can't be read
+        """
+        self.couchdb.down = True
+        self.assertIsNone(self.cache.query({"RequestStatus": ["assigned"]}))
+        self.assertNotEqual(self.cache.lastFailure, 0)
+        # no new attempt before retryInterval, even if the database is back
+        self.couchdb.down = False
+        self.assertIsNone(self.cache.query({"RequestStatus": ["assigned"]}))
+        self.assertEqual(self.couchdb.views, 0)
+        self.cache.lastFailure -= self.cache.retryInterval
+        self.assertEqual(self.cache.query({"RequestStatus": ["assigned"]}), ["req_rereco"])
+        self.assertEqual(self.couchdb.views, 1)
+
+        # failing to pull the changes falls back to the database as well
+        self.couchdb.down = True
+        self.assertIsNone(self.cache.query({"RequestStatus": ["assigned"]}))
+        self.couchdb.down = False
+        self.assertIsNone(self.cache.query({"RequestStatus": ["assigned"]}))
+        self.cache.lastFailure = 0
+        self.assertEqual(self.cache.query({"RequestStatus": ["assigned"]}), ["req_rereco"])
+        self.assertEqual(self.couchdb.views, 1)
+
+    def testProjections(self):
+        """
+        Test the masked requests
+        """
+        names = self.cache.query({"RequestStatus": ["assigned", "running-open"]})
+        result = self.cache.getRequests(names, ["Memory", "Campaign"])
+        self.assertEqual(result["req_rereco"], {"Memory": 2000, "Campaign": "Camp1"})
+        self.assertItemsEqual(result["req_taskchain"]["Memory"], [1000, 3000])
+        # same as masking the full documents
+        for name in names:
+            self.assertEqual(result[name], maskRequest(self.couchdb.docs[name], ["Memory", "Campaign"]))
+
+        # projections are kept and dropped when the request changes
+        self.assertIs(self.cache.getRequests(names, ["Memory", "Campaign"])["req_rereco"],
+                      result["req_rereco"])
+        self.couchdb.update(dict(REQUESTS[0], Memory=4000))
+        names = self.cache.query({"RequestStatus": ["assigned", "running-open"]})
+        result = self.cache.getRequests(names, ["Memory", "Campaign"])
+        self.assertEqual(result["req_rereco"]["Memory"], 4000)
+
+        self.cache.maxMasks = 1
+        self.cache.getRequests(names, ["Team"])
+        self.assertEqual(list(self.cache.projections), [("Team",)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -62,6 +62,8 @@ data.object = "WMCore.ReqMgr.Service.RestApiHub.RestApiHub"
 data.couch_host = COUCH_URL
 # main ReqMgr CouchDB database containing all requests with spec files attached
 data.couch_reqmgr_db = "reqmgr_workload_cache"
+# max age in seconds of the in-memory request cache, 0 disables it
+data.request_cache_refresh = 30
 # ReqMgr database containing groups, teams, software, etc
 data.couch_reqmgr_aux_db = "reqmgr_auxiliary"
 # ConfigCache - database with configuration documents
@@ -5,9 +5,13 @@ _DBSReader_t_
 Unit test for the DBS helper class.
 """
 
+import threading
 import unittest
 
-from WMCore.Services.DBS.DBS3Reader import getDataTiers, DBS3Reader as DBSReader
+from mock import patch
+
+from WMCore.Services.DBS.DBS3Reader import (getDataTiers, DBS3Reader as DBSReader, DBSBlockCache, blockCache,
+                                            _getThreadPool)
 from WMCore.Services.DBS.DBSErrors import DBSReaderError
 from WMQuality.Emulators.EmulatedUnitTestCase import EmulatedUnitTestCase
 
@@ -35,6 +39,7 @@ class DBSReaderTest(EmulatedUnitTestCase):
 
         self.endpoint = 'https://cmsweb.cern.ch/dbs/prod/global/DBSReader'
         self.dbs = None
+        blockCache.clear()
         super(DBSReaderTest, self).setUp()
         return
 
@@ -310,6 +315,80 @@ class DBSReaderTest(EmulatedUnitTestCase):
 
         self.assertRaises(DBSReaderError, self.dbs.getFileBlockWithParents, BLOCK + 'asas')
 
+    def testGetFileBlocks(self):
+        """getFileBlocks returns several blocks, fetched in parallel"""
+        self.dbs = DBSReader(self.endpoint)
+        blocks = self.dbs.getFileBlocks([BLOCK, BLOCK_WITH_PARENTS, BLOCK])
+        self.assertItemsEqual(blocks.keys(), [BLOCK, BLOCK_WITH_PARENTS])
+        self.assertEqual(blocks[BLOCK], self.dbs.getFileBlock(BLOCK)[BLOCK])
+        self.assertFalse(blocks[BLOCK]['IsOpen'])
+
+        blocks = self.dbs.getFileBlocks([BLOCK_WITH_PARENTS], withParents=True)
+        self.assertEqual(PARENT_FILE, blocks[BLOCK_WITH_PARENTS]['Files'][0]['ParentList'][0]['LogicalFileName'])
+
+        # serial calls give the same result
+        serialDbs = DBSReader(self.endpoint, parallelCalls=1)
+        blockCache.clear()
+        self.assertEqual(serialDbs.getFileBlocks([BLOCK, BLOCK_WITH_PARENTS]),
+                         self.dbs.getFileBlocks([BLOCK, BLOCK_WITH_PARENTS]))
+
+        self.assertRaises(DBSReaderError, self.dbs.getFileBlocks, [BLOCK, BLOCK + 'asas'])
+
+    def testBlockCache(self):
+        """DBSBlockCache de-duplicates the calls and returns copies"""
+        calls = []
+        startCall = threading.Event()
+
+        def fetch(blockName):
+            calls.append(blockName)
+            startCall.wait()
+            return {'Files': [blockName]}
+
+        cache = DBSBlockCache(expiration=60)
+        threads = [threading.Thread(target=cache.get, args=(BLOCK, fetch, BLOCK)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        startCall.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(calls, [BLOCK])
+
+        result = cache.get(BLOCK, fetch, BLOCK)
+        result['Files'].append('other')
+        self.assertEqual(cache.get(BLOCK, fetch, BLOCK), {'Files': [BLOCK]})
+        self.assertEqual(calls, [BLOCK])
+
+        # the least recently used results are evicted
+        cache.maxSize = 2
+        cache.get(PARENT_BLOCK, fetch, PARENT_BLOCK)
+        cache.get(BLOCK, fetch, BLOCK)
+        cache.get(BLOCK_WITH_PARENTS, fetch, BLOCK_WITH_PARENTS)
+        self.assertEqual(list(cache._results), [BLOCK, BLOCK_WITH_PARENTS])
+        self.assertEqual(calls, [BLOCK, PARENT_BLOCK, BLOCK_WITH_PARENTS])
+
+        # expired results are dropped when looked up and fetched again
+        cache.expiration = 0
+        cache.get(BLOCK, fetch, BLOCK)
+        self.assertEqual(calls, [BLOCK, PARENT_BLOCK, BLOCK_WITH_PARENTS, BLOCK])
+        cache.expiration = 60
+        cache._results[BLOCK] = (0, {'Files': []})
+        self.assertIsNone(cache._lookup(BLOCK))
+        self.assertNotIn(BLOCK, cache._results)
+
+        # failures are not cached
+        self.assertRaises(KeyError, cache.get, FILE, {}.__getitem__, FILE)
+        cache.clear()
+
+    def testThreadPoolPerProcess(self):
+        """The thread pools of a parent process aren't reused by a forked child"""
+        pool = _getThreadPool(2)
+        self.assertIs(_getThreadPool(2), pool)
+        with patch('WMCore.Services.DBS.DBS3Reader.os.getpid', return_value=-1):
+            childPool = _getThreadPool(2)
+        self.assertIsNot(childPool, pool)
+        self.assertEqual(childPool.map(abs, [-1, -2]), [1, 2])
+        childPool.terminate()
+
     def testGetFiles(self):
         """getFiles returns files in dataset"""
         self.dbs = DBSReader(self.endpoint)
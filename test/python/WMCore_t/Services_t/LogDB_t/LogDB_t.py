@@ -253,5 +253,50 @@ class LogDBTest(unittest.TestCase):
         report = self.agent_inst.wmstats_down_components_report([threadName])
         self.assertEqual(report['down_components'], [])
 
+    def test_buffered(self):
+        "Test buffered LogDB posts"
+        url = self.agent_inst.url
+        agent_inst = LogDB(url, 'agentname', logger=self.logger, thread_name="MainThread",
+                           flush_interval=3600, max_buffer=4)
+        user_inst = LogDB(url, self.user_inst.identifier, logger=self.logger,
+                          thread_name="MainThread", flush_interval=3600)
+        request = 'abc'
+
+        self.assertEqual(agent_inst.post(request, 'msg1', 'info'), 'post-buffered')
+        agent_inst.post(request, 'msg2', 'info')
+        agent_inst.post(request, 'msg3', 'warning')
+        self.assertEqual(self.agent_inst.get(request), [])
+        res = agent_inst.flush()
+        self.assertEqual(len(res), 2)  # one doc per message type
+        docs = self.agent_inst.get(request)
+        self.assertItemsEqual([doc['msg'] for doc in docs], ['msg2', 'msg3'])
+
+        # known revisions are reused, and updates by other instances resolved
+        self.agent_inst.post(request, 'msg4', 'info')
+        agent_inst.post(request, 'msg5', 'info')
+        agent_inst.post(request, 'msg6', 'warning')
+        self.assertEqual(len(agent_inst.flush()), 2)
+        docs = self.agent_inst.get(request)
+        self.assertItemsEqual([doc['msg'] for doc in docs], ['msg5', 'msg6'])
+
+        # a full buffer is flushed right away
+        for idx in range(4):
+            res = agent_inst.post('request%s' % idx, 'msg', 'info')
+        self.assertEqual(len(res), 4)
+        self.assertEqual(len(self.agent_inst.get_all_requests()), 5)
+
+        # user messages keep growing, the newest first
+        user_inst.post(request, 'doc1')
+        user_inst.post(request, 'doc2')
+        user_inst.close()
+        user_inst.post(request, 'doc3')
+        docs = [doc['msg'] for doc in self.user_inst.get(request) if doc['type'] == 'comment']
+        self.assertEqual(docs, ['doc3', 'doc2', 'doc1'])
+
+        agent_inst.post(request, 'msg7', 'error')
+        agent_inst.delete(request)
+        self.assertEqual(self.agent_inst.get(request), [])
+        agent_inst.close()
+
 if __name__ == "__main__":
     unittest.main()
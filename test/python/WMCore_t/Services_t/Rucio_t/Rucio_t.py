@@ -5,8 +5,11 @@ Test case for Rucio WMCore Service class
 from __future__ import print_function, division, absolute_import
 
 import os
+import unittest
 
+from mock import patch
 from rucio.client import Client as testClient
+from rucio.common.exception import DataIdentifierAlreadyExists, DataIdentifierNotFound, DuplicateContent
 
 from WMCore.Services.Rucio.Rucio import Rucio, validateMetaData, RUCIO_VALID_PROJECT
 from WMQuality.Emulators.EmulatedUnitTestCase import EmulatedUnitTestCase
@@ -299,3 +302,131 @@ class RucioTest(EmulatedUnitTestCase):
         resp = self.myRucio.pickRSE(rseExpression="ddm_quota>0", rseAttribute="ddm_quota")
         self.assertTrue(len(resp) == 2)
         self.assertTrue(resp[1] is True or resp[1] is False)
+
+
+class RucioBulkTest(unittest.TestCase):
+    """
+    Unit tests for the bulk insertion methods of the Rucio Service module,
+    run against a mocked Rucio client
+    """
+
+    def setUp(self):
+        with patch("WMCore.Services.Rucio.Rucio.Client"):
+            self.myRucio = Rucio("wma_test", hostUrl="http://rucio.test", authUrl="https://rucio-auth.test")
+        self.cli = self.myRucio.cli
+
+    def testCreateContainers(self):
+        """
+        Test the `createContainers` method, in bulk and one by one
+        """
+        self.assertEqual(self.myRucio.createContainers([]), set())
+        names = [DSET, DSET + "2"]
+        self.assertEqual(self.myRucio.createContainers(names + [DSET]), set(names))
+        self.assertEqual(self.cli.add_dids.call_count, 1)
+        dids = self.cli.add_dids.call_args[0][0]
+        self.assertItemsEqual([did['name'] for did in dids], names)
+        self.assertTrue(all(did['type'] == "CONTAINER" and did['scope'] == "cms" for did in dids))
+        self.assertFalse(self.cli.add_container.called)
+
+        # invalid meta data
+        self.assertEqual(self.myRucio.createContainers(names, meta={"project": "mistake"}), set())
+
+        # the bulk call fails, containers are created one by one
+        def addContainer(scope, name, **kwargs):
+            if name == DSET:
+                raise DataIdentifierAlreadyExists()
+            if name == DSET + "3":
+                raise RuntimeError("failed")
+            return True
+
+        self.cli.add_dids.side_effect = DataIdentifierAlreadyExists()
+        self.cli.add_container.side_effect = addContainer
+        self.assertEqual(self.myRucio.createContainers(names + [DSET + "3"]), set(names))
+        self.assertEqual(self.cli.add_container.call_count, 3)
+
+    def testCreateBlocks(self):
+        """
+        Test the `createBlocks` method, in bulk and one by one
+        """
+        blocks = [BLOCK, BLOCK + "2", DSET + "2#abc"]
+        self.assertEqual(self.myRucio.createBlocks(blocks, "T2_CH_CERN"), set(blocks))
+        dids = self.cli.add_dids.call_args[0][0]
+        self.assertItemsEqual([did['name'] for did in dids], blocks)
+        self.assertTrue(all(did['type'] == "DATASET" and did['rse'] == "T2_CH_CERN" for did in dids))
+        # the blocks are attached to their containers with a single call
+        self.assertEqual(self.cli.attach_dids_to_dids.call_count, 1)
+        attachments = self.cli.attach_dids_to_dids.call_args[0][0]
+        attachments = dict((item['name'], [did['name'] for did in item['dids']]) for item in attachments)
+        self.assertItemsEqual(attachments[DSET], [BLOCK, BLOCK + "2"])
+        self.assertEqual(attachments[DSET + "2"], [DSET + "2#abc"])
+        self.assertEqual(self.cli.attach_dids_to_dids.call_args[1], {"ignore_duplicate": True})
+
+        self.assertEqual(self.myRucio.createBlocks(blocks, "T2_CH_CERN", attach=False), set(blocks))
+        self.assertEqual(self.cli.attach_dids_to_dids.call_count, 1)
+
+        # the bulk call fails, blocks are created and attached one by one
+        def addDataset(scope, name, **kwargs):
+            if name == BLOCK + "2":
+                raise RuntimeError("failed")
+            return True
+
+        self.cli.add_dids.side_effect = RuntimeError("failed")
+        self.cli.add_dataset.side_effect = addDataset
+        self.cli.attach_dids.return_value = True
+        self.assertEqual(self.myRucio.createBlocks(blocks, "T2_CH_CERN"), set([BLOCK, DSET + "2#abc"]))
+        self.assertEqual(self.cli.add_dataset.call_count, 3)
+        self.assertEqual(self.cli.attach_dids.call_count, 2)
+
+    def testAttachDIDsToDIDs(self):
+        """
+        Test the `attachDIDsToDIDs` method, in bulk and one by one
+        """
+        self.assertEqual(self.myRucio.attachDIDsToDIDs("T2_CH_CERN", {}), set())
+        didsBySuperDID = {DSET: [BLOCK], DSET + "2": [DSET + "2#abc"], DSET + "3": [DSET + "3#abc"]}
+        self.assertEqual(self.myRucio.attachDIDsToDIDs("T2_CH_CERN", didsBySuperDID), set(didsBySuperDID))
+        self.assertFalse(self.cli.attach_dids.called)
+
+        # the bulk call fails, each list is attached on its own
+        def attachDIDs(scope, name, dids, rse):
+            if name == DSET + "2":
+                raise DuplicateContent()
+            if name == DSET + "3":
+                raise DataIdentifierNotFound()
+            return True
+
+        self.cli.attach_dids_to_dids.side_effect = DataIdentifierNotFound()
+        self.cli.attach_dids.side_effect = attachDIDs
+        self.assertEqual(self.myRucio.attachDIDsToDIDs("T2_CH_CERN", didsBySuperDID), set([DSET, DSET + "2"]))
+        self.assertEqual(self.cli.attach_dids.call_count, 3)
+
+    def testCreateReplicasInBlocks(self):
+        """
+        Test the `createReplicasInBlocks` method, in bulk and block by block
+        """
+        self.assertEqual(self.myRucio.createReplicasInBlocks("T2_CH_CERN", {}), set())
+        filesByBlock = {BLOCK: [{'name': '/store/a/1.root', 'bytes': 1, 'adler32': '1', 'state': 'A'},
+                                {'name': '/store/a/2.root', 'bytes': 1, 'adler32': '2', 'state': 'A'}],
+                        BLOCK + "2": [{'name': '/store/b/1.root', 'bytes': 1, 'adler32': '3', 'state': 'A'}]}
+        self.assertEqual(self.myRucio.createReplicasInBlocks("T2_CH_CERN", filesByBlock), set(filesByBlock))
+        self.assertEqual(self.cli.add_replicas.call_count, 1)
+        files = self.cli.add_replicas.call_args[0][1]
+        self.assertEqual(len(files), 3)
+        self.assertTrue(all(item['scope'] == "cms" for item in files))
+        attachments = self.cli.attach_dids_to_dids.call_args[0][0]
+        attachments = dict((item['name'], [did['name'] for did in item['dids']]) for item in attachments)
+        self.assertItemsEqual(attachments[BLOCK], ['/store/a/1.root', '/store/a/2.root'])
+        self.assertEqual(attachments[BLOCK + "2"], ['/store/b/1.root'])
+
+        # the bulk call fails, replicas are created block by block
+        def addReplicas(rse, files, ignoreAvailability):
+            if len(files) == 3 or files[0]['name'].startswith('/store/b'):
+                raise RuntimeError("failed")
+            return True
+
+        self.cli.reset_mock()
+        self.cli.add_replicas.side_effect = addReplicas
+        self.cli.attach_dids.return_value = True
+        self.assertEqual(self.myRucio.createReplicasInBlocks("T2_CH_CERN", filesByBlock), set([BLOCK]))
+        self.assertEqual(self.cli.add_replicas.call_count, 3)
+        self.assertEqual(self.cli.attach_dids.call_count, 1)
+        self.assertFalse(self.cli.attach_dids_to_dids.called)
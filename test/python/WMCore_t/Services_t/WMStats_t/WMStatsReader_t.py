@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Unit tests for the concurrent latestRequest queries of WMStatsReader,
+run without CouchDB
+"""
+from __future__ import (print_function, division)
+
+import unittest
+
+from mock import patch
+
+from WMCore.Services.WMStats.WMStatsReader import WMStatsReader
+
+
+def fakeLatestJobInfoSlice(keys):
+    """
+    Emulate the latestRequest view answer for a slice of keys: one agent
+    document per key, but for the deleted documents of the 'gone' agent
+    """
+    rows = []
+    for request, agent in keys:
+        doc = None if agent == "gone" else {"workflow": request, "agent_url": agent,
+                                            "status": {"success": len(request)}}
+        rows.append({"key": [request, agent], "value": None, "doc": doc})
+    return {"rows": rows}
+
+
+class WMStatsReaderTest(unittest.TestCase):
+    """
+    Compare the rows and merged job info of the concurrent queries with the serial ones
+    """
+
+    def setUp(self):
+        self.requests = ["request_%d" % i for i in range(25)]
+        self.keys = []
+        for i, request in enumerate(self.requests):
+            for agent in ("agent1", "agent2", "gone")[:1 + i % 3]:
+                self.keys.append([request, agent])
+
+        patchers = [patch.object(WMStatsReader, "_commonInit"),
+                    patch.object(WMStatsReader, "_getLatestJobInfoSlice",
+                                 side_effect=fakeLatestJobInfoSlice),
+                    patch.object(WMStatsReader, "_getRequestAndAgent", return_value=self.keys),
+                    patch("WMCore.Services.WMStats.WMStatsReader.LATEST_JOB_INFO_SLICE", 4)]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.serialReader = WMStatsReader("http://localhost:5984/wmstats", jobInfoThreads=1)
+        self.threadedReader = WMStatsReader("http://localhost:5984/wmstats", jobInfoThreads=4)
+
+    def keyOfRow(self, row):
+        return tuple(row["key"])
+
+    def testIterLatestJobInfo(self):
+        """
+        The concurrent queries yield the same rows as the serial ones
+        """
+        serialRows = list(self.serialReader._iterLatestJobInfo(self.keys))
+        threadedRows = list(self.threadedReader._iterLatestJobInfo(self.keys))
+        self.assertEqual(len(serialRows), len(self.keys))
+        self.assertEqual(sorted(serialRows, key=self.keyOfRow), sorted(threadedRows, key=self.keyOfRow))
+        self.assertEqual(sorted(self.threadedReader._getLatestJobInfo(self.keys)["rows"], key=self.keyOfRow),
+                         sorted(serialRows, key=self.keyOfRow))
+        self.assertEqual(list(self.threadedReader._iterLatestJobInfo([])), [])
+
+        # an abandoned iteration doesn't affect the next ones
+        next(self.threadedReader._iterLatestJobInfo(self.keys))
+        self.assertEqual(len(list(self.threadedReader._iterLatestJobInfo(self.keys))), len(self.keys))
+
+    def testUpdateRequestInfoWithJobInfo(self):
+        """
+        The agent documents merged concurrently are the same as the serial ones
+        """
+        serialInfo = dict((request, {"RequestName": request}) for request in self.requests)
+        threadedInfo = dict((request, {"RequestName": request}) for request in self.requests)
+        serialStages = {}
+        self.serialReader.updateRequestInfoWithJobInfo(serialInfo, serialStages)
+        self.threadedReader.updateRequestInfoWithJobInfo(threadedInfo)
+        self.assertEqual(serialInfo, threadedInfo)
+        self.assertItemsEqual(serialStages.keys(), ["requestAgent", "jobInfo"])
+
+        # deleted agent documents are skipped
+        self.assertItemsEqual(serialInfo["request_2"]["AgentJobInfo"].keys(), ["agent1", "agent2"])
+        self.assertEqual(serialInfo["request_0"]["AgentJobInfo"]["agent1"]["status"], {"success": 9})
+
+        # same result as merging the rows of the serial query at once
+        mergedInfo = dict((request, {"RequestName": request}) for request in self.requests)
+        self.serialReader._combineRequestAndJobData(mergedInfo, self.serialReader._getLatestJobInfo(self.keys))
+        self.assertEqual(mergedInfo, threadedInfo)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,7 +12,8 @@ import unittest
 from WMCore.DAOFactory import DAOFactory
 from WMCore.DataStructs.File import File as WMFile
 from WMCore.DataStructs.Run import Run
-from WMCore.WMBS.File import File, addFilesToWMBSInBulk
+from WMCore.WMBS.File import File, ParentageCache, addFilesToWMBSInBulk, \
+    getAncestorsInBulk, getDescendantsInBulk
 from WMCore.WMBS.Fileset import Fileset
 from WMCore.WMBS.Job import Job
 from WMCore.WMBS.JobGroup import JobGroup
@@ -689,6 +690,101 @@ class FileTest(unittest.TestCase):
 
         return
 
+    def testGetAncestorsInBulk(self):
+        """
+        _testGetAncestorsInBulk_
+
+        Verify the ancestors and descendants of several files are
+        correctly loaded at once, and that the parentage cache is used.
+        """
+        testFiles = {}
+        for name in "ABCDEF":
+            testFile = File(lfn="/this/is/a/lfn%s" % name, size=1024, events=10,
+                            checksums={'cksum': 1}, locations="T1_US_FNAL_Disk")
+            testFile.create()
+            testFiles[name] = testFile
+
+        testFiles["A"].addParent(lfn="/this/is/a/lfnB")
+        testFiles["A"].addParent(lfn="/this/is/a/lfnC")
+        testFiles["B"].addParent(lfn="/this/is/a/lfnD")
+        testFiles["C"].addParent(lfn="/this/is/a/lfnD")
+        testFiles["D"].addParent(lfn="/this/is/a/lfnE")
+        testFiles["D"].addParent(lfn="/this/is/a/lfnF")
+
+        fileIDs = [testFiles[name]["id"] for name in "ABCDEF"]
+        cache = ParentageCache()
+        ancestors = getAncestorsInBulk(fileIDs, level=2, type="lfn", cache=cache)
+        self.assertEqual(ancestors[testFiles["A"]["id"]], ["/this/is/a/lfnD"])
+        self.assertEqual(ancestors[testFiles["B"]["id"]], ["/this/is/a/lfnE", "/this/is/a/lfnF"])
+        self.assertEqual(ancestors[testFiles["C"]["id"]], ["/this/is/a/lfnE", "/this/is/a/lfnF"])
+        for name in "DEF":
+            self.assertEqual(ancestors[testFiles[name]["id"]], [])
+
+        self.assertItemsEqual(list(cache.parents), fileIDs)
+        self.assertItemsEqual(list(cache.files),
+                              [testFiles[name]["id"] for name in "DEF"])
+
+        ancestors = getAncestorsInBulk([testFiles["A"]["id"]], level=1, type="file", cache=cache)
+        parentFiles = ancestors[testFiles["A"]["id"]]
+        self.assertEqual([x["lfn"] for x in parentFiles], ["/this/is/a/lfnB", "/this/is/a/lfnC"])
+        for parentFile in parentFiles:
+            self.assertEqual(parentFile["size"], 1024)
+            self.assertEqual(parentFile["events"], 10)
+            self.assertEqual(parentFile["checksums"], {'cksum': '1'})
+            self.assertTrue(parentFile["merged"])
+
+        descendants = getDescendantsInBulk([testFiles["D"]["id"], testFiles["E"]["id"]], level=2)
+        self.assertEqual(descendants[testFiles["D"]["id"]], [testFiles["A"]["id"]])
+        self.assertEqual(descendants[testFiles["E"]["id"]],
+                         sorted([testFiles["B"]["id"], testFiles["C"]["id"]]))
+
+        self.assertEqual(testFiles["A"].getAncestors(level=3, type="lfn", cache=cache),
+                         ["/this/is/a/lfnE", "/this/is/a/lfnF"])
+        return
+
+    def testParentageDAOs(self):
+        """
+        _testParentageDAOs_
+
+        Verify the DAOs used to load the parentage in bulk (this is the only
+        coverage of their SQL for the backend the tests are running against).
+        """
+        testFiles = {}
+        for name in "ABC":
+            testFile = File(lfn="/this/is/a/lfn%s" % name, size=1024, events=10,
+                            first_event=5, merged=(name != "A"),
+                            checksums={'cksum': 1, 'adler32': 'abc'})
+            testFile.create()
+            testFiles[name] = testFile
+        testFiles["A"].addParent(lfn="/this/is/a/lfnB")
+        testFiles["A"].addParent(lfn="/this/is/a/lfnC")
+        fileIDs = dict((name, testFiles[name]["id"]) for name in "ABC")
+
+        getIDsAction = self.daofactory(classname="Files.GetIDsByLFN")
+        self.assertEqual(getIDsAction.execute(["/this/is/a/lfnA", "/this/is/a/lfnB", "/not/in/wmbs"]),
+                         {"/this/is/a/lfnA": fileIDs["A"], "/this/is/a/lfnB": fileIDs["B"]})
+        self.assertEqual(getIDsAction.execute([]), {})
+
+        parentsAction = self.daofactory(classname="Files.GetParentMapByID")
+        self.assertEqual(parentsAction.execute([fileIDs["A"], fileIDs["B"]]),
+                         {fileIDs["A"]: set([fileIDs["B"], fileIDs["C"]]), fileIDs["B"]: set()})
+        childrenAction = self.daofactory(classname="Files.GetChildMapByID")
+        self.assertEqual(childrenAction.execute(fileIDs["C"]), {fileIDs["C"]: set([fileIDs["A"]])})
+
+        loadAction = self.daofactory(classname="Files.GetByID")
+        fileInfo = loadAction.execute([fileIDs["A"], fileIDs["B"]])
+        self.assertItemsEqual(list(fileInfo), [fileIDs["A"], fileIDs["B"]])
+        self.assertEqual(fileInfo[fileIDs["A"]],
+                         {"id": fileIDs["A"], "lfn": "/this/is/a/lfnA", "size": 1024, "events": 10,
+                          "first_event": 5, "merged": False})
+        self.assertTrue(fileInfo[fileIDs["B"]]["merged"])
+
+        checksumAction = self.daofactory(classname="Files.GetChecksumsByID")
+        self.assertEqual(checksumAction.execute([fileIDs["A"], fileIDs["C"]]),
+                         {fileIDs["A"]: {'cksum': '1', 'adler32': 'abc'},
+                          fileIDs["C"]: {'cksum': '1', 'adler32': 'abc'}})
+        return
+
     def testGetLocationBulk(self):
         """
         _testGetLocationBulk_
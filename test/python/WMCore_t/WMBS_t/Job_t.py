@@ -552,6 +552,7 @@ class JobTest(JobTestBase):
             goldenIDs.remove(job["id"])
 
             if job["id"] == testJobA["id"]:
+                self.assertEqual(job["workflow"], testJobA.getWorkflow()["name"])
                 assert job["fwjr_path"] == "NonsenseA", \
                     "Error: Wrong fwjr path: %s" % job["fwjr_path"]
             else:
@@ -939,6 +940,14 @@ class JobTest(JobTestBase):
         self.assertEqual(len(goldenMap.keys()), 0,
                          "Error: Missing output maps.")
 
+        # bulk version, keyed by job id
+        testJobB = Job(name="SplitJobB", files=[inputFile])
+        testJobB.create(group=testJobGroup)
+        outputMaps = outputMapAction.execute(jobID=[testJob["id"], testJobB["id"]])
+        self.assertItemsEqual(outputMaps.keys(), [testJob["id"], testJobB["id"]])
+        self.assertEqual(outputMaps[testJob["id"]], outputMap)
+        self.assertEqual(outputMaps[testJobB["id"]], outputMap)
+
         return
 
     def testLocations(self):
@@ -1037,6 +1046,12 @@ class JobTest(JobTestBase):
 
         self.assertEqual(testJob.loadOutputID(), testJobGroup.output.id)
 
+        testJobB = Job()
+        testJobB.create(group=testJobGroup)
+        loadOutputID = self.daoFactory(classname="Jobs.LoadOutputID")
+        self.assertEqual(loadOutputID.execute(jobID=[testJob["id"], testJobB["id"]]),
+                         {testJob["id"]: testJobGroup.output.id, testJobB["id"]: testJobGroup.output.id})
+
         return
 
     def testLoadForTaskArchiver(self):
@@ -1142,6 +1157,16 @@ class JobTest(JobTestBase):
         self.assertEqual(runs[100], [[101, 102]])
         self.assertEqual(runs[200], [[201, 202]])
 
+        # load the masks of several jobs at once
+        otherJob = Job()
+        otherJob.create(group=testJobGroup)
+        masksAction = self.daoFactory(classname="Masks.Load")
+        jobMasks = masksAction.execute([testJob["id"], otherJob["id"]])
+        bulkMask = Mask()
+        bulkMask.loadFromEntries(jobMasks[testJob["id"]])
+        self.assertEqual(bulkMask.getRunAndLumis(), runs)
+        self.assertEqual(len(jobMasks[otherJob["id"]]), 1)
+
         bigRun = Run(100, *[101, 102, 103, 104])
         badRun = Run(300, *[1001, 1002])
         result = loadJob['mask'].filterRunLumisByMask([bigRun, badRun])
@@ -603,6 +603,63 @@ class SubscriptionTest(unittest.TestCase):
         testFileF.delete()
         return
 
+    def testAvailableFilesByLocation(self):
+        """
+        _testAvailableFilesByLocation_
+
+        Verify the available files are properly bucketed by their set of
+        locations, also when they are streamed in several chunks.
+        """
+        testWorkflow = Workflow(spec="spec.xml", owner="Simon",
+                                name="wf001", task='Test')
+        testWorkflow.create()
+
+        testFileset = Fileset(name="TestFileset")
+        testFileset.create()
+        locations = {"A": {"goodse.cern.ch"}, "B": {"goodse.cern.ch", "testse.cern.ch"},
+                     "C": {"testse.cern.ch", "goodse.cern.ch"}, "D": {"badse.cern.ch"},
+                     "E": {"goodse.cern.ch"}}
+        testFiles = {}
+        for name in sorted(locations):
+            testFile = File(lfn="/this/is/a/lfn%s" % name, size=1024, events=20,
+                            checksums={'cksum': 1}, locations=locations[name])
+            testFile.create()
+            testFileset.addFile(testFile)
+            testFiles[name] = testFile
+        testFileset.commit()
+
+        testSubscription = Subscription(fileset=testFileset,
+                                        workflow=testWorkflow)
+        testSubscription.create()
+        testSubscription.acquireFiles([testFiles["E"]])
+
+        for chunkSize in (1, 2, 10000):
+            filesByLocation = testSubscription.availableFilesByLocation(chunkSize=chunkSize)
+            self.assertItemsEqual(list(filesByLocation),
+                                  [frozenset(["goodse.cern.ch"]), frozenset(["badse.cern.ch"]),
+                                   frozenset(["goodse.cern.ch", "testse.cern.ch"])])
+            self.assertItemsEqual([x["lfn"] for x in filesByLocation[frozenset(["goodse.cern.ch", "testse.cern.ch"])]],
+                                  ["/this/is/a/lfnB", "/this/is/a/lfnC"])
+            self.assertEqual([x["lfn"] for x in filesByLocation[frozenset(["goodse.cern.ch"])]],
+                             ["/this/is/a/lfnA"])
+            for availableFile in filesByLocation[frozenset(["badse.cern.ch"])]:
+                self.assertEqual(availableFile["lfn"], "/this/is/a/lfnD")
+                self.assertEqual(availableFile["size"], 1024)
+                self.assertEqual(availableFile["events"], 20)
+                self.assertEqual(availableFile["checksums"], {'cksum': '1'})
+                self.assertEqual(availableFile["locations"], {"badse.cern.ch"})
+
+        filesByLocation = testSubscription.availableFilesByLocation(limit=2, chunkSize=1)
+        self.assertEqual(sum(len(x) for x in filesByLocation.values()), 2)
+
+        availAction = self.daofactory(classname="Subscriptions.GetAvailableFiles")
+        availableFiles = availAction.execute(subscription=testSubscription["id"])
+        self.assertEqual(len(availableFiles), 4)
+        for availableFile in availableFiles:
+            if availableFile["file"] == testFiles["C"]["id"]:
+                self.assertEqual(availableFile["locations"], ["goodse.cern.ch", "testse.cern.ch"])
+        return
+
     def testAvailableFilesMeta(self):
         """
         _testAvailableFilesMeta_
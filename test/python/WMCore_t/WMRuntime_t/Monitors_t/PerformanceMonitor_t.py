@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""
+_PerformanceMonitor_t_
+
+Unittests for the /proc sampler of the PerformanceMonitor
+"""
+from __future__ import division
+
+import os
+import subprocess
+import unittest
+
+from WMCore.FwkJobReport.Report import Report
+from WMCore.WMRuntime.Monitors.PerformanceMonitor import (RunningStats, ProcessTreeSampler,
+                                                          listProcessTree, readProcPSS, readProcStat)
+
+
+class PerformanceMonitorTest(unittest.TestCase):
+
+    def testRunningStats(self):
+        """
+        Test the incremental minimum, maximum and average
+        """
+        stats = RunningStats()
+        self.assertIsNone(stats.average)
+        for value in (3, 1, 5, 3):
+            stats.update(value)
+        self.assertEqual(stats.minimum, 1)
+        self.assertEqual(stats.maximum, 5)
+        self.assertEqual(stats.average, 3)
+
+    def testReadProc(self):
+        """
+        Test reading the /proc files of a process and its children
+        """
+        stat = readProcStat(os.getpid())
+        self.assertEqual(stat['ppid'], os.getppid())
+        self.assertTrue(stat['rss'] > 0)
+        self.assertTrue(stat['vsize'] >= stat['rss'])
+        self.assertTrue(readProcPSS(os.getpid()) > 0)
+
+        child = subprocess.Popen(["sleep", "30"])
+        try:
+            self.assertItemsEqual(listProcessTree(child.pid), [child.pid])
+            self.assertIn(child.pid, listProcessTree(os.getpid()))
+        finally:
+            child.kill()
+            child.wait()
+        self.assertIsNone(readProcStat(child.pid))
+
+    def testSampler(self):
+        """
+        Test sampling a process tree and recording it in a report
+        """
+        sampler = ProcessTreeSampler(os.getpid())
+        for _ in range(3):
+            sample = sampler.sample()
+            self.assertTrue(sample['pss'] > 0)
+            self.assertTrue(sample['rss'] > 0)
+            self.assertTrue(sample['pcpu'] >= 0)
+            self.assertTrue(0 < sample['pmem'] < 100)
+        self.assertEqual(sampler.stats['rss'].count, 3)
+
+        report = Report("cmsRun1")
+        sampler.fillReport(report, "cmsRun1")
+        performance = report.retrieveStep("cmsRun1").performance
+        self.assertEqual(performance.PSSMemory.max, sampler.stats['pss'].maximum)
+        self.assertEqual(performance.RSSMemory.min, sampler.stats['rss'].minimum)
+        self.assertEqual(performance.PercentCPU.average, sampler.stats['pcpu'].average)
+        self.assertTrue(performance.VSizeMemory.max >= performance.RSSMemory.max)
+
+        child = subprocess.Popen(["true"])
+        child.wait()
+        self.assertIsNone(ProcessTreeSampler(child.pid).sample())
+
+
+if __name__ == '__main__':
+    unittest.main()
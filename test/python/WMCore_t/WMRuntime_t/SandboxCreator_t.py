@@ -18,6 +18,7 @@ import WMCore_t.WMSpec_t.TestWorkloads as TestWorkloads
 
 import WMCore.WMRuntime.SandboxCreator as SandboxCreator
 import WMCore.WMSpec.WMTask as WMTask
+from WMCore.WMRuntime.Unpacker import extractSandbox
 
 
 class SandboxCreator_t(unittest.TestCase):
@@ -78,6 +79,40 @@ class SandboxCreator_t(unittest.TestCase):
         shutil.rmtree( extractDir )
         shutil.rmtree( tempdir )
 
+    def testSandboxPackageCache(self):
+        """
+        Test the WMCore package reuse and the gz compressed sandboxes
+        """
+        creator = SandboxCreator.SandboxCreator(compression="gz")
+        tempdir = tempfile.mkdtemp()
+        workload = TestWorkloads.twoTaskTree()
+        boxpath = creator.makeSandbox(tempdir, workload)
+        self.assertTrue(boxpath.endswith("-Sandbox.tar.gz"))
+
+        zipPath = creator.getWMCorePackage(tempdir)
+        self.fileExistsTest(zipPath)
+        self.assertEqual(os.path.join(tempdir, "WMCorePackageCache"), os.path.dirname(zipPath))
+        zipMTime = os.path.getmtime(zipPath)
+
+        # a second workflow reuses the same WMCore package
+        workload = TestWorkloads.oneTaskTwoStep()
+        otherBoxpath = SandboxCreator.SandboxCreator(compression="none").makeSandbox(tempdir, workload)
+        self.assertTrue(otherBoxpath.endswith("-Sandbox.tar"))
+        self.assertEqual(zipPath, creator.getWMCorePackage(tempdir))
+        self.assertEqual(zipMTime, os.path.getmtime(zipPath))
+        self.assertEqual(1, len(os.listdir(os.path.dirname(zipPath))))
+
+        for archive in (boxpath, otherBoxpath):
+            extractDir = tempfile.mkdtemp()
+            extractSandbox(archive, extractDir)
+            self.fileExistsTest(extractDir + "/WMSandbox/WMWorkload.pkl")
+            self.fileExistsTest(extractDir + "/WMCore.zip")
+            self.fileExistsTest(extractDir + "/PSetTweaks")
+            shutil.rmtree(extractDir)
+
+        self.assertRaises(ValueError, SandboxCreator.SandboxCreator, compression="zstd")
+        shutil.rmtree(tempdir)
+
     def fileExistsTest(self, file, msg=None):
         if msg is None:
             msg = "Failed file existence test for (%s)" % file
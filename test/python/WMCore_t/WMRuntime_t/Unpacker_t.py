@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+_Unpacker_t_
+
+Unittests for the job package extraction of the Unpacker
+"""
+
+import os
+import unittest
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from WMQuality.TestInit import TestInit
+
+from WMCore.DataStructs.Job import Job
+from WMCore.DataStructs.JobPackage import JobPackage
+from WMCore.WMRuntime.Unpacker import extractPackageJob
+
+
+class UnpackerTest(unittest.TestCase):
+    def setUp(self):
+        """
+        _setUp_
+
+        Save a job package to a temporary directory.
+        """
+        self.testInit = TestInit(__file__)
+        self.testDir = self.testInit.generateWorkDir()
+        self.packageFile = os.path.join(self.testDir, "JobPackage.pkl")
+        self.targetFile = os.path.join(self.testDir, "JobPackage.pcl")
+
+        package = JobPackage(directory="/some/dir")
+        for i in range(10):
+            newJob = Job("Job%s" % i)
+            newJob["id"] = i
+            package[i] = newJob
+        package.save(self.packageFile)
+        return
+
+    def tearDown(self):
+        self.testInit.delWorkDir()
+
+    def testExtractPackageJob(self):
+        """
+        _testExtractPackageJob_
+
+        Verify that a single job is copied out of an indexed package.
+        """
+        self.assertTrue(extractPackageJob(self.packageFile, 4, self.targetFile))
+
+        newPackage = JobPackage()
+        newPackage.load(self.targetFile)
+        self.assertItemsEqual(['directory', 4], newPackage.keys())
+        self.assertEqual("/some/dir", newPackage['directory'])
+        self.assertEqual("Job4", newPackage[4]["name"])
+
+        self.assertFalse(extractPackageJob(self.packageFile, 1000, self.targetFile))
+        return
+
+    def testExtractOldPackage(self):
+        """
+        _testExtractOldPackage_
+
+        Verify that old style packages aren't extracted.
+        """
+        package = JobPackage()
+        package.load(self.packageFile)
+        with open(self.packageFile, 'wb') as fileHandle:
+            pickle.dump(package, fileHandle, -1)
+
+        self.assertFalse(extractPackageJob(self.packageFile, 4, self.targetFile))
+        self.assertFalse(os.path.exists(self.targetFile))
+        return
+
+    def testExtractTruncatedPackage(self):
+        """
+        _testExtractTruncatedPackage_
+
+        Verify that a package with a corrupted trailer is rejected.
+        """
+        with open(self.packageFile, 'r+b') as fileHandle:
+            fileHandle.seek(-4, os.SEEK_END)
+            fileHandle.truncate()
+
+        self.assertRaises(IOError, extractPackageJob, self.packageFile, 4, self.targetFile)
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,7 @@
 Tests for ConfigSectionTree
 """
 
+import pickle
 import unittest
 
 from WMCore.WMSpec.ConfigSectionTree import ConfigSectionTree
@@ -135,12 +136,74 @@ class ConfigSectionTreeTest(unittest.TestCase):
         topNode = TreeHelper(findTopNode(node3))
         self.assertEqual(topNode.name(), "node2")
 
-
-
-
-
-
-
+    def testNodeIndex(self):
+        """
+        _testNodeIndex_
+
+        Verify the cached node index follows the changes of the tree.
+        """
+        top = TreeHelper(ConfigSectionTree("top"))
+        top.addNode(ConfigSectionTree("child1"))
+        child1 = top.getNodeWithHelper("child1")
+        child1.addNode(ConfigSectionTree("grandChild1"))
+        self.assertEqual(top.getNode("grandChild1")._internal_name, "grandChild1")
+        self.assertIsNotNone(top.data._internal_node_index)
+        self.assertEqual(child1.getNode("top"), top.data)
+
+        # adding a node invalidates the index
+        top.addTopNode(ConfigSectionTree("child2"))
+        self.assertIsNone(top.data._internal_node_index)
+        self.assertEqual(top.getNode("child2")._internal_name, "child2")
+        self.assertEqual(top.listNodes(), ["top", "child2", "child1", "grandChild1"])
+        self.assertEqual([x._internal_name for x in top.nodeIterator()],
+                         ["top", "child2", "child1", "grandChild1"])
+
+        # deleting the subtree drops all of its nodes
+        top.deleteNode("child1")
+        self.assertIsNone(top.getNode("child1"))
+        self.assertIsNone(top.getNode("grandChild1"))
+
+        # removing a node behind the tree back is detected
+        grandChild2 = ConfigSectionTree("grandChild2")
+        TreeHelper(top.getNode("child2")).addNode(grandChild2)
+        self.assertEqual(top.getNode("grandChild2"), grandChild2)
+        delattr(top.getNode("child2").tree.children, "grandChild2")
+        top.getNode("child2").tree.childNames.remove("grandChild2")
+        self.assertIsNone(top.getNode("grandChild2"))
+
+        # a node added behind the tree back is found on a miss
+        child3 = ConfigSectionTree("child3")
+        child3._internal_parent_ref = top.data.tree.children
+        setattr(top.data.tree.children, "child3", child3)
+        top.data.tree.childNames.append("child3")
+        self.assertEqual(top.getNode("child3"), child3)
+
+        # so is the removal of any ancestor of an indexed node
+        TreeHelper(child3).addNode(ConfigSectionTree("grandChild3"))
+        self.assertEqual(top.getNode("grandChild3")._internal_name, "grandChild3")
+        delattr(top.data.tree.children, "child3")
+        top.data.tree.childNames.remove("child3")
+        self.assertIsNone(top.getNode("grandChild3"))
+        return
+
+    def testNodeIndexPickle(self):
+        """
+        _testNodeIndexPickle_
+
+        Verify the cached node index is not pickled along with the tree.
+        """
+        top = TreeHelper(ConfigSectionTree("top"))
+        top.addNode(ConfigSectionTree("child1"))
+        self.assertIsNotNone(top.getNode("child1"))
+        self.assertIsNotNone(top.data._internal_node_index)
+
+        data = pickle.dumps(top.data, -1)
+        self.assertNotIn(b"_internal_node_index", data)
+        newTop = TreeHelper(pickle.loads(data))
+        self.assertIsNone(getattr(newTop.data, "_internal_node_index", None))
+        self.assertEqual(newTop.getNode("child1")._internal_name, "child1")
+        self.assertEqual(newTop.listNodes(), ["top", "child1"])
+        return
 
 
 if __name__ == '__main__':
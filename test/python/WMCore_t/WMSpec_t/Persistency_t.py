@@ -1,10 +1,39 @@
-from WMCore.WMSpec.Persistency import PersistencyHelper
+import os
+import pickle
+import shutil
+import tempfile
 import unittest
+
+from WMCore.WMSpec.Persistency import (PersistencyHelper, LazyTaskSection, SpecCache,
+                                       decodeSpec, encodeSpec, SPEC_MAGIC)
 from WMCore.WMSpec.WMStep import WMStep, makeWMStep
+from WMCore.WMSpec.WMWorkload import WMWorkload, WMWorkloadHelper
 
 
 class PersistencyTest(unittest.TestCase):
 
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+    def createWorkload(self, nTasks=5):
+        """
+        _createWorkload_
+
+        Workload with nTasks top level tasks, each with a child task
+        """
+        workload = WMWorkloadHelper(WMWorkload("TestWorkload"))
+        for i in range(nTasks):
+            task = workload.newTask("Task%d" % i)
+            task.makeStep("cmsRun1")
+            task.setTaskType("Processing")
+            childTask = task.addTask("Merge%d" % i)
+            childTask.makeStep("cmsRun1")
+            childTask.setTaskType("Merge")
+        return workload
+
     def testSplitUrl(self):
         helper = PersistencyHelper()
         url = 'https://cmsreqmgr.cern.ch/couchdb/mydb/doc/spec'
@@ -19,6 +48,155 @@ class PersistencyTest(unittest.TestCase):
         self.assertEqual(dbname, 'mydb')
         self.assertEqual(doc, 'doc/spec')
 
+    def testIndexedFormat(self):
+        """
+        _testIndexedFormat_
+
+        Save and load a workload in the indexed format, tasks must only be
+        loaded when they are accessed.
+        """
+        workload = self.createWorkload()
+        specFile = os.path.join(self.tempDir, "spec.pkl")
+        workload.save(specFile, specFormat="indexed")
+        with open(specFile, 'rb') as handle:
+            self.assertTrue(handle.read().startswith(SPEC_MAGIC))
+
+        loadedWorkload = WMWorkloadHelper(WMWorkload("workload"))
+        loadedWorkload.load(specFile)
+        self.assertEqual(loadedWorkload.name(), "TestWorkload")
+        self.assertFalse(isinstance(loadedWorkload.data.tasks, LazyTaskSection))
+        self.assertEqual(loadedWorkload.listAllTaskPathNames(), workload.listAllTaskPathNames())
+
+        loadedWorkload = WMWorkloadHelper(WMWorkload("workload"))
+        loadedWorkload.load(specFile, lazy=True)
+        self.assertTrue(isinstance(loadedWorkload.data.tasks, LazyTaskSection))
+        self.assertEqual(loadedWorkload.data.tasks.loadedTasks(), [])
+
+        task = loadedWorkload.getTaskByPath("/TestWorkload/Task3/Merge3")
+        self.assertEqual(task.taskType(), "Merge")
+        self.assertEqual(loadedWorkload.data.tasks.loadedTasks(), ["Task3"])
+        self.assertTrue(task.getTopConfigSection() is loadedWorkload.data)
+        # child tasks are loaded lazily too
+        childTasks = loadedWorkload.getTask("Task3").data.tree.children
+        self.assertTrue(isinstance(childTasks, LazyTaskSection))
+        self.assertEqual(childTasks.loadedTasks(), ["Merge3"])
+        self.assertEqual(task.getNode("Task3"), loadedWorkload.getTask("Task3").data)
+
+        task = loadedWorkload.getTaskByName("Merge1")
+        self.assertEqual(task.getPathName(), "/TestWorkload/Task1/Merge1")
+        self.assertItemsEqual(loadedWorkload.data.tasks.loadedTasks(), ["Task1", "Task3"])
+        self.assertTrue(loadedWorkload.data.tasks.hasLazyTask("Merge2"))
+        self.assertIsNone(loadedWorkload.getTaskByName("Merge9"))
+        self.assertIsNone(loadedWorkload.getTaskByPath("/TestWorkload/Task2/Merge3"))
+
+        self.assertEqual(loadedWorkload.listAllTaskPathNames(), workload.listAllTaskPathNames())
+        self.assertItemsEqual(loadedWorkload.data.tasks.loadedTasks(),
+                              ["Task%d" % i for i in range(5)])
+
+        # unloaded tasks can be removed
+        loadedWorkload = WMWorkloadHelper(WMWorkload("workload"))
+        loadedWorkload.load(specFile, lazy=True)
+        loadedWorkload.removeTask("Task1")
+        self.assertFalse(hasattr(loadedWorkload.data.tasks, "Task1"))
+        self.assertEqual(len(loadedWorkload.listAllTaskPathNames()), 8)
+        return
+
+    def testLegacyFormat(self):
+        """
+        _testLegacyFormat_
+
+        Legacy pickled specs are still loaded, and lazily loaded workloads
+        can be written back in the legacy format.
+        """
+        workload = self.createWorkload()
+        specFile = os.path.join(self.tempDir, "spec.pkl")
+        workload.save(specFile, specFormat="pickle")
+        with open(specFile, 'rb') as handle:
+            self.assertEqual(pickle.load(handle).tasks.tasklist, workload.listAllTaskNodes()[::2])
+
+        loadedWorkload = WMWorkloadHelper(WMWorkload("workload"))
+        loadedWorkload.load(specFile)
+        self.assertEqual(loadedWorkload.listAllTaskPathNames(), workload.listAllTaskPathNames())
+
+        lazyWorkload = decodeSpec(encodeSpec(workload.data, "indexed"))
+        data = pickle.loads(encodeSpec(lazyWorkload, specFormat="pickle"))
+        self.assertFalse(isinstance(data.tasks, LazyTaskSection))
+        self.assertFalse(isinstance(data.tasks.Task0.tree.children, LazyTaskSection))
+        self.assertEqual(WMWorkloadHelper(data).listAllTaskPathNames(), workload.listAllTaskPathNames())
+        self.assertRaises(ValueError, encodeSpec, workload.data, "json")
+        return
+
+    def testSpecCache(self):
+        """
+        _testSpecCache_
+
+        Specs with the same content are decoded from the cache, and every
+        load gets its own workload object.
+        """
+        workload = self.createWorkload()
+        specCache = SpecCache(maxSize=1)
+        content = encodeSpec(workload.data, specFormat="indexed")
+
+        dataA = specCache.decode(content)
+        dataB = specCache.decode(content)
+        self.assertEqual((specCache.hits, specCache.misses), (1, 1))
+        self.assertFalse(dataA is dataB)
+        WMWorkloadHelper(dataA).getTask("Task0").setTaskType("Skim")
+        self.assertEqual(WMWorkloadHelper(dataB).getTask("Task0").taskType(), "Processing")
+
+        legacyContent = encodeSpec(workload.data, specFormat="pickle")
+        specCache.decode(legacyContent)
+        data = specCache.decode(legacyContent)
+        self.assertEqual((specCache.hits, specCache.misses), (2, 2))
+        self.assertTrue(isinstance(data.tasks, LazyTaskSection))
+        self.assertEqual(data.tasks.loadedTasks(), [])
+        self.assertEqual(WMWorkloadHelper(data).listAllTaskPathNames(), workload.listAllTaskPathNames())
+
+        # the first spec was evicted
+        specCache.decode(content)
+        self.assertEqual(specCache.misses, 3)
+        return
+
+    def testSpecFileCache(self):
+        """
+        _testSpecFileCache_
+
+        Spec files are only decoded again when their content changes, even
+        if they are rewritten with the same size and modification time.
+        """
+        workload = self.createWorkload()
+        specCache = SpecCache(maxSize=2)
+        specFile = os.path.join(self.tempDir, "spec.pkl")
+        workload.data.testValue = "A"
+        workload.save(specFile)
+        os.utime(specFile, (1500000000, 1500000000))
+
+        data = specCache.decodeFile(specFile)
+        self.assertEqual(WMWorkloadHelper(data).listAllTaskPathNames(), workload.listAllTaskPathNames())
+        specCache.decodeFile(specFile)
+        self.assertEqual((specCache.hits, specCache.misses), (1, 1))
+
+        stat = os.stat(specFile)
+        workload.data.testValue = "B"
+        workload.save(specFile)
+        os.utime(specFile, (1500000000, 1500000000))
+        self.assertEqual(os.stat(specFile).st_mtime, stat.st_mtime)
+        self.assertEqual(os.stat(specFile).st_size, stat.st_size)
+        data = specCache.decodeFile(specFile)
+        self.assertEqual((specCache.hits, specCache.misses), (1, 2))
+        self.assertEqual(data.testValue, "B")
+
+        # a spec file with the same content is decoded from the cache
+        otherFile = os.path.join(self.tempDir, "other.pkl")
+        shutil.copy(specFile, otherFile)
+        specCache.decodeFile(otherFile)
+        self.assertEqual((specCache.hits, specCache.misses), (2, 2))
+
+        specCache.clear()
+        specCache.decodeFile(specFile)
+        self.assertEqual((specCache.hits, specCache.misses), (2, 3))
+        return
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -87,6 +87,66 @@ class DataCacheTests(unittest.TestCase):
         self.assertEqual("amaltaro_TaskChain_InclParents_HG1812_Validation_181203_121005_1483",
                          data[0]['RequestName'])
 
+    def testFilterByIndexedKeys(self):
+        data = list(DataCache.filterDataByRequest(filterDict={'RequestStatus': 'failed'}, maskList='RequestType'))
+        self.assertEqual(1, len(data))
+        self.assertEqual("ReReco", data[0]['RequestType'])
+
+        data = list(DataCache.filterDataByRequest(filterDict={'RequestStatus': ['acquired', 'failed'],
+                                                              'RequestType': 'ReDigi'}))
+        self.assertEqual(3, len(data))
+
+        data = list(DataCache.filterData(filterDict={'RequestType': 'TaskChain', 'IncludeParents': 'True'},
+                                         maskList=['RequestName']))
+        self.assertItemsEqual(["amaltaro_TaskChain_InclParents_HG1812_Validation_181203_121005_1483"],
+                              data)
+
+        data = list(DataCache.filterDataByRequest(filterDict={'RequestStatus': 'running-open'}))
+        self.assertEqual([], data)
+
+        data = list(DataCache.filterDataByRequest(filterDict={'AgentJobInfo': 'CLEANED',
+                                                              'RequestStatus': 'failed'}))
+        self.assertEqual(1, len(data))
+
+    def testIncrementalUpdates(self):
+        reqName = "amaltaro_ReReco_BlockWhiteBlack_HG1812_Validation_181203_121036_1728"
+        doc = dict(DataCache.getlatestJobData()[reqName])
+        oldData = DataCache.getlatestJobData()
+
+        doc['RequestStatus'] = 'running-open'
+        DataCache.updateRequests({reqName: doc}, {"reqmgr": 10})
+        self.assertEqual(20, len(DataCache.getlatestJobData()))
+        self.assertEqual('failed', oldData[reqName]['RequestStatus'])
+        self.assertEqual([], list(DataCache.filterDataByRequest({'RequestStatus': 'failed'})))
+        data = list(DataCache.filterDataByRequest({'RequestStatus': 'running-open'}, 'RequestStatus'))
+        self.assertEqual([{'RequestName': reqName, 'RequestStatus': 'running-open'}], data)
+        self.assertEqual({"reqmgr": 10}, DataCache.getSequences())
+
+        jobDoc = {"_id": "agent1-%s" % reqName, "workflow": reqName, "agent_url": "agent1:9999",
+                  "type": "agent_request", "status": {"success": 1}}
+        DataCache.updateJobInfo([jobDoc], sequences={"wmstats": 5})
+        self.assertItemsEqual(["agent1:9999"], DataCache.getlatestJobData()[reqName]['AgentJobInfo'].keys())
+        self.assertEqual([], list(DataCache.filterDataByRequest({'AgentJobInfo': 'CLEANED',
+                                                                 'RequestStatus': 'running-open'})))
+        # request updates keep the job information already cached
+        DataCache.updateRequests({reqName: doc})
+        self.assertIn('AgentJobInfo', DataCache.getlatestJobData()[reqName])
+
+        DataCache.updateJobInfo([], deletedIDs=[jobDoc["_id"]])
+        self.assertEqual({}, DataCache.getlatestJobData()[reqName]['AgentJobInfo'])
+
+        DataCache.removeRequests([reqName], {"reqmgr": 11})
+        self.assertEqual(19, len(DataCache.getlatestJobData()))
+        self.assertEqual([], list(DataCache.filterDataByRequest({'RequestStatus': 'running-open'})))
+        self.assertEqual({"reqmgr": 11, "wmstats": 5}, DataCache.getSequences())
+
+    def testCacheStatus(self):
+        status = DataCache.getCacheStatus()
+        self.assertEqual(20, status['size'])
+        self.assertFalse(status['expired'])
+        self.assertTrue(status['age'] <= 1)
+        self.assertEqual(7, status['indexes']['RequestType'])
+
 
 if __name__ == '__main__':
     unittest.main()